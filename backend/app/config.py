@@ -12,14 +12,115 @@ class Settings(BaseSettings):
     elasticsearch_url: str = ""
     elasticsearch_cloud_id: str = ""
     elasticsearch_api_key: str = ""
+    # Settings applied by the per-org index templates (installed at startup)
+    index_number_of_shards: int = 1
+    index_number_of_replicas: int = 1
+    index_refresh_interval: str = "1s"
+    # Feedback mapping: lean (no text.keyword, author fields and metadata not indexed) or standard
+    feedback_mapping_profile: str = "lean"
+    # Matches counted for list totals (feedback, search, customers) unless a request asks for
+    # exact totals; past it totals are a lower bound and sorted feedback lists stop early
+    list_track_total_hits: int = 10000
+    # Index tenancy: "per_org" gives each org its own indices; "shared" keeps one
+    # index per data type routed by org_id, with {org}-feedback etc. as filtered aliases
+    index_tenancy: str = "per_org"
+    shared_index_prefix: str = "shared"
+    shared_index_shards: int = 3
+    # Feedback layout: "none" (one {org}-feedback index) or "monthly" ({org}-feedback-YYYY.MM
+    # partitions by created_at behind the {org}-feedback alias; per_org tenancy only).
+    # ILM force-merges, shrinks and freezes writes on a month this many days after it ends.
+    feedback_partitioning: str = "none"
+    feedback_partition_warm_after_days: int = 30
+    # Dashboard aggregations: "auto" samples with random_sampler once an org has more than
+    # analytics_sampling_min_org_docs feedback docs, "on" always, "off" never. The sampling
+    # probability aims at analytics_sampling_target_docs docs per widget query.
+    analytics_sampling: str = "auto"
+    analytics_sampling_min_org_docs: int = 5_000_000
+    analytics_sampling_target_docs: int = 200_000
+    # Volume chart: the finest of day/week/month/quarter/year with at most this many buckets
+    analytics_volume_max_buckets: int = 120
+    # Dashboard widget queries: "dsl" (Query DSL aggregations; sampling and snapshots apply)
+    # or "esql" (ES|QL STATS with columnar results)
+    analytics_engine: str = "dsl"
+    # In-process columnar (NumPy) snapshots of hot orgs' feedback answer dashboard widgets
+    # without ES. An org is snapshotted after analytics_snapshot_build_after_requests widget
+    # queries if it has at most analytics_snapshot_max_org_docs docs; least recently used
+    # snapshots are evicted beyond analytics_snapshot_max_bytes, and every
+    # analytics_snapshot_verify_seconds each one is checked against ES (0 disables).
+    analytics_snapshot_enabled: bool = False
+    analytics_snapshot_max_bytes: int = 256 * 1024 * 1024
+    analytics_snapshot_max_org_docs: int = 2_000_000
+    analytics_snapshot_build_after_requests: int = 20
+    analytics_snapshot_verify_seconds: float = 300.0
 
     # Elastic Agent Builder (Phase 5)
     kibana_url: str = ""
     kibana_api_key: str = ""
     agent_id: str = "context-engine-agent"
+    # Trust a verified tool/agent registration fingerprint for this long before re-checking
+    agent_registration_recheck_seconds: int = 300
+    # Answer templated analytics questions locally instead of via Agent Builder
+    agent_fast_path_enabled: bool = True
+    agent_fast_path_cache_seconds: int = 60
+    # Max duration of one streamed agent turn
+    agent_stream_timeout_seconds: float = 300.0
+
+    # Pooled HTTP client for Kibana and LLM calls (HTTP/2 needs the h2 package)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http_timeout_seconds: float = 60.0
+    http2_enabled: bool = True
 
     # Spec Generation LLM (Phase 6) - optional; fallback to Kibana converse
     spec_inference_id: str = ""
+    # Per-document LLM timeout in seconds; documents are generated concurrently
+    spec_document_timeouts: dict[str, float] = {
+        "prd": 300.0,
+        "architecture": 240.0,
+        "rules": 180.0,
+        "plan": 240.0,
+    }
+    # Background spec generation: worker pool size and in-flight jobs per org
+    spec_job_workers: int = 4
+    spec_job_max_per_org: int = 2
+    spec_progress_poll_seconds: float = 1.0
+    # Stream tokens from the inference _stream API (falls back to full completion)
+    spec_streaming_enabled: bool = True
+    # Token budget for feedback quotes in each document's prompt (0 = no quotes).
+    # The PRD budget is about 70% of what the old fixed 15 quotes took.
+    spec_quote_token_budgets: dict[str, int] = {
+        "prd": 900,
+        "architecture": 0,
+        "rules": 0,
+        "plan": 0,
+    }
+    # Estimated Jaccard similarity at which two quotes count as near-duplicates
+    spec_quote_dedupe_threshold: float = 0.6
+    # Incremental refresh: regenerate once new feedback since generation is at least
+    # min_new_feedback and min_growth_ratio of the original; sweep interval 0 = off
+    spec_refresh_min_new_feedback: int = 10
+    spec_refresh_min_growth_ratio: float = 0.1
+    spec_refresh_batch_size: int = 50
+    spec_refresh_interval_seconds: int = 0
+    # Content-addressed LLM completion cache (ES index llm-completion-cache)
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 5000
+    llm_cache_max_entry_bytes: int = 200_000
+
+    # Feedback re-denormalization (customer name/segment copied into feedback docs)
+    feedback_sync_requests_per_second: float = 500.0
+    feedback_sync_slices: str = "auto"
+    feedback_sync_batch_size: int = 1000
+
+    # Mapping migrations (scripts/migrate_index_mappings.py): reindex throttle and slices
+    index_migration_requests_per_second: float = 1000.0
+    index_migration_slices: str = "auto"
+
+    # In-memory customer name matcher for feedback linking
+    customer_matcher_ttl_seconds: int = 300
+    customer_matcher_fuzzy_threshold: float = 0.88
 
     # Auth
     jwt_secret_key: str = "change-this-to-a-random-64-char-string"
@@ -2,7 +2,7 @@
 
 from typing import Any
 
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 
 from app.config import get_settings
 from app.utils.logging import get_logger
@@ -12,33 +12,67 @@ logger = get_logger(__name__)
 _client: Elasticsearch | None = None
 
 
+def _client_kwargs() -> dict[str, Any]:
+    """Connection kwargs shared by the sync and async clients."""
+    settings = get_settings()
+    if not settings.elasticsearch_api_key:
+        raise ValueError("ELASTICSEARCH_API_KEY must be set in .env")
+    if settings.elasticsearch_url:
+        return {
+            "hosts": [settings.elasticsearch_url],
+            "api_key": settings.elasticsearch_api_key,
+            "request_timeout": 300,
+        }
+    if settings.elasticsearch_cloud_id:
+        return {
+            "cloud_id": settings.elasticsearch_cloud_id,
+            "api_key": settings.elasticsearch_api_key,
+            "request_timeout": 300,
+        }
+    raise ValueError(
+        "Set ELASTICSEARCH_URL (or ELASTICSEARCH_CLOUD_ID) and ELASTICSEARCH_API_KEY in .env"
+    )
+
+
 def get_es_client() -> Elasticsearch:
     """Return singleton Elasticsearch client."""
     global _client
     if _client is None:
-        settings = get_settings()
-        if not settings.elasticsearch_api_key:
-            raise ValueError("ELASTICSEARCH_API_KEY must be set in .env")
-        if settings.elasticsearch_url:
-            _client = Elasticsearch(
-                hosts=[settings.elasticsearch_url],
-                api_key=settings.elasticsearch_api_key,
-                request_timeout=300,
-            )
-        elif settings.elasticsearch_cloud_id:
-            _client = Elasticsearch(
-                cloud_id=settings.elasticsearch_cloud_id,
-                api_key=settings.elasticsearch_api_key,
-                request_timeout=300,
-            )
-        else:
-            raise ValueError(
-                "Set ELASTICSEARCH_URL (or ELASTICSEARCH_CLOUD_ID) and ELASTICSEARCH_API_KEY in .env"
-            )
+        _client = Elasticsearch(**_client_kwargs())
         logger.info("Elasticsearch client initialized")
     return _client
 
 
+def create_async_es_client() -> AsyncElasticsearch:
+    """
+    Create a new AsyncElasticsearch client.
+
+    Async clients are bound to the event loop they first run on, so callers own
+    the client and must close() it when done.
+    """
+    return AsyncElasticsearch(**_client_kwargs())
+
+
+def get_es_http_target() -> tuple[str, dict[str, str]]:
+    """
+    Return (base_url, auth headers) for raw HTTP calls to Elasticsearch.
+
+    Used for streaming endpoints (e.g. inference _stream) whose responses the
+    Python client buffers in full.
+    """
+    from elastic_transport.client_utils import parse_cloud_id
+
+    kwargs = _client_kwargs()
+    headers = {"Authorization": f"ApiKey {kwargs['api_key']}"}
+    if "hosts" in kwargs:
+        return kwargs["hosts"][0].rstrip("/"), headers
+    cloud = parse_cloud_id(kwargs["cloud_id"])
+    if not cloud.es_address:
+        raise ValueError("ELASTICSEARCH_CLOUD_ID has no Elasticsearch address")
+    host, port = cloud.es_address
+    return f"https://{host}:{port}", headers
+
+
 def check_es_health() -> dict[str, Any]:
     """
     Check Elasticsearch cluster health.
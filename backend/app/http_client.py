@@ -0,0 +1,98 @@
+"""Shared pooled HTTP clients for Kibana and LLM calls."""
+
+import asyncio
+import threading
+from typing import Any
+
+import httpx
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_async_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_kwargs() -> dict[str, Any]:
+    """Pool limits, keep-alive and protocol shared by the sync and async clients."""
+    settings = get_settings()
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        "timeout": httpx.Timeout(settings.http_timeout_seconds, connect=10.0),
+        "http2": settings.http2_enabled and _http2_available(),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide sync HTTP client (thread-safe, pooled)."""
+    global _client
+    with _lock:
+        if _client is None:
+            kwargs = _client_kwargs()
+            _client = httpx.Client(**kwargs)
+            logger.info("HTTP client initialized (http2=%s)", kwargs["http2"])
+        return _client
+
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """
+    Create a new pooled AsyncClient with the shared settings.
+
+    For code running on its own event loop (e.g. spec job workers); the caller
+    owns the client and must aclose() it.
+    """
+    return httpx.AsyncClient(**_client_kwargs())
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared AsyncClient for the running event loop.
+
+    The client is bound to the loop it was created on (the app loop once
+    open_http_clients ran in lifespan); a different loop gets a fresh client.
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop or _async_client.is_closed:
+        if _async_client is not None and not _async_client.is_closed:
+            logger.warning("Async HTTP client requested from a new event loop; creating another")
+        _async_client = create_async_http_client()
+        _async_loop = loop
+    return _async_client
+
+
+async def open_http_clients() -> None:
+    """Create the shared clients at startup so the first requests reuse them."""
+    get_http_client()
+    get_async_http_client()
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients and their pooled connections."""
+    global _client, _async_client, _async_loop
+    if _async_client is not None:
+        if _async_loop is asyncio.get_running_loop():
+            await _async_client.aclose()
+        _async_client = None
+        _async_loop = None
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+    logger.info("HTTP clients closed")
@@ -1,5 +1,6 @@
 """Context Engine v2 — FastAPI application."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -7,9 +8,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.routers import agent, analytics, auth, config, customers, feedback, health, product, search, specs, uploads, user
+from app.services.analytics_snapshot_service import run_snapshot_verify_loop
 from app.services.elser_service import ensure_elser_deployed
 from app.es_client import get_es_client
+from app.http_client import close_http_clients, open_http_clients
 from app.services.es_service import setup_initial_indexes
+from app.services.feedback_partition_service import ensure_feedback_ilm_policy, partitioning_enabled
+from app.services.index_template_service import check_mapping_versions, install_index_templates
+from app.services.spec_job_service import shutdown_spec_jobs
+from app.services.spec_refresh_service import run_spec_refresh_loop
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -17,17 +24,47 @@ logger = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: create ES indexes. Shutdown: nothing."""
+    """
+    Startup: create ES indexes and index templates, open pooled HTTP clients, start the spec refresh
+    sweep and the analytics snapshot check. Shutdown: stop background work and close HTTP connections.
+    """
     logger.info("Starting up...")
     try:
         setup_initial_indexes()
+        if partitioning_enabled():
+            ensure_feedback_ilm_policy()
         ensure_elser_deployed(get_es_client())
+        install_index_templates()
         logger.info("Initial indexes ready")
     except Exception as e:
         logger.error("Startup failed: %s", str(e))
         raise
+    try:
+        report = check_mapping_versions()
+        if report["outdated"]:
+            logger.warning(
+                "%d of %d org indices are on outdated mappings (run scripts/check_index_mappings.py)",
+                len(report["outdated"]), report["checked"],
+            )
+    except Exception as e:
+        logger.warning("Mapping version check failed: %s", str(e))
+    await open_http_clients()
+    settings = get_settings()
+    refresh_task = None
+    interval = settings.spec_refresh_interval_seconds
+    if interval > 0:
+        refresh_task = asyncio.create_task(run_spec_refresh_loop(interval))
+    verify_task = None
+    if settings.analytics_snapshot_enabled and settings.analytics_snapshot_verify_seconds > 0:
+        verify_task = asyncio.create_task(run_snapshot_verify_loop(settings.analytics_snapshot_verify_seconds))
     yield
     logger.info("Shutting down")
+    if refresh_task:
+        refresh_task.cancel()
+    if verify_task:
+        verify_task.cancel()
+    shutdown_spec_jobs()
+    await close_http_clients()
 
 
 def create_app() -> FastAPI:
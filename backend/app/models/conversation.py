@@ -6,6 +6,11 @@ def conversations_index(org_id: str) -> str:
     return f"{org_id}-conversations"
 
 
+def conversation_messages_index(org_id: str) -> str:
+    """Return the conversation messages index name for an org (one doc per message)."""
+    return f"{org_id}-conversation-messages"
+
+
 CONVERSATIONS_MAPPING = {
     "mappings": {
         "properties": {
@@ -14,6 +19,9 @@ CONVERSATIONS_MAPPING = {
             "user_id": {"type": "keyword"},
             "kibana_conversation_id": {"type": "keyword"},
             "title": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "last_message": {"type": "text", "index": False},
+            "message_count": {"type": "integer"},
+            # Legacy: messages were embedded here before they moved to their own index
             "messages": {
                 "type": "nested",
                 "properties": {
@@ -27,3 +35,18 @@ CONVERSATIONS_MAPPING = {
         }
     }
 }
+
+CONVERSATION_MESSAGES_MAPPING = {
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "org_id": {"type": "keyword"},
+            "conversation_id": {"type": "keyword"},
+            "user_id": {"type": "keyword"},
+            "seq": {"type": "integer"},
+            "role": {"type": "keyword"},
+            "content": {"type": "text"},
+            "timestamp": {"type": "date"},
+        }
+    }
+}
@@ -34,7 +34,17 @@ def feedback_index(org_id: str) -> str:
     return f"{org_id}-feedback"
 
 
+def feedback_partition_index(org_id: str, month: str) -> str:
+    """Return the monthly feedback partition name (month is YYYY.MM) for an org."""
+    return f"{org_id}-feedback-{month}"
+
+
+# Segments sorted newest first: created_at desc list queries stop after the page
+# instead of visiting every match. Fixed at index creation.
+FEEDBACK_INDEX_SORT = {"index.sort.field": "created_at", "index.sort.order": "desc"}
+
 FEEDBACK_MAPPING = {
+    "settings": FEEDBACK_INDEX_SORT,
     "mappings": {
         "properties": {
             "id": {"type": "keyword"},
@@ -61,6 +71,7 @@ FEEDBACK_MAPPING = {
 }
 
 FEEDBACK_MAPPING_WITH_ELSER = {
+    "settings": FEEDBACK_INDEX_SORT,
     "mappings": {
         "properties": {
             "id": {"type": "keyword"},
@@ -89,3 +100,39 @@ FEEDBACK_MAPPING_WITH_ELSER = {
         }
     }
 }
+
+# Hot aggregation keys (low cardinality): global ordinals built at refresh, not on the first query
+_EAGER_ORDINALS = {"product_area", "sentiment", "source", "customer_segment"}
+# Free-form keywords: skip indexing absurdly long values
+_IGNORE_ABOVE = {"customer_name": 256, "tags": 256, "source_file": 512}
+
+
+def _lean(mapping: dict) -> dict:
+    """
+    Trimmed copy of a feedback mapping: text without the text.keyword copy or
+    positions (BM25 and more_like_this only need term freqs), author fields
+    kept in _source only, metadata not indexed.
+    """
+    props = dict(mapping["mappings"]["properties"])
+    props["text"] = {"type": "text", "index_options": "freqs"}
+    for field in ("author_name", "author_email"):
+        props[field] = {"type": "keyword", "index": False, "doc_values": False}
+    props["metadata"] = {"type": "object", "enabled": False}
+    for field in _EAGER_ORDINALS:
+        props[field] = {**props[field], "eager_global_ordinals": True}
+    for field, limit in _IGNORE_ABOVE.items():
+        props[field] = {**props[field], "ignore_above": limit}
+    return {**mapping, "mappings": {**mapping["mappings"], "properties": props}}
+
+
+FEEDBACK_MAPPING_LEAN = _lean(FEEDBACK_MAPPING)
+FEEDBACK_MAPPING_LEAN_WITH_ELSER = _lean(FEEDBACK_MAPPING_WITH_ELSER)
+
+FEEDBACK_MAPPING_PROFILES = ("standard", "lean")
+
+
+def feedback_mapping(semantic: bool, profile: str = "standard") -> dict:
+    """Feedback mapping for a profile (standard or lean), with text_semantic if semantic."""
+    if profile == "lean":
+        return FEEDBACK_MAPPING_LEAN_WITH_ELSER if semantic else FEEDBACK_MAPPING_LEAN
+    return FEEDBACK_MAPPING_WITH_ELSER if semantic else FEEDBACK_MAPPING
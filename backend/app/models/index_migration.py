@@ -0,0 +1,30 @@
+"""Elasticsearch index for per-org index mapping migrations."""
+
+INDEX_MIGRATIONS_INDEX = "index-migrations"
+
+INDEX_MIGRATIONS_MAPPING = {
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "org_id": {"type": "keyword"},
+            "data_type": {"type": "keyword"},
+            "alias": {"type": "keyword"},
+            "source_index": {"type": "keyword"},
+            "dest_index": {"type": "keyword"},
+            "target_version": {"type": "integer"},
+            "status": {"type": "keyword"},
+            "task_id": {"type": "keyword"},
+            "requests_per_second": {"type": "float"},
+            "slices": {"type": "keyword"},
+            "source_count": {"type": "long"},
+            "dest_count": {"type": "long"},
+            "strays_deleted": {"type": "long"},
+            "copy_started_at": {"type": "date"},
+            "catchup_started_at": {"type": "date"},
+            "error_message": {"type": "text"},
+            "created_at": {"type": "date"},
+            "updated_at": {"type": "date"},
+            "completed_at": {"type": "date"},
+        }
+    }
+}
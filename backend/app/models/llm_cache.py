@@ -0,0 +1,15 @@
+"""Elasticsearch index for the content-addressed LLM completion cache."""
+
+LLM_CACHE_INDEX = "llm-completion-cache"
+
+LLM_CACHE_MAPPING = {
+    "mappings": {
+        "properties": {
+            "key": {"type": "keyword"},
+            "namespace": {"type": "keyword"},
+            "text": {"type": "text", "index": False},
+            "size_bytes": {"type": "integer"},
+            "created_at": {"type": "date"},
+        }
+    }
+}
@@ -28,7 +28,13 @@ SPECS_MAPPING = {
             "generated_by": {"type": "keyword"},
             "generated_by_name": {"type": "keyword"},
             "data_brief": {"type": "object", "enabled": True},
+            "generation_errors": {"type": "object", "enabled": False},
+            "section_input_hashes": {"type": "object", "enabled": False},
+            "error_message": {"type": "text"},
+            "sections_completed": {"type": "keyword"},
             "data_freshness_date": {"type": "date"},
+            "refreshed_at": {"type": "date"},
+            "feedback_since_generation": {"type": "integer"},
             "created_at": {"type": "date"},
             "updated_at": {"type": "date"},
         }
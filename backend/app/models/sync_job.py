@@ -0,0 +1,26 @@
+"""Elasticsearch index for feedback re-denormalization jobs."""
+
+FEEDBACK_SYNC_JOBS_INDEX = "feedback-sync-jobs"
+
+FEEDBACK_SYNC_JOBS_MAPPING = {
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "org_id": {"type": "keyword"},
+            "task_id": {"type": "keyword"},
+            "reason": {"type": "keyword"},
+            "customer_ids": {"type": "keyword"},
+            "customer_count": {"type": "integer"},
+            "status": {"type": "keyword"},
+            "requests_per_second": {"type": "float"},
+            "slices": {"type": "keyword"},
+            "total": {"type": "integer"},
+            "updated": {"type": "integer"},
+            "noops": {"type": "integer"},
+            "failures": {"type": "integer"},
+            "error_message": {"type": "text"},
+            "created_at": {"type": "date"},
+            "completed_at": {"type": "date"},
+        }
+    }
+}
@@ -25,6 +25,8 @@ ORGANIZATIONS_MAPPING = {
             "org_id": {"type": "keyword"},
             "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
             "onboarding_completed": {"type": "boolean"},
+            "agent_fingerprint": {"type": "keyword", "index": False},
+            "agent_registered_at": {"type": "date"},
             "created_at": {"type": "date"},
             "updated_at": {"type": "date"},
         }
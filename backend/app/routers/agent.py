@@ -2,11 +2,13 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_current_user
 from app.schemas.agent import ChatRequest, ChatResponse
 from app.services.agent_service import get_agent_service
+from app.services.intent_router_service import get_fast_path_metrics
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -32,6 +34,35 @@ async def chat(
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
 
+@router.post("/chat/stream")
+async def chat_stream(
+    body: ChatRequest,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """
+    Send a message and stream the agent's turn as server-sent events:
+    reasoning, tool_call, tool_result, delta, then done (or error).
+    """
+    return StreamingResponse(
+        get_agent_service().chat_stream(
+            org_id=current_user["org_id"],
+            user_id=current_user["user_id"],
+            message=body.message.strip(),
+            conversation_id=body.conversation_id,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/fast-path/metrics")
+def fast_path_metrics(
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """Local fast-path hit rate and latency saved (this process, since start)."""
+    return {"data": get_fast_path_metrics()}
+
+
 @router.get("/conversations")
 def list_conversations(
     current_user: Annotated[dict, Depends(get_current_user)],
@@ -54,3 +85,20 @@ def get_conversation(
     if not doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
     return doc
+
+
+@router.get("/conversations/{conversation_id}/messages")
+def get_conversation_messages(
+    conversation_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    before: int | None = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Page backwards through a conversation's messages (pass next_before as before)."""
+    org_id = current_user["org_id"]
+    page = get_agent_service().get_conversation_messages(
+        org_id=org_id, conversation_id=conversation_id, before=before, limit=limit
+    )
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+    return {"data": page}
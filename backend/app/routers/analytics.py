@@ -19,6 +19,13 @@ from app.services.analytics_service import (
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
+_SAMPLING_QUERY = Query(
+    None,
+    pattern="^(auto|on|off)$",
+    description="auto, on or off; overrides ANALYTICS_SAMPLING",
+)
+
+
 def _get_org_id(current_user: dict) -> str:
     return current_user["org_id"]
 
@@ -29,6 +36,7 @@ def analytics_summary(
     period: str = Query("30d", description="7d, 30d, 90d, or custom"),
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return 4 summary metrics with trends."""
     return get_summary(
@@ -36,6 +44,7 @@ def analytics_summary(
         period=period,
         from_date=from_date,
         to_date=to_date,
+        sampling=sampling,
     )
 
 
@@ -46,6 +55,7 @@ def analytics_volume(
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
     areas: str | None = Query(None, description="Comma-separated product areas"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return feedback volume over time."""
     area_list = [a.strip() for a in (areas or "").split(",") if a.strip()]
@@ -55,6 +65,7 @@ def analytics_volume(
         from_date=from_date,
         to_date=to_date,
         areas=area_list if area_list else None,
+        sampling=sampling,
     )
 
 
@@ -64,6 +75,7 @@ def analytics_sentiment(
     period: str = Query("30d"),
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return sentiment breakdown."""
     return get_sentiment_breakdown(
@@ -71,6 +83,7 @@ def analytics_sentiment(
         period=period,
         from_date=from_date,
         to_date=to_date,
+        sampling=sampling,
     )
 
 
@@ -81,6 +94,7 @@ def analytics_top_issues(
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
     limit: int = Query(5, ge=1, le=20),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return top issues ranked by impact."""
     return get_top_issues(
@@ -89,6 +103,7 @@ def analytics_top_issues(
         from_date=from_date,
         to_date=to_date,
         limit=limit,
+        sampling=sampling,
     )
 
 
@@ -98,6 +113,7 @@ def analytics_areas(
     period: str = Query("30d"),
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return product area breakdown."""
     return get_area_breakdown(
@@ -105,6 +121,7 @@ def analytics_areas(
         period=period,
         from_date=from_date,
         to_date=to_date,
+        sampling=sampling,
     )
 
 
@@ -132,6 +149,7 @@ def analytics_sources(
     period: str = Query("30d"),
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return source distribution."""
     return get_source_distribution(
@@ -139,6 +157,7 @@ def analytics_sources(
         period=period,
         from_date=from_date,
         to_date=to_date,
+        sampling=sampling,
     )
 
 
@@ -148,6 +167,7 @@ def analytics_segments(
     period: str = Query("30d"),
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
+    sampling: str | None = _SAMPLING_QUERY,
 ) -> dict:
     """Return segment breakdown."""
     return get_segment_breakdown(
@@ -155,4 +175,5 @@ def analytics_segments(
         period=period,
         from_date=from_date,
         to_date=to_date,
+        sampling=sampling,
     )
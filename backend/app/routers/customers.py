@@ -7,7 +7,13 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, File, HTTPException, Query, status, UploadFile
 
 from app.dependencies import get_current_user
-from app.schemas.customer import CustomerManualRequest, CustomerUploadConfirmRequest
+from app.schemas.customer import (
+    CustomerManualRequest,
+    CustomerUpdateRequest,
+    CustomerUploadConfirmRequest,
+    FeedbackSyncRequest,
+    FeedbackSyncRethrottleRequest,
+)
 from app.services.csv_service import (
     detect_customer_columns,
     parse_csv_file,
@@ -22,6 +28,14 @@ from app.services.customer_service import (
     get_customers,
     get_customer_sentiment_trend,
     search_customers,
+    update_customer,
+)
+from app.services.feedback_sync_service import (
+    get_sync_job,
+    get_sync_jobs,
+    rethrottle_sync_job,
+    start_customer_sync,
+    trigger_customer_sync,
 )
 from app.services.upload_service import (
     create_upload,
@@ -157,6 +171,8 @@ def import_customers_csv(
 
     imported, bulk_failed, created_ids = create_customers_bulk(org_id, items)
     failed += bulk_failed
+    # Link existing feedback that named these customers before they were imported
+    trigger_customer_sync(org_id, created_ids, reason="customer_import")
 
     update_upload(
         upload_id,
@@ -185,6 +201,7 @@ def create_customer_manual(
     """Add single customer manually."""
     org_id = current_user["org_id"]
     doc = create_customer(org_id, body.model_dump(exclude_none=True))
+    trigger_customer_sync(org_id, [doc["id"]], reason="customer_created")
     return {"data": doc}
 
 
@@ -204,6 +221,7 @@ def list_customers(
     include_feedback_stats: bool = Query(False),
     sort_by: str = Query("company_name"),
     sort_order: str = Query("asc"),
+    exact_total: bool = Query(False, description="Count every match instead of stopping at LIST_TRACK_TOTAL_HITS"),
 ):
     """List customers with pagination and filters."""
     org_id = current_user["org_id"]
@@ -222,10 +240,10 @@ def list_customers(
     filters = {k: v for k, v in filters.items() if v is not None}
     if include_feedback_stats:
         filters["include_feedback_stats"] = True
-    items, total = get_customers(org_id, page, page_size, filters)
+    items, total, lower_bound = get_customers(org_id, page, page_size, filters, exact_total=exact_total)
     return {
         "data": items,
-        "pagination": {"page": page, "page_size": page_size, "total": total},
+        "pagination": {"page": page, "page_size": page_size, "total": total, "total_is_lower_bound": lower_bound},
     }
 
 
@@ -250,22 +268,85 @@ def customers_count(
     return {"data": {"count": count}}
 
 
+@router.post("/sync")
+def start_feedback_sync(
+    body: FeedbackSyncRequest,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Re-denormalize customer name/segment onto feedback for the given customers."""
+    org_id = current_user["org_id"]
+    try:
+        jobs = start_customer_sync(
+            org_id,
+            body.customer_ids,
+            reason="manual",
+            requests_per_second=body.requests_per_second,
+            slices=body.slices,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Could not start feedback sync: {str(e)}",
+        ) from e
+    return {"data": jobs}
+
+
+@router.get("/sync-jobs")
+def list_feedback_sync_jobs(
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """List feedback sync jobs for current org."""
+    org_id = current_user["org_id"]
+    return {"data": get_sync_jobs(org_id)}
+
+
+@router.get("/sync-jobs/{job_id}")
+def get_feedback_sync_job(
+    job_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Get feedback sync job with progress (total, updated, noops)."""
+    org_id = current_user["org_id"]
+    job = get_sync_job(org_id, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return {"data": job}
+
+
+@router.post("/sync-jobs/{job_id}/rethrottle")
+def rethrottle_feedback_sync_job(
+    job_id: str,
+    body: FeedbackSyncRethrottleRequest,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Change requests_per_second of a running sync job."""
+    org_id = current_user["org_id"]
+    try:
+        job = rethrottle_sync_job(org_id, job_id, body.requests_per_second)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return {"data": job}
+
+
 @router.get("/{customer_id}/feedback")
 def get_customer_feedback_endpoint(
     customer_id: str,
     current_user: Annotated[dict, Depends(get_current_user)] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    exact_total: bool = Query(False, description="Count every match instead of stopping at LIST_TRACK_TOTAL_HITS"),
 ):
     """Get feedback for a customer with pagination."""
     org_id = current_user["org_id"]
     doc = get_customer(org_id, customer_id)
     if not doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    items, total = get_customer_feedback(org_id, customer_id, page, page_size)
+    items, total, lower_bound = get_customer_feedback(org_id, customer_id, page, page_size, exact_total=exact_total)
     return {
         "data": items,
-        "pagination": {"page": page, "page_size": page_size, "total": total},
+        "pagination": {"page": page, "page_size": page_size, "total": total, "total_is_lower_bound": lower_bound},
     }
 
 
@@ -294,3 +375,20 @@ def get_customer_detail(
     if not doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
     return {"data": doc}
+
+
+@router.put("/{customer_id}")
+def update_customer_endpoint(
+    customer_id: str,
+    body: CustomerUpdateRequest,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Update customer. Name or segment changes are propagated to feedback in the background."""
+    org_id = current_user["org_id"]
+    updates = body.model_dump(exclude_none=True)
+    doc = update_customer(org_id, customer_id, updates)
+    if not doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if "company_name" in updates or "segment" in updates:
+        trigger_customer_sync(org_id, [customer_id], reason="customer_updated")
+    return {"data": doc}
@@ -231,6 +231,7 @@ def list_feedback(
     sentiment: str | None = Query(None),
     sort_by: str = Query("created_at"),
     sort_order: str = Query("desc"),
+    exact_total: bool = Query(False, description="Count every match instead of stopping at LIST_TRACK_TOTAL_HITS"),
 ):
     """List feedback with pagination and filters."""
     org_id = current_user["org_id"]
@@ -241,10 +242,10 @@ def list_feedback(
         "sort_by": sort_by,
         "sort_order": sort_order,
     }
-    items, total = get_feedback_items(org_id, page, page_size, filters)
+    items, total, lower_bound = get_feedback_items(org_id, page, page_size, filters, exact_total=exact_total)
     return {
         "data": items,
-        "pagination": {"page": page, "page_size": page_size, "total": total},
+        "pagination": {"page": page, "page_size": page_size, "total": total, "total_is_lower_bound": lower_bound},
     }
 
 
@@ -16,6 +16,7 @@ from app.schemas.product import (
     ProductTechStackRequest,
     ProductTeamsRequest,
 )
+from app.services.agent_service import invalidate_agent_registration
 from app.services.product_service import (
     delete_wizard_section,
     get_all_wizard_sections,
@@ -69,6 +70,7 @@ def put_wizard_section(
     validated = _validate_section_data(section, body)
     try:
         doc = save_wizard_section(org_id, section, validated)
+        invalidate_agent_registration(org_id)
         return {"data": doc}
     except ValueError as e:
         raise HTTPException(
@@ -125,6 +127,7 @@ def delete_wizard(
         )
     org_id = current_user["org_id"]
     deleted = delete_wizard_section(org_id, section)
+    invalidate_agent_registration(org_id)
     return {"data": {"deleted": deleted}}
 
 
@@ -19,16 +19,22 @@ def search_feedback_endpoint(
     """Hybrid semantic + keyword search on feedback."""
     org_id = current_user["org_id"]
     filters_dict = body.filters.model_dump(exclude_none=True) if body.filters else None
-    items, total = search_feedback(
+    items, total, lower_bound = search_feedback(
         org_id=org_id,
         query=body.query,
         filters=filters_dict,
         sort_by=body.sort_by,
         page=body.page,
         page_size=body.page_size,
+        exact_total=body.exact_total,
     )
     return {
         "data": items,
-        "pagination": {"page": body.page, "page_size": body.page_size, "total": total},
+        "pagination": {
+            "page": body.page,
+            "page_size": body.page_size,
+            "total": total,
+            "total_is_lower_bound": lower_bound,
+        },
         "query": body.query,
     }
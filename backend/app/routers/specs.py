@@ -3,15 +3,22 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_current_user
 from app.schemas.spec import GenerateSpecRequest, UpdateSpecRequest
+from app.services.spec_job_service import (
+    SpecJobLimitError,
+    get_spec_status,
+    spec_progress_events,
+    start_spec_generation,
+    start_spec_regeneration,
+)
+from app.services.spec_refresh_service import refresh_spec, refresh_stale_specs
 from app.services.spec_service import (
     delete_spec,
-    generate_specs,
     get_spec,
     get_specs,
-    regenerate_spec,
     update_spec,
 )
 
@@ -23,11 +30,14 @@ def create_spec_generate(
     body: GenerateSpecRequest,
     current_user: Annotated[dict, Depends(get_current_user)] = None,
 ):
-    """Generate specs for a topic. Returns spec summary for redirect."""
+    """
+    Start spec generation for a topic. Returns the spec summary immediately with
+    status 'generating'; poll /specs/{id}/status or stream /specs/{id}/events.
+    """
     org_id = current_user["org_id"]
     user_id = current_user["user_id"]
     try:
-        doc = generate_specs(
+        doc = start_spec_generation(
             org_id,
             user_id,
             body.topic,
@@ -44,6 +54,8 @@ def create_spec_generate(
                 "created_at": doc["created_at"],
             }
         }
+    except SpecJobLimitError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -76,16 +88,51 @@ def list_specs(
     }
 
 
+@router.post("/refresh")
+def refresh_specs_endpoint(
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+    limit: int | None = Query(None, ge=1, le=500),
+):
+    """
+    Fold new feedback into the org's least recently refreshed specs. Specs whose
+    new feedback crosses the refresh threshold start regenerating.
+    """
+    org_id = current_user["org_id"]
+    return {"data": refresh_stale_specs(org_id, limit)}
+
+
+@router.post("/{spec_id}/refresh")
+def refresh_spec_endpoint(
+    spec_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Fold feedback ingested since the spec's last refresh into its brief."""
+    org_id = current_user["org_id"]
+    try:
+        result = refresh_spec(org_id, spec_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return {"data": result}
+
+
 @router.post("/{spec_id}/regenerate")
 def regenerate_spec_endpoint(
     spec_id: str,
     current_user: Annotated[dict, Depends(get_current_user)] = None,
+    force: bool = Query(False),
 ):
-    """Regenerate 4 docs from saved data_brief."""
+    """
+    Queue regeneration of the docs whose inputs changed (all with force=true,
+    which also bypasses the completion cache). Returns the spec with
+    sections_regenerated; status is 'generating' if any were queued.
+    """
     org_id = current_user["org_id"]
-    user_id = current_user["user_id"]
     try:
-        doc = regenerate_spec(org_id, spec_id, user_id)
+        doc = start_spec_regeneration(org_id, spec_id, force=force)
+    except SpecJobLimitError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not doc:
@@ -93,6 +140,35 @@ def regenerate_spec_endpoint(
     return {"data": doc}
 
 
+@router.get("/{spec_id}/status")
+def get_spec_status_endpoint(
+    spec_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Get generation status and completed sections (for polling)."""
+    org_id = current_user["org_id"]
+    result = get_spec_status(org_id, spec_id)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return {"data": result}
+
+
+@router.get("/{spec_id}/events")
+def stream_spec_events(
+    spec_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)] = None,
+):
+    """Server-sent events: status, each section as it completes, then done."""
+    org_id = current_user["org_id"]
+    if not get_spec(org_id, spec_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return StreamingResponse(
+        spec_progress_events(org_id, spec_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{spec_id}")
 def get_spec_detail(
     spec_id: str,
@@ -21,6 +21,36 @@ class CustomerManualRequest(BaseModel):
     employee_count: int | None = None
 
 
+class CustomerUpdateRequest(BaseModel):
+    """Partial customer update (PUT /customers/{id})."""
+
+    company_name: str | None = Field(None, min_length=1)
+    customer_id_external: str | None = None
+    segment: str | None = None
+    plan: str | None = None
+    mrr: float | None = None
+    arr: float | None = None
+    account_manager: str | None = None
+    renewal_date: str | None = None
+    health_score: int | None = None
+    industry: str | None = None
+    employee_count: int | None = None
+
+
+class FeedbackSyncRequest(BaseModel):
+    """Manually re-denormalize feedback for customers."""
+
+    customer_ids: list[str] = Field(..., min_length=1)
+    requests_per_second: float | None = None
+    slices: str | None = None
+
+
+class FeedbackSyncRethrottleRequest(BaseModel):
+    """Change throttling of a running sync job. -1 disables throttling."""
+
+    requests_per_second: float
+
+
 class CustomerResponse(BaseModel):
     """Customer profile response."""
 
@@ -24,3 +24,5 @@ class SearchFeedbackRequest(BaseModel):
     sort_by: str = "relevance"
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=100)
+    # Count every match instead of stopping at LIST_TRACK_TOTAL_HITS
+    exact_total: bool = False
@@ -24,6 +24,17 @@ class GenerateSpecResponse(BaseModel):
     created_at: str
 
 
+class SpecStatusResponse(BaseModel):
+    """Lightweight generation status for polling."""
+
+    id: str
+    status: str
+    sections_completed: list[str] = Field(default_factory=list)
+    generation_errors: dict[str, str] = Field(default_factory=dict)
+    error_message: str | None = None
+    updated_at: str | None = None
+
+
 class UpdateSpecRequest(BaseModel):
     """Request body for PUT /specs/{id}."""
 
@@ -57,6 +68,8 @@ class SpecDetail(BaseModel):
     generated_by: str | None = None
     generated_by_name: str | None = None
     data_freshness_date: str | None = None
+    generation_errors: dict[str, str] = Field(default_factory=dict)
+    error_message: str | None = None
     created_at: str
     updated_at: str
 
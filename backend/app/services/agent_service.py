@@ -1,28 +1,60 @@
 """Agent service — proxies to Kibana Agent Builder converse API."""
 
+import asyncio
+import hashlib
 import json
+import time
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, AsyncIterator
 
 import httpx
 
 from app.config import get_settings
+from app.http_client import get_async_http_client
+from app.es_client import get_es_client
 from app.models.conversation import (
+    CONVERSATION_MESSAGES_MAPPING,
     CONVERSATIONS_MAPPING,
+    conversation_messages_index,
     conversations_index,
 )
+from app.models.user import ORGANIZATIONS_INDEX
 from app.services.es_service import (
+    bulk_index_documents,
     ensure_index_exists,
     get_document,
-    index_document,
-    search_documents,
+    update_document,
 )
+from app.services.intent_router_service import answer_locally, record_escalation, record_fast_path
 from app.services.product_service import get_product_context
 from app.utils.logging import get_logger
+from app.utils.sse import iter_sse, sse_event
 
 logger = get_logger(__name__)
 
+# Header preview of the latest reply shown in the conversation list
+_LAST_MESSAGE_CHARS = 200
+# Bump message_count (seeded from legacy embedded messages) and refresh the header preview
+_APPEND_TURN_SCRIPT = (
+    "if (ctx._source.message_count == null) {"
+    " ctx._source.message_count = ctx._source.messages == null ? 0 : ctx._source.messages.size(); }"
+    " ctx._source.message_count += params.n;"
+    " ctx._source.last_message = params.last_message;"
+    " ctx._source.updated_at = params.now;"
+    " if (params.kibana_conversation_id != '') {"
+    " ctx._source.kibana_conversation_id = params.kibana_conversation_id; }"
+)
+
+# org_id -> (registration fingerprint, monotonic time it was last verified)
+_registrations: dict[str, tuple[str, float]] = {}
+_registration_locks: dict[str, asyncio.Lock] = {}
+
+
+def invalidate_agent_registration(org_id: str) -> None:
+    """Force the next chat to re-check the org's registration (e.g. product context changed)."""
+    _registrations.pop(org_id, None)
+
 
 def _extract_response_text(data: dict[str, Any]) -> str:
     """
@@ -301,54 +333,210 @@ class AgentService:
     def _enabled(self) -> bool:
         return bool(self.kibana_url and self.api_key)
 
+    async def _upsert(self, url: str, body: dict[str, Any]) -> None:
+        """Create an Agent Builder object; if it already exists, update it in place."""
+        client = get_async_http_client()
+        resp = await client.post(url, json=body, headers=self._headers(), timeout=30.0)
+        if resp.status_code in (200, 201):
+            return
+        if resp.status_code in (400, 409) and "exist" in resp.text.lower():
+            update = {k: v for k, v in body.items() if k not in ("id", "type")}
+            resp = await client.put(f"{url}/{body['id']}", json=update, headers=self._headers(), timeout=30.0)
+            if resp.status_code in (200, 201):
+                return
+        logger.warning("Agent Builder upsert %s: %s", body["id"], resp.text)
+        resp.raise_for_status()
+
     async def register_tools(self, org_id: str) -> None:
-        """Register org-specific ES|QL tools in Agent Builder."""
+        """Register (or update) org-specific ES|QL tools in Agent Builder, concurrently."""
         if not self._enabled():
             raise ValueError("Kibana URL and API key are required")
         url = f"{self.kibana_url}/api/agent_builder/tools"
-        for tool_base in TOOL_IDS:
-            body = _esql_tool_config(org_id, tool_base)
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    resp = await client.post(url, json=body, headers=self._headers())
-                    if resp.status_code in (200, 201):
-                        logger.info("Registered tool %s for org %s", body["id"], org_id[:8])
-                    else:
-                        logger.warning("Tool registration %s: %s", body["id"], resp.text)
-            except Exception as e:
-                logger.error("Failed to register tool %s: %s", body["id"], str(e))
-                raise
-
-    async def register_agent(self, org_id: str) -> None:
-        """Register/update custom agent with product context in instructions."""
-        if not self._enabled():
-            raise ValueError("Kibana URL and API key are required")
-        product_context = get_product_context(org_id)
-        instructions = _build_instructions(product_context)
+        bodies = [_esql_tool_config(org_id, t) for t in TOOL_IDS]
+        results = await asyncio.gather(*(self._upsert(url, b) for b in bodies), return_exceptions=True)
+        for body, result in zip(bodies, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to register tool %s: %s", body["id"], str(result))
+                raise result
+        logger.info("Registered %d tools for org %s", len(bodies), org_id[:8])
+
+    def _agent_body(self, org_id: str, instructions: str) -> dict[str, Any]:
         tool_ids = [_tool_id(org_id, t) for t in TOOL_IDS]
-        tools_config = [{"tool_ids": [tid]} for tid in tool_ids]
-        body = {
+        return {
             "id": self._agent_id(org_id),
             "name": "Context Engine Agent",
             "description": "AI assistant for Product Managers. Analyzes customer feedback, identifies trends, and helps generate engineering specs.",
             "configuration": {
                 "instructions": instructions,
-                "tools": tools_config,
+                "tools": [{"tool_ids": [tid]} for tid in tool_ids],
             },
         }
-        url = f"{self.kibana_url}/api/agent_builder/agents"
+
+    async def register_agent(self, org_id: str, instructions: str | None = None) -> None:
+        """Register/update custom agent with product context in instructions."""
+        if not self._enabled():
+            raise ValueError("Kibana URL and API key are required")
+        if instructions is None:
+            instructions = _build_instructions(get_product_context(org_id))
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(url, json=body, headers=self._headers())
-                if resp.status_code in (200, 201):
-                    logger.info("Registered agent for org %s", org_id[:8])
-                else:
-                    logger.warning("Agent registration: %s", resp.text)
-                    resp.raise_for_status()
+            await self._upsert(f"{self.kibana_url}/api/agent_builder/agents", self._agent_body(org_id, instructions))
+            logger.info("Registered agent for org %s", org_id[:8])
         except Exception as e:
             logger.error("Failed to register agent: %s", str(e))
             raise
 
+    def _registration_fingerprint(self, org_id: str, instructions: str) -> str:
+        """Hash of everything registered for an org: tool configs and agent body."""
+        payload = {
+            "tools": [_esql_tool_config(org_id, t) for t in TOOL_IDS],
+            "agent": self._agent_body(org_id, instructions),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def ensure_registered(self, org_id: str) -> bool:
+        """
+        Register tools and agent only if their fingerprint changed.
+
+        A fingerprint verified within agent_registration_recheck_seconds is
+        trusted without any I/O; otherwise it is recomputed from the product
+        context and compared with the one persisted on the org. Returns True
+        if a registration was performed.
+        """
+        recheck = get_settings().agent_registration_recheck_seconds
+        cached = _registrations.get(org_id)
+        if cached and time.monotonic() - cached[1] < recheck:
+            return False
+        lock = _registration_locks.setdefault(org_id, asyncio.Lock())
+        async with lock:
+            cached = _registrations.get(org_id)
+            if cached and time.monotonic() - cached[1] < recheck:
+                return False
+            product_context = await asyncio.to_thread(get_product_context, org_id)
+            instructions = _build_instructions(product_context)
+            fingerprint = self._registration_fingerprint(org_id, instructions)
+            org = await asyncio.to_thread(get_document, ORGANIZATIONS_INDEX, org_id)
+            if org and org.get("agent_fingerprint") == fingerprint:
+                _registrations[org_id] = (fingerprint, time.monotonic())
+                return False
+
+            await self.register_tools(org_id)
+            await self.register_agent(org_id, instructions)
+            if org:
+                await asyncio.to_thread(update_document, ORGANIZATIONS_INDEX, org_id, {
+                    "agent_fingerprint": fingerprint,
+                    "agent_registered_at": datetime.utcnow().isoformat() + "Z",
+                })
+            _registrations[org_id] = (fingerprint, time.monotonic())
+            logger.info("Agent registration updated for org %s", org_id[:8])
+            return True
+
+    def _converse_payload(self, org_id: str, message: str, conversation_id: str | None) -> dict[str, Any]:
+        """Converse request body, continuing the stored Kibana conversation if any."""
+        payload: dict[str, Any] = {
+            "input": message,
+            "agent_id": self._agent_id(org_id),
+        }
+        if conversation_id:
+            existing = get_document(conversations_index(org_id), conversation_id)
+            if existing and existing.get("org_id") == org_id and existing.get("kibana_conversation_id"):
+                payload["conversation_id"] = existing["kibana_conversation_id"]
+        return payload
+
+    def _save_turn(
+        self,
+        org_id: str,
+        user_id: str,
+        conversation_id: str | None,
+        kibana_conv_id: str | None,
+        message: str,
+        response_text: str,
+    ) -> str:
+        """
+        Append a user/assistant exchange to the conversation. Returns our conversation ID.
+
+        The header doc is upserted with a script that bumps message_count and
+        returns it, which numbers the new messages; the messages themselves
+        are appended as separate docs, so a turn costs the same at any length.
+        """
+        idx = conversations_index(org_id)
+        msg_idx = conversation_messages_index(org_id)
+        ensure_index_exists(idx, CONVERSATIONS_MAPPING)
+        ensure_index_exists(msg_idx, CONVERSATION_MESSAGES_MAPPING)
+        now = datetime.utcnow().isoformat() + "Z"
+        our_conv_id = conversation_id or str(uuid.uuid4())
+        turn = [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response_text},
+        ]
+        title = message[:50] + "..." if len(message) > 50 else message
+
+        es = get_es_client()
+        resp = es.update(
+            index=idx,
+            id=our_conv_id,
+            script={"source": _APPEND_TURN_SCRIPT, "params": {
+                "n": len(turn),
+                "last_message": response_text[:_LAST_MESSAGE_CHARS],
+                "kibana_conversation_id": kibana_conv_id or "",
+                "now": now,
+            }},
+            upsert={
+                "id": our_conv_id,
+                "org_id": org_id,
+                "user_id": user_id,
+                "kibana_conversation_id": kibana_conv_id or "",
+                "title": title,
+                "last_message": response_text[:_LAST_MESSAGE_CHARS],
+                "message_count": len(turn),
+                "created_at": now,
+                "updated_at": now,
+            },
+            source={"includes": ["message_count"]},
+            retry_on_conflict=3,
+        )
+        count = resp["get"]["_source"]["message_count"]
+        first_seq = count - len(turn)
+        bulk_index_documents(msg_idx, [
+            {
+                "id": f"{our_conv_id}-{first_seq + i:06d}",
+                "org_id": org_id,
+                "conversation_id": our_conv_id,
+                "user_id": user_id,
+                "seq": first_seq + i,
+                "timestamp": now,
+                **m,
+            }
+            for i, m in enumerate(turn)
+        ])
+        return our_conv_id
+
+    async def _fast_path(
+        self,
+        org_id: str,
+        user_id: str,
+        message: str,
+        conversation_id: str | None,
+        started: float,
+    ) -> dict[str, Any] | None:
+        """
+        Answer templated analytics questions locally and store the turn in the
+        conversation. Returns a chat result, or None to escalate to the agent.
+        """
+        local = await asyncio.to_thread(answer_locally, org_id, message)
+        if not local:
+            return None
+        our_conv_id = await asyncio.to_thread(
+            self._save_turn, org_id, user_id, conversation_id, None, message, local["response"]
+        )
+        record_fast_path(local["intent"], (time.monotonic() - started) * 1000)
+        logger.info("Answered '%s' locally for org %s", local["intent"], org_id[:8])
+        return {
+            "conversation_id": our_conv_id,
+            "response": local["response"],
+            "tools_used": [{"tool_id": f"local:{local['intent']}", "local": True}],
+            "citations": [],
+        }
+
     async def chat(
         self,
         org_id: str,
@@ -364,38 +552,27 @@ class AgentService:
         """
         if not self._enabled():
             raise ValueError("Agent temporarily unavailable. Configure KIBANA_URL and KIBANA_API_KEY.")
+        started = time.monotonic()
+        local = await self._fast_path(org_id, user_id, message, conversation_id, started)
+        if local:
+            return local
         try:
-            await self.register_tools(org_id)
-        except Exception:
-            pass  # May already exist
-        try:
-            await self.register_agent(org_id)
-        except Exception:
-            pass  # May already exist
+            await self.ensure_registered(org_id)
+        except Exception as e:
+            logger.warning("Agent registration check failed for org %s: %s", org_id[:8], str(e))
 
         # Use Kibana's conversation_id for context; our ID for storage
-        kibana_conv_id: str | None = None
-        if conversation_id:
-            existing = get_document(conversations_index(org_id), conversation_id)
-            if existing and existing.get("org_id") == org_id:
-                kibana_conv_id = existing.get("kibana_conversation_id") or None
-
-        payload: dict[str, Any] = {
-            "input": message,
-            "agent_id": self._agent_id(org_id),
-        }
-        if kibana_conv_id:
-            payload["conversation_id"] = kibana_conv_id
+        payload = self._converse_payload(org_id, message, conversation_id)
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                resp = await client.post(
-                    f"{self.kibana_url}/api/agent_builder/converse",
-                    json=payload,
-                    headers=self._headers(),
-                )
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await get_async_http_client().post(
+                f"{self.kibana_url}/api/agent_builder/converse",
+                json=payload,
+                headers=self._headers(),
+                timeout=60.0,
+            )
+            resp.raise_for_status()
+            data = resp.json()
         except httpx.HTTPStatusError as e:
             logger.error("Kibana converse error: %s", e.response.text)
             raise ValueError("Agent temporarily unavailable. Please try again later.")
@@ -418,29 +595,8 @@ class AgentService:
         tools_used = data.get("tools_used") or data.get("tool_calls") or []
         citations = data.get("citations") or []
 
-        idx = conversations_index(org_id)
-        ensure_index_exists(idx, CONVERSATIONS_MAPPING)
-        now = datetime.utcnow().isoformat() + "Z"
-        our_conv_id = conversation_id or str(uuid.uuid4())
-
-        # Load existing or create new
-        existing = get_document(idx, our_conv_id)
-        messages = list(existing.get("messages", [])) if existing else []
-        messages.append({"role": "user", "content": message, "timestamp": now})
-        messages.append({"role": "assistant", "content": response_text, "timestamp": now})
-        title = (existing or {}).get("title") or (message[:50] + "..." if len(message) > 50 else message)
-
-        doc = {
-            "id": our_conv_id,
-            "org_id": org_id,
-            "user_id": user_id,
-            "kibana_conversation_id": kibana_conv_id or "",
-            "title": title,
-            "messages": messages,
-            "created_at": (existing or {}).get("created_at") or now,
-            "updated_at": now,
-        }
-        index_document(idx, our_conv_id, doc)
+        our_conv_id = self._save_turn(org_id, user_id, conversation_id, kibana_conv_id, message, response_text)
+        record_escalation((time.monotonic() - started) * 1000)
 
         return {
             "conversation_id": our_conv_id,
@@ -449,28 +605,173 @@ class AgentService:
             "citations": citations,
         }
 
+    async def chat_stream(
+        self,
+        org_id: str,
+        user_id: str,
+        message: str,
+        conversation_id: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream an agent turn as SSE: reasoning, tool_call and tool_result steps,
+        delta text chunks, then done with the stored conversation_id. The
+        final message is persisted when the stream ends; failures end with an
+        error event.
+        """
+        if not self._enabled():
+            yield sse_event("error", {"detail": "Agent temporarily unavailable. Configure KIBANA_URL and KIBANA_API_KEY."})
+            return
+        started = time.monotonic()
+        local = await self._fast_path(org_id, user_id, message, conversation_id, started)
+        if local:
+            yield sse_event("delta", {"text": local["response"]})
+            yield sse_event("done", {k: local[k] for k in ("conversation_id", "response", "tools_used")})
+            return
+        try:
+            await self.ensure_registered(org_id)
+        except Exception as e:
+            logger.warning("Agent registration check failed for org %s: %s", org_id[:8], str(e))
+
+        payload = await asyncio.to_thread(self._converse_payload, org_id, message, conversation_id)
+        kibana_conv_id = payload.get("conversation_id")
+        chunks: list[str] = []
+        final_text: str | None = None
+        tools_used: list[Any] = []
+        try:
+            async with get_async_http_client().stream(
+                "POST",
+                f"{self.kibana_url}/api/agent_builder/converse/async",
+                json=payload,
+                headers={**self._headers(), "Accept": "text/event-stream"},
+                timeout=httpx.Timeout(get_settings().agent_stream_timeout_seconds, connect=10.0),
+            ) as resp:
+                if resp.status_code >= 400:
+                    body = await resp.aread()
+                    logger.error("Kibana streaming converse error: %s", body[:500])
+                    resp.raise_for_status()
+                async for event, raw in iter_sse(resp.aiter_lines()):
+                    try:
+                        parsed = json.loads(raw)
+                    except ValueError:
+                        continue
+                    data = parsed.get("data", parsed) if isinstance(parsed, dict) else {}
+                    event = (parsed.get("event") if isinstance(parsed, dict) else None) or event
+                    if event == "conversation_id_set":
+                        kibana_conv_id = data.get("conversation_id") or kibana_conv_id
+                    elif event == "reasoning":
+                        yield sse_event("reasoning", {"text": data.get("reasoning") or ""})
+                    elif event == "tool_call":
+                        tools_used.append({"tool_id": data.get("tool_id"), "params": data.get("params")})
+                        yield sse_event("tool_call", {"tool_id": data.get("tool_id"), "params": data.get("params")})
+                    elif event == "tool_result":
+                        yield sse_event("tool_result", {"tool_id": data.get("tool_id")})
+                    elif event == "message_chunk":
+                        delta = data.get("text_chunk") or ""
+                        if delta:
+                            chunks.append(delta)
+                            yield sse_event("delta", {"text": delta})
+                    elif event == "message_complete":
+                        final_text = data.get("message_content") or None
+                    elif event == "error":
+                        raise ValueError(str(data.get("message") or data.get("error") or data))
+        except Exception as e:
+            logger.error("Kibana streaming converse failed: %s", str(e))
+            yield sse_event("error", {"detail": "Agent temporarily unavailable. Please try again later."})
+            return
+
+        response_text = final_text or "".join(chunks)
+        if not response_text.strip():
+            response_text = "The agent responded but the format was unexpected. Please try again."
+        our_conv_id = await asyncio.to_thread(
+            self._save_turn, org_id, user_id, conversation_id, kibana_conv_id, message, response_text
+        )
+        record_escalation((time.monotonic() - started) * 1000)
+        yield sse_event("done", {
+            "conversation_id": our_conv_id,
+            "response": response_text,
+            "tools_used": tools_used,
+        })
+
     def get_conversations(self, org_id: str, user_id: str) -> list[dict[str, Any]]:
-        """List conversations for user (UI dropdown)."""
+        """List conversation headers for user (UI dropdown), most recent first."""
         idx = conversations_index(org_id)
         ensure_index_exists(idx, CONVERSATIONS_MAPPING)
-        hits = search_documents(
-            idx,
-            {"bool": {"must": [{"term": {"org_id": org_id}}, {"term": {"user_id": user_id}}]}},
+        es = get_es_client()
+        resp = es.search(
+            index=idx,
+            query={"bool": {"must": [{"term": {"org_id": org_id}}, {"term": {"user_id": user_id}}]}},
+            sort=[{"updated_at": {"order": "desc"}}],
             size=50,
+            _source_excludes=["messages"],
         )
-        # Sort by updated_at desc
-        hits.sort(key=lambda x: x.get("updated_at") or "", reverse=True)
-        return hits
+        return [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
+
+    def get_conversation_messages(
+        self,
+        org_id: str,
+        conversation_id: str,
+        before: int | None = None,
+        limit: int = 50,
+        header: dict[str, Any] | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Page backwards through a conversation's messages.
+
+        Returns up to limit messages with seq < before (latest first when
+        before is None), oldest first, plus has_more and next_before for the
+        next page. Messages embedded in legacy headers are included at their
+        original positions. Returns None if not found.
+        """
+        if header is None:
+            header = get_document(conversations_index(org_id), conversation_id)
+        if not header or header.get("org_id") != org_id:
+            return None
+        legacy = header.get("messages") or []
+        count = header.get("message_count") or len(legacy)
+        end = count if before is None else max(0, min(before, count))
+        start = max(0, end - limit)
+
+        messages: list[dict[str, Any]] = []
+        if end > len(legacy):
+            es = get_es_client()
+            resp = es.search(
+                index=conversation_messages_index(org_id),
+                query={"bool": {"filter": [
+                    {"term": {"conversation_id": conversation_id}},
+                    {"range": {"seq": {"gte": max(start, len(legacy)), "lt": end}}},
+                ]}},
+                sort=[{"seq": {"order": "asc"}}],
+                size=limit,
+                _source=["seq", "role", "content", "timestamp"],
+                ignore_unavailable=True,
+            )
+            messages = [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
+        if start < len(legacy):
+            messages = [
+                {"seq": i, **m} for i, m in enumerate(legacy[start:min(end, len(legacy))], start)
+            ] + messages
+        return {
+            "messages": messages,
+            "has_more": start > 0,
+            "next_before": start if start > 0 else None,
+        }
 
     def get_conversation(self, org_id: str, conversation_id: str) -> dict[str, Any] | None:
-        """Get single conversation for UI display and continuation."""
+        """Get conversation header with its most recent page of messages (UI display and continuation)."""
         idx = conversations_index(org_id)
         doc = get_document(idx, conversation_id)
         if not doc or doc.get("org_id") != org_id:
             return None
-        return doc
+        page = self.get_conversation_messages(org_id, conversation_id, header=doc)
+        return {**doc, **page}
+
+
+_agent_service: AgentService | None = None
 
 
 def get_agent_service() -> AgentService:
     """Return agent service singleton."""
-    return AgentService()
+    global _agent_service
+    if _agent_service is None:
+        _agent_service = AgentService()
+    return _agent_service
@@ -0,0 +1,58 @@
+"""ES|QL analytics engine — dashboard widget queries with columnar results."""
+
+from typing import Any
+
+from elasticsearch import BadRequestError, NotFoundError
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+ANALYTICS_ENGINES = ("dsl", "esql")
+# ES|QL date periods for the volume chart's calendar intervals
+ESQL_INTERVALS = {"day": "1 day", "week": "1 week", "month": "1 month", "quarter": "1 quarter", "year": "1 year"}
+
+
+def esql_enabled() -> bool:
+    """True when analytics_engine selects ES|QL for dashboard widgets."""
+    engine = get_settings().analytics_engine
+    if engine not in ANALYTICS_ENGINES:
+        logger.warning("Unknown analytics_engine %r; using dsl", engine)
+    return engine == "esql"
+
+
+def esql_columns(
+    es: Any,
+    index: str,
+    query: str,
+    filter_query: dict[str, Any],
+    params: list[Any] | None = None,
+) -> dict[str, list[Any]]:
+    """
+    Run FROM {index} | {query} with columnar output over docs matching
+    filter_query (Query DSL, so org and date scoping match the DSL engine).
+    Returns {column: values}; {} when the index expression matches nothing
+    (e.g. months without a feedback partition).
+    """
+    try:
+        resp = es.esql.query(
+            query=f"FROM {index} | {query}",
+            filter=filter_query,
+            params=params or None,
+            columnar=True,
+        )
+    except NotFoundError:
+        return {}
+    except BadRequestError as e:
+        if "Unknown index" not in str(e):
+            raise
+        return {}
+    return {col["name"]: values for col, values in zip(resp["columns"], resp["values"])}
+
+
+def esql_rows(columns: dict[str, list[Any]], *names: str) -> list[tuple[Any, ...]]:
+    """Zip the named columns back into rows (empty when the query matched nothing)."""
+    if not columns:
+        return []
+    return list(zip(*(columns[name] for name in names)))
@@ -0,0 +1,111 @@
+"""Sampled dashboard aggregations — random_sampler for orgs too large to aggregate exactly."""
+
+import math
+import threading
+import time
+from typing import Any
+
+from app.config import get_settings
+from app.models.feedback import feedback_index
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SAMPLING_MODES = ("auto", "on", "off")
+# random_sampler accepts probabilities up to 0.5 (or exactly 1)
+_MAX_PROBABILITY = 0.5
+# Fixed seed: the same request samples the same docs, so widgets do not jitter on reload
+_SEED = 42
+# Org sizes change slowly; recount at most this often
+_ORG_SIZE_TTL_SECONDS = 300.0
+
+_org_sizes: dict[str, tuple[int, float]] = {}
+_lock = threading.Lock()
+
+
+def _org_feedback_count(es: Any, org_id: str) -> int:
+    """Feedback docs of an org, cached for _ORG_SIZE_TTL_SECONDS."""
+    now = time.monotonic()
+    with _lock:
+        cached = _org_sizes.get(org_id)
+    if cached and now - cached[1] < _ORG_SIZE_TTL_SECONDS:
+        return cached[0]
+    resp = es.count(index=feedback_index(org_id), query={"term": {"org_id": org_id}}, ignore_unavailable=True)
+    count = int(resp.get("count", 0) or 0)
+    with _lock:
+        _org_sizes[org_id] = (count, now)
+    return count
+
+
+def sampling_probability(
+    es: Any,
+    org_id: str,
+    index: str,
+    query: dict[str, Any],
+    mode: str | None = None,
+) -> tuple[float, int] | None:
+    """
+    (probability, matching docs) for a widget query, or None to aggregate
+    exactly. mode overrides analytics_sampling for one request. In auto mode
+    only orgs above analytics_sampling_min_org_docs are sampled; queries that
+    match fewer than twice analytics_sampling_target_docs are never sampled.
+    """
+    settings = get_settings()
+    mode = mode or settings.analytics_sampling
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"sampling must be one of {', '.join(SAMPLING_MODES)}")
+    if mode == "off":
+        return None
+    if mode == "auto" and _org_feedback_count(es, org_id) < settings.analytics_sampling_min_org_docs:
+        return None
+    matching = int(es.count(index=index, query=query, ignore_unavailable=True).get("count", 0) or 0)
+    if not matching:
+        return None
+    probability = settings.analytics_sampling_target_docs / matching
+    if probability > _MAX_PROBABILITY:
+        return None
+    return round(probability, 6), matching
+
+
+def _sampling_info(probability: float, matching: int) -> dict[str, Any]:
+    """
+    Sampling metadata for a response. relative_error is the 95% bound on a
+    count over all matching docs (Bernoulli sampling); counts over a share s
+    of the docs have an error about 1/sqrt(s) times larger.
+    """
+    sampled_docs = max(1, round(matching * probability))
+    return {
+        "sampled": True,
+        "probability": probability,
+        "sampled_docs": sampled_docs,
+        "relative_error": round(1.96 * math.sqrt((1 - probability) / sampled_docs), 4),
+    }
+
+
+def search_aggs(
+    es: Any,
+    org_id: str,
+    index: str,
+    query: dict[str, Any],
+    aggs: dict[str, Any],
+    mode: str | None = None,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Run a size=0 aggregation search, inside random_sampler when
+    sampling_probability says so. Returns (aggregations, sampling info).
+    Doc counts, value counts and sums come back scaled by ES to estimate the
+    full set and averages need no scaling; cardinalities only count values
+    seen in the sample, so they undercount.
+    """
+    sampling = sampling_probability(es, org_id, index, query, mode)
+    if sampling is None:
+        resp = es.search(index=index, query=query, size=0, aggs=aggs)
+        return resp.get("aggregations", {}), {"sampled": False}
+    probability, matching = sampling
+    resp = es.search(
+        index=index,
+        query=query,
+        size=0,
+        aggs={"sample": {"random_sampler": {"probability": probability, "seed": _SEED}, "aggs": aggs}},
+    )
+    return resp.get("aggregations", {}).get("sample", {}), _sampling_info(probability, matching)
@@ -3,10 +3,15 @@
 from datetime import datetime, timedelta
 from typing import Any
 
+from app.config import get_settings
 from app.es_client import get_es_client
 from app.models.customer import CUSTOMERS_MAPPING, customers_index
 from app.models.feedback import FEEDBACK_MAPPING, feedback_index
+from app.services.analytics_esql_service import ESQL_INTERVALS, esql_columns, esql_enabled, esql_rows
+from app.services.analytics_sampling_service import search_aggs
+from app.services.analytics_snapshot_service import snapshot_aggs
 from app.services.es_service import ensure_index_exists
+from app.services.feedback_partition_service import feedback_search_index
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -49,6 +54,118 @@ def _feedback_base_query(org_id: str, from_date: str, to_date: str) -> dict[str,
     }
 
 
+def _widget_aggs(
+    es: Any,
+    org_id: str,
+    index: str,
+    query: dict[str, Any],
+    aggs: dict[str, Any],
+    sampling: str | None = None,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """(aggregations, sampling info) from the org's in-process snapshot if it has one, else from ES."""
+    result = snapshot_aggs(org_id, query, aggs)
+    if result is not None:
+        return result, {"sampled": False}
+    return search_aggs(es, org_id, index, query, aggs, sampling)
+
+
+# Calendar intervals offered to the volume chart, finest first
+VOLUME_INTERVALS = ("day", "week", "month", "quarter", "year")
+
+
+def _bucket_count(from_dt: datetime, to_dt: datetime, interval: str) -> int:
+    """Calendar buckets of interval that overlap [from_dt, to_dt]."""
+    if interval == "day":
+        return (to_dt - from_dt).days + 1
+    if interval == "week":
+        # Weeks start on Monday
+        return ((to_dt - timedelta(days=to_dt.weekday())) - (from_dt - timedelta(days=from_dt.weekday()))).days // 7 + 1
+    months = (to_dt.year - from_dt.year) * 12 + to_dt.month - from_dt.month
+    if interval == "month":
+        return months + 1
+    if interval == "quarter":
+        return (to_dt.year - from_dt.year) * 4 + (to_dt.month - 1) // 3 - (from_dt.month - 1) // 3 + 1
+    return to_dt.year - from_dt.year + 1
+
+
+def volume_interval(from_date: str, to_date: str, max_buckets: int | None = None) -> str:
+    """Finest calendar interval that covers the range in at most max_buckets buckets."""
+    max_buckets = max_buckets or get_settings().analytics_volume_max_buckets
+    from_dt = datetime.strptime(from_date[:10], "%Y-%m-%d")
+    to_dt = datetime.strptime(to_date[:10], "%Y-%m-%d")
+    for interval in VOLUME_INTERVALS:
+        if _bucket_count(from_dt, to_dt, interval) <= max_buckets:
+            return interval
+    return VOLUME_INTERVALS[-1]
+
+
+def _bucket_end(start: str, interval: str) -> str:
+    """Last day (YYYY-MM-DD) of the bucket starting at start."""
+    dt = datetime.strptime(start, "%Y-%m-%d")
+    if interval == "day":
+        return start
+    if interval == "week":
+        return (dt + timedelta(days=6)).strftime("%Y-%m-%d")
+    months = {"month": 1, "quarter": 3, "year": 12}[interval]
+    month = dt.month - 1 + months
+    first_of_next = datetime(dt.year + month // 12, month % 12 + 1, 1)
+    return (first_of_next - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _bucket_starts(from_date: str, to_date: str, interval: str) -> list[str]:
+    """First days of the interval buckets covering [from_date, to_date], as extended_bounds yields them."""
+    dt = datetime.strptime(from_date[:10], "%Y-%m-%d")
+    if interval == "week":
+        dt -= timedelta(days=dt.weekday())
+    elif interval == "month":
+        dt = dt.replace(day=1)
+    elif interval == "quarter":
+        dt = dt.replace(month=(dt.month - 1) // 3 * 3 + 1, day=1)
+    elif interval == "year":
+        dt = dt.replace(month=1, day=1)
+    starts: list[str] = []
+    while dt.strftime("%Y-%m-%d") <= to_date[:10]:
+        starts.append(dt.strftime("%Y-%m-%d"))
+        dt = datetime.strptime(_bucket_end(starts[-1], interval), "%Y-%m-%d") + timedelta(days=1)
+    return starts
+
+
+def _percent_breakdown(rows: list[tuple[Any, int]], key: str, missing: str | None = None) -> dict[str, Any]:
+    """{"breakdown": [{key, count, percentage}], "total"} from (value, count) rows."""
+    total = sum(count for _, count in rows)
+    breakdown = [
+        {key: (value or missing) if missing else value, "count": count,
+         "percentage": round(count / total * 100, 1) if total > 0 else 0}
+        for value, count in rows
+    ]
+    return {"breakdown": breakdown, "total": total}
+
+
+def _issue(area: str | None, count: int, prev_count: int, avg_sent: float | None, unique_customers: int) -> dict[str, Any]:
+    """Top-issue entry with growth against the previous period and a severity label."""
+    area = area or "Unknown"
+    growth = calculate_trend(float(count), float(prev_count)) if prev_count else None
+    avg_sent = avg_sent or -0.5
+
+    severity = "Stable"
+    if avg_sent < -0.5 and count >= 10:
+        severity = "Critical"
+    elif growth is not None and growth > 15:
+        severity = "Emerging"
+    elif growth is not None and growth < -5:
+        severity = "Improving"
+
+    return {
+        "product_area": area,
+        "issue_name": area,
+        "feedback_count": count,
+        "growth_rate": growth,
+        "severity": severity,
+        "affected_customers": unique_customers,
+        "avg_sentiment": round(avg_sent, 2),
+    }
+
+
 def calculate_trend(current: float, previous: float) -> float | None:
     """Return % change: (current - previous) / previous * 100. None if previous is 0."""
     if previous == 0:
@@ -56,11 +173,47 @@ def calculate_trend(current: float, previous: float) -> float | None:
     return round((current - previous) / previous * 100, 1)
 
 
+_SUMMARY_AGGS = {
+    "total": {"value_count": {"field": "id"}},
+    "avg_sentiment": {"avg": {"field": "sentiment_score"}},
+    "active_issues": {
+        "filter": {"range": {"sentiment_score": {"lt": -0.3}}},
+        "aggs": {"areas": {"cardinality": {"field": "product_area"}}},
+    },
+}
+_SUMMARY_ESQL = (
+    "STATS total = COUNT(*), avg_sentiment = AVG(sentiment_score),"
+    " active_issues = COUNT_DISTINCT(CASE(sentiment_score < -0.3, product_area))"
+)
+
+
+def _summary_stats(
+    es: Any,
+    org_id: str,
+    index: str,
+    query: dict[str, Any],
+    sampling: str | None,
+) -> tuple[int, float | None, int, dict[str, Any]]:
+    """(feedback count, avg sentiment, areas with negative feedback, sampling info) for one period."""
+    if esql_enabled():
+        rows = esql_rows(esql_columns(es, index, _SUMMARY_ESQL, query), "total", "avg_sentiment", "active_issues")
+        total, avg_sent, active = rows[0] if rows else (0, None, 0)
+        return total or 0, avg_sent, active or 0, {"sampled": False}
+    aggs, sampling_info = _widget_aggs(es, org_id, index, query, _SUMMARY_AGGS, sampling)
+    return (
+        aggs.get("total", {}).get("value", 0) or 0,
+        aggs.get("avg_sentiment", {}).get("value"),
+        aggs.get("active_issues", {}).get("areas", {}).get("value", 0) or 0,
+        sampling_info,
+    )
+
+
 def get_summary(
     org_id: str,
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return 4 summary metrics with trends. At-risk = health_score < 50."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
@@ -72,8 +225,8 @@ def get_summary(
     prev_from_str = prev_from.strftime("%Y-%m-%d")
     prev_to_str = prev_to.strftime("%Y-%m-%d")
 
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
     prev_base = {
@@ -85,46 +238,10 @@ def get_summary(
         }
     }
 
-    # Current period aggregations
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={
-            "total": {"value_count": {"field": "id"}},
-            "avg_sentiment": {"avg": {"field": "sentiment_score"}},
-            "active_issues": {
-                "filter": {"range": {"sentiment_score": {"lt": -0.3}}},
-                "aggs": {"areas": {"cardinality": {"field": "product_area"}}},
-            },
-        },
-    )
-    aggs = resp.get("aggregations", {})
-    total = aggs.get("total", {}).get("value", 0) or 0
-    avg_sent = aggs.get("avg_sentiment", {}).get("value")
-    active_issues = (
-        aggs.get("active_issues", {}).get("areas", {}).get("value", 0) or 0
-    )
-
-    # Previous period for trends
-    prev_resp = es.search(
-        index=idx,
-        query=prev_base,
-        size=0,
-        aggs={
-            "total": {"value_count": {"field": "id"}},
-            "avg_sentiment": {"avg": {"field": "sentiment_score"}},
-            "active_issues": {
-                "filter": {"range": {"sentiment_score": {"lt": -0.3}}},
-                "aggs": {"areas": {"cardinality": {"field": "product_area"}}},
-            },
-        },
-    )
-    prev_aggs = prev_resp.get("aggregations", {})
-    prev_total = prev_aggs.get("total", {}).get("value", 0) or 0
-    prev_avg_sent = prev_aggs.get("avg_sentiment", {}).get("value")
-    prev_active = (
-        prev_aggs.get("active_issues", {}).get("areas", {}).get("value", 0) or 0
+    # Current period, then previous period for trends
+    total, avg_sent, active_issues, sampling_info = _summary_stats(es, org_id, idx, base, sampling)
+    prev_total, prev_avg_sent, prev_active, _ = _summary_stats(
+        es, org_id, feedback_search_index(org_id, prev_from_str, prev_to_str), prev_base, sampling,
     )
 
     # At-risk customers: health < 50
@@ -155,27 +272,71 @@ def get_summary(
         "active_issues": active_issues,
         "active_issues_trend": calculate_trend(float(active_issues), float(prev_active)),
         "at_risk_customers": at_risk,
+        "sampling": sampling_info,
     }
 
 
+def _esql_volume(
+    es: Any,
+    index: str,
+    query: dict[str, Any],
+    from_date: str,
+    to_date: str,
+    interval: str,
+    areas: list[str] | None,
+) -> list[dict[str, Any]]:
+    """Volume periods from one ES|QL DATE_TRUNC group-by, with empty buckets filled in."""
+    esql = f"EVAL date = DATE_TRUNC({ESQL_INTERVALS[interval]}, created_at)"
+    if areas:
+        esql += f" | WHERE product_area IN ({', '.join(['?'] * len(areas))})"
+        esql += " | STATS count = COUNT(*) BY date, product_area | LIMIT 10000"
+        by_date: dict[str, dict[str, int]] = {}
+        for date, area, count in esql_rows(esql_columns(es, index, esql, query, list(areas)), "date", "product_area", "count"):
+            by_date.setdefault(date[:10], {})[area] = count
+        return [
+            {"date": d, "end": _bucket_end(d, interval), "count": sum(by_date.get(d, {}).values()), "by_area": by_date.get(d, {})}
+            for d in _bucket_starts(from_date, to_date, interval)
+        ]
+    esql += " | STATS count = COUNT(*) BY date | LIMIT 10000"
+    counts = {date[:10]: count for date, count in esql_rows(esql_columns(es, index, esql, query), "date", "count")}
+    return [
+        {"date": d, "end": _bucket_end(d, interval), "count": counts.get(d, 0)}
+        for d in _bucket_starts(from_date, to_date, interval)
+    ]
+
+
 def get_volume(
     org_id: str,
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
     areas: list[str] | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
-    """Return date histogram of feedback count. Optional terms sub-agg on product_area."""
+    """
+    Return a date histogram of feedback count, optionally split by product_area.
+    The interval is the finest of VOLUME_INTERVALS that keeps the range within
+    analytics_volume_max_buckets buckets; it is returned as "interval" and each
+    period carries its first ("date") and last ("end") day.
+    """
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    interval = volume_interval(from_dt, to_dt)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
 
+    if esql_enabled():
+        return {
+            "periods": _esql_volume(es, idx, base, from_dt, to_dt, interval, areas),
+            "interval": interval,
+            "sampling": {"sampled": False},
+        }
+
     date_histogram: dict[str, Any] = {
         "date_histogram": {
             "field": "created_at",
-            "calendar_interval": "day",
+            "calendar_interval": interval,
             "min_doc_count": 0,
             "extended_bounds": {"min": from_dt, "max": to_dt},
         }
@@ -190,30 +351,22 @@ def get_volume(
     else:
         date_histogram["aggs"] = {"count": {"value_count": {"field": "id"}}}
 
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={"volume": date_histogram},
-    )
-    buckets = (
-        resp.get("aggregations", {})
-        .get("volume", {})
-        .get("buckets", [])
-    )
+    aggs, sampling_info = _widget_aggs(es, org_id, idx, base, {"volume": date_histogram}, sampling)
+    buckets = aggs.get("volume", {}).get("buckets", [])
     result = []
     for b in buckets:
         key = b.get("key_as_string", b.get("key", ""))[:10]
+        end = _bucket_end(key, interval)
         if areas:
             by_area = {
                 sb["key"]: sb.get("count", {}).get("value", 0)
                 for sb in b.get("by_area", {}).get("buckets", [])
             }
             total = sum(by_area.values())
-            result.append({"date": key, "count": total, "by_area": by_area})
+            result.append({"date": key, "end": end, "count": total, "by_area": by_area})
         else:
-            result.append({"date": key, "count": b.get("count", {}).get("value", 0)})
-    return {"periods": result}
+            result.append({"date": key, "end": end, "count": b.get("count", {}).get("value", 0)})
+    return {"periods": result, "interval": interval, "sampling": sampling_info}
 
 
 def get_sentiment_breakdown(
@@ -221,31 +374,26 @@ def get_sentiment_breakdown(
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return sentiment breakdown: positive, negative, neutral counts and percentages."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={"sentiment": {"terms": {"field": "sentiment", "size": 10}}},
+    if esql_enabled():
+        columns = esql_columns(
+            es, idx,
+            "WHERE sentiment IS NOT NULL | STATS count = COUNT(*) BY sentiment | SORT count DESC, sentiment | LIMIT 10",
+            base,
+        )
+        return {**_percent_breakdown(esql_rows(columns, "sentiment", "count"), "sentiment"), "sampling": {"sampled": False}}
+    aggs, sampling_info = _widget_aggs(
+        es, org_id, idx, base, {"sentiment": {"terms": {"field": "sentiment", "size": 10}}}, sampling,
     )
-    buckets = (
-        resp.get("aggregations", {})
-        .get("sentiment", {})
-        .get("buckets", [])
-    )
-    total = sum(b["doc_count"] for b in buckets)
-    result = []
-    for b in buckets:
-        count = b["doc_count"]
-        pct = round(count / total * 100, 1) if total > 0 else 0
-        result.append({"sentiment": b["key"], "count": count, "percentage": pct})
-    return {"breakdown": result, "total": total}
+    rows = [(b["key"], b["doc_count"]) for b in aggs.get("sentiment", {}).get("buckets", [])]
+    return {**_percent_breakdown(rows, "sentiment"), "sampling": sampling_info}
 
 
 def get_top_issues(
@@ -254,6 +402,7 @@ def get_top_issues(
     from_date: str | None = None,
     to_date: str | None = None,
     limit: int = 5,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return top issues by product_area with severity and growth. Reuses agent logic."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
@@ -265,8 +414,8 @@ def get_top_issues(
     prev_from_str = prev_from.strftime("%Y-%m-%d")
     prev_to_str = prev_to.strftime("%Y-%m-%d")
 
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = {
         "bool": {
@@ -286,64 +435,57 @@ def get_top_issues(
             ]
         }
     }
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={
-            "by_area": {
-                "terms": {"field": "product_area", "size": limit * 2},
-                "aggs": {
-                    "unique_customers": {"cardinality": {"field": "customer_id"}},
-                    "avg_sentiment": {"avg": {"field": "sentiment_score"}},
-                },
-            }
-        },
-    )
-    prev_resp = es.search(
-        index=idx,
-        query=prev_base,
-        size=0,
-        aggs={"by_area": {"terms": {"field": "product_area", "size": limit * 2}}},
-    )
-    prev_counts = {
-        b["key"]: b["doc_count"]
-        for b in prev_resp.get("aggregations", {})
-        .get("by_area", {})
-        .get("buckets", [])
-    }
-    buckets = (
-        resp.get("aggregations", {})
-        .get("by_area", {})
-        .get("buckets", [])
+    prev_idx = feedback_search_index(org_id, prev_from_str, prev_to_str)
+    if esql_enabled():
+        rows = esql_rows(esql_columns(
+            es, idx,
+            "WHERE product_area IS NOT NULL"
+            " | STATS feedback_count = COUNT(*), unique_customers = COUNT_DISTINCT(customer_id),"
+            " avg_sentiment = AVG(sentiment_score) BY product_area"
+            f" | SORT feedback_count DESC, product_area | LIMIT {limit * 2}",
+            base,
+        ), "product_area", "feedback_count", "avg_sentiment", "unique_customers")
+        prev_counts = dict(esql_rows(esql_columns(
+            es, prev_idx,
+            "WHERE product_area IS NOT NULL | STATS count = COUNT(*) BY product_area"
+            f" | SORT count DESC, product_area | LIMIT {limit * 2}",
+            prev_base,
+        ), "product_area", "count"))
+        issues = [
+            _issue(area, count, prev_counts.get(area, 0), avg_sent, unique_customers or 0)
+            for area, count, avg_sent, unique_customers in rows[:limit]
+        ]
+        return {"issues": issues, "sampling": {"sampled": False}}
+    aggs, sampling_info = _widget_aggs(es, org_id, idx, base, {
+        "by_area": {
+            "terms": {"field": "product_area", "size": limit * 2},
+            "aggs": {
+                "unique_customers": {"cardinality": {"field": "customer_id"}},
+                "avg_sentiment": {"avg": {"field": "sentiment_score"}},
+            },
+        }
+    }, sampling)
+    prev_aggs, _ = _widget_aggs(
+        es,
+        org_id,
+        prev_idx,
+        prev_base,
+        {"by_area": {"terms": {"field": "product_area", "size": limit * 2}}},
+        sampling,
     )
-    issues = []
-    for b in buckets[:limit]:
-        area = b["key"] or "Unknown"
-        count = b["doc_count"]
-        prev_count = prev_counts.get(area, 0)
-        growth = calculate_trend(float(count), float(prev_count)) if prev_count else None
-        avg_sent = b.get("avg_sentiment", {}).get("value") or -0.5
-        unique_customers = b.get("unique_customers", {}).get("value", 0)
-
-        severity = "Stable"
-        if avg_sent < -0.5 and count >= 10:
-            severity = "Critical"
-        elif growth is not None and growth > 15:
-            severity = "Emerging"
-        elif growth is not None and growth < -5:
-            severity = "Improving"
-
-        issues.append({
-            "product_area": area,
-            "issue_name": area,
-            "feedback_count": count,
-            "growth_rate": growth,
-            "severity": severity,
-            "affected_customers": unique_customers,
-            "avg_sentiment": round(avg_sent, 2),
-        })
-    return {"issues": issues}
+    prev_counts = {b["key"]: b["doc_count"] for b in prev_aggs.get("by_area", {}).get("buckets", [])}
+    buckets = aggs.get("by_area", {}).get("buckets", [])
+    issues = [
+        _issue(
+            b["key"],
+            b["doc_count"],
+            prev_counts.get(b["key"] or "Unknown", 0),
+            b.get("avg_sentiment", {}).get("value"),
+            b.get("unique_customers", {}).get("value", 0),
+        )
+        for b in buckets[:limit]
+    ]
+    return {"issues": issues, "sampling": sampling_info}
 
 
 def get_area_breakdown(
@@ -351,29 +493,38 @@ def get_area_breakdown(
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return product_area terms with count and avg sentiment."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={
-            "by_area": {
-                "terms": {"field": "product_area", "size": 50},
-                "aggs": {"avg_sentiment": {"avg": {"field": "sentiment_score"}}},
+    if esql_enabled():
+        rows = esql_rows(esql_columns(
+            es, idx,
+            "WHERE product_area IS NOT NULL"
+            " | STATS count = COUNT(*), avg_sentiment = AVG(sentiment_score) BY product_area"
+            " | SORT count DESC, product_area | LIMIT 50",
+            base,
+        ), "product_area", "count", "avg_sentiment")
+        areas = [
+            {
+                "product_area": area or "Unknown",
+                "count": count,
+                "avg_sentiment": round(avg_sent, 2) if avg_sent is not None else 0.0,
             }
-        },
-    )
-    buckets = (
-        resp.get("aggregations", {})
-        .get("by_area", {})
-        .get("buckets", [])
-    )
+            for area, count, avg_sent in rows
+        ]
+        return {"areas": areas, "sampling": {"sampled": False}}
+    aggs, sampling_info = _widget_aggs(es, org_id, idx, base, {
+        "by_area": {
+            "terms": {"field": "product_area", "size": 50},
+            "aggs": {"avg_sentiment": {"avg": {"field": "sentiment_score"}}},
+        }
+    }, sampling)
+    buckets = aggs.get("by_area", {}).get("buckets", [])
     result = []
     for b in buckets:
         avg_sent = b.get("avg_sentiment", {}).get("value")
@@ -382,7 +533,7 @@ def get_area_breakdown(
             "count": b["doc_count"],
             "avg_sentiment": round(avg_sent, 2) if avg_sent is not None else 0.0,
         })
-    return {"areas": result}
+    return {"areas": result, "sampling": sampling_info}
 
 
 def get_at_risk_customers(
@@ -394,9 +545,9 @@ def get_at_risk_customers(
 ) -> dict[str, Any]:
     """Return customers with health < 50 OR significant negative feedback. Include negative_feedback_count."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    fb_idx = feedback_index(org_id)
+    fb_idx = feedback_search_index(org_id, from_dt, to_dt)
     cust_idx = customers_index(org_id)
-    ensure_index_exists(fb_idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
     ensure_index_exists(cust_idx, CUSTOMERS_MAPPING)
     es = get_es_client()
 
@@ -466,31 +617,58 @@ def get_source_distribution(
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return terms aggregation on source field."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={"by_source": {"terms": {"field": "source", "size": 50}}},
+    if esql_enabled():
+        columns = esql_columns(
+            es, idx,
+            "WHERE source IS NOT NULL | STATS count = COUNT(*) BY source | SORT count DESC, source | LIMIT 50",
+            base,
+        )
+        return {
+            **_percent_breakdown(esql_rows(columns, "source", "count"), "source", missing="unknown"),
+            "sampling": {"sampled": False},
+        }
+    aggs, sampling_info = _widget_aggs(
+        es, org_id, idx, base, {"by_source": {"terms": {"field": "source", "size": 50}}}, sampling,
     )
-    buckets = (
-        resp.get("aggregations", {})
-        .get("by_source", {})
-        .get("buckets", [])
+    rows = [(b["key"], b["doc_count"]) for b in aggs.get("by_source", {}).get("buckets", [])]
+    return {**_percent_breakdown(rows, "source", missing="unknown"), "sampling": sampling_info}
+
+
+def _esql_segments(es: Any, index: str, query: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Segments with their top areas from one ES|QL group-by on (segment, area),
+    ranked like the nested terms aggregation: top 20 segments by count, top
+    20 areas within each. Feedback without an area counts toward its segment.
+    """
+    columns = esql_columns(
+        es, index,
+        "WHERE customer_segment IS NOT NULL"
+        " | STATS count = COUNT(*) BY customer_segment, product_area | LIMIT 10000",
+        query,
     )
-    total = sum(b["doc_count"] for b in buckets)
-    result = []
-    for b in buckets:
-        count = b["doc_count"]
-        pct = round(count / total * 100, 1) if total > 0 else 0
-        result.append({"source": b["key"] or "unknown", "count": count, "percentage": pct})
-    return {"breakdown": result, "total": total}
+    totals: dict[str, int] = {}
+    by_area: dict[str, list[dict[str, Any]]] = {}
+    for segment, area, count in esql_rows(columns, "customer_segment", "product_area", "count"):
+        totals[segment] = totals.get(segment, 0) + count
+        if area is not None:
+            by_area.setdefault(segment, []).append({"product_area": area, "count": count})
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:20]
+    return [
+        {
+            "segment": segment or "Unknown",
+            "count": count,
+            "by_area": sorted(by_area.get(segment, []), key=lambda a: (-a["count"], a["product_area"]))[:20],
+        }
+        for segment, count in ranked
+    ]
 
 
 def get_segment_breakdown(
@@ -498,31 +676,25 @@ def get_segment_breakdown(
     period: str = "30d",
     from_date: str | None = None,
     to_date: str | None = None,
+    sampling: str | None = None,
 ) -> dict[str, Any]:
     """Return terms aggregation on customer_segment, optionally by product_area."""
     from_dt, to_dt = _parse_period(period, from_date, to_date)
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
+    ensure_index_exists(feedback_index(org_id), FEEDBACK_MAPPING)
+    idx = feedback_search_index(org_id, from_dt, to_dt)
     es = get_es_client()
     base = _feedback_base_query(org_id, from_dt, to_dt)
-    resp = es.search(
-        index=idx,
-        query=base,
-        size=0,
-        aggs={
-            "by_segment": {
-                "terms": {"field": "customer_segment", "size": 20},
-                "aggs": {
-                    "by_area": {"terms": {"field": "product_area", "size": 20}},
-                },
-            }
-        },
-    )
-    buckets = (
-        resp.get("aggregations", {})
-        .get("by_segment", {})
-        .get("buckets", [])
-    )
+    if esql_enabled():
+        return {"segments": _esql_segments(es, idx, base), "sampling": {"sampled": False}}
+    aggs, sampling_info = _widget_aggs(es, org_id, idx, base, {
+        "by_segment": {
+            "terms": {"field": "customer_segment", "size": 20},
+            "aggs": {
+                "by_area": {"terms": {"field": "product_area", "size": 20}},
+            },
+        }
+    }, sampling)
+    buckets = aggs.get("by_segment", {}).get("buckets", [])
     result = []
     for b in buckets:
         by_area = [{"product_area": sb["key"], "count": sb["doc_count"]} for sb in b.get("by_area", {}).get("buckets", [])]
@@ -531,4 +703,4 @@ def get_segment_breakdown(
             "count": b["doc_count"],
             "by_area": by_area,
         })
-    return {"segments": result}
+    return {"segments": result, "sampling": sampling_info}
@@ -0,0 +1,590 @@
+"""In-process columnar snapshots of hot orgs' feedback for dashboard aggregations."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import numpy as np
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.feedback import feedback_index
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Dictionary-encoded columns; everything else a widget aggregates on is created_at or sentiment_score
+KEYWORD_FIELDS = ("product_area", "source", "sentiment", "customer_id", "customer_segment")
+_SOURCE_FIELDS = ["id", "created_at", "sentiment_score", *KEYWORD_FIELDS]
+_NO_DAY = np.iinfo(np.int32).min
+_SCAN_PAGE_SIZE = 10000
+_PIT_KEEP_ALIVE = "2m"
+# Rough cost of one id -> row entry (key string plus dict slot), and of one dictionary value
+_ID_BYTES = 120
+_VALUE_BYTES = 80
+_INTERVAL_UNITS = {"month": "M", "quarter": "M", "year": "Y"}
+# After an org is too big to snapshot or its build fails, don't count it toward a build for this long
+_REJECTED_BACKOFF_SECONDS = 900.0
+
+
+class UnsupportedAggregation(Exception):
+    """The snapshot cannot answer this query or aggregation; ask ES instead."""
+
+
+def _day(value: Any) -> int:
+    """Days since the epoch of an ISO date or datetime string; _NO_DAY if unparseable."""
+    try:
+        return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+    except (ValueError, TypeError):
+        return _NO_DAY
+
+
+def _bucket_starts(days: np.ndarray, interval: str) -> np.ndarray:
+    """First day of the calendar bucket containing each day (weeks start on Monday)."""
+    if interval == "day":
+        return days
+    if interval == "week":
+        return days - (days + 3) % 7  # 1970-01-01 was a Thursday
+    if interval not in _INTERVAL_UNITS:
+        raise UnsupportedAggregation(f"calendar_interval {interval}")
+    units = days.astype("datetime64[D]").astype(f"datetime64[{_INTERVAL_UNITS[interval]}]")
+    if interval == "quarter":
+        months = units.astype(np.int64)
+        units = (months - months % 3).astype("datetime64[M]")
+    return units.astype("datetime64[D]").astype(np.int64)
+
+
+def _next_bucket(start: int, interval: str) -> int:
+    if interval == "day":
+        return start + 1
+    if interval == "week":
+        return start + 7
+    unit = _INTERVAL_UNITS[interval]
+    step = 3 if interval == "quarter" else 1
+    nxt = np.datetime64(start, "D").astype(f"datetime64[{unit}]") + step
+    return int(nxt.astype("datetime64[D]").astype(np.int64))
+
+
+def _date_key(start: int) -> dict[str, Any]:
+    """key / key_as_string of a date_histogram bucket, as ES returns them for created_at."""
+    return {
+        "key": start * 86_400_000,
+        "key_as_string": f"{np.datetime64(start, 'D')}T00:00:00.000Z",
+    }
+
+
+def _group(rows: np.ndarray, keys: np.ndarray, counts: np.ndarray) -> Callable[[int], np.ndarray]:
+    """rows split by small integer keys with one stable sort (radix for 16-bit keys); returns key -> rows."""
+    dtype = np.uint16 if len(counts) <= np.iinfo(np.uint16).max else np.int64
+    order = np.argsort(keys.astype(dtype), kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return lambda k: rows[order[offsets[k] : offsets[k + 1]]]
+
+
+class FeedbackSnapshot:
+    """
+    Columnar copy of an org's feedback. created_at is kept as days since the
+    epoch, sentiment_score as float32 (NaN when missing) and KEYWORD_FIELDS as
+    int32 codes into per-field dictionaries (-1 when missing). Rows are
+    upserted by id and deletes clear a live flag, so ingest keeps it current.
+
+    aggregate() answers the subset of the aggregation DSL the dashboard uses
+    (terms, avg, value_count, cardinality, filter, date_histogram) and returns
+    ES-shaped results, so widgets parse buckets the same way either way.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._size = 0
+        self._rows: dict[str, int] = {}
+        self._days = np.full(capacity, _NO_DAY, dtype=np.int32)
+        self._scores = np.full(capacity, np.nan, dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._codes = {f: np.full(capacity, -1, dtype=np.int32) for f in KEYWORD_FIELDS}
+        self._values: dict[str, list[str]] = {f: [] for f in KEYWORD_FIELDS}
+        self._lookup: dict[str, dict[str, int]] = {f: {} for f in KEYWORD_FIELDS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self._live[: self._size].sum())
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: column arrays, the id map and the dictionaries."""
+        arrays = self._days.nbytes + self._scores.nbytes + self._live.nbytes
+        arrays += sum(c.nbytes for c in self._codes.values())
+        values = sum(len(v) for v in self._values.values())
+        return arrays + len(self._rows) * _ID_BYTES + values * _VALUE_BYTES
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._days)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+
+        def grown(a: np.ndarray, fill: Any) -> np.ndarray:
+            out = np.full(capacity, fill, dtype=a.dtype)
+            out[: self._size] = a[: self._size]
+            return out
+
+        self._days = grown(self._days, _NO_DAY)
+        self._scores = grown(self._scores, np.nan)
+        self._live = grown(self._live, False)
+        self._codes = {f: grown(c, -1) for f, c in self._codes.items()}
+
+    def _encode(self, field: str, value: Any) -> int:
+        if value is None or value == "":
+            return -1
+        value = str(value)
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._values[field])
+            self._values[field].append(value)
+        return code
+
+    def upsert(self, docs: list[dict[str, Any]]) -> None:
+        """Insert or overwrite feedback docs by id."""
+        with self._lock:
+            self._grow(self._size + len(docs))
+            for doc in docs:
+                doc_id = doc.get("id")
+                if not doc_id:
+                    continue
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._rows[doc_id] = self._size
+                    self._size += 1
+                self._days[row] = _day(doc.get("created_at"))
+                score = doc.get("sentiment_score")
+                self._scores[row] = np.nan if score is None else float(score)
+                self._live[row] = True
+                for field in KEYWORD_FIELDS:
+                    self._codes[field][row] = self._encode(field, doc.get(field))
+
+    def remove(self, ids: list[str]) -> None:
+        """Mark feedback docs deleted."""
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.get(doc_id)
+                if row is not None:
+                    self._live[row] = False
+
+    def aggregate(
+        self,
+        aggs: dict[str, Any],
+        from_date: str | None = None,
+        to_date: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        ES-shaped aggregations over live docs with created_at between from_date
+        and to_date (whole days, inclusive). Raises UnsupportedAggregation for
+        anything outside the supported subset.
+        """
+        with self._lock:
+            n = self._size
+            mask = self._live[:n].copy()
+            days = self._days[:n]
+            if from_date:
+                mask &= days >= _day(from_date)
+            if to_date:
+                mask &= (days <= _day(to_date)) & (days != _NO_DAY)
+            return self._run(aggs, np.nonzero(mask)[0])
+
+    def _run(self, aggs: dict[str, Any], rows: np.ndarray) -> dict[str, Any]:
+        return {name: self._agg(spec, rows) for name, spec in aggs.items()}
+
+    def _keyword(self, field: str) -> np.ndarray:
+        if field not in self._codes:
+            raise UnsupportedAggregation(f"field {field}")
+        return self._codes[field][: self._size]
+
+    def _agg(self, spec: dict[str, Any], rows: np.ndarray) -> dict[str, Any]:
+        kinds = [k for k in spec if k != "aggs"]
+        if len(kinds) != 1:
+            raise UnsupportedAggregation(str(kinds))
+        kind, body, sub = kinds[0], spec[kinds[0]], spec.get("aggs") or {}
+        if kind == "terms":
+            return self._terms(body, sub, rows)
+        if kind == "date_histogram":
+            return self._date_histogram(body, sub, rows)
+        if kind == "filter":
+            rows = self._filter(body, rows)
+            return {"doc_count": int(rows.size), **self._run(sub, rows)}
+        if sub:
+            raise UnsupportedAggregation(f"sub-aggregations under {kind}")
+        field = body.get("field")
+        if kind == "value_count" and field == "id":
+            return {"value": int(rows.size)}
+        if kind == "avg" and field == "sentiment_score":
+            scores = self._scores[rows]
+            scores = scores[~np.isnan(scores)]
+            return {"value": float(scores.mean(dtype=np.float64)) if scores.size else None}
+        if kind == "cardinality":
+            codes = self._keyword(field)[rows]
+            return {"value": int(np.count_nonzero(np.bincount(codes[codes >= 0])))}
+        raise UnsupportedAggregation(f"{kind} on {field}")
+
+    def _filter(self, query: dict[str, Any], rows: np.ndarray) -> np.ndarray:
+        if "term" in query and len(query["term"]) == 1:
+            field, value = next(iter(query["term"].items()))
+            codes = self._keyword(field)[rows]
+            return rows[codes == self._lookup[field].get(str(value), -2)]
+        if "range" in query and set(query["range"]) == {"sentiment_score"}:
+            scores = self._scores[rows]
+            keep = ~np.isnan(scores)
+            for op, bound in query["range"]["sentiment_score"].items():
+                if op == "lt":
+                    keep &= scores < bound
+                elif op == "lte":
+                    keep &= scores <= bound
+                elif op == "gt":
+                    keep &= scores > bound
+                elif op == "gte":
+                    keep &= scores >= bound
+                else:
+                    raise UnsupportedAggregation(f"range {op}")
+            return rows[keep]
+        raise UnsupportedAggregation(f"filter {list(query)}")
+
+    def _terms(self, body: dict[str, Any], sub: dict[str, Any], rows: np.ndarray) -> dict[str, Any]:
+        field = body.get("field")
+        codes = self._keyword(field)[rows]
+        values = self._values[field]
+        present = codes >= 0
+        rows, codes = rows[present], codes[present]
+        counts = np.bincount(codes, minlength=len(values))
+        keys = np.nonzero(counts)[0].tolist()
+        include = body.get("include")
+        if include is not None:
+            if not isinstance(include, list):
+                raise UnsupportedAggregation("terms include pattern")
+            allowed = {self._lookup[field].get(str(v)) for v in include}
+            keys = [k for k in keys if k in allowed]
+        # ES default order: doc_count desc, then key asc
+        keys.sort(key=lambda k: (-counts[k], values[k]))
+        groups = _group(rows, codes, counts) if sub else None
+        buckets = []
+        for k in keys[: body.get("size", 10)]:
+            bucket = {"key": values[k], "doc_count": int(counts[k])}
+            if groups is not None:
+                bucket.update(self._run(sub, groups(k)))
+            buckets.append(bucket)
+        return {"buckets": buckets}
+
+    def _date_histogram(self, body: dict[str, Any], sub: dict[str, Any], rows: np.ndarray) -> dict[str, Any]:
+        if body.get("field") != "created_at" or "calendar_interval" not in body:
+            raise UnsupportedAggregation("date_histogram")
+        interval = body["calendar_interval"]
+        days = self._days[rows].astype(np.int64)
+        dated = days != _NO_DAY
+        rows, days = rows[dated], days[dated]
+
+        bound_days = [int(days.min()), int(days.max())] if days.size else []
+        extended = body.get("extended_bounds") or {}
+        bound_days += [_day(extended[key]) for key in ("min", "max") if extended.get(key)]
+        if not bound_days:
+            return {"buckets": []}
+        first, last = (int(d) for d in _bucket_starts(np.array([min(bound_days), max(bound_days)]), interval))
+        all_starts = [first]
+        while (nxt := _next_bucket(all_starts[-1], interval)) <= last:
+            all_starts.append(nxt)
+        # Day -> bucket lookup table over the bounds; avoids calendar math per row
+        edges = np.array(all_starts + [_next_bucket(all_starts[-1], interval)])
+        index = np.repeat(np.arange(len(all_starts)), np.diff(edges))[days - edges[0]]
+        counts = np.bincount(index, minlength=len(all_starts))
+        groups = _group(rows, index, counts) if sub else None
+        min_doc_count = body.get("min_doc_count", 0)
+        buckets = []
+        for i, start in enumerate(all_starts):
+            if counts[i] < min_doc_count:
+                continue
+            bucket = {**_date_key(start), "doc_count": int(counts[i])}
+            if groups is not None:
+                bucket.update(self._run(sub, groups(i)))
+            buckets.append(bucket)
+        return {"buckets": buckets}
+
+
+_snapshots: "OrderedDict[str, FeedbackSnapshot]" = OrderedDict()
+_requests: dict[str, int] = {}
+_building: dict[str, list[tuple[str, list[Any]]]] = {}
+# Orgs with feedback sync tasks still running -> their task IDs; never snapshotted meanwhile
+_held: dict[str, set[str]] = {}
+# Orgs whose last build returned nothing -> monotonic time their requests count again
+_rejected: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _base_range(org_id: str, query: dict[str, Any]) -> tuple[str | None, str | None] | None:
+    """(from, to) of a widget base query (org term plus created_at range); None for anything else."""
+    clauses = (query.get("bool") or {}).get("filter")
+    if set(query) != {"bool"} or set(query["bool"]) != {"filter"} or not isinstance(clauses, list):
+        return None
+    org_ok, bounds = False, (None, None)
+    for clause in clauses:
+        if clause == {"term": {"org_id": org_id}}:
+            org_ok = True
+        elif set(clause) == {"range"} and set(clause["range"]) == {"created_at"}:
+            r = clause["range"]["created_at"]
+            if not set(r) <= {"gte", "lte"}:
+                return None
+            bounds = (r.get("gte"), r.get("lte"))
+        else:
+            return None
+    return bounds if org_ok else None
+
+
+def _evict() -> None:
+    """Drop least recently used snapshots until the total fits analytics_snapshot_max_bytes."""
+    budget = get_settings().analytics_snapshot_max_bytes
+    total = sum(s.nbytes for s in _snapshots.values())
+    while _snapshots and total > budget:
+        org_id, snapshot = _snapshots.popitem(last=False)
+        total -= snapshot.nbytes
+        _requests.pop(org_id, None)
+        logger.info("Evicted analytics snapshot for org %s (%d bytes)", org_id[:8], snapshot.nbytes)
+
+
+def build_feedback_snapshot(org_id: str) -> FeedbackSnapshot | None:
+    """
+    Load an org's feedback columns with a point-in-time scan (_shard_doc
+    order, search_after paging). Returns None if the org has more than
+    analytics_snapshot_max_org_docs feedback docs.
+    """
+    es = get_es_client()
+    max_docs = get_settings().analytics_snapshot_max_org_docs
+    snapshot = FeedbackSnapshot()
+    pit_id = es.open_point_in_time(index=feedback_index(org_id), keep_alive=_PIT_KEEP_ALIVE)["id"]
+    try:
+        search_after = None
+        while True:
+            resp = es.search(
+                pit={"id": pit_id, "keep_alive": _PIT_KEEP_ALIVE},
+                query={"term": {"org_id": org_id}},
+                sort=[{"_shard_doc": "asc"}],
+                size=_SCAN_PAGE_SIZE,
+                source_includes=_SOURCE_FIELDS,
+                search_after=search_after,
+                track_total_hits=max_docs + 1 if search_after is None else False,
+            )
+            pit_id = resp.get("pit_id", pit_id)
+            if search_after is None and resp["hits"]["total"]["value"] > max_docs:
+                logger.info("Org %s has more than %d feedback docs; not snapshotted", org_id[:8], max_docs)
+                return None
+            hits = resp["hits"]["hits"]
+            snapshot.upsert([h["_source"] for h in hits])
+            if len(hits) < _SCAN_PAGE_SIZE:
+                return snapshot
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.debug("Closing PIT failed: %s", str(e))
+
+
+def _build(org_id: str) -> None:
+    """Build an org's snapshot, replay writes that arrived meanwhile and install it."""
+    try:
+        snapshot = build_feedback_snapshot(org_id)
+    except Exception as e:
+        logger.warning("Analytics snapshot build failed for org %s: %s", org_id[:8], str(e))
+        snapshot = None
+    with _lock:
+        pending = _building.pop(org_id, [])
+        if snapshot is None:
+            _requests.pop(org_id, None)
+            _rejected[org_id] = time.monotonic() + _REJECTED_BACKOFF_SECONDS
+            return
+        if ("invalidate", []) in pending:
+            return
+        for op, items in pending:
+            if op == "upsert":
+                snapshot.upsert(items)
+            else:
+                snapshot.remove(items)
+        _snapshots[org_id] = snapshot
+        _evict()
+        if org_id in _snapshots:
+            logger.info("Built analytics snapshot for org %s (%d docs, %d bytes)", org_id[:8], len(snapshot), snapshot.nbytes)
+
+
+def snapshot_aggs(org_id: str, query: dict[str, Any], aggs: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Widget aggregations from the org's snapshot, or None to ask ES (snapshots
+    disabled, cold org, query or aggregation not supported). Each miss counts
+    toward analytics_snapshot_build_after_requests; crossing it starts a
+    background build.
+    """
+    settings = get_settings()
+    if not settings.analytics_snapshot_enabled:
+        return None
+    bounds = _base_range(org_id, query)
+    if bounds is None:
+        return None
+    build = False
+    with _lock:
+        if org_id in _held:
+            return None
+        if org_id in _rejected:
+            if time.monotonic() < _rejected[org_id]:
+                return None
+            del _rejected[org_id]
+        snapshot = _snapshots.get(org_id)
+        if snapshot is not None:
+            _snapshots.move_to_end(org_id)
+        else:
+            _requests[org_id] = _requests.get(org_id, 0) + 1
+            if _requests[org_id] >= settings.analytics_snapshot_build_after_requests and org_id not in _building:
+                _building[org_id] = []
+                build = True
+    if build:
+        threading.Thread(target=_build, args=(org_id,), daemon=True).start()
+    if snapshot is None:
+        return None
+    try:
+        return snapshot.aggregate(aggs, *bounds)
+    except UnsupportedAggregation as e:
+        logger.debug("Snapshot cannot answer for org %s: %s", org_id[:8], str(e))
+        return None
+
+
+def refresh_feedback_snapshot(
+    org_id: str,
+    docs: list[dict[str, Any]] | None = None,
+    deleted_ids: list[str] | None = None,
+) -> None:
+    """Apply feedback writes to a loaded (or building) snapshot. No-op for other orgs."""
+    with _lock:
+        if org_id in _building:
+            if docs:
+                _building[org_id].append(("upsert", list(docs)))
+            if deleted_ids:
+                _building[org_id].append(("remove", list(deleted_ids)))
+        snapshot = _snapshots.get(org_id)
+    if snapshot is None:
+        return
+    if docs:
+        snapshot.upsert(docs)
+    if deleted_ids:
+        snapshot.remove(deleted_ids)
+    with _lock:
+        _evict()
+
+
+def invalidate_feedback_snapshot(org_id: str | None = None) -> None:
+    """Drop the snapshot of one org, or all orgs, after writes it cannot follow (e.g. update_by_query)."""
+    with _lock:
+        if org_id is None:
+            _snapshots.clear()
+            _requests.clear()
+            for pending in _building.values():
+                pending.append(("invalidate", []))
+            return
+        _snapshots.pop(org_id, None)
+        if org_id in _building:
+            _building[org_id].append(("invalidate", []))
+
+
+def hold_feedback_snapshot(org_id: str, task_id: str) -> None:
+    """
+    Drop the org's snapshot and keep it from being rebuilt while an
+    update_by_query task rewrites its feedback in place.
+    """
+    with _lock:
+        _held.setdefault(org_id, set()).add(task_id)
+    invalidate_feedback_snapshot(org_id)
+
+
+def release_feedback_snapshot(org_id: str, task_id: str) -> None:
+    """End a hold_feedback_snapshot once its task finished. Safe to call more than once."""
+    with _lock:
+        tasks = _held.get(org_id)
+        if tasks is not None:
+            tasks.discard(task_id)
+            if not tasks:
+                del _held[org_id]
+    invalidate_feedback_snapshot(org_id)
+
+
+def snapshot_stats() -> dict[str, Any]:
+    """Memory accounting: {"bytes", "max_bytes", "orgs": [{org_id, docs, bytes}]}, most recently used last."""
+    with _lock:
+        orgs = [{"org_id": o, "docs": len(s), "bytes": s.nbytes} for o, s in _snapshots.items()]
+    return {
+        "bytes": sum(o["bytes"] for o in orgs),
+        "max_bytes": get_settings().analytics_snapshot_max_bytes,
+        "orgs": orgs,
+    }
+
+
+def _counts(aggs: dict[str, Any]) -> tuple[dict[str, int], dict[str, int], int]:
+    """(per-area counts, per-segment counts, distinct customers) of an ES-shaped _VERIFY_AGGS result."""
+    return (
+        {b["key"]: b["doc_count"] for b in aggs.get("by_area", {}).get("buckets", [])},
+        {b["key"]: b["doc_count"] for b in aggs.get("by_segment", {}).get("buckets", [])},
+        aggs.get("customers", {}).get("value"),
+    )
+
+
+# ES cardinality is near-exact up to this many distinct values (its maximum precision_threshold)
+_CARDINALITY_PRECISION = 40000
+# Covers the fields ingest and customer sync write
+_VERIFY_AGGS = {
+    "by_area": {"terms": {"field": "product_area", "size": 1000}},
+    "by_segment": {"terms": {"field": "customer_segment", "size": 1000}},
+    "customers": {"cardinality": {"field": "customer_id", "precision_threshold": _CARDINALITY_PRECISION}},
+}
+
+
+def verify_feedback_snapshot(org_id: str) -> bool | None:
+    """
+    Compare the snapshot's doc count, per-area and per-segment counts and
+    distinct customers with ES and drop it on a mismatch (it is rebuilt once
+    the org is hot again). None if the org has no snapshot.
+    """
+    snapshot = _snapshots.get(org_id)
+    if snapshot is None:
+        return None
+    resp = get_es_client().search(
+        index=feedback_index(org_id),
+        query={"term": {"org_id": org_id}},
+        size=0,
+        track_total_hits=True,
+        aggs=_VERIFY_AGGS,
+    )
+    expected = (resp["hits"]["total"]["value"], *_counts(resp.get("aggregations", {})))
+    actual = (len(snapshot), *_counts(snapshot.aggregate(_VERIFY_AGGS)))
+    if actual[3] > _CARDINALITY_PRECISION:
+        expected, actual = expected[:3], actual[:3]
+    if actual == expected:
+        return True
+    logger.warning(
+        "Analytics snapshot for org %s drifted from ES (%d vs %d docs); dropping it",
+        org_id[:8], actual[0], expected[0],
+    )
+    invalidate_feedback_snapshot(org_id)
+    return False
+
+
+def verify_all_snapshots() -> int:
+    """Run verify_feedback_snapshot for every loaded snapshot. Returns number dropped."""
+    dropped = 0
+    for org_id in list(_snapshots):
+        try:
+            dropped += verify_feedback_snapshot(org_id) is False
+        except Exception as e:
+            logger.warning("Analytics snapshot check failed for org %s: %s", org_id[:8], str(e))
+    return dropped
+
+
+async def run_snapshot_verify_loop(interval_seconds: float) -> None:
+    """Check all snapshots against ES every interval_seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(verify_all_snapshots)
+        except Exception as e:
+            logger.warning("Analytics snapshot check failed: %s", str(e))
@@ -0,0 +1,216 @@
+"""In-memory per-org customer matcher for feedback-to-customer linking."""
+
+import re
+import threading
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.customer import customers_index
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Legal-entity suffixes stripped from the end of company names before matching.
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "lp", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "ag", "sa", "sas", "sarl", "srl", "spa", "bv", "nv",
+    "oy", "ab", "as", "pty", "pte", "kk", "kg", "group", "holdings",
+}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_INITIALISM_DOT = re.compile(r"\b(\w)\.")
+_PREFIX_LEN = 3
+_MAX_FUZZY_CANDIDATES = 50
+
+
+def normalize_company_name(name: str | None) -> str:
+    """
+    Normalize a company name for matching.
+
+    Casefolds, strips accents and punctuation, drops a leading "the" and
+    trailing legal suffixes ("ACME, Inc." -> "acme"). Returns "" for empty input.
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = _INITIALISM_DOT.sub(r"\1", text.replace("&", " and "))
+    tokens = [t for t in _NON_ALNUM.split(text) if t]
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+class CustomerMatcher:
+    """
+    Normalized-name index over an org's customers.
+
+    Lookup order: exact normalized name, then a bounded fuzzy match over
+    candidates that share a token or token prefix with the query.
+    """
+
+    def __init__(self, customers: list[dict[str, Any]] | None = None, fuzzy_threshold: float = 0.88) -> None:
+        self.fuzzy_threshold = fuzzy_threshold
+        self._by_id: dict[str, dict[str, Any]] = {}
+        self._by_name: dict[str, dict[str, Any]] = {}
+        self._token_index: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        for c in customers or []:
+            self.add(c)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @staticmethod
+    def _index_keys(norm: str) -> set[str]:
+        keys: set[str] = set()
+        for token in norm.split():
+            keys.add(token)
+            if len(token) > _PREFIX_LEN:
+                keys.add(token[:_PREFIX_LEN] + "*")
+        return keys
+
+    def _remove_name(self, norm: str, customer_id: str) -> None:
+        entry = self._by_name.get(norm)
+        if not entry or entry["id"] != customer_id:
+            return
+        del self._by_name[norm]
+        for key in self._index_keys(norm):
+            names = self._token_index.get(key)
+            if names:
+                names.discard(norm)
+                if not names:
+                    del self._token_index[key]
+
+    def add(self, customer: dict[str, Any]) -> None:
+        """Add or replace a customer. Renames drop the old name mapping."""
+        cid = customer.get("id")
+        if not cid:
+            return
+        entry = {
+            "id": cid,
+            "company_name": customer.get("company_name"),
+            "segment": customer.get("segment"),
+        }
+        norm = normalize_company_name(entry["company_name"])
+        with self._lock:
+            old = self._by_id.get(cid)
+            if old:
+                self._remove_name(normalize_company_name(old.get("company_name")), cid)
+            self._by_id[cid] = entry
+            if not norm or norm in self._by_name:
+                return
+            self._by_name[norm] = entry
+            for key in self._index_keys(norm):
+                self._token_index.setdefault(key, set()).add(norm)
+
+    def get_by_id(self, customer_id: str | None) -> dict[str, Any] | None:
+        """Return customer entry by ID, or None."""
+        if not customer_id:
+            return None
+        return self._by_id.get(customer_id)
+
+    def match(self, name: str | None) -> dict[str, Any] | None:
+        """Return best customer entry for a free-form company name, or None."""
+        norm = normalize_company_name(name)
+        if not norm:
+            return None
+        entry = self._by_name.get(norm)
+        if entry:
+            return entry
+        return self._fuzzy_match(norm)
+
+    def _fuzzy_match(self, norm: str) -> dict[str, Any] | None:
+        shared: dict[str, int] = {}
+        for key in self._index_keys(norm):
+            for cand in self._token_index.get(key, ()):
+                shared[cand] = shared.get(cand, 0) + 1
+        if not shared:
+            return None
+        candidates = sorted(shared, key=lambda c: (-shared[c], c))[:_MAX_FUZZY_CANDIDATES]
+
+        best: str | None = None
+        best_ratio = self.fuzzy_threshold
+        sm = SequenceMatcher(autojunk=False)
+        sm.set_seq2(norm)
+        for cand in candidates:
+            sm.set_seq1(cand)
+            if sm.real_quick_ratio() < best_ratio or sm.quick_ratio() < best_ratio:
+                continue
+            ratio = sm.ratio()
+            if ratio >= best_ratio and (best is None or ratio > best_ratio):
+                best, best_ratio = cand, ratio
+        return self._by_name.get(best) if best else None
+
+
+_matchers: dict[str, tuple[CustomerMatcher, float]] = {}
+_matchers_lock = threading.Lock()
+
+
+def _load_customers(org_id: str) -> list[dict[str, Any]]:
+    """Scan all customers of an org (id, company_name, segment)."""
+    from elasticsearch.helpers import scan
+
+    es = get_es_client()
+    idx = customers_index(org_id)
+    if not es.indices.exists(index=idx):
+        return []
+    return [
+        h["_source"]
+        for h in scan(
+            es,
+            index=idx,
+            query={"query": {"term": {"org_id": org_id}}},
+            _source=["id", "company_name", "segment"],
+            size=1000,
+        )
+    ]
+
+
+def get_customer_matcher(org_id: str) -> CustomerMatcher:
+    """Return the org's matcher, building it from the customers index when missing or expired."""
+    settings = get_settings()
+    now = time.monotonic()
+    cached = _matchers.get(org_id)
+    if cached and now - cached[1] < settings.customer_matcher_ttl_seconds:
+        return cached[0]
+
+    with _matchers_lock:
+        cached = _matchers.get(org_id)
+        if cached and now - cached[1] < settings.customer_matcher_ttl_seconds:
+            return cached[0]
+        try:
+            customers = _load_customers(org_id)
+        except Exception as e:
+            logger.warning("Customer matcher build failed for org %s: %s", org_id[:8], str(e))
+            if cached:
+                return cached[0]
+            customers = []
+        matcher = CustomerMatcher(customers, fuzzy_threshold=settings.customer_matcher_fuzzy_threshold)
+        _matchers[org_id] = (matcher, time.monotonic())
+        logger.info("Built customer matcher for org %s (%d customers)", org_id[:8], len(matcher))
+        return matcher
+
+
+def refresh_customer_matcher(org_id: str, customers: list[dict[str, Any]]) -> None:
+    """Apply customer writes to a loaded matcher. No-op if the org has none cached."""
+    cached = _matchers.get(org_id)
+    if not cached:
+        return
+    for c in customers:
+        cached[0].add(c)
+
+
+def invalidate_customer_matcher(org_id: str | None = None) -> None:
+    """Drop the cached matcher for one org, or all orgs."""
+    with _matchers_lock:
+        if org_id is None:
+            _matchers.clear()
+        else:
+            _matchers.pop(org_id, None)
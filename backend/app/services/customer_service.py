@@ -7,12 +7,15 @@ from typing import Any
 from app.es_client import get_es_client
 from app.models.customer import CUSTOMERS_MAPPING, customers_index
 from app.models.feedback import FEEDBACK_MAPPING, feedback_index
+from app.services.customer_matching_service import refresh_customer_matcher
 from app.services.es_service import (
     bulk_index_documents,
     ensure_index_exists,
     get_document,
     index_document,
+    read_total,
     search_documents,
+    track_total_hits,
 )
 from app.utils.logging import get_logger
 
@@ -46,6 +49,7 @@ def create_customer(org_id: str, data: dict[str, Any]) -> dict[str, Any]:
     }
     doc = {k: v for k, v in doc.items() if v is not None}
     index_document(idx, customer_id, doc)
+    refresh_customer_matcher(org_id, [doc])
     logger.info("Created customer %s for org %s", customer_id[:8], org_id[:8])
     return doc
 
@@ -90,6 +94,7 @@ def create_customers_bulk(
         return (0, len(customers), [])
 
     success, failed = bulk_index_documents(idx, docs)
+    refresh_customer_matcher(org_id, docs)
     created_ids = [d["id"] for d in docs]
     return (success, failed + (len(customers) - len(docs)), created_ids)
 
@@ -123,6 +128,25 @@ def get_customer(org_id: str, customer_id: str) -> dict[str, Any] | None:
     return doc
 
 
+def update_customer(org_id: str, customer_id: str, updates: dict[str, Any]) -> dict[str, Any] | None:
+    """Update customer fields. Returns updated doc or None if not found or wrong org."""
+    doc = get_customer(org_id, customer_id)
+    if not doc:
+        return None
+    allowed = {
+        "company_name", "customer_id_external", "segment", "plan", "mrr", "arr",
+        "account_manager", "renewal_date", "health_score", "industry", "employee_count",
+    }
+    for k, v in updates.items():
+        if k in allowed and v is not None:
+            doc[k] = v
+    doc["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    index_document(customers_index(org_id), customer_id, doc)
+    refresh_customer_matcher(org_id, [doc])
+    logger.info("Updated customer %s for org %s", customer_id[:8], org_id[:8])
+    return doc
+
+
 def get_customer_by_external_id(org_id: str, external_id: str) -> dict[str, Any] | None:
     """Find customer by customer_id_external."""
     idx = customers_index(org_id)
@@ -134,29 +158,6 @@ def get_customer_by_external_id(org_id: str, external_id: str) -> dict[str, Any]
     return hits[0] if hits else None
 
 
-def get_customer_by_company_name(org_id: str, company_name: str) -> dict[str, Any] | None:
-    """Find customer by company name (exact match on keyword field)."""
-    if not company_name or not str(company_name).strip():
-        return None
-    idx = customers_index(org_id)
-    name = str(company_name).strip()
-    hits = search_documents(
-        idx,
-        {
-            "bool": {
-                "must": [
-                    {"term": {"org_id": org_id}},
-                    {"term": {"company_name.keyword": name}},
-                ]
-            }
-        },
-        size=1,
-    )
-    if hits:
-        return hits[0]
-    return None
-
-
 def _get_customers_with_negative_feedback(org_id: str) -> list[str]:
     """Return list of customer_ids that have at least one negative feedback."""
     f_idx = feedback_index(org_id)
@@ -225,8 +226,10 @@ def get_customers(
     page: int = 1,
     page_size: int = 20,
     filters: dict[str, Any] | None = None,
-) -> tuple[list[dict[str, Any]], int]:
-    """Get paginated customers. Returns (items, total_count).
+    exact_total: bool = False,
+) -> tuple[list[dict[str, Any]], int, bool]:
+    """Get paginated customers. Returns (items, total_count, total_is_lower_bound);
+    totals are counted up to list_track_total_hits unless exact_total.
     Extended filters: search, renewal_within_days, arr_min, arr_max,
     has_negative_feedback, include_feedback_stats.
     """
@@ -298,11 +301,10 @@ def get_customers(
         from_=(page - 1) * page_size,
         size=page_size,
         sort=[{sort_field: {"order": sort_order}}],
+        track_total_hits=track_total_hits(exact_total),
     )
-    hits = resp.get("hits", {})
-    total = hits.get("total", {})
-    total_val = total.get("value", 0) if isinstance(total, dict) else total
-    items = [h["_source"] for h in hits.get("hits", [])]
+    total_val, lower_bound = read_total(resp)
+    items = [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
 
     if filters.get("include_feedback_stats") and items:
         stats = _get_feedback_stats_by_customer(org_id)
@@ -312,7 +314,7 @@ def get_customers(
             c["feedback_count"] = s.get("feedback_count", 0)
             c["negative_feedback_count"] = s.get("negative_feedback_count", 0)
 
-    return (items, total_val)
+    return (items, total_val, lower_bound)
 
 
 def get_customer_feedback(
@@ -321,8 +323,12 @@ def get_customer_feedback(
     page: int = 1,
     page_size: int = 20,
     filters: dict[str, Any] | None = None,
-) -> tuple[list[dict[str, Any]], int]:
-    """Get paginated feedback for a customer. Reuses search logic with customer_id filter."""
+    exact_total: bool = False,
+) -> tuple[list[dict[str, Any]], int, bool]:
+    """
+    Get paginated feedback for a customer. Reuses search logic with customer_id
+    filter. Returns (items, total, total_is_lower_bound).
+    """
     from app.services.search_service import search_feedback
 
     filters = dict(filters or {})
@@ -334,6 +340,7 @@ def get_customer_feedback(
         sort_by="date",
         page=page,
         page_size=page_size,
+        exact_total=exact_total,
     )
 
 
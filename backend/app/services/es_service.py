@@ -2,7 +2,16 @@
 
 from typing import Any
 
+from elasticsearch import BadRequestError
+
+from app.config import get_settings
 from app.es_client import get_es_client
+from app.models.index_migration import INDEX_MIGRATIONS_INDEX, INDEX_MIGRATIONS_MAPPING
+from app.models.llm_cache import LLM_CACHE_INDEX, LLM_CACHE_MAPPING
+from app.models.sync_job import (
+    FEEDBACK_SYNC_JOBS_INDEX,
+    FEEDBACK_SYNC_JOBS_MAPPING,
+)
 from app.models.upload import (
     UPLOAD_HISTORY_INDEX,
     UPLOAD_HISTORY_MAPPING,
@@ -18,19 +27,147 @@ from app.utils.logging import get_logger
 logger = get_logger(__name__)
 
 
+# Per-org data types; {org_id}-{type} is an index, or a filtered alias in shared mode.
+# Longest first so "conversation-messages" is not read as "messages".
+TENANT_INDEX_TYPES = (
+    "conversation-messages",
+    "product-context",
+    "conversations",
+    "customers",
+    "feedback",
+    "specs",
+)
+
+
+# Indices known to exist in this process (ensure_index_exists skips them)
+_known_indices: set[str] = set()
+
+
+def shared_tenancy() -> bool:
+    """True when per-org data lives in shared indices (INDEX_TENANCY=shared)."""
+    return get_settings().index_tenancy == "shared"
+
+
+def shared_index(data_type: str) -> str:
+    """Return the shared index name for a data type, e.g. shared-feedback."""
+    return f"{get_settings().shared_index_prefix}-{data_type}"
+
+
+def split_tenant_index(index_name: str) -> tuple[str, str] | None:
+    """Split '{org_id}-{type}' into (org_id, type). None for non-tenant indices."""
+    for data_type in TENANT_INDEX_TYPES:
+        suffix = f"-{data_type}"
+        if index_name.endswith(suffix) and len(index_name) > len(suffix):
+            return index_name[: -len(suffix)], data_type
+    return None
+
+
+def tenant_doc_id(org_id: str, doc_id: str) -> str:
+    """
+    Document id for ids that are only unique within an org (e.g. wizard section
+    names). Shared indices hold every org, so the id is prefixed with org_id.
+    """
+    return f"{org_id}:{doc_id}" if shared_tenancy() else doc_id
+
+
+def tenant_alias_body(org_id: str) -> dict[str, Any]:
+    """Filter and routing of an org's alias over a shared index."""
+    return {"filter": {"term": {"org_id": org_id}}, "routing": org_id}
+
+
+def resolve_index(name: str) -> dict[str, Any] | None:
+    """
+    Resolve an index name or alias. Returns {"indices": [concrete names],
+    "alias": bool, "filtered": bool}, or None if nothing has that name.
+    """
+    es = get_es_client()
+    if not es.indices.exists(index=name):
+        return None
+    if not es.indices.exists_alias(name=name):
+        return {"indices": [name], "alias": False, "filtered": False}
+    resp = es.indices.get_alias(name=name)
+    filtered = any(
+        "filter" in body.get("aliases", {}).get(name, {}) or "index_routing" in body.get("aliases", {}).get(name, {})
+        for body in resp.values()
+    )
+    return {"indices": sorted(resp), "alias": True, "filtered": filtered}
+
+
+def ensure_shared_index(data_type: str, mappings: dict[str, Any]) -> str:
+    """Create the shared index for a data type if missing. Returns its name."""
+    es = get_es_client()
+    name = shared_index(data_type)
+    if es.indices.exists(index=name):
+        return name
+    body = {
+        **mappings,
+        "settings": {**mappings.get("settings", {}), "number_of_shards": get_settings().shared_index_shards},
+        "mappings": {**mappings.get("mappings", {}), "_routing": {"required": True}},
+    }
+    try:
+        es.indices.create(index=name, body=body)
+        logger.info("Created shared index: %s", name)
+    except BadRequestError as e:
+        if e.error != "resource_already_exists_exception":
+            raise
+    return name
+
+
 def ensure_index_exists(index_name: str, mappings: dict[str, Any]) -> None:
-    """Create index if it does not exist."""
+    """
+    Create index if it does not exist.
+
+    Indices seen by this process are remembered, so repeat calls cost no round
+    trip. Per-org indices covered by the index templates are created without a
+    body (the template supplies settings and the versioned mapping). In shared
+    tenancy, per-org names are created as filtered, routed aliases over the
+    shared index for their data type; orgs not yet migrated keep their
+    existing per-org index. With monthly feedback partitions, {org}-feedback
+    is the read alias created with the current month's partition.
+    """
+    if index_name in _known_indices:
+        return
     es = get_es_client()
-    if not es.indices.exists(index=index_name):
-        es.indices.create(index=index_name, body=mappings)
-        logger.info("Created index: %s", index_name)
+    if es.indices.exists(index=index_name):
+        _known_indices.add(index_name)
+        return
+    _create_index(es, index_name, mappings)
+    _known_indices.add(index_name)
+
+
+def _create_index(es: Any, index_name: str, mappings: dict[str, Any]) -> None:
+    tenant = split_tenant_index(index_name)
+    if tenant and tenant[1] == "feedback":
+        from app.services.feedback_partition_service import ensure_partition, partition_month, partitioning_enabled
+
+        if partitioning_enabled():
+            ensure_partition(tenant[0], partition_month(None), mappings)
+            return
+    if tenant and shared_tenancy():
+        org_id, data_type = tenant
+        shared = ensure_shared_index(data_type, mappings)
+        es.indices.put_alias(index=shared, name=index_name, **tenant_alias_body(org_id))
+        logger.info("Created alias %s -> %s", index_name, shared)
+        return
+    if tenant:
+        from app.services.index_template_service import templates_installed
+
+        if templates_installed():
+            es.indices.create(index=index_name)
+            logger.info("Created index from template: %s", index_name)
+            return
+    es.indices.create(index=index_name, body=mappings)
+    logger.info("Created index: %s", index_name)
 
 
 def setup_initial_indexes() -> None:
-    """Create users, organizations, and upload-history indexes on startup."""
+    """Create users, organizations, upload-history, sync-job, LLM cache and migration indexes on startup."""
     ensure_index_exists(USERS_INDEX, USERS_MAPPING)
     ensure_index_exists(ORGANIZATIONS_INDEX, ORGANIZATIONS_MAPPING)
     ensure_index_exists(UPLOAD_HISTORY_INDEX, UPLOAD_HISTORY_MAPPING)
+    ensure_index_exists(FEEDBACK_SYNC_JOBS_INDEX, FEEDBACK_SYNC_JOBS_MAPPING)
+    ensure_index_exists(LLM_CACHE_INDEX, LLM_CACHE_MAPPING)
+    ensure_index_exists(INDEX_MIGRATIONS_INDEX, INDEX_MIGRATIONS_MAPPING)
 
 
 def index_document(index: str, doc_id: str, body: dict[str, Any]) -> None:
@@ -58,11 +195,17 @@ def get_document(index: str, doc_id: str) -> dict[str, Any] | None:
 
 
 def search_documents(
-    index: str, query: dict[str, Any], size: int = 20
+    index: str,
+    query: dict[str, Any],
+    size: int = 20,
+    sort: list[dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
-    """Run search and return list of _source documents."""
+    """Run search and return list of _source documents (in sort order if given)."""
     es = get_es_client()
-    resp = es.search(index=index, query=query, size=size)
+    if sort:
+        resp = es.search(index=index, query=query, size=size, sort=sort)
+    else:
+        resp = es.search(index=index, query=query, size=size)
     hits = resp.get("hits", {}).get("hits", [])
     return [h["_source"] for h in hits]
 
@@ -75,6 +218,35 @@ def search_document_ids(index: str, query: dict[str, Any], size: int = 10000) ->
     return [h["_id"] for h in hits]
 
 
+def scan_document_ids(index: str, query: dict[str, Any], page_size: int = 10000) -> list[str]:
+    """IDs of every matching document (no 10k cap), paged with a point in time and search_after."""
+    es = get_es_client()
+    ids: list[str] = []
+    pit_id = es.open_point_in_time(index=index, keep_alive="2m")["id"]
+    try:
+        search_after = None
+        while True:
+            resp = es.search(
+                pit={"id": pit_id, "keep_alive": "2m"},
+                query=query,
+                sort=[{"_shard_doc": "asc"}],
+                size=page_size,
+                _source=False,
+                search_after=search_after,
+            )
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp.get("hits", {}).get("hits", [])
+            ids.extend(h["_id"] for h in hits)
+            if len(hits) < page_size:
+                return ids
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.debug("Closing PIT failed: %s", str(e))
+
+
 def delete_document(index: str, doc_id: str) -> bool:
     """Delete a document by ID. Returns True if deleted."""
     es = get_es_client()
@@ -85,11 +257,35 @@ def delete_document(index: str, doc_id: str) -> bool:
         return False
 
 
+def parse_slices(value: str | int | None) -> str | int:
+    """Return 'auto' or a positive slice count for update_by_query and reindex."""
+    if value is None or str(value).strip().lower() in ("", "auto"):
+        return "auto"
+    try:
+        return max(1, int(value))
+    except (ValueError, TypeError):
+        return "auto"
+
+
+def track_total_hits(exact: bool = False) -> bool | int:
+    """track_total_hits for a list query: True for exact totals, else the configured bound."""
+    return True if exact else get_settings().list_track_total_hits
+
+
+def read_total(resp: dict[str, Any]) -> tuple[int, bool]:
+    """(hits.total value, True if it is a lower bound because counting stopped)."""
+    total = resp.get("hits", {}).get("total", {})
+    if isinstance(total, dict):
+        return total.get("value", 0), total.get("relation") == "gte"
+    return total or 0, False
+
+
 def bulk_index_documents(
     index: str,
     documents: list[dict[str, Any]],
     id_field: str = "id",
     batch_size: int = 500,
+    failed_ids: list[str] | None = None,
 ) -> tuple[int, int]:
     """
     Index documents via ES Bulk API in batches.
@@ -99,6 +295,7 @@ def bulk_index_documents(
         documents: List of documents to index. Each must have id_field.
         id_field: Field name containing document ID.
         batch_size: Max documents per bulk request.
+        failed_ids: If given, IDs of documents that were not indexed are appended.
 
     Returns:
         Tuple of (success_count, failed_count).
@@ -130,17 +327,25 @@ def bulk_index_documents(
                 actions,
                 raise_on_error=False,
                 raise_on_exception=False,
-                stats_only=True,
+                stats_only=failed_ids is None,
             )
             success_count += ok
-            failed_count += failed
+            if isinstance(failed, list):
+                failed_count += len(failed)
+                failed_ids.extend(str(next(iter(err.values())).get("_id")) for err in failed)
+            else:
+                failed_count += failed
         except BulkIndexError as e:
             success_count += e.successful
             failed_count += len(e.errors)
             for err in e.errors:
                 logger.warning("Bulk index error: %s", err)
+            if failed_ids is not None:
+                failed_ids.extend(str(next(iter(err.values())).get("_id")) for err in e.errors)
         except Exception as e:
             failed_count += len(actions)
             logger.error("Bulk index failed: %s", str(e))
+            if failed_ids is not None:
+                failed_ids.extend(a["_id"] for a in actions)
 
     return (success_count, failed_count)
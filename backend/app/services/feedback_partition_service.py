@@ -0,0 +1,272 @@
+"""Monthly feedback partitions — {org}-feedback-YYYY.MM indices behind the {org}-feedback alias."""
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from elasticsearch import BadRequestError
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.feedback import FEEDBACK_INDEX_SORT, feedback_index, feedback_partition_index
+from app.services.es_service import resolve_index
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+FEEDBACK_ILM_POLICY = "feedback-partitions"
+
+# Partitions created or seen by this process; avoids an exists call per write
+_known_partitions: set[str] = set()
+# Orgs whose feedback is split into partitions, and orgs still on one index
+# (with the time that was seen; rechecked, since another process may split them)
+_split_orgs: set[str] = set()
+_unsplit_orgs: dict[str, float] = {}
+_UNSPLIT_RECHECK_SECONDS = 60.0
+_lock = threading.Lock()
+_PARTITION_NAME = re.compile(r"-\d{4}\.\d{2}")
+
+
+def partitioning_enabled() -> bool:
+    """True when feedback is split into monthly partitions (not with shared tenancy)."""
+    settings = get_settings()
+    return settings.feedback_partitioning == "monthly" and settings.index_tenancy != "shared"
+
+
+def _unsplit(resolved: dict[str, Any]) -> bool:
+    """True if a resolved {org}-feedback is one unpartitioned index (or a versioned copy behind the alias)."""
+    return not resolved["filtered"] and len(resolved["indices"]) == 1 and not _PARTITION_NAME.search(resolved["indices"][0])
+
+
+def org_partitioned(org_id: str) -> bool:
+    """
+    True if the org's feedback is read and written through monthly partitions:
+    partitioning is on and {org}-feedback is missing (a new org) or already
+    split. An org that still has a single feedback index keeps writing to it
+    until partition_existing_feedback splits it.
+    """
+    if not partitioning_enabled():
+        return False
+    if org_id in _split_orgs:
+        return True
+    seen = _unsplit_orgs.get(org_id)
+    if seen is not None and time.monotonic() - seen < _UNSPLIT_RECHECK_SECONDS:
+        return False
+    resolved = resolve_index(feedback_index(org_id))
+    unsplit = bool(resolved) and _unsplit(resolved)
+    with _lock:
+        if unsplit:
+            _unsplit_orgs[org_id] = time.monotonic()
+        else:
+            _split_orgs.add(org_id)
+            _unsplit_orgs.pop(org_id, None)
+    return not unsplit
+
+
+def _parse_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def partition_month(created_at: str | None) -> str:
+    """Partition (YYYY.MM) a feedback doc belongs to; unparseable dates go to this month."""
+    dt = _parse_date(created_at) or datetime.now(timezone.utc)
+    return dt.strftime("%Y.%m")
+
+
+def _months(from_dt: datetime, to_dt: datetime) -> list[str]:
+    months = []
+    year, month = from_dt.year, from_dt.month
+    while (year, month) <= (to_dt.year, to_dt.month):
+        months.append(f"{year:04d}.{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _month_end_millis(month: str) -> int:
+    """Epoch millis of the first instant after the month; ILM ages partitions from here."""
+    year, mon = (int(p) for p in month.split("."))
+    year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return int(datetime(year, mon, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def feedback_ilm_policy() -> dict[str, Any]:
+    """
+    Lifecycle for monthly partitions: once a month has been over for
+    feedback_partition_warm_after_days, force-merge to one segment and shrink
+    to one shard. Partitions stay writable (customer sync, historical
+    imports), so shrink lifts its write block afterwards (ES 8.14+).
+    """
+    return {
+        "phases": {
+            "hot": {"min_age": "0ms", "actions": {"set_priority": {"priority": 100}}},
+            "warm": {
+                "min_age": f"{get_settings().feedback_partition_warm_after_days}d",
+                "actions": {
+                    "shrink": {"number_of_shards": 1, "allow_write_after_shrink": True},
+                    "forcemerge": {"max_num_segments": 1},
+                    "set_priority": {"priority": 50},
+                },
+            },
+        }
+    }
+
+
+def ensure_feedback_ilm_policy() -> None:
+    """Create or update the feedback partition ILM policy."""
+    get_es_client().ilm.put_lifecycle(name=FEEDBACK_ILM_POLICY, policy=feedback_ilm_policy())
+    logger.info("ILM policy ready: %s", FEEDBACK_ILM_POLICY)
+
+
+def ensure_partition(org_id: str, month: str, mappings: dict[str, Any]) -> str:
+    """
+    Create the org's partition for month (YYYY.MM) if missing, attached to the
+    {org}-feedback read alias and the ILM policy. Returns the partition name.
+    """
+    name = feedback_partition_index(org_id, month)
+    if name in _known_partitions:
+        return name
+    es = get_es_client()
+    if not es.indices.exists(index=name):
+        body = {
+            **mappings,
+            "settings": {
+                **mappings.get("settings", {}),
+                "index.lifecycle.name": FEEDBACK_ILM_POLICY,
+                "index.lifecycle.origination_date": _month_end_millis(month),
+            },
+            "aliases": {feedback_index(org_id): {}},
+        }
+        try:
+            es.indices.create(index=name, body=body)
+            logger.info("Created feedback partition: %s", name)
+        except BadRequestError as e:
+            if e.error != "resource_already_exists_exception":
+                raise
+    with _lock:
+        _known_partitions.add(name)
+    return name
+
+
+def feedback_doc_index(org_id: str, doc: dict[str, Any]) -> str:
+    """Concrete index (or partition) holding a feedback doc, for APIs that need one."""
+    if not org_partitioned(org_id):
+        return feedback_index(org_id)
+    return feedback_partition_index(org_id, partition_month(doc.get("created_at")))
+
+
+def group_by_partition(docs: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    """Group feedback docs by the month of their created_at."""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for doc in docs:
+        groups.setdefault(partition_month(doc.get("created_at")), []).append(doc)
+    return groups
+
+
+def feedback_search_index(org_id: str, from_date: str | None = None, to_date: str | None = None) -> str:
+    """
+    Index expression for feedback searches over [from_date, to_date].
+
+    With monthly partitions and a from_date this is one wildcard per
+    overlapping month (matching shrunk partitions too; months with no
+    partition match nothing). Otherwise, including orgs not split yet, it is
+    the {org}-feedback index or alias.
+    """
+    start = _parse_date(from_date)
+    if not start or not org_partitioned(org_id):
+        return feedback_index(org_id)
+    end = _parse_date(to_date) or datetime.now(timezone.utc)
+    if end < start:
+        end = start
+    return ",".join(f"{feedback_partition_index(org_id, m)}*" for m in _months(start, end))
+
+
+# Target partition from created_at ("2026-01-05..." -> prefix + "2026.01")
+_PARTITION_SCRIPT = (
+    "def c = ctx._source.created_at;"
+    " def m = (c instanceof String && c.length() >= 7) ? c.substring(0, 7).replace('-', '.') : params.fallback;"
+    " ctx._index = params.prefix + m;"
+)
+
+
+def partition_existing_feedback(org_id: str, dry_run: bool = False) -> dict[str, Any]:
+    """
+    Split an org's single {org}-feedback index (or the versioned index a
+    mapping migration put behind that name) into monthly partitions.
+
+    Creates a partition per month with feedback, reindexes each doc into the
+    month of its created_at, verifies the count, then swaps the old index for
+    the read alias in one atomic update_aliases call. Writes during the copy
+    are not carried over, so run it while the org is idle. Returns
+    {"index", "status", "docs", "partitions"}.
+    """
+    es = get_es_client()
+    alias = feedback_index(org_id)
+    result: dict[str, Any] = {"index": alias, "docs": 0, "partitions": []}
+    resolved = resolve_index(alias)
+    if not resolved:
+        return {**result, "status": "missing"}
+    if not _unsplit(resolved):
+        return {**result, "status": "already_partitioned"}
+    # The alias itself, or the versioned index a mapping migration put behind it
+    src = resolved["indices"][0]
+
+    resp = es.search(
+        index=src,
+        size=0,
+        aggs={"months": {"date_histogram": {"field": "created_at", "calendar_interval": "month", "min_doc_count": 1}}},
+    )
+    months = sorted({
+        partition_month(b["key_as_string"]) for b in resp.get("aggregations", {}).get("months", {}).get("buckets", [])
+    })
+    fallback = partition_month(None)
+    docs = es.count(index=src)["count"]
+    if docs and fallback not in months:
+        # Docs without created_at land in the current month
+        months.append(fallback)
+    result.update({"docs": docs, "partitions": [feedback_partition_index(org_id, m) for m in months]})
+    if dry_run:
+        return {**result, "status": "would_partition"}
+
+    mapping = es.indices.get_mapping(index=src)[src]["mappings"]
+    for month in months:
+        name = feedback_partition_index(org_id, month)
+        if not es.indices.exists(index=name):
+            es.indices.create(index=name, body={
+                "mappings": mapping,
+                "settings": {
+                    **FEEDBACK_INDEX_SORT,
+                    "index.lifecycle.name": FEEDBACK_ILM_POLICY,
+                    "index.lifecycle.origination_date": _month_end_millis(month),
+                },
+            })
+    if docs:
+        es.reindex(
+            source={"index": src},
+            dest={"index": feedback_partition_index(org_id, fallback)},
+            script={"source": _PARTITION_SCRIPT, "params": {"prefix": f"{alias}-", "fallback": fallback}},
+            refresh=True,
+            wait_for_completion=True,
+        )
+    copied = es.count(index=",".join(result["partitions"]))["count"]
+    if copied < docs:
+        logger.warning("Partitioning %s copied %d of %d docs; index left in place", src, copied, docs)
+        return {**result, "status": "count_mismatch", "copied": copied}
+
+    es.indices.update_aliases(actions=[
+        {"add": {"indices": result["partitions"], "alias": alias}},
+        {"remove_index": {"index": src}},
+    ])
+    with _lock:
+        _known_partitions.update(result["partitions"])
+        _split_orgs.add(org_id)
+        _unsplit_orgs.pop(org_id, None)
+    logger.info("Partitioned %s (%d docs) into %d months", alias, docs, len(months))
+    return {**result, "status": "partitioned"}
@@ -4,22 +4,31 @@ import uuid
 from datetime import datetime
 from typing import Any
 
+from app.config import get_settings
 from app.es_client import get_es_client
 from app.models.feedback import (
     FEEDBACK_MAPPING,
-    FEEDBACK_MAPPING_WITH_ELSER,
     feedback_index,
+    feedback_mapping,
 )
-from app.services.customer_service import (
-    get_customer_by_company_name,
-    get_customer_by_external_id,
-)
+from app.services.analytics_snapshot_service import refresh_feedback_snapshot
+from app.services.customer_matching_service import CustomerMatcher, get_customer_matcher
+from app.services.customer_service import get_customer
 from app.services.elser_service import ensure_elser_deployed, is_elser_available
 from app.services.es_service import (
     bulk_index_documents,
     ensure_index_exists,
     get_document,
     index_document,
+    read_total,
+    search_documents,
+    track_total_hits,
+)
+from app.services.feedback_partition_service import (
+    ensure_partition,
+    group_by_partition,
+    org_partitioned,
+    partition_month,
 )
 from app.services.sentiment_service import analyze_sentiment
 from app.utils.logging import get_logger
@@ -27,29 +36,62 @@ from app.utils.logging import get_logger
 logger = get_logger(__name__)
 
 
+def _feedback_mapping() -> dict[str, Any]:
+    return feedback_mapping(is_elser_available(), get_settings().feedback_mapping_profile)
+
+
 def _ensure_feedback_index(org_id: str) -> str:
-    """Ensure feedback index exists. Returns index name."""
+    """Ensure feedback index (or partition alias) exists. Returns index name."""
     idx = feedback_index(org_id)
     ensure_elser_deployed(get_es_client())
-    mapping = FEEDBACK_MAPPING_WITH_ELSER if is_elser_available() else FEEDBACK_MAPPING
-    ensure_index_exists(idx, mapping)
+    ensure_index_exists(idx, _feedback_mapping())
     return idx
 
 
-def _resolve_customer(org_id: str, customer_id: str | None, customer_name: str | None) -> dict[str, Any]:
-    """Resolve customer for denormalization. Returns {customer_id, customer_name, customer_segment}."""
+def _index_feedback_docs(
+    org_id: str,
+    docs: list[dict[str, Any]],
+    failed_ids: list[str] | None = None,
+) -> tuple[int, int]:
+    """
+    Bulk index feedback docs. With monthly partitions each doc goes to the
+    partition of its created_at. Returns (success_count, failed_count);
+    IDs of docs that were not indexed are appended to failed_ids if given.
+    """
+    if not org_partitioned(org_id):
+        return bulk_index_documents(feedback_index(org_id), docs, failed_ids=failed_ids)
+    mapping = _feedback_mapping()
+    success, failed = 0, 0
+    for month, group in sorted(group_by_partition(docs).items()):
+        ok, bad = bulk_index_documents(ensure_partition(org_id, month, mapping), group, failed_ids=failed_ids)
+        success += ok
+        failed += bad
+    return success, failed
+
+
+def _resolve_customer(
+    org_id: str,
+    customer_id: str | None,
+    customer_name: str | None,
+    matcher: CustomerMatcher | None = None,
+) -> dict[str, Any]:
+    """
+    Resolve customer for denormalization. Returns {customer_id, customer_name, customer_segment}.
+
+    Uses the org's in-memory matcher (normalized + fuzzy name match). IDs not yet
+    in the matcher fall back to a direct lookup.
+    """
     result = {"customer_id": None, "customer_name": customer_name, "customer_segment": None}
+    matcher = matcher or get_customer_matcher(org_id)
     if customer_id:
-        from app.services.customer_service import get_customer
-
-        cust = get_customer(org_id, customer_id)
+        cust = matcher.get_by_id(customer_id) or get_customer(org_id, customer_id)
         if cust:
             result["customer_id"] = cust.get("id")
             result["customer_name"] = cust.get("company_name") or customer_name
             result["customer_segment"] = cust.get("segment")
         return result
     if customer_name:
-        cust = get_customer_by_company_name(org_id, customer_name)
+        cust = matcher.match(customer_name)
         if cust:
             result["customer_id"] = cust.get("id")
             result["customer_name"] = cust.get("company_name")
@@ -112,7 +154,10 @@ def create_feedback_item(
     if doc.get("tags") is not None and not isinstance(doc["tags"], list):
         doc["tags"] = [doc["tags"]]
 
+    if org_partitioned(org_id):
+        idx = ensure_partition(org_id, partition_month(created_at), _feedback_mapping())
     index_document(idx, feedback_id, doc)
+    refresh_feedback_snapshot(org_id, [doc])
     logger.info("Created feedback %s for org %s", feedback_id[:8], org_id[:8])
     return doc
 
@@ -130,11 +175,12 @@ def create_feedback_items_bulk(
 
     Each item can have customer_id or customer_name for resolution.
     """
-    idx = _ensure_feedback_index(org_id)
+    _ensure_feedback_index(org_id)
     now = datetime.utcnow().isoformat() + "Z"
     docs: list[dict[str, Any]] = []
     failed = 0
     include_semantic = is_elser_available()
+    matcher = get_customer_matcher(org_id)
 
     for item in items:
         text = (item.get("text") or "").strip()
@@ -152,6 +198,7 @@ def create_feedback_items_bulk(
             org_id,
             item.get("customer_id"),
             item.get("customer_name"),
+            matcher,
         )
 
         feedback_id = str(uuid.uuid4())
@@ -188,7 +235,10 @@ def create_feedback_items_bulk(
     if not docs:
         return (0, failed, [])
 
-    success, bulk_failed = bulk_index_documents(idx, docs)
+    rejected: list[str] = []
+    success, bulk_failed = _index_feedback_docs(org_id, docs, rejected)
+    rejected_ids = set(rejected)
+    refresh_feedback_snapshot(org_id, [d for d in docs if d["id"] not in rejected_ids])
     created_ids = [d["id"] for d in docs]
     return (success, failed + bulk_failed, created_ids)
 
@@ -196,7 +246,12 @@ def create_feedback_items_bulk(
 def get_feedback_item(org_id: str, item_id: str) -> dict[str, Any] | None:
     """Get single feedback item. Returns None if not found or wrong org."""
     idx = feedback_index(org_id)
-    doc = get_document(idx, item_id)
+    if org_partitioned(org_id):
+        # GET by id cannot target an alias over several partitions
+        hits = search_documents(idx, {"ids": {"values": [item_id]}}, size=1)
+        doc = hits[0] if hits else None
+    else:
+        doc = get_document(idx, item_id)
     if not doc or doc.get("org_id") != org_id:
         return None
     return doc
@@ -207,8 +262,12 @@ def get_feedback_items(
     page: int = 1,
     page_size: int = 20,
     filters: dict[str, Any] | None = None,
-) -> tuple[list[dict[str, Any]], int]:
-    """Get paginated feedback. Returns (items, total_count)."""
+    exact_total: bool = False,
+) -> tuple[list[dict[str, Any]], int, bool]:
+    """
+    Get paginated feedback. Returns (items, total_count, total_is_lower_bound);
+    totals are counted up to list_track_total_hits unless exact_total.
+    """
     idx = feedback_index(org_id)
     ensure_index_exists(idx, FEEDBACK_MAPPING)
 
@@ -232,15 +291,11 @@ def get_feedback_items(
         from_=(page - 1) * page_size,
         size=page_size,
         sort=[{sort_field: {"order": sort_order}}],
+        track_total_hits=track_total_hits(exact_total),
     )
-    hits = resp.get("hits", {})
-    total = hits.get("total", {})
-    if isinstance(total, dict):
-        total_val = total.get("value", 0)
-    else:
-        total_val = total
-    items = [h["_source"] for h in hits.get("hits", [])]
-    return (items, total_val)
+    total_val, lower_bound = read_total(resp)
+    items = [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
+    return (items, total_val, lower_bound)
 
 
 def get_feedback_count(org_id: str) -> int:
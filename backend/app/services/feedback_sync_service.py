@@ -0,0 +1,358 @@
+"""Feedback re-denormalization — refresh customer fields copied into feedback docs."""
+
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.customer import customers_index
+from app.models.feedback import feedback_index
+from app.models.sync_job import (
+    FEEDBACK_SYNC_JOBS_INDEX,
+    FEEDBACK_SYNC_JOBS_MAPPING,
+)
+from app.services.analytics_snapshot_service import (
+    hold_feedback_snapshot,
+    release_feedback_snapshot,
+)
+from app.services.customer_matching_service import get_customer_matcher
+from app.services.es_service import (
+    ensure_index_exists,
+    get_document,
+    index_document,
+    parse_slices,
+    search_documents,
+)
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_TASK_POLL_SECONDS = 5.0
+# Consecutive failed task lookups before the watcher gives up and fails the job (~1 minute)
+_MAX_TASK_LOOKUP_FAILURES = 12
+
+# Painless script run by update_by_query. Matches a feedback doc to a customer by
+# customer_id, or for feedback that was never linked by its raw customer_name
+# (resolved beforehand with the org's CustomerMatcher, as at ingest), and copies
+# the current id/name/segment. Unchanged docs are skipped with a noop.
+_SYNC_SCRIPT = """
+def c = null;
+if (ctx._source.customer_id != null) {
+  c = params.by_id[ctx._source.customer_id];
+}
+if (c == null && ctx._source.customer_id == null && ctx._source.customer_name != null) {
+  c = params.by_name[ctx._source.customer_name];
+}
+if (c == null) {
+  ctx.op = 'noop';
+  return;
+}
+if (ctx._source.customer_id == c.id
+    && ctx._source.customer_name == c.name
+    && ctx._source.customer_segment == c.segment) {
+  ctx.op = 'noop';
+  return;
+}
+ctx._source.customer_id = c.id;
+ctx._source.customer_name = c.name;
+if (c.segment != null) {
+  ctx._source.customer_segment = c.segment;
+} else {
+  ctx._source.remove('customer_segment');
+}
+"""
+
+
+def _load_customers(org_id: str, customer_ids: list[str]) -> list[dict[str, Any]]:
+    """Fetch current customer docs for the given IDs with a single mget."""
+    es = get_es_client()
+    resp = es.mget(
+        index=customers_index(org_id),
+        ids=customer_ids,
+        _source=["id", "org_id", "company_name", "segment"],
+    )
+    customers = []
+    for d in resp.get("docs", []):
+        src = d.get("_source") if d.get("found") else None
+        if src and src.get("org_id") == org_id:
+            customers.append(src)
+    return customers
+
+
+def _unlinked_names(org_id: str) -> list[str]:
+    """Distinct customer_name values on feedback without a customer_id (composite agg pages)."""
+    es = get_es_client()
+    names: list[str] = []
+    after: dict[str, Any] | None = None
+    while True:
+        composite: dict[str, Any] = {"size": 1000, "sources": [{"name": {"terms": {"field": "customer_name"}}}]}
+        if after:
+            composite["after"] = after
+        resp = es.search(
+            index=feedback_index(org_id),
+            query={"bool": {
+                "filter": [{"term": {"org_id": org_id}}, {"exists": {"field": "customer_name"}}],
+                "must_not": [{"exists": {"field": "customer_id"}}],
+            }},
+            size=0,
+            aggs={"names": {"composite": composite}},
+            ignore_unavailable=True,
+        )
+        agg = resp.get("aggregations", {}).get("names", {})
+        names.extend(b["key"]["name"] for b in agg.get("buckets", []))
+        after = agg.get("after_key")
+        if not after or not agg.get("buckets"):
+            return names
+
+
+def _build_sync_request(
+    org_id: str,
+    customers: list[dict[str, Any]],
+    unlinked_names: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Build query and script params for one update_by_query batch. Unlinked
+    names are resolved with the org's CustomerMatcher (normalized, then
+    fuzzy), so a batch customer claims the same raw names ingest would link.
+    """
+    by_id: dict[str, dict[str, Any]] = {}
+    by_name: dict[str, dict[str, Any]] = {}
+    for c in customers:
+        entry = {
+            "id": c.get("id"),
+            "name": c.get("company_name"),
+            "segment": c.get("segment"),
+        }
+        by_id[entry["id"]] = entry
+    if unlinked_names:
+        matcher = get_customer_matcher(org_id)
+        for c in customers:
+            matcher.add(c)
+        for name in unlinked_names:
+            match = matcher.match(name)
+            if match and match["id"] in by_id:
+                by_name[name] = by_id[match["id"]]
+
+    should: list[dict[str, Any]] = [{"terms": {"customer_id": list(by_id.keys())}}]
+    if by_name:
+        should.append({
+            "bool": {
+                "filter": [{"terms": {"customer_name": list(by_name.keys())}}],
+                "must_not": [{"exists": {"field": "customer_id"}}],
+            }
+        })
+    query = {
+        "bool": {
+            "filter": [{"term": {"org_id": org_id}}],
+            "should": should,
+            "minimum_should_match": 1,
+        }
+    }
+    script = {
+        "source": _SYNC_SCRIPT,
+        "lang": "painless",
+        "params": {"by_id": by_id, "by_name": by_name},
+    }
+    return {"query": query, "script": script}
+
+
+def start_customer_sync(
+    org_id: str,
+    customer_ids: list[str],
+    reason: str = "manual",
+    requests_per_second: float | None = None,
+    slices: str | int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Start throttled, sliced update_by_query tasks that refresh customer_name and
+    customer_segment on feedback for the given customers.
+
+    Customer IDs are processed in batches of feedback_sync_batch_size; each batch
+    is one ES task and one job record. Returns the created job records.
+    """
+    ids = [c for c in dict.fromkeys(customer_ids) if c]
+    if not ids:
+        return []
+
+    settings = get_settings()
+    rps = requests_per_second if requests_per_second is not None else settings.feedback_sync_requests_per_second
+    slice_count = parse_slices(slices if slices is not None else settings.feedback_sync_slices)
+    batch_size = max(1, settings.feedback_sync_batch_size)
+
+    ensure_index_exists(FEEDBACK_SYNC_JOBS_INDEX, FEEDBACK_SYNC_JOBS_MAPPING)
+    es = get_es_client()
+    fb_idx = feedback_index(org_id)
+    jobs: list[dict[str, Any]] = []
+    unlinked = _unlinked_names(org_id)
+
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i : i + batch_size]
+        customers = _load_customers(org_id, batch)
+        if not customers:
+            continue
+        req = _build_sync_request(org_id, customers, unlinked)
+        resp = es.update_by_query(
+            index=fb_idx,
+            query=req["query"],
+            script=req["script"],
+            conflicts="proceed",
+            slices=slice_count,
+            requests_per_second=rps,
+            refresh=True,
+            wait_for_completion=False,
+        )
+        now = datetime.utcnow().isoformat() + "Z"
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "org_id": org_id,
+            "task_id": resp.get("task"),
+            "reason": reason,
+            "customer_ids": [c["id"] for c in customers],
+            "customer_count": len(customers),
+            "status": "running",
+            "requests_per_second": rps,
+            "slices": str(slice_count),
+            "total": 0,
+            "updated": 0,
+            "noops": 0,
+            "failures": 0,
+            "created_at": now,
+        }
+        index_document(FEEDBACK_SYNC_JOBS_INDEX, job_id, job)
+        jobs.append(job)
+        if job["task_id"]:
+            # Segments change in place; no snapshot until the task is done
+            hold_feedback_snapshot(org_id, job["task_id"])
+            _watch_sync_task(job)
+        logger.info(
+            "Started feedback sync %s (%d customers, reason=%s) for org %s",
+            job_id[:8], len(customers), reason, org_id[:8],
+        )
+    return jobs
+
+
+def trigger_customer_sync(org_id: str, customer_ids: list[str], reason: str) -> list[dict[str, Any]]:
+    """Best-effort start_customer_sync for write paths. Never raises."""
+    try:
+        return start_customer_sync(org_id, customer_ids, reason=reason)
+    except Exception as e:
+        logger.warning("Feedback sync for org %s not started: %s", org_id[:8], str(e))
+        return []
+
+
+def _refresh_progress(job: dict[str, Any], raise_errors: bool = False) -> dict[str, Any]:
+    """
+    Pull task status from ES and persist progress on the job record. A failed
+    task lookup leaves the job as is, or raises with raise_errors.
+    """
+    if job.get("status") != "running" or not job.get("task_id"):
+        return job
+    es = get_es_client()
+    try:
+        resp = es.tasks.get(task_id=job["task_id"])
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.warning("Task lookup failed for sync %s: %s", job["id"][:8], str(e))
+        return job
+
+    task_status = resp.get("task", {}).get("status", {}) or {}
+    result = resp.get("response") or task_status
+    job["total"] = result.get("total", 0) or 0
+    job["updated"] = result.get("updated", 0) or 0
+    job["noops"] = result.get("noops", 0) or 0
+    failures = result.get("failures")
+    job["failures"] = len(failures) if isinstance(failures, list) else 0
+
+    if resp.get("completed"):
+        error = resp.get("error")
+        job["status"] = "failed" if error or job["failures"] else "completed"
+        if error:
+            job["error_message"] = str(error.get("reason") or error)
+        job["completed_at"] = datetime.utcnow().isoformat() + "Z"
+        release_feedback_snapshot(job["org_id"], job["task_id"])
+    index_document(FEEDBACK_SYNC_JOBS_INDEX, job["id"], job)
+    return job
+
+
+def _await_sync_task(job: dict[str, Any]) -> None:
+    """
+    Poll a sync task until it finishes, record the result and release the
+    org's snapshot. A task that cannot be looked up _MAX_TASK_LOOKUP_FAILURES
+    times in a row (e.g. lost in a node restart) marks the job failed.
+    """
+    failures = 0
+    try:
+        while True:
+            time.sleep(_TASK_POLL_SECONDS)
+            current = get_document(FEEDBACK_SYNC_JOBS_INDEX, job["id"]) or job
+            try:
+                if _refresh_progress(current, raise_errors=True).get("status") != "running":
+                    return
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures < _MAX_TASK_LOOKUP_FAILURES:
+                    continue
+                logger.warning("Sync %s task lost, marking it failed: %s", job["id"][:8], str(e))
+                current["status"] = "failed"
+                current["error_message"] = f"Task lookup failed: {e}"
+                current["completed_at"] = datetime.utcnow().isoformat() + "Z"
+                index_document(FEEDBACK_SYNC_JOBS_INDEX, current["id"], current)
+                return
+    except Exception as e:
+        logger.warning("Watching sync %s failed: %s", job["id"][:8], str(e))
+    finally:
+        release_feedback_snapshot(job["org_id"], job["task_id"])
+
+
+def _watch_sync_task(job: dict[str, Any]) -> None:
+    """Follow a sync task in the background, so its completion does not wait for a client to poll."""
+    threading.Thread(target=_await_sync_task, args=(job,), daemon=True).start()
+
+
+def get_sync_job(org_id: str, job_id: str) -> dict[str, Any] | None:
+    """Get sync job with live progress. Returns None if not found or wrong org."""
+    job = get_document(FEEDBACK_SYNC_JOBS_INDEX, job_id)
+    if not job or job.get("org_id") != org_id:
+        return None
+    return _refresh_progress(job)
+
+
+def get_sync_jobs(org_id: str, size: int = 50) -> list[dict[str, Any]]:
+    """List sync jobs for org, newest first."""
+    ensure_index_exists(FEEDBACK_SYNC_JOBS_INDEX, FEEDBACK_SYNC_JOBS_MAPPING)
+    return search_documents(
+        FEEDBACK_SYNC_JOBS_INDEX,
+        {"term": {"org_id": org_id}},
+        size=size,
+        sort=[{"created_at": {"order": "desc"}}],
+    )
+
+
+def rethrottle_sync_job(
+    org_id: str,
+    job_id: str,
+    requests_per_second: float,
+) -> dict[str, Any] | None:
+    """
+    Change throttling of a running sync job. -1 disables throttling.
+    Returns updated job, or None if not found or wrong org.
+    """
+    job = get_document(FEEDBACK_SYNC_JOBS_INDEX, job_id)
+    if not job or job.get("org_id") != org_id:
+        return None
+    if job.get("status") != "running":
+        raise ValueError("Sync job is not running")
+    es = get_es_client()
+    es.update_by_query_rethrottle(
+        task_id=job["task_id"],
+        requests_per_second=requests_per_second,
+    )
+    job["requests_per_second"] = requests_per_second
+    index_document(FEEDBACK_SYNC_JOBS_INDEX, job_id, job)
+    return job
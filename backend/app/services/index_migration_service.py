@@ -0,0 +1,395 @@
+"""Zero-downtime mapping migrations — copy per-org indices into versioned indices behind an alias."""
+
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.index_migration import INDEX_MIGRATIONS_INDEX, INDEX_MIGRATIONS_MAPPING
+from app.models.sync_job import FEEDBACK_SYNC_JOBS_INDEX
+from app.services.es_service import (
+    ensure_index_exists,
+    get_document,
+    index_document,
+    parse_slices,
+    resolve_index,
+    search_documents,
+    split_tenant_index,
+)
+from app.services.index_template_service import MAPPING_VERSIONS, check_mapping_versions
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Field bumped on every write of a data type; bounds the final catch-up pass.
+# Feedback sync (update_by_query) leaves ingested_at alone; see _final_catchup_query.
+_TIME_FIELDS = {
+    "feedback": "ingested_at",
+    "customers": "updated_at",
+    "specs": "updated_at",
+    "conversations": "updated_at",
+    "conversation-messages": "timestamp",
+    "product-context": "updated_at",
+}
+# Clock skew allowance between this process and the writers
+_CATCHUP_MARGIN = timedelta(minutes=1)
+_VERSIONED = re.compile(r"-v\d+$")
+_ACTIVE = ("pending", "copying", "catching_up", "swapping")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _minus_margin(iso: str) -> str:
+    dt = datetime.fromisoformat(iso.rstrip("Z")) - _CATCHUP_MARGIN
+    return dt.isoformat() + "Z"
+
+
+def versioned_index(org_id: str, data_type: str, version: int) -> str:
+    """Return the concrete index name for a mapping version, e.g. {org}-feedback-v2."""
+    return f"{org_id}-{data_type}-v{version}"
+
+
+def split_migratable_index(index: str) -> tuple[str, str] | None:
+    """(org_id, data_type) of a per-org index or its versioned copy; None otherwise."""
+    return split_tenant_index(_VERSIONED.sub("", index))
+
+
+def _save(job: dict[str, Any]) -> dict[str, Any]:
+    job["updated_at"] = _now()
+    index_document(INDEX_MIGRATIONS_INDEX, job["id"], job)
+    return job
+
+
+def _fail(job: dict[str, Any], message: str) -> dict[str, Any]:
+    logger.warning("Migration %s failed: %s", job["id"], message)
+    job["status"] = "failed"
+    job["error_message"] = message
+    return _save(job)
+
+
+def get_migration(org_id: str, data_type: str) -> dict[str, Any] | None:
+    """Latest migration record for an org's data type."""
+    return get_document(INDEX_MIGRATIONS_INDEX, f"{org_id}:{data_type}")
+
+
+def list_migrations(status: str | None = None, size: int = 1000) -> list[dict[str, Any]]:
+    """Migration records, optionally filtered by status, most recently updated first."""
+    ensure_index_exists(INDEX_MIGRATIONS_INDEX, INDEX_MIGRATIONS_MAPPING)
+    query = {"term": {"status": status}} if status else {"match_all": {}}
+    return search_documents(INDEX_MIGRATIONS_INDEX, query, size=size, sort=[{"updated_at": {"order": "desc"}}])
+
+
+def plan_migrations() -> list[dict[str, Any]]:
+    """
+    Outdated indices from check_mapping_versions that this engine can migrate:
+    a per-org index (or versioned copy) reached through its {org}-{type} name.
+    Returns [{org_id, data_type, index, mapping_version, expected}].
+    """
+    planned = []
+    for entry in check_mapping_versions()["outdated"]:
+        tenant = split_migratable_index(entry["index"])
+        if not tenant:
+            continue  # monthly partitions, shared indices
+        planned.append({
+            "org_id": tenant[0],
+            "data_type": tenant[1],
+            "index": entry["index"],
+            "mapping_version": entry["mapping_version"],
+            "expected": entry["expected"],
+        })
+    return planned
+
+
+def start_migration(
+    org_id: str,
+    data_type: str,
+    requests_per_second: float | None = None,
+    slices: str | int | None = None,
+) -> dict[str, Any]:
+    """
+    Create (or return the unfinished) migration of {org_id}-{data_type} to the
+    current mapping version. Raises ValueError if the name is missing, already
+    current, or is a filtered or multi-index alias (shared tenancy, partitions).
+    """
+    existing = get_migration(org_id, data_type)
+    if existing and existing.get("status") in _ACTIVE:
+        return existing
+
+    alias = f"{org_id}-{data_type}"
+    resolved = resolve_index(alias)
+    if not resolved:
+        raise ValueError(f"{alias} does not exist")
+    if resolved["filtered"] or len(resolved["indices"]) != 1:
+        raise ValueError(f"{alias} is a filtered or multi-index alias; migrate it with its own tooling")
+    source = resolved["indices"][0]
+    version = MAPPING_VERSIONS[data_type]
+    dest = versioned_index(org_id, data_type, version)
+    if source == dest:
+        raise ValueError(f"{alias} is already on mapping v{version}")
+
+    settings = get_settings()
+    ensure_index_exists(INDEX_MIGRATIONS_INDEX, INDEX_MIGRATIONS_MAPPING)
+    now = _now()
+    job = {
+        "id": f"{org_id}:{data_type}",
+        "org_id": org_id,
+        "data_type": data_type,
+        "alias": alias,
+        "source_index": source,
+        "dest_index": dest,
+        "target_version": version,
+        "status": "pending",
+        "requests_per_second": (
+            requests_per_second if requests_per_second is not None
+            else settings.index_migration_requests_per_second
+        ),
+        "slices": str(parse_slices(slices if slices is not None else settings.index_migration_slices)),
+        "created_at": now,
+    }
+    logger.info("Planned migration %s -> %s", source, dest)
+    return _save(job)
+
+
+def _task_result(task_id: str) -> tuple[bool, str | None]:
+    """(completed, error message) of an ES task."""
+    resp = get_es_client().tasks.get(task_id=task_id)
+    if not resp.get("completed"):
+        return False, None
+    error = resp.get("error")
+    if error:
+        return True, str(error.get("reason") or error)
+    failures = (resp.get("response") or {}).get("failures") or []
+    return True, (f"{len(failures)} reindex failures: {failures[0]}" if failures else None)
+
+
+def _reindex(
+    job: dict[str, Any],
+    query: dict[str, Any] | None = None,
+    wait: bool = False,
+    throttled: bool = True,
+) -> dict[str, Any]:
+    """
+    Reindex source to dest with external versions, so a doc is only written
+    when the source copy is newer and catch-up passes are idempotent.
+    throttled=False ignores the job's requests_per_second.
+    """
+    source: dict[str, Any] = {"index": job["source_index"]}
+    if query:
+        source["query"] = query
+    slices = job.get("slices") or "auto"
+    return get_es_client().reindex(
+        source=source,
+        dest={"index": job["dest_index"], "version_type": "external"},
+        conflicts="proceed",
+        slices=int(slices) if slices.isdigit() else slices,
+        requests_per_second=(job.get("requests_per_second") or -1) if throttled else -1,
+        wait_for_completion=wait,
+        refresh=wait,
+    )
+
+
+def _source_deletes(index: str) -> int:
+    """Delete operations on the source's primaries (stats counter; resets when shards move)."""
+    stats = get_es_client().indices.stats(index=index, metric="indexing")
+    return int(stats["indices"][index]["primaries"]["indexing"]["delete_total"])
+
+
+def _delete_strays(job: dict[str, Any]) -> int:
+    """Delete docs from dest that were deleted from source during the copy."""
+    from elasticsearch.helpers import scan
+
+    es = get_es_client()
+    source_ids = {h["_id"] for h in scan(es, index=job["source_index"], query={"query": {"match_all": {}}}, _source=False)}
+    strays = [
+        h["_id"] for h in scan(es, index=job["dest_index"], query={"query": {"match_all": {}}}, _source=False)
+        if h["_id"] not in source_ids
+    ]
+    for i in range(0, len(strays), 1000):
+        es.delete_by_query(index=job["dest_index"], query={"ids": {"values": strays[i : i + 1000]}}, refresh=True)
+    return len(strays)
+
+
+def _synced_customer_ids(org_id: str, since: str) -> list[str]:
+    """Customers of feedback sync jobs that were running at or started after since."""
+    resp = get_es_client().search(
+        index=FEEDBACK_SYNC_JOBS_INDEX,
+        query={"bool": {
+            "filter": [{"term": {"org_id": org_id}}],
+            "should": [
+                {"term": {"status": "running"}},
+                {"range": {"created_at": {"gte": since}}},
+                {"range": {"completed_at": {"gte": since}}},
+            ],
+            "minimum_should_match": 1,
+        }},
+        size=10000,
+        _source=["customer_ids"],
+        ignore_unavailable=True,
+    )
+    ids: dict[str, None] = {}
+    for hit in resp.get("hits", {}).get("hits", []):
+        ids.update(dict.fromkeys(hit["_source"].get("customer_ids") or []))
+    return list(ids)
+
+
+def _final_catchup_query(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Docs the write-blocked pass must re-copy: written since the catch-up
+    started and, for feedback, linked to customers a sync touched meanwhile
+    (sync rewrites customer fields in place and always sets customer_id).
+    """
+    since = _minus_margin(job["catchup_started_at"])
+    query: dict[str, Any] = {"range": {_TIME_FIELDS[job["data_type"]]: {"gte": since}}}
+    if job["data_type"] != "feedback":
+        return query
+    synced = _synced_customer_ids(job["org_id"], since)
+    if not synced:
+        return query
+    return {"bool": {"should": [query, {"terms": {"customer_id": synced}}], "minimum_should_match": 1}}
+
+
+def _finish(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Block writes on source, copy what changed since the catch-up started,
+    restore dest settings and swap the alias in one update_aliases call.
+    """
+    es = get_es_client()
+    settings = get_settings()
+    src, dest, alias = job["source_index"], job["dest_index"], job["alias"]
+
+    resolved = resolve_index(alias)
+    if resolved and resolved["indices"] == [dest]:
+        # Swapped before an interruption; only the record is behind
+        job["status"] = "completed"
+        job["completed_at"] = _now()
+        return _save(job)
+
+    es.indices.add_block(index=src, block="write")
+    try:
+        # Writes are blocked until the swap, so this pass runs unthrottled
+        _reindex(job, query=_final_catchup_query(job), wait=True, throttled=False)
+        es.indices.refresh(index=src)
+        source_count = es.count(index=src)["count"]
+        dest_count = es.count(index=dest)["count"]
+        # Deletes during the copy can hide behind new docs with equal counts, so
+        # compare IDs whenever the source's delete counter moved (or is unknown)
+        deletes_seen = job.get("source_deletes")
+        if dest_count > source_count or deletes_seen is None or _source_deletes(src) != deletes_seen:
+            job["strays_deleted"] = _delete_strays(job)
+            dest_count = es.count(index=dest)["count"]
+        job["source_count"], job["dest_count"] = source_count, dest_count
+        if dest_count != source_count:
+            raise RuntimeError(f"count mismatch after catch-up: source {source_count}, dest {dest_count}")
+
+        es.indices.put_settings(index=dest, settings={
+            "index.refresh_interval": settings.index_refresh_interval,
+            "index.number_of_replicas": settings.index_number_of_replicas,
+        })
+        actions: list[dict[str, Any]] = [{"add": {"index": dest, "alias": alias}}]
+        if src == alias:
+            # Legacy concrete index with the alias's name: replaced in the same call
+            actions.append({"remove_index": {"index": src}})
+        else:
+            actions.extend([{"remove": {"index": src, "alias": alias}}, {"remove_index": {"index": src}}])
+        es.indices.update_aliases(actions=actions)
+    except Exception:
+        es.indices.put_settings(index=src, settings={"index.blocks.write": False})
+        raise
+
+    job["status"] = "completed"
+    job["task_id"] = None
+    job["completed_at"] = _now()
+    logger.info("Migrated %s -> %s (%d docs)", src, dest, job["dest_count"])
+    return _save(job)
+
+
+def advance_migration(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Run the migration state machine as far as it can go without waiting:
+
+    pending      create dest from the template (no refresh, no replicas), note
+                 the source's delete counter, start the sliced, throttled copy task
+    copying      when the copy task is done, start a catch-up task over all docs
+                 (writes only docs changed during the copy)
+    catching_up  when that is done: swapping
+    swapping     write-block source, unthrottled final catch-up of docs written
+                 (or customer-synced) since, drop docs deleted from source if any were, verify
+                 counts, swap the alias, drop source: completed
+
+    Each step is persisted, so a crashed or interrupted run resumes where it
+    stopped. Failures mark the job failed and leave the alias on source.
+    """
+    es = get_es_client()
+    try:
+        while True:
+            status = job["status"]
+            if status == "pending":
+                if not es.indices.exists(index=job["dest_index"]):
+                    es.indices.create(index=job["dest_index"], settings={
+                        "index.refresh_interval": "-1",
+                        "index.number_of_replicas": 0,
+                    })
+                job["copy_started_at"] = _now()
+                job["source_deletes"] = _source_deletes(job["source_index"])
+                job["task_id"] = _reindex(job)["task"]
+                job["status"] = "copying"
+                _save(job)
+            elif status == "copying":
+                done, error = _task_result(job["task_id"])
+                if not done:
+                    return job
+                if error:
+                    return _fail(job, error)
+                job["catchup_started_at"] = _now()
+                job["task_id"] = _reindex(job)["task"]
+                job["status"] = "catching_up"
+                _save(job)
+            elif status == "catching_up":
+                done, error = _task_result(job["task_id"])
+                if not done:
+                    return job
+                if error:
+                    return _fail(job, error)
+                job["status"] = "swapping"
+                _save(job)
+            elif status == "swapping":
+                return _finish(job)
+            else:
+                return job
+    except Exception as e:
+        return _fail(job, str(e))
+
+
+def run_migrations(
+    targets: list[tuple[str, str]],
+    parallel: int = 4,
+    poll_seconds: float = 5.0,
+    requests_per_second: float | None = None,
+    slices: str | int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Migrate (org_id, data_type) targets with at most parallel copies in
+    flight. Unfinished jobs from earlier runs are resumed. Returns final jobs.
+    """
+    queue = list(targets)
+    active: list[dict[str, Any]] = []
+    finished: list[dict[str, Any]] = []
+    while queue or active:
+        while queue and len(active) < max(1, parallel):
+            org_id, data_type = queue.pop(0)
+            try:
+                active.append(start_migration(org_id, data_type, requests_per_second, slices))
+            except ValueError as e:
+                finished.append({"id": f"{org_id}:{data_type}", "status": "skipped", "error_message": str(e)})
+        still_active = []
+        for job in active:
+            job = advance_migration(job)
+            (still_active if job["status"] in _ACTIVE else finished).append(job)
+        active = still_active
+        if active:
+            time.sleep(poll_seconds)
+    return finished
@@ -0,0 +1,148 @@
+"""Composable index templates for per-org indices, with mapping versions."""
+
+from typing import Any
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.conversation import CONVERSATION_MESSAGES_MAPPING, CONVERSATIONS_MAPPING
+from app.models.customer import CUSTOMERS_MAPPING
+from app.models.feedback import feedback_mapping
+from app.models.product import PRODUCT_CONTEXT_MAPPING
+from app.models.spec import SPECS_MAPPING
+from app.services.elser_service import is_elser_available
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+TEMPLATE_PREFIX = "context-engine"
+# Base of a range above the built-in (100) and Fleet integration (200) templates,
+# so no same-priority overlap with them; each data type adds its offset
+TEMPLATE_PRIORITY = 500
+
+# Bump a data type's version whenever its mapping changes; indices created
+# from an older template are then reported by check_mapping_versions
+MAPPING_VERSIONS = {
+    "feedback": 3,  # v2: lean mapping profile, v3: sorted by created_at desc
+    "customers": 1,
+    "specs": 1,
+    "conversations": 1,
+    "conversation-messages": 1,
+    "product-context": 1,
+}
+
+# Per-org names plus versioned copies made by mapping migrations ({org}-{type}-vN);
+# feedback patterns also cover monthly partitions (and shrunk copies)
+_INDEX_PATTERNS = {
+    "feedback": ["*-feedback", "*-feedback-*"],
+    "customers": ["*-customers", "*-customers-v*"],
+    "specs": ["*-specs", "*-specs-v*"],
+    "conversations": ["*-conversations", "*-conversations-v*"],
+    "conversation-messages": ["*-conversation-messages", "*-conversation-messages-v*"],
+    "product-context": ["*-product-context", "*-product-context-v*"],
+}
+
+_installed = False
+
+
+def template_name(data_type: str) -> str:
+    """Return the index template name for a data type."""
+    return f"{TEMPLATE_PREFIX}-{data_type}"
+
+
+def _mapping_for(data_type: str) -> dict[str, Any]:
+    if data_type == "feedback":
+        return feedback_mapping(is_elser_available(), get_settings().feedback_mapping_profile)
+    return {
+        "customers": CUSTOMERS_MAPPING,
+        "specs": SPECS_MAPPING,
+        "conversations": CONVERSATIONS_MAPPING,
+        "conversation-messages": CONVERSATION_MESSAGES_MAPPING,
+        "product-context": PRODUCT_CONTEXT_MAPPING,
+    }[data_type]
+
+
+def build_template(data_type: str) -> dict[str, Any]:
+    """
+    Composable template body: explicit shard, replica and refresh settings
+    (plus the data type's own, e.g. feedback index sorting) and the data
+    type's mapping with its version in _meta. The feedback mapping
+    follows feedback_mapping_profile and includes text_semantic when ELSER
+    was available at startup.
+    """
+    settings = get_settings()
+    version = MAPPING_VERSIONS[data_type]
+    mappings = {
+        **_mapping_for(data_type)["mappings"],
+        "_meta": {
+            "mapping_version": version,
+            "template": template_name(data_type),
+            "semantic": data_type == "feedback" and is_elser_available(),
+        },
+    }
+    if data_type == "feedback":
+        mappings["_meta"]["profile"] = settings.feedback_mapping_profile
+    return {
+        "index_patterns": _INDEX_PATTERNS[data_type],
+        # Distinct priorities: ES rejects same-priority templates whose patterns can overlap
+        "priority": TEMPLATE_PRIORITY + list(MAPPING_VERSIONS).index(data_type),
+        "version": version,
+        "template": {
+            "settings": {
+                "number_of_shards": settings.index_number_of_shards,
+                "number_of_replicas": settings.index_number_of_replicas,
+                "refresh_interval": settings.index_refresh_interval,
+                **_mapping_for(data_type).get("settings", {}),
+            },
+            "mappings": mappings,
+        },
+        "_meta": {"managed_by": TEMPLATE_PREFIX},
+    }
+
+
+def install_index_templates() -> list[str]:
+    """Create or update every per-org index template. Call after ELSER setup."""
+    global _installed
+    es = get_es_client()
+    names = []
+    for data_type in MAPPING_VERSIONS:
+        name = template_name(data_type)
+        es.indices.put_index_template(name=name, **build_template(data_type))
+        names.append(name)
+    _installed = True
+    logger.info("Index templates ready: %s", ", ".join(names))
+    return names
+
+
+def templates_installed() -> bool:
+    """True once install_index_templates has run in this process."""
+    return _installed
+
+
+def check_mapping_versions() -> dict[str, Any]:
+    """
+    Compare every per-org index's _meta.mapping_version with the current
+    template. Feedback indices without text_semantic while ELSER is available
+    are reported too. Returns {"checked", "outdated": [{index, data_type,
+    mapping_version, expected, reason}]}.
+    """
+    es = get_es_client()
+    checked = 0
+    outdated: list[dict[str, Any]] = []
+    for data_type, expected in MAPPING_VERSIONS.items():
+        resp = es.indices.get_mapping(
+            index=",".join(_INDEX_PATTERNS[data_type]),
+            allow_no_indices=True,
+            ignore_unavailable=True,
+        )
+        for index, body in sorted(resp.items()):
+            if index.startswith("."):
+                continue
+            checked += 1
+            mappings = body.get("mappings", {})
+            version = mappings.get("_meta", {}).get("mapping_version", 0)
+            entry = {"index": index, "data_type": data_type, "mapping_version": version, "expected": expected}
+            if version < expected:
+                outdated.append({**entry, "reason": "mapping_version"})
+            elif data_type == "feedback" and is_elser_available() and "text_semantic" not in mappings.get("properties", {}):
+                outdated.append({**entry, "reason": "missing_text_semantic"})
+    return {"checked": checked, "outdated": outdated}
@@ -0,0 +1,297 @@
+"""Local fast path for templated agent questions — answered from analytics without an LLM round trip."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from app.config import get_settings
+from app.services.analytics_service import (
+    get_area_breakdown,
+    get_at_risk_customers,
+    get_segment_breakdown,
+    get_summary,
+    get_top_issues,
+)
+from app.services.customer_matching_service import get_customer_matcher
+from app.services.customer_service import get_customer, get_customer_feedback
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Longer questions, or ones asking for reasoning or writing, go to the agent
+_MAX_WORDS = 14
+_OPEN_ENDED = re.compile(
+    r"\b(why|explain|should|recommend|suggest|generate|write|draft|specs?|plan|prioriti[sz]e)\b",
+    re.I,
+)
+_PERIODS = [
+    (re.compile(r"\b(this|last|past)\s+week\b|\b7\s*d(ays)?\b", re.I), "7d"),
+    (re.compile(r"\b(this|last|past)\s+quarter\b|\b90\s*d(ays)?\b|\b3\s+months\b", re.I), "90d"),
+    (re.compile(r"\b(this|last|past)\s+month\b|\b30\s*d(ays)?\b", re.I), "30d"),
+]
+_PERIOD_LABELS = {"7d": "the last 7 days", "30d": "the last 30 days", "90d": "the last 90 days"}
+_INTENTS = [
+    ("top_issues", re.compile(r"\b(top|biggest|main|worst)\b.*\b(issues?|problems?|complaints?|pain\s*points?)\b", re.I)),
+    ("at_risk", re.compile(r"\b(at[-\s]risk|churn\s*risk)\b", re.I)),
+    ("compare_segments", re.compile(r"\bsegments?\b", re.I)),
+    ("area_breakdown", re.compile(r"\b(product\s+)?areas?\b.*\b(breakdown|volume|sentiment)\b|\bby\s+(product\s+)?area\b", re.I)),
+    ("summary", re.compile(r"\b(summary|overview|how\s+are\s+we\s+doing|key\s+metrics)\b", re.I)),
+]
+# Every word a templated (org-wide) question is made of. Any other word after
+# the period is dropped (a customer, area or segment name, "feel", "about",
+# ...) scopes or reshapes the question, so it goes to the agent rather than
+# getting an org-wide answer
+_TEMPLATE_WORDS = frozenset("""
+    a across all an and any are area areas at biggest breakdown by can churn compare complaint
+    complaints current currently customer customers did do does doing feedback for get give has have
+    how hows i in is issue issues key list main me metrics most my now of on our overall overview
+    pain painpoints please point points problem problems product right risk segment segments
+    sentiment show so summary tell the to today top us volume was we were what whats where which who
+    worst you
+""".split())
+_WORD = re.compile(r"[a-z0-9]+")
+_CUSTOMER = re.compile(
+    r"^\s*(?:how\s+is|how's|what\s+about|tell\s+me\s+about|look\s*up)\s+"
+    r"(?P<name>.+?)(?:\s+doing)?(?:\s+(?:this|last|past)\s+\w+)?\s*\??\s*$",
+    re.I,
+)
+
+# (org, intent, period, customer) -> (answer, monotonic time cached), least recently used first
+_cache: "OrderedDict[tuple[str, ...], tuple[Any, float]]" = OrderedDict()
+_CACHE_MAX_ENTRIES = 5000
+_cache_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics: dict[str, Any] = {
+    "requests": 0,
+    "fast_path_hits": 0,
+    "fast_path_ms": 0.0,
+    "escalations": 0,
+    "escalated_ms": 0.0,
+    "by_intent": {},
+}
+
+
+def _period(message: str) -> str:
+    for pattern, period in _PERIODS:
+        if pattern.search(message):
+            return period
+    return "30d"
+
+
+def _scoped(text: str) -> bool:
+    """True if the question has words beyond an org-wide template and its period."""
+    for pattern, _ in _PERIODS:
+        text = pattern.sub(" ", text)
+    words = _WORD.findall(text.lower().replace("'", ""))
+    return any(w not in _TEMPLATE_WORDS for w in words)
+
+
+def classify_intent(org_id: str, message: str) -> dict[str, Any] | None:
+    """
+    Return {"intent", "period", ...} if the message is a templated analytics
+    question, else None. Analytics intents are org-wide, so questions scoped
+    to a customer, area or segment ("top issues for Acme", "is Acme at
+    risk?") return None. Customer lookups only match a known customer name.
+    """
+    text = message.strip()
+    if not text or len(text.split()) > _MAX_WORDS or _OPEN_ENDED.search(text):
+        return None
+    period = _period(text)
+    for intent, pattern in _INTENTS:
+        if pattern.search(text):
+            return None if _scoped(text) else {"intent": intent, "period": period}
+    m = _CUSTOMER.match(text)
+    if m:
+        customer = get_customer_matcher(org_id).match(m.group("name"))
+        if customer:
+            return {"intent": "customer_lookup", "period": period, "customer_id": customer["id"]}
+    return None
+
+
+def _fmt_trend(value: float | None) -> str:
+    return "" if value is None else f" ({value:+.1f}% vs previous period)"
+
+
+def _answer_summary(org_id: str, intent: dict[str, Any]) -> str:
+    s = get_summary(org_id, intent["period"])
+    return "\n".join([
+        f"**Summary for {_PERIOD_LABELS[intent['period']]}**",
+        "",
+        f"- Feedback: {s['total_feedback']}{_fmt_trend(s['total_feedback_trend'])}",
+        f"- Average sentiment: {s['avg_sentiment']}{_fmt_trend(s['avg_sentiment_trend'])}",
+        f"- Active issue areas: {s['active_issues']}{_fmt_trend(s['active_issues_trend'])}",
+        f"- At-risk customers (health < 50): {s['at_risk_customers']}",
+    ])
+
+
+def _answer_top_issues(org_id: str, intent: dict[str, Any]) -> str:
+    issues = get_top_issues(org_id, intent["period"])["issues"]
+    if not issues:
+        return f"No negative feedback in {_PERIOD_LABELS[intent['period']]}."
+    lines = [f"**Top issues in {_PERIOD_LABELS[intent['period']]}**", "", "| Area | Feedback | Customers | Sentiment | Growth | Severity |", "|---|---|---|---|---|---|"]
+    for i in issues:
+        growth = "new" if i["growth_rate"] is None else f"{i['growth_rate']:+.1f}%"
+        lines.append(
+            f"| {i['product_area']} | {i['feedback_count']} | {i['affected_customers']} "
+            f"| {i['avg_sentiment']} | {growth} | {i['severity']} |"
+        )
+    return "\n".join(lines)
+
+
+def _answer_at_risk(org_id: str, intent: dict[str, Any]) -> str:
+    customers = get_at_risk_customers(org_id, intent["period"])["customers"]
+    if not customers:
+        return "No customers are currently at risk."
+    lines = [f"**At-risk customers ({_PERIOD_LABELS[intent['period']]})**", ""]
+    for c in customers:
+        arr = f"${c['arr']:,.0f} ARR" if c.get("arr") is not None else "ARR unknown"
+        lines.append(
+            f"- **{c['company_name']}** — health {c.get('health_score', 'n/a')}, {arr}, "
+            f"{c['negative_feedback_count']} negative feedback, renews {c.get('renewal_date') or 'n/a'}"
+        )
+    return "\n".join(lines)
+
+
+def _answer_segments(org_id: str, intent: dict[str, Any]) -> str:
+    segments = get_segment_breakdown(org_id, intent["period"])["segments"]
+    if not segments:
+        return f"No feedback in {_PERIOD_LABELS[intent['period']]}."
+    lines = [f"**Feedback by segment ({_PERIOD_LABELS[intent['period']]})**", "", "| Segment | Feedback | Top areas |", "|---|---|---|"]
+    for s in segments:
+        top = ", ".join(f"{a['product_area']} ({a['count']})" for a in s["by_area"][:3])
+        lines.append(f"| {s['segment']} | {s['count']} | {top} |")
+    return "\n".join(lines)
+
+
+def _answer_areas(org_id: str, intent: dict[str, Any]) -> str:
+    areas = get_area_breakdown(org_id, intent["period"])["areas"]
+    if not areas:
+        return f"No feedback in {_PERIOD_LABELS[intent['period']]}."
+    lines = [f"**Feedback by product area ({_PERIOD_LABELS[intent['period']]})**", "", "| Area | Feedback | Avg sentiment |", "|---|---|---|"]
+    for a in areas:
+        lines.append(f"| {a['product_area']} | {a['count']} | {a['avg_sentiment']} |")
+    return "\n".join(lines)
+
+
+def _answer_customer(org_id: str, intent: dict[str, Any]) -> str | None:
+    customer = get_customer(org_id, intent["customer_id"])
+    if not customer:
+        return None
+    items, total, lower_bound = get_customer_feedback(org_id, intent["customer_id"], page_size=3)
+    arr = f"${customer['arr']:,.0f}" if customer.get("arr") is not None else "unknown"
+    lines = [
+        f"**{customer.get('company_name')}**",
+        "",
+        f"- Segment: {customer.get('segment') or 'n/a'}, plan: {customer.get('plan') or 'n/a'}",
+        f"- ARR: {arr}, health score: {customer.get('health_score', 'n/a')}",
+        f"- Renewal: {customer.get('renewal_date') or 'n/a'}, account manager: {customer.get('account_manager') or 'n/a'}",
+        f"- Feedback on record: {total:,}{'+' if lower_bound else ''}",
+    ]
+    if items:
+        lines.extend(["", "Most recent feedback:"])
+        for fb in items:
+            text = (fb.get("text") or "").strip().replace("\n", " ")
+            lines.append(f"- ({fb.get('sentiment') or 'neutral'}) {text[:200]}")
+    return "\n".join(lines)
+
+
+_ANSWERS: dict[str, Callable[[str, dict[str, Any]], str | None]] = {
+    "summary": _answer_summary,
+    "top_issues": _answer_top_issues,
+    "at_risk": _answer_at_risk,
+    "compare_segments": _answer_segments,
+    "area_breakdown": _answer_areas,
+    "customer_lookup": _answer_customer,
+}
+
+
+def answer_locally(org_id: str, message: str) -> dict[str, Any] | None:
+    """
+    Answer a templated analytics question from the analytics services.
+    Results are cached for agent_fast_path_cache_seconds. Returns
+    {"intent", "response"} or None when the question needs the agent.
+    """
+    settings = get_settings()
+    if not settings.agent_fast_path_enabled:
+        return None
+    try:
+        intent = classify_intent(org_id, message)
+    except Exception as e:
+        logger.warning("Fast path classification failed for org %s, escalating: %s", org_id[:8], str(e))
+        return None
+    if not intent:
+        return None
+    key = (org_id, intent["intent"], intent["period"], intent.get("customer_id", ""))
+    ttl = settings.agent_fast_path_cache_seconds
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and time.monotonic() - cached[1] < ttl:
+            _cache.move_to_end(key)
+            return {"intent": intent["intent"], "response": cached[0]}
+    try:
+        text = _ANSWERS[intent["intent"]](org_id, intent)
+    except Exception as e:
+        logger.warning("Fast path %s failed for org %s, escalating: %s", intent["intent"], org_id[:8], str(e))
+        return None
+    if not text:
+        return None
+    _cache_put(key, text, ttl)
+    return {"intent": intent["intent"], "response": text}
+
+
+def _cache_put(key: tuple[str, ...], text: str, ttl: float) -> None:
+    """Cache an answer, dropping expired entries and then the least recently used beyond _CACHE_MAX_ENTRIES."""
+    now = time.monotonic()
+    with _cache_lock:
+        _cache[key] = (text, now)
+        _cache.move_to_end(key)
+        for k in [k for k, (_, at) in _cache.items() if now - at >= ttl]:
+            del _cache[k]
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def record_fast_path(intent: str, elapsed_ms: float) -> None:
+    """Count a question answered locally."""
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        _metrics["fast_path_hits"] += 1
+        _metrics["fast_path_ms"] += elapsed_ms
+        _metrics["by_intent"][intent] = _metrics["by_intent"].get(intent, 0) + 1
+
+
+def record_escalation(elapsed_ms: float) -> None:
+    """Count a question sent to Agent Builder."""
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        _metrics["escalations"] += 1
+        _metrics["escalated_ms"] += elapsed_ms
+
+
+def get_fast_path_metrics() -> dict[str, Any]:
+    """
+    Hit rate, mean latency per path and estimated latency saved (hits times
+    the difference between mean escalated and mean fast-path latency).
+    """
+    with _metrics_lock:
+        m = {**_metrics, "by_intent": dict(_metrics["by_intent"])}
+    hits, escalations = m["fast_path_hits"], m["escalations"]
+    fast_avg = m["fast_path_ms"] / hits if hits else None
+    escalated_avg = m["escalated_ms"] / escalations if escalations else None
+    saved = (
+        round(hits * max(escalated_avg - fast_avg, 0.0), 1)
+        if fast_avg is not None and escalated_avg is not None
+        else None
+    )
+    return {
+        "requests": m["requests"],
+        "fast_path_hits": hits,
+        "escalations": escalations,
+        "hit_rate": round(hits / m["requests"], 3) if m["requests"] else 0.0,
+        "avg_fast_path_ms": round(fast_avg, 1) if fast_avg is not None else None,
+        "avg_escalated_ms": round(escalated_avg, 1) if escalated_avg is not None else None,
+        "estimated_ms_saved": saved,
+        "by_intent": m["by_intent"],
+    }
@@ -0,0 +1,123 @@
+"""Content-addressed LLM completion cache, stored in Elasticsearch."""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.llm_cache import LLM_CACHE_INDEX
+from app.services.es_service import get_document, index_document
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Prune expired/excess entries after this many stores per process
+_PRUNE_EVERY = 100
+
+_stores_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def completion_cache_key(prompt: str, system_prompt: str | None, namespace: str) -> str:
+    """SHA-256 over (prompt, system_prompt, model namespace)."""
+    payload = json.dumps([prompt, system_prompt or "", namespace], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_fresh(created_at: str | None, ttl_seconds: int) -> bool:
+    if not created_at:
+        return False
+    try:
+        created = datetime.fromisoformat(created_at.rstrip("Z"))
+    except ValueError:
+        return False
+    return datetime.utcnow() - created < timedelta(seconds=ttl_seconds)
+
+
+def get_cached_completion(key: str) -> str | None:
+    """Return cached completion text for key, or None if missing, expired or disabled."""
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return None
+    try:
+        doc = get_document(LLM_CACHE_INDEX, key)
+    except Exception as e:
+        logger.warning("LLM cache lookup failed: %s", str(e))
+        return None
+    if not doc or not _is_fresh(doc.get("created_at"), settings.llm_cache_ttl_seconds):
+        return None
+    return doc.get("text") or None
+
+
+def store_completion(key: str, text: str, namespace: str) -> None:
+    """Cache a completion. Best-effort: never raises."""
+    global _stores_since_prune
+    settings = get_settings()
+    if not settings.llm_cache_enabled or not text:
+        return
+    size = len(text.encode("utf-8"))
+    if size > settings.llm_cache_max_entry_bytes:
+        return
+    try:
+        index_document(LLM_CACHE_INDEX, key, {
+            "key": key,
+            "namespace": namespace,
+            "text": text,
+            "size_bytes": size,
+            "created_at": datetime.utcnow().isoformat() + "Z",
+        })
+    except Exception as e:
+        logger.warning("LLM cache store failed: %s", str(e))
+        return
+
+    with _prune_lock:
+        _stores_since_prune += 1
+        due = _stores_since_prune >= _PRUNE_EVERY
+        if due:
+            _stores_since_prune = 0
+    if due:
+        try:
+            prune_llm_cache()
+        except Exception as e:
+            logger.warning("LLM cache prune failed: %s", str(e))
+
+
+def prune_llm_cache() -> int:
+    """
+    Delete expired entries, then the oldest entries beyond llm_cache_max_entries.
+    Returns number of entries deleted.
+    """
+    settings = get_settings()
+    es = get_es_client()
+    cutoff = (datetime.utcnow() - timedelta(seconds=settings.llm_cache_ttl_seconds)).isoformat() + "Z"
+    resp = es.delete_by_query(
+        index=LLM_CACHE_INDEX,
+        query={"range": {"created_at": {"lt": cutoff}}},
+        conflicts="proceed",
+        refresh=True,
+    )
+    deleted = resp.get("deleted", 0) or 0
+
+    count = es.count(index=LLM_CACHE_INDEX).get("count", 0)
+    excess = count - settings.llm_cache_max_entries
+    if excess > 0:
+        oldest = es.search(
+            index=LLM_CACHE_INDEX,
+            size=min(excess, 10000),
+            sort=[{"created_at": {"order": "asc"}}],
+            _source=False,
+        )
+        ids = [h["_id"] for h in oldest.get("hits", {}).get("hits", [])]
+        if ids:
+            resp = es.delete_by_query(
+                index=LLM_CACHE_INDEX,
+                query={"ids": {"values": ids}},
+                conflicts="proceed",
+                refresh=True,
+            )
+            deleted += resp.get("deleted", 0) or 0
+    if deleted:
+        logger.info("Pruned %d LLM cache entries", deleted)
+    return deleted
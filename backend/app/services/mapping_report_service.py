@@ -0,0 +1,89 @@
+"""Disk and heap comparison of feedback mapping profiles on a sample of an org's feedback."""
+
+from typing import Any
+
+from app.es_client import get_es_client
+from app.models.feedback import FEEDBACK_MAPPING_PROFILES, feedback_index, feedback_mapping
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Outside the per-org template patterns, so the profile mapping is used as given
+_REPORT_INDEX_PREFIX = "mapping-report"
+# Aggregations run before reading fielddata stats, so global ordinals are built
+_HOT_FIELDS = ("product_area", "sentiment", "source", "customer_segment", "customer_id")
+
+
+def _report_index(profile: str) -> str:
+    return f"{_REPORT_INDEX_PREFIX}-{profile}"
+
+
+def _field_bytes(disk_usage: dict[str, Any], index: str) -> dict[str, int]:
+    fields = disk_usage.get(index, {}).get("fields", {})
+    return {name: f.get("total_in_bytes", 0) for name, f in fields.items()}
+
+
+def _profile_stats(index: str) -> dict[str, Any]:
+    """Store size, segment count, heap used by fielddata/global ordinals and bytes per field."""
+    es = get_es_client()
+    es.search(
+        index=index,
+        size=0,
+        aggs={f: {"terms": {"field": f, "size": 10}} for f in _HOT_FIELDS},
+    )
+    stats = es.indices.stats(index=index, metric="docs,store,segments,fielddata")["indices"][index]["primaries"]
+    disk = es.indices.disk_usage(index=index, run_expensive_tasks=True)
+    return {
+        "docs": stats["docs"]["count"],
+        "store_bytes": stats["store"]["size_in_bytes"],
+        "segments": stats["segments"]["count"],
+        "fielddata_bytes": stats["fielddata"]["memory_size_in_bytes"],
+        "fields": _field_bytes(disk, index),
+    }
+
+
+def compare_feedback_profiles(org_id: str, max_docs: int = 50000) -> dict[str, Any]:
+    """
+    Copy up to max_docs of an org's feedback into one scratch index per
+    mapping profile (no text_semantic, one shard, no replicas), force-merge
+    each to one segment and compare store size, heap and per-field disk use.
+    The scratch indices are deleted afterwards. Returns {"org_id", "docs",
+    "profiles": {profile: stats}, "savings": {"store_bytes", "store_pct"}}.
+    """
+    es = get_es_client()
+    source = feedback_index(org_id)
+    profiles: dict[str, Any] = {}
+    try:
+        for profile in FEEDBACK_MAPPING_PROFILES:
+            index = _report_index(profile)
+            es.indices.delete(index=index, ignore_unavailable=True)
+            es.indices.create(
+                index=index,
+                mappings=feedback_mapping(False, profile)["mappings"],
+                settings={"number_of_shards": 1, "number_of_replicas": 0},
+            )
+            es.reindex(
+                source={"index": source, "_source": {"excludes": ["text_semantic"]}},
+                dest={"index": index},
+                max_docs=max_docs,
+                refresh=True,
+                wait_for_completion=True,
+            )
+            es.indices.forcemerge(index=index, max_num_segments=1)
+            profiles[profile] = _profile_stats(index)
+    finally:
+        for profile in FEEDBACK_MAPPING_PROFILES:
+            es.indices.delete(index=_report_index(profile), ignore_unavailable=True)
+
+    standard, lean = profiles["standard"]["store_bytes"], profiles["lean"]["store_bytes"]
+    saved = standard - lean
+    logger.info("Lean feedback mapping saves %d bytes for org %s", saved, org_id[:8])
+    return {
+        "org_id": org_id,
+        "docs": profiles["standard"]["docs"],
+        "profiles": profiles,
+        "savings": {
+            "store_bytes": saved,
+            "store_pct": round(100.0 * saved / standard, 1) if standard else 0.0,
+        },
+    }
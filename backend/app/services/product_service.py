@@ -17,6 +17,7 @@ from app.services.es_service import (
     get_document,
     index_document,
     search_documents,
+    tenant_doc_id,
 )
 from app.utils.logging import get_logger
 
@@ -75,7 +76,7 @@ def save_wizard_section(org_id: str, section: str, data: dict[str, Any]) -> dict
     data_with_ids = _add_ids_for_section(section, data)
     now = datetime.utcnow().isoformat() + "Z"
 
-    existing = get_document(idx, section)
+    existing = get_document(idx, tenant_doc_id(org_id, section))
     created_at = existing["created_at"] if existing else now
 
     body = {
@@ -87,7 +88,7 @@ def save_wizard_section(org_id: str, section: str, data: dict[str, Any]) -> dict
         "updated_at": now,
     }
 
-    index_document(idx, section, body)
+    index_document(idx, tenant_doc_id(org_id, section), body)
     logger.info("Saved wizard section %s for org %s", section, org_id[:8])
     return body
 
@@ -98,7 +99,7 @@ def get_wizard_section(org_id: str, section: str) -> dict[str, Any] | None:
         return None
 
     idx = product_context_index(org_id)
-    doc = get_document(idx, section)
+    doc = get_document(idx, tenant_doc_id(org_id, section))
     return doc
 
 
@@ -128,7 +129,7 @@ def delete_wizard_section(org_id: str, section: str) -> bool:
         return False
 
     idx = product_context_index(org_id)
-    return delete_document(idx, section)
+    return delete_document(idx, tenant_doc_id(org_id, section))
 
 
 def get_product_context(org_id: str) -> ProductContextResponse:
@@ -137,8 +138,11 @@ def get_product_context(org_id: str) -> ProductContextResponse:
 
     Returns empty structure if no data. Used for agent system prompt.
     """
-    sections = get_all_wizard_sections(org_id)
+    return build_product_context(get_all_wizard_sections(org_id))
+
 
+def build_product_context(sections: dict[str, dict[str, Any]]) -> ProductContextResponse:
+    """Flatten already-loaded wizard sections (section -> doc) into product context."""
     product_name = None
     description = None
     industry = None
@@ -0,0 +1,188 @@
+"""Quote selection for spec prompts — near-duplicate removal, diverse ordering, token budgets."""
+
+import hashlib
+import re
+from typing import Any, Callable
+
+_WORD = re.compile(r"[0-9a-z']+")
+_SHINGLE_SIZE = 3
+_NUM_PERM = 64
+_BANDS = 16  # 16 bands x 4 rows: pairs with Jaccard >= ~0.5 almost always collide
+_ROWS = _NUM_PERM // _BANDS
+_MERSENNE = (1 << 61) - 1
+# Fixed (a, b) pairs so signatures are stable across processes
+_PERMS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE or 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE,
+    )
+    for i in range(_NUM_PERM)
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting prompts."""
+    return (len(text) + 3) // 4
+
+
+def shingles(text: str, size: int = _SHINGLE_SIZE) -> set[str]:
+    """Word n-gram shingles of normalized text. Short texts fall back to single words."""
+    words = _WORD.findall((text or "").casefold())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(shingle_set: set[str]) -> tuple[int, ...]:
+    """MinHash signature of a shingle set. Empty sets get an all-max signature."""
+    if not shingle_set:
+        return (_MERSENNE,) * _NUM_PERM
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+        for s in shingle_set
+    ]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / _NUM_PERM
+
+
+def _candidate_pairs(signatures: list[tuple[int, ...]]) -> set[tuple[int, int]]:
+    """Index pairs that share at least one LSH band."""
+    pairs: set[tuple[int, int]] = set()
+    for band in range(_BANDS):
+        buckets: dict[tuple[int, ...], list[int]] = {}
+        for i, sig in enumerate(signatures):
+            buckets.setdefault(sig[band * _ROWS : (band + 1) * _ROWS], []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def dedupe_quotes(
+    quotes: list[dict[str, Any]],
+    threshold: float = 0.6,
+) -> tuple[list[dict[str, Any]], list[tuple[int, ...]]]:
+    """
+    Collapse near-identical quotes, keeping the first (most relevant) of each group.
+
+    Kept quotes get similar_count (other quotes folded in) and similar_ids;
+    counts a quote already carries from an earlier pass are preserved.
+    Returns (kept quotes, their signatures) in input order.
+    """
+    signatures = [minhash(shingles(q.get("text", ""))) for q in quotes]
+    parent = list(range(len(quotes)))
+
+    def _find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in sorted(_candidate_pairs(signatures)):
+        if similarity(signatures[i], signatures[j]) >= threshold:
+            ri, rj = _find(i), _find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    kept: list[dict[str, Any]] = []
+    kept_sigs: list[tuple[int, ...]] = []
+    by_root: dict[int, dict[str, Any]] = {}
+    for i, q in enumerate(quotes):
+        root = _find(i)
+        if root == i:
+            entry = {
+                **q,
+                "similar_count": q.get("similar_count", 0),
+                "similar_ids": list(q.get("similar_ids", [])),
+            }
+            by_root[i] = entry
+            kept.append(entry)
+            kept_sigs.append(signatures[i])
+        else:
+            rep = by_root[root]
+            rep["similar_count"] += 1 + q.get("similar_count", 0)
+            if q.get("id"):
+                rep["similar_ids"].append(q["id"])
+            rep["similar_ids"].extend(q.get("similar_ids", []))
+    return kept, kept_sigs
+
+
+def diverse_order(
+    quotes: list[dict[str, Any]],
+    signatures: list[tuple[int, ...]],
+    relevance_weight: float = 0.6,
+) -> list[dict[str, Any]]:
+    """
+    Order quotes by maximal marginal relevance.
+
+    Relevance is input rank plus a boost for quotes that absorbed duplicates
+    (widely reported). Each pick is penalized by its similarity to quotes
+    already picked and rewarded for a customer, product area or sentiment
+    not yet covered.
+    """
+    n = len(quotes)
+    if n <= 1:
+        return list(quotes)
+    max_similar = max(q.get("similar_count", 0) for q in quotes) or 1
+    relevance = [
+        0.7 * (1 - i / n) + 0.3 * (q.get("similar_count", 0) / max_similar)
+        for i, q in enumerate(quotes)
+    ]
+
+    remaining = list(range(n))
+    order: list[int] = []
+    seen: dict[str, set[Any]] = {"customer": set(), "area": set(), "sentiment": set()}
+    max_sim = [0.0] * n
+
+    while remaining:
+        best, best_score = remaining[0], float("-inf")
+        for i in remaining:
+            q = quotes[i]
+            novelty = (
+                (q.get("customer_id") or q.get("customer_name")) not in seen["customer"],
+                q.get("product_area") not in seen["area"],
+                q.get("sentiment") not in seen["sentiment"],
+            )
+            score = (
+                relevance_weight * relevance[i]
+                - (1 - relevance_weight) * max_sim[i]
+                + 0.15 * sum(novelty) / 3
+            )
+            if score > best_score:
+                best, best_score = i, score
+        remaining.remove(best)
+        order.append(best)
+        picked = quotes[best]
+        seen["customer"].add(picked.get("customer_id") or picked.get("customer_name"))
+        seen["area"].add(picked.get("product_area"))
+        seen["sentiment"].add(picked.get("sentiment"))
+        for i in remaining:
+            max_sim[i] = max(max_sim[i], similarity(signatures[i], signatures[best]))
+    return [quotes[i] for i in order]
+
+
+def fit_to_budget(
+    quotes: list[dict[str, Any]],
+    budget_tokens: int,
+    format_quote: Callable[[dict[str, Any]], str],
+) -> tuple[list[str], int]:
+    """
+    Take quotes in order while their formatted lines fit the token budget.
+    Quotes too long for the remaining budget are skipped, not truncated.
+    Returns (lines, tokens used).
+    """
+    lines: list[str] = []
+    used = 0
+    for q in quotes:
+        line = format_quote(q)
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget_tokens:
+            continue
+        lines.append(line)
+        used += cost
+    return lines, used
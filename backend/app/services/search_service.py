@@ -2,13 +2,11 @@
 
 from typing import Any
 
+from app.config import get_settings
 from app.es_client import get_es_client
-from app.models.feedback import (
-    FEEDBACK_MAPPING,
-    FEEDBACK_MAPPING_WITH_ELSER,
-    feedback_index,
-)
-from app.services.es_service import ensure_index_exists
+from app.models.feedback import feedback_index, feedback_mapping
+from app.services.es_service import ensure_index_exists, read_total, track_total_hits
+from app.services.feedback_partition_service import feedback_doc_index, feedback_search_index
 from app.services.feedback_service import get_feedback_item
 from app.services.elser_service import ensure_elser_deployed, is_elser_available
 from app.utils.logging import get_logger
@@ -20,8 +18,7 @@ def _ensure_feedback_index(org_id: str) -> str:
     """Ensure feedback index exists. Returns index name."""
     idx = feedback_index(org_id)
     ensure_elser_deployed(get_es_client())
-    mapping = FEEDBACK_MAPPING_WITH_ELSER if is_elser_available() else FEEDBACK_MAPPING
-    ensure_index_exists(idx, mapping)
+    ensure_index_exists(idx, feedback_mapping(is_elser_available(), get_settings().feedback_mapping_profile))
     return idx
 
 
@@ -84,12 +81,15 @@ def search_feedback(
     sort_by: str,
     page: int,
     page_size: int,
-) -> tuple[list[dict[str, Any]], int]:
+    exact_total: bool = False,
+) -> tuple[list[dict[str, Any]], int, bool]:
     """
     Hybrid search on feedback.
     Query non-empty: ELSER semantic + BM25 keyword (bool.should), sort by _score.
     Query empty: match_all + filters, sort by created_at desc.
     When ELSER unavailable: keyword-only fallback.
+    Returns (items, total, total_is_lower_bound); totals are counted up to
+    list_track_total_hits unless exact_total.
     """
     idx = _ensure_feedback_index(org_id)
     es = get_es_client()
@@ -141,18 +141,20 @@ def search_feedback(
         sort_clause = [{"sentiment_score": {"order": "asc"}}]  # Most negative first
 
     from_ = (page - 1) * page_size
+    filters = filters or {}
+    if filters.get("date_from"):
+        idx = feedback_search_index(org_id, filters["date_from"], filters.get("date_to"))
     resp = es.search(
         index=idx,
         query=main_query,
         from_=from_,
         size=page_size,
         sort=sort_clause,
+        track_total_hits=track_total_hits(exact_total),
     )
-    hits = resp.get("hits", {})
-    total = hits.get("total", {})
-    total_val = total.get("value", 0) if isinstance(total, dict) else total
-    items = [h["_source"] for h in hits.get("hits", [])]
-    return (items, total_val)
+    total_val, lower_bound = read_total(resp)
+    items = [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
+    return (items, total_val, lower_bound)
 
 
 def find_similar(
@@ -171,6 +173,7 @@ def find_similar(
         return []
 
     idx = _ensure_feedback_index(org_id)
+    like_idx = feedback_doc_index(org_id, source)
     es = get_es_client()
     text = (source.get("text") or "").strip()
     if not text:
@@ -208,7 +211,7 @@ def find_similar(
                         {
                             "more_like_this": {
                                 "fields": ["text"],
-                                "like": [{"_index": idx, "_id": feedback_id}],
+                                "like": [{"_index": like_idx, "_id": feedback_id}],
                                 "min_term_freq": 1,
                                 "max_query_terms": 12,
                             },
@@ -225,7 +228,7 @@ def find_similar(
                     {
                         "more_like_this": {
                             "fields": ["text"],
-                            "like": [{"_index": idx, "_id": feedback_id}],
+                            "like": [{"_index": like_idx, "_id": feedback_id}],
                             "min_term_freq": 1,
                             "max_query_terms": 12,
                         },
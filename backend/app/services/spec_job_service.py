@@ -0,0 +1,404 @@
+"""Background spec generation jobs — bounded worker pool, per-org limits, progress and token events."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+from app.config import get_settings
+from app.models.spec import specs_index
+from app.schemas.product import ProductContextResponse
+from app.services.es_service import index_document, update_document
+from app.services.product_service import get_product_context
+from app.services.spec_service import (
+    SPEC_DOCUMENTS,
+    build_spec_doc,
+    ensure_specs_index_exists,
+    failed_document,
+    gather_spec_inputs,
+    generate_documents,
+    generation_interrupted,
+    generation_timeout_seconds,
+    get_spec,
+    section_input_hashes,
+    stale_sections,
+)
+from app.utils.logging import get_logger
+from app.utils.sse import sse_event
+
+logger = get_logger(__name__)
+
+
+class SpecJobLimitError(ValueError):
+    """Raised when an org already has the maximum number of specs generating."""
+
+
+_INTERRUPTED = "Spec generation was interrupted. Regenerate the spec to try again."
+
+_executor: ThreadPoolExecutor | None = None
+_inflight: dict[str, int] = {}
+# Spec IDs submitted to the pool in this process that no worker has picked up yet
+_queued: set[str] = set()
+_lock = threading.Lock()
+# spec_id -> (event loop, queue) of SSE streams in this process listening for tokens
+_token_subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide spec worker pool."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, get_settings().spec_job_workers),
+                thread_name_prefix="spec-job",
+            )
+        return _executor
+
+
+def _acquire_slot(org_id: str) -> None:
+    """Reserve an in-flight slot for org. Raises SpecJobLimitError when full."""
+    limit = max(1, get_settings().spec_job_max_per_org)
+    with _lock:
+        if _inflight.get(org_id, 0) >= limit:
+            raise SpecJobLimitError(
+                f"Already generating {limit} specs. Wait for one to finish and try again."
+            )
+        _inflight[org_id] = _inflight.get(org_id, 0) + 1
+
+
+def _release_slot(org_id: str) -> None:
+    with _lock:
+        count = _inflight.get(org_id, 0) - 1
+        if count > 0:
+            _inflight[org_id] = count
+        else:
+            _inflight.pop(org_id, None)
+
+
+def _subscribe_tokens(spec_id: str) -> asyncio.Queue:
+    """Register the running loop for token events of spec_id."""
+    queue: asyncio.Queue = asyncio.Queue()
+    with _lock:
+        _token_subscribers.setdefault(spec_id, []).append((asyncio.get_running_loop(), queue))
+    return queue
+
+
+def _unsubscribe_tokens(spec_id: str, queue: asyncio.Queue) -> None:
+    with _lock:
+        subs = [s for s in _token_subscribers.get(spec_id, []) if s[1] is not queue]
+        if subs:
+            _token_subscribers[spec_id] = subs
+        else:
+            _token_subscribers.pop(spec_id, None)
+
+
+def _publish_token(spec_id: str, section: str, delta: str) -> None:
+    """Hand a text delta to every subscribed stream. Called from worker threads."""
+    with _lock:
+        subs = list(_token_subscribers.get(spec_id, ()))
+    for loop, queue in subs:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, {"section": section, "delta": delta})
+        except RuntimeError:
+            pass  # subscriber's loop already closed
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _run_spec_job(
+    org_id: str,
+    spec_id: str,
+    data_brief: dict[str, Any],
+    keep_previous: bool,
+    product_context: ProductContextResponse | None = None,
+    sections: tuple[str, ...] = SPEC_DOCUMENTS,
+    use_cache: bool = True,
+) -> None:
+    """
+    Worker body: stream the given sections, publishing tokens to subscribed
+    event streams and writing each section and its input hash to ES as it
+    finishes. Failed sections get a placeholder unless keep_previous
+    (regeneration). Product context is loaded here unless the caller already
+    has it.
+    """
+    idx = specs_index(org_id)
+    completed: list[str] = [s for s in SPEC_DOCUMENTS if s not in sections]
+    hashes: dict[str, str] = {}
+
+    def _on_token(section: str, delta: str) -> None:
+        _publish_token(spec_id, section, delta)
+
+    async def _on_section(section: str, text: str | None, error: str | None) -> None:
+        if text is None:
+            return
+        completed.append(section)
+        # Off the event loop, so other sections keep streaming during the write
+        await asyncio.to_thread(update_document, idx, spec_id, {
+            section: text,
+            "section_input_hashes": {section: hashes[section]},
+            "sections_completed": list(completed),
+            "updated_at": _now(),
+        })
+
+    try:
+        # The interruption timeout runs from here; job_interrupted skips queued specs
+        with _lock:
+            _queued.discard(spec_id)
+        update_document(idx, spec_id, {"updated_at": _now()})
+        if product_context is None:
+            product_context = get_product_context(org_id)
+        hashes.update(section_input_hashes(data_brief, product_context, sections))
+        _, errors = asyncio.run(
+            generate_documents(
+                data_brief,
+                product_context,
+                sections=sections,
+                on_section=_on_section,
+                on_token=_on_token,
+                use_cache=use_cache,
+            )
+        )
+        final: dict[str, Any] = {
+            "status": "draft",
+            "generation_errors": errors,
+            "updated_at": _now(),
+        }
+        if not keep_previous:
+            for section, error in errors.items():
+                final[section] = failed_document(section, error)
+        update_document(idx, spec_id, final)
+        logger.info("Spec job %s finished for org %s (%d failed sections)", spec_id[:8], org_id[:8], len(errors))
+    except Exception as e:
+        logger.error("Spec job %s failed for org %s: %s", spec_id[:8], org_id[:8], str(e))
+        try:
+            update_document(idx, spec_id, {
+                "status": "failed",
+                "error_message": str(e) or "Spec generation failed.",
+                "updated_at": _now(),
+            })
+        except Exception as write_err:
+            logger.error("Could not mark spec %s failed: %s", spec_id[:8], str(write_err))
+    finally:
+        _release_slot(org_id)
+
+
+def _submit(org_id: str, spec_id: str, data_brief: dict[str, Any], **options: Any) -> None:
+    """
+    Queue a reserved job on the worker pool; releases the slot if queuing fails.
+    options are passed to _run_spec_job.
+    """
+    with _lock:
+        _queued.add(spec_id)
+    try:
+        _get_executor().submit(_run_spec_job, org_id, spec_id, data_brief, **options)
+    except Exception:
+        with _lock:
+            _queued.discard(spec_id)
+        _release_slot(org_id)
+        raise
+
+
+def job_interrupted(doc: dict[str, Any]) -> bool:
+    """
+    generation_interrupted, except for specs still waiting for a worker in
+    this process: however long they have queued, their job has not started.
+    """
+    with _lock:
+        if doc.get("id") in _queued:
+            return False
+    return generation_interrupted(doc)
+
+
+def start_spec_generation(
+    org_id: str,
+    user_id: str,
+    topic: str,
+    product_area: str | None = None,
+) -> dict[str, Any]:
+    """
+    Gather data, save a spec in 'generating' status and queue LLM generation.
+
+    Returns the saved spec immediately. Raises ValueError when there is no
+    matching feedback and SpecJobLimitError when the org is at its limit.
+    """
+    _acquire_slot(org_id)
+    try:
+        data_brief, product_context = gather_spec_inputs(org_id, topic, product_area)
+        doc = build_spec_doc(org_id, user_id, topic, product_area, data_brief, status="generating")
+        doc["sections_completed"] = []
+        idx = ensure_specs_index_exists(org_id)
+        index_document(idx, doc["id"], doc)
+    except Exception:
+        _release_slot(org_id)
+        raise
+    _submit(org_id, doc["id"], data_brief, keep_previous=False, product_context=product_context)
+    logger.info("Queued spec %s for org %s", doc["id"][:8], org_id[:8])
+    return doc
+
+
+def start_spec_regeneration(org_id: str, spec_id: str, force: bool = False) -> dict[str, Any] | None:
+    """
+    Mark an existing spec 'generating' and queue regeneration from its data_brief.
+
+    Only sections whose inputs changed are regenerated; if none did, the spec
+    is returned unchanged. force=True regenerates all sections and bypasses
+    the completion cache. Sections that fail keep their previous content.
+    A spec whose job was interrupted (see job_interrupted) can be
+    regenerated. The returned spec lists sections_regenerated. Returns None
+    if not found.
+    """
+    doc = get_spec(org_id, spec_id)
+    if not doc:
+        return None
+    if job_interrupted(doc):
+        logger.warning("Spec %s was left generating by an interrupted job; restarting", spec_id[:8])
+    elif doc.get("status") == "generating":
+        raise ValueError("Spec is already being generated.")
+    data_brief = doc.get("data_brief")
+    if not data_brief:
+        raise ValueError("Spec has no data_brief; cannot regenerate.")
+
+    product_context = get_product_context(org_id)
+    hashes = section_input_hashes(data_brief, product_context)
+    sections = SPEC_DOCUMENTS if force else stale_sections(doc, hashes)
+    if not sections:
+        doc["sections_regenerated"] = []
+        return doc
+
+    _acquire_slot(org_id)
+    try:
+        partial = {
+            "status": "generating",
+            "sections_completed": [s for s in SPEC_DOCUMENTS if s not in sections],
+            "generation_errors": {},
+            "error_message": None,
+            "feedback_since_generation": 0,
+            "updated_at": _now(),
+        }
+        update_document(specs_index(org_id), spec_id, partial)
+        doc.update(partial)
+    except Exception:
+        _release_slot(org_id)
+        raise
+    _submit(
+        org_id,
+        spec_id,
+        data_brief,
+        keep_previous=True,
+        product_context=product_context,
+        sections=sections,
+        use_cache=not force,
+    )
+    logger.info(
+        "Queued regeneration of spec %s for org %s (sections: %s)", spec_id[:8], org_id[:8], ", ".join(sections)
+    )
+    doc["sections_regenerated"] = list(sections)
+    return doc
+
+
+def _interrupted_as_failed(doc: dict[str, Any]) -> dict[str, Any]:
+    """Report a spec whose job was interrupted as failed, so pollers and streams stop waiting."""
+    if not job_interrupted(doc):
+        return doc
+    return {**doc, "status": "failed", "error_message": doc.get("error_message") or _INTERRUPTED}
+
+
+def get_spec_status(org_id: str, spec_id: str) -> dict[str, Any] | None:
+    """Return generation status for polling, or None if not found."""
+    doc = get_spec(org_id, spec_id)
+    if not doc:
+        return None
+    doc = _interrupted_as_failed(doc)
+    completed = doc.get("sections_completed")
+    if completed is None:
+        completed = [s for s in SPEC_DOCUMENTS if doc.get(s)]
+    return {
+        "id": spec_id,
+        "status": doc.get("status"),
+        "sections_completed": completed,
+        "generation_errors": doc.get("generation_errors") or {},
+        "error_message": doc.get("error_message"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+async def spec_progress_events(
+    org_id: str,
+    spec_id: str,
+    poll_seconds: float | None = None,
+    max_seconds: float | None = None,
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for one spec: 'status' on connect, 'token' for each text
+    delta while a section streams, 'section' with the full text once it is
+    saved, and 'done' once the spec leaves 'generating'.
+
+    Progress comes from the spec doc in ES, so it works whichever worker runs
+    the job; tokens are only delivered when the job runs in this process.
+    """
+    settings = get_settings()
+    poll = poll_seconds if poll_seconds is not None else settings.spec_progress_poll_seconds
+    deadline = max_seconds if max_seconds is not None else generation_timeout_seconds()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent: set[str] = set()
+    first = True
+    tokens = _subscribe_tokens(spec_id)
+
+    try:
+        while True:
+            doc = await asyncio.to_thread(get_spec, org_id, spec_id)
+            if not doc:
+                yield sse_event("error", {"detail": "Not found"})
+                return
+            doc = _interrupted_as_failed(doc)
+            status = doc.get("status")
+            completed = doc.get("sections_completed")
+            if completed is None:
+                completed = [s for s in SPEC_DOCUMENTS if doc.get(s)] if status != "generating" else []
+            if first:
+                yield sse_event("status", {"id": spec_id, "status": status, "sections_completed": completed})
+                first = False
+            for section in completed:
+                if section not in sent:
+                    sent.add(section)
+                    yield sse_event("section", {"section": section, "content": doc.get(section) or ""})
+            if status != "generating":
+                yield sse_event("done", {
+                    "id": spec_id,
+                    "status": status,
+                    "generation_errors": doc.get("generation_errors") or {},
+                    "error_message": doc.get("error_message"),
+                })
+                return
+            if loop.time() - started > deadline:
+                yield sse_event("error", {"detail": "Timed out waiting for spec generation"})
+                return
+
+            next_poll = loop.time() + poll
+            forwarded = False
+            while True:
+                try:
+                    event = await asyncio.wait_for(tokens.get(), timeout=max(0.0, next_poll - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if event["section"] not in sent:
+                    forwarded = True
+                    yield sse_event("token", event)
+            if not forwarded:
+                yield ": keep-alive\n\n"
+    finally:
+        _unsubscribe_tokens(spec_id, tokens)
+
+
+def shutdown_spec_jobs(wait: bool = False) -> None:
+    """Stop accepting jobs. Called on app shutdown."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,260 @@
+"""Incremental spec refresh — fold feedback ingested since the last refresh into stored briefs."""
+
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from app.config import get_settings
+from app.es_client import get_es_client
+from app.models.spec import specs_index
+from app.models.user import ORGANIZATIONS_INDEX
+from app.models.feedback import feedback_index
+from app.services.es_service import scan_document_ids
+from app.services.spec_job_service import (
+    SpecJobLimitError,
+    job_interrupted,
+    start_spec_regeneration,
+)
+from app.services.spec_service import (
+    SPEC_DOCUMENTS,
+    customer_arr,
+    generation_timeout_seconds,
+    get_spec,
+    quote_feedback_ids,
+    select_quotes,
+    spec_feedback_search,
+)
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _threshold_crossed(feedback_count: int, pending: int) -> bool:
+    """
+    True when feedback added since the last generation is both at least
+    spec_refresh_min_new_feedback and at least spec_refresh_min_growth_ratio
+    of the feedback the spec was generated from.
+    """
+    settings = get_settings()
+    if pending <= 0:
+        return False
+    baseline = max(feedback_count - pending, 0)
+    return pending >= max(settings.spec_refresh_min_new_feedback, settings.spec_refresh_min_growth_ratio * baseline)
+
+
+def _merge_delta(
+    brief: dict[str, Any],
+    delta: dict[str, Any],
+    arr_by_customer: dict[str, float],
+) -> dict[str, Any]:
+    """Return a copy of brief with the delta's counts, customers, ARR and quotes folded in."""
+    hits = delta.get("hits", {})
+    new_hits = [h["_source"] for h in hits.get("hits", [])]
+    aggs = delta.get("aggregations", {})
+    known = set(brief.get("customer_ids") or [])
+    new_customers = [
+        b["key"] for b in aggs.get("customers", {}).get("buckets", []) if b["key"] not in known
+    ]
+
+    quotes, report = select_quotes(new_hits, existing_quotes=brief.get("feedback_quotes") or [])
+    merged = {
+        **brief,
+        "feedback_count": (brief.get("feedback_count") or 0) + hits.get("total", {}).get("value", len(new_hits)),
+        "customer_count": (brief.get("customer_count") or 0) + len(new_customers),
+        "customer_ids": list(brief.get("customer_ids") or []) + new_customers,
+        "total_arr": (brief.get("total_arr") or 0) + sum(arr_by_customer.get(c, 0.0) for c in new_customers),
+        "feedback_quotes": quotes,
+        "feedback_ids": quote_feedback_ids(quotes),
+        "quote_selection": report,
+        "data_freshness_date": max(
+            filter(None, [aggs.get("latest", {}).get("value_as_string"), brief.get("data_freshness_date")]),
+            default=None,
+        ),
+        "ingested_through": (
+            aggs.get("latest_ingested", {}).get("value_as_string") or brief.get("ingested_through")
+        ),
+    }
+    return merged
+
+
+def _refreshable_specs(org_id: str, limit: int) -> list[dict[str, Any]]:
+    """
+    Specs with a freshness date that are not generating (or whose generation
+    was interrupted), least recently refreshed first. Queued specs are left out
+    however stale their updated_at.
+    """
+    es = get_es_client()
+    interrupted = f"now-{int(generation_timeout_seconds())}s"
+    resp = es.search(
+        index=specs_index(org_id),
+        query={
+            "bool": {
+                "must": [{"term": {"org_id": org_id}}, {"exists": {"field": "data_freshness_date"}}],
+                "should": [
+                    {"bool": {"must_not": [{"term": {"status": "generating"}}]}},
+                    {"range": {"updated_at": {"lt": interrupted}}},
+                ],
+                "minimum_should_match": 1,
+            }
+        },
+        sort=[{"refreshed_at": {"order": "asc", "missing": "_first", "unmapped_type": "date"}}],
+        size=limit,
+        _source_excludes=list(SPEC_DOCUMENTS),
+        ignore_unavailable=True,
+    )
+    specs = [h["_source"] for h in resp.get("hits", {}).get("hits", [])]
+    return [s for s in specs if s.get("status") != "generating" or job_interrupted(s)]
+
+
+def _refresh_specs(org_id: str, specs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Refresh a batch of specs with one _msearch (one delta query per spec),
+    one mget for ARR of newly seen customers and one bulk update. Specs whose
+    accumulated new feedback crosses the threshold are queued for
+    regeneration of their stale sections. Returns per-spec results.
+    """
+    if not specs:
+        return []
+    es = get_es_client()
+    searches: list[dict[str, Any]] = []
+    for spec in specs:
+        brief = spec.get("data_brief") or {}
+        # All partitions: imported feedback lands in the month of its (old) created_at
+        searches.append({"index": feedback_index(org_id), "ignore_unavailable": True})
+        searches.append(spec_feedback_search(
+            org_id,
+            brief.get("topic") or spec.get("topic") or "",
+            brief.get("product_area"),
+            # Briefs from before the ingested_at watermark continue from their freshness date
+            since=brief.get("ingested_through") or spec.get("data_freshness_date"),
+        ))
+    responses = es.msearch(searches=searches)["responses"]
+
+    new_customer_ids: set[str] = set()
+    for spec, resp in zip(specs, responses):
+        if "error" in resp:
+            continue
+        known = set((spec.get("data_brief") or {}).get("customer_ids") or [])
+        for b in resp.get("aggregations", {}).get("customers", {}).get("buckets", []):
+            if b["key"] not in known:
+                new_customer_ids.add(b["key"])
+    arr_by_customer = customer_arr(org_id, sorted(new_customer_ids))
+
+    now = _now()
+    operations: list[dict[str, Any]] = []
+    results: list[dict[str, Any]] = []
+    to_regenerate: list[str] = []
+    for spec, resp in zip(specs, responses):
+        spec_id = spec["id"]
+        if "error" in resp:
+            logger.warning("Refresh query failed for spec %s: %s", spec_id[:8], resp["error"])
+            results.append({"spec_id": spec_id, "error": str(resp["error"])})
+            continue
+        brief = spec.get("data_brief") or {}
+        new_feedback = resp.get("hits", {}).get("total", {}).get("value", 0)
+        pending = (spec.get("feedback_since_generation") or 0) + new_feedback
+        update: dict[str, Any] = {"refreshed_at": now}
+        result = {"spec_id": spec_id, "new_feedback": new_feedback, "new_customers": 0}
+        if new_feedback:
+            merged = _merge_delta(brief, resp, arr_by_customer)
+            result["new_customers"] = merged["customer_count"] - (brief.get("customer_count") or 0)
+            update.update({
+                "data_brief": merged,
+                "feedback_count": merged["feedback_count"],
+                "customer_count": merged["customer_count"],
+                "total_arr": merged["total_arr"],
+                "feedback_ids": merged["feedback_ids"],
+                "customer_ids": merged["customer_ids"],
+                "data_freshness_date": merged["data_freshness_date"],
+                "feedback_since_generation": pending,
+            })
+            if _threshold_crossed(merged["feedback_count"], pending):
+                to_regenerate.append(spec_id)
+        result["feedback_since_generation"] = pending
+        result["regenerating"] = False
+        results.append(result)
+        operations.append({"update": {"_index": specs_index(org_id), "_id": spec_id}})
+        operations.append({"doc": update})
+
+    if operations:
+        resp = es.bulk(operations=operations, refresh=bool(to_regenerate))
+        if resp.get("errors"):
+            failed = [i["update"].get("_id") for i in resp.get("items", []) if i.get("update", {}).get("error")]
+            logger.warning("Spec refresh update failed for %d specs: %s", len(failed), failed[:5])
+            to_regenerate = [s for s in to_regenerate if s not in failed]
+
+    by_id = {r["spec_id"]: r for r in results}
+    for spec_id in to_regenerate:
+        try:
+            doc = start_spec_regeneration(org_id, spec_id)
+        except SpecJobLimitError:
+            # Stays pending; the next refresh retries once a slot is free
+            logger.info("Spec %s due for regeneration but org %s is at its job limit", spec_id[:8], org_id[:8])
+            continue
+        except ValueError as e:
+            logger.warning("Spec %s regeneration skipped: %s", spec_id[:8], str(e))
+            continue
+        by_id[spec_id]["regenerating"] = bool(doc and doc.get("sections_regenerated"))
+    return results
+
+
+def refresh_spec(org_id: str, spec_id: str) -> dict[str, Any] | None:
+    """
+    Fold feedback ingested since the spec's last refresh into its brief and
+    regenerate stale sections if the threshold is crossed. Returns refresh
+    stats, or None if not found. Raises ValueError if the spec cannot refresh.
+    """
+    doc = get_spec(org_id, spec_id)
+    if not doc:
+        return None
+    if doc.get("status") == "generating":
+        raise ValueError("Spec is already being generated.")
+    if not doc.get("data_brief") or not doc.get("data_freshness_date"):
+        raise ValueError("Spec has no data_freshness_date; regenerate it instead.")
+    return _refresh_specs(org_id, [doc])[0]
+
+
+def refresh_stale_specs(org_id: str, limit: int | None = None) -> dict[str, Any]:
+    """
+    Refresh up to limit specs of an org (least recently refreshed first).
+    Returns {"checked", "updated", "regenerating", "results"}.
+    """
+    limit = limit or get_settings().spec_refresh_batch_size
+    results = _refresh_specs(org_id, _refreshable_specs(org_id, limit))
+    summary = {
+        "checked": len(results),
+        "updated": sum(1 for r in results if r.get("new_feedback")),
+        "regenerating": sum(1 for r in results if r.get("regenerating")),
+        "results": results,
+    }
+    if summary["updated"]:
+        logger.info(
+            "Refreshed %d/%d specs for org %s (%d regenerating)",
+            summary["updated"], summary["checked"], org_id[:8], summary["regenerating"],
+        )
+    return summary
+
+
+def refresh_all_orgs() -> int:
+    """Run refresh_stale_specs for every org. Returns number of specs updated."""
+    updated = 0
+    for org_id in scan_document_ids(ORGANIZATIONS_INDEX, {"match_all": {}}):
+        try:
+            updated += refresh_stale_specs(org_id)["updated"]
+        except Exception as e:
+            logger.warning("Spec refresh failed for org %s: %s", org_id[:8], str(e))
+    return updated
+
+
+async def run_spec_refresh_loop(interval_seconds: float) -> None:
+    """Sweep all orgs every interval_seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(refresh_all_orgs)
+        except Exception as e:
+            logger.warning("Spec refresh sweep failed: %s", str(e))
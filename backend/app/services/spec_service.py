@@ -1,18 +1,23 @@
 """Spec generation service — gather data, call LLM, CRUD."""
 
+import asyncio
+import inspect
+import json
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable
 
 import httpx
 
 from app.config import get_settings
-from app.es_client import get_es_client
-from app.models.feedback import FEEDBACK_MAPPING, feedback_index
-from app.models.customer import CUSTOMERS_MAPPING, customers_index
+from app.es_client import create_async_es_client, get_es_client, get_es_http_target
+from app.http_client import create_async_http_client, get_http_client
+from app.models.feedback import feedback_index
+from app.models.customer import customers_index
+from app.models.product import product_context_index
 from app.models.spec import SPECS_MAPPING, specs_index
+from app.schemas.product import ProductContextResponse
 from app.services.auth_service import get_user_by_id
-from app.services.customer_service import get_customer
 from app.services.es_service import (
     delete_document,
     ensure_index_exists,
@@ -20,8 +25,20 @@ from app.services.es_service import (
     index_document,
     search_documents,
 )
-from app.services.product_service import get_all_wizard_sections, get_product_context
+from app.services.llm_cache_service import (
+    completion_cache_key,
+    get_cached_completion,
+    store_completion,
+)
+from app.services.product_service import build_product_context, get_product_context
+from app.services.quote_selection_service import (
+    dedupe_quotes,
+    diverse_order,
+    estimate_tokens,
+    fit_to_budget,
+)
 from app.utils.logging import get_logger
+from app.utils.sse import iter_sse
 
 logger = get_logger(__name__)
 
@@ -33,80 +50,133 @@ def ensure_specs_index_exists(org_id: str) -> str:
     return idx
 
 
-def _llm_completion(prompt: str, system_prompt: str | None = None) -> str:
+SPEC_DOCUMENTS = ("prd", "architecture", "rules", "plan")
+
+
+def _join_prompt(prompt: str, system_prompt: str | None) -> str:
+    """Prepend the system prompt; both backends take a single input string."""
+    if system_prompt:
+        return f"{system_prompt}\n\n---\n\n{prompt}"
+    return prompt
+
+
+def _parse_inference_text(resp: Any) -> str | None:
+    """Extract completion text from an ES Inference API response."""
+    # Handle ObjectApiResponse (dict-like)
+    data = resp if isinstance(resp, dict) else getattr(resp, "body", resp) or {}
+    text = None
+    if isinstance(data, dict):
+        # ES Inference completion API format: { "completion": [ { "result": "..." } ] }
+        completion_arr = data.get("completion", [])
+        if completion_arr and isinstance(completion_arr[0], dict):
+            text = completion_arr[0].get("result")
+        if not text:
+            # Legacy inference_results format
+            results = data.get("inference_results", [])
+            if results:
+                outputs = results[0].get("output", [])
+                if outputs:
+                    text = outputs[0].get("output_text")
+        if not text:
+            text = data.get("result") or data.get("output")
+    if isinstance(text, str) and text.strip():
+        return text.strip()
+    return None
+
+
+def _parse_converse_text(data: dict[str, Any]) -> str | None:
+    """Extract text from a Kibana converse response."""
+    for key in ("response", "output", "content", "text"):
+        val = data.get(key)
+        if isinstance(val, str) and val.strip():
+            return val.strip()
+    steps = data.get("steps", [])
+    if isinstance(steps, list) and steps:
+        last = steps[-1]
+        if isinstance(last, dict):
+            for k in ("content", "message", "output", "text"):
+                v = last.get(k)
+                if isinstance(v, str) and v.strip():
+                    return v.strip()
+    return None
+
+
+def _parse_stream_delta(data: dict[str, Any]) -> str:
+    """Extract the text delta from one inference _stream event."""
+    completion = data.get("completion") or []
+    if completion and isinstance(completion[0], dict):
+        return completion[0].get("delta") or ""
+    return ""
+
+
+def _kibana_converse_request(full_input: str) -> tuple[str, dict[str, str], dict[str, Any]]:
+    """Return (url, headers, payload) for the Kibana converse fallback."""
+    settings = get_settings()
+    url = f"{settings.kibana_url.rstrip('/')}/api/agent_builder/converse"
+    headers = {
+        "Authorization": f"ApiKey {settings.kibana_api_key}",
+        "kbn-xsrf": "true",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "input": full_input,
+        "agent_id": settings.agent_id,
+    }
+    return url, headers, payload
+
+
+def _cache_namespace() -> str:
+    """Model identity for cache keys: the inference endpoint, else the Kibana agent."""
+    settings = get_settings()
+    return settings.spec_inference_id or f"kibana:{settings.agent_id}"
+
+
+def _llm_completion(prompt: str, system_prompt: str | None = None, use_cache: bool = True) -> str:
     """
-    Call LLM for text completion.
+    Call LLM for text completion, through the completion cache unless use_cache=False.
     Preferred: ES Inference API. Fallback: Kibana converse (doc-only).
     """
+    namespace = _cache_namespace()
+    key = completion_cache_key(prompt, system_prompt, namespace)
+    if use_cache:
+        cached = get_cached_completion(key)
+        if cached:
+            return cached
+    text = _llm_completion_uncached(prompt, system_prompt)
+    store_completion(key, text, namespace)
+    return text
+
+
+def _llm_completion_uncached(prompt: str, system_prompt: str | None = None) -> str:
+    """Call the LLM backends directly."""
     settings = get_settings()
+    full_prompt = _join_prompt(prompt, system_prompt)
 
     # Try ES Inference API first (completion task type)
     if settings.spec_inference_id:
         try:
             es = get_es_client()
-            full_prompt = prompt
-            if system_prompt:
-                full_prompt = f"{system_prompt}\n\n---\n\n{prompt}"
             resp = es.inference.completion(
                 inference_id=settings.spec_inference_id,
                 input=full_prompt,
                 timeout="300s",
             )
-            # Handle ObjectApiResponse (dict-like)
-            data = resp if isinstance(resp, dict) else getattr(resp, "body", resp) or {}
-            text = None
-            if isinstance(data, dict):
-                # ES Inference completion API format: { "completion": [ { "result": "..." } ] }
-                completion_arr = data.get("completion", [])
-                if completion_arr and isinstance(completion_arr[0], dict):
-                    text = completion_arr[0].get("result")
-                if not text:
-                    # Legacy inference_results format
-                    results = data.get("inference_results", [])
-                    if results:
-                        outputs = results[0].get("output", [])
-                        if outputs:
-                            text = outputs[0].get("output_text")
-                if not text:
-                    text = data.get("result") or data.get("output")
-            if isinstance(text, str) and text.strip():
-                return text.strip()
+            text = _parse_inference_text(resp)
+            if text:
+                return text
         except Exception as e:
             logger.warning("ES Inference for spec failed, using Kibana fallback: %s", e)
 
     # Fallback: Kibana converse with strict doc-only prompt
     if settings.kibana_url and settings.kibana_api_key:
         try:
-            url = f"{settings.kibana_url.rstrip('/')}/api/agent_builder/converse"
-            headers = {
-                "Authorization": f"ApiKey {settings.kibana_api_key}",
-                "kbn-xsrf": "true",
-                "Content-Type": "application/json",
-            }
-            full_input = prompt
-            if system_prompt:
-                full_input = f"{system_prompt}\n\n---\n\n{prompt}"
-            payload = {
-                "input": full_input,
-                "agent_id": settings.agent_id,
-            }
-            with httpx.Client(timeout=120.0) as client:
-                resp = client.post(url, json=payload, headers=headers)
-                resp.raise_for_status()
-                data = resp.json()
-            # Extract text from converse response
-            for key in ("response", "output", "content", "text"):
-                val = data.get(key)
-                if isinstance(val, str) and val.strip():
-                    return val.strip()
-            steps = data.get("steps", [])
-            if isinstance(steps, list) and steps:
-                last = steps[-1]
-                if isinstance(last, dict):
-                    for k in ("content", "message", "output", "text"):
-                        v = last.get(k)
-                        if isinstance(v, str) and v.strip():
-                            return v.strip()
+            url, headers, payload = _kibana_converse_request(full_prompt)
+            resp = get_http_client().post(url, json=payload, headers=headers, timeout=120.0)
+            resp.raise_for_status()
+            data = resp.json()
+            text = _parse_converse_text(data)
+            if text:
+                return text
         except Exception as e:
             logger.error("Kibana converse for spec failed: %s", e)
             raise ValueError("Spec generation temporarily unavailable. Please try again.")
@@ -116,50 +186,296 @@ def _llm_completion(prompt: str, system_prompt: str | None = None) -> str:
     )
 
 
+class AsyncLLMClient:
+    """
+    Async counterpart of _llm_completion for concurrent spec generation.
+
+    Use as an async context manager; the ES and HTTP clients it opens are shared
+    by all completions issued inside the block. Completions go through the
+    completion cache unless use_cache=False.
+    """
+
+    def __init__(self, use_cache: bool = True) -> None:
+        settings = get_settings()
+        self.use_cache = use_cache
+        self.namespace = _cache_namespace()
+        self.inference_id = settings.spec_inference_id
+        self.kibana_enabled = bool(settings.kibana_url and settings.kibana_api_key)
+        self.streaming_enabled = bool(self.inference_id and settings.spec_streaming_enabled)
+        self._es: Any = None
+        self._http: httpx.AsyncClient | None = None
+        self._stream_target: tuple[str, dict[str, str]] | None = None
+
+    async def __aenter__(self) -> "AsyncLLMClient":
+        if self.inference_id:
+            self._es = create_async_es_client()
+        if self.streaming_enabled:
+            try:
+                self._stream_target = get_es_http_target()
+            except Exception as e:
+                logger.warning("Inference streaming unavailable: %s", e)
+        if self.kibana_enabled or self._stream_target:
+            self._http = create_async_http_client()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._es is not None:
+            await self._es.close()
+        if self._http is not None:
+            await self._http.aclose()
+
+    def cache_key(self, prompt: str, system_prompt: str | None = None) -> str:
+        return completion_cache_key(prompt, system_prompt, self.namespace)
+
+    async def _cached(self, key: str) -> str | None:
+        if not self.use_cache:
+            return None
+        return await asyncio.to_thread(get_cached_completion, key)
+
+    async def complete(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        timeout: float = 300.0,
+    ) -> str:
+        """Same backend order, caching and error semantics as _llm_completion."""
+        key = self.cache_key(prompt, system_prompt)
+        cached = await self._cached(key)
+        if cached:
+            return cached
+        text = await self._complete_uncached(prompt, system_prompt, timeout)
+        await asyncio.to_thread(store_completion, key, text, self.namespace)
+        return text
+
+    async def _complete_uncached(
+        self,
+        prompt: str,
+        system_prompt: str | None,
+        timeout: float,
+    ) -> str:
+        full_prompt = _join_prompt(prompt, system_prompt)
+
+        if self._es is not None:
+            try:
+                resp = await self._es.options(request_timeout=timeout).inference.completion(
+                    inference_id=self.inference_id,
+                    input=full_prompt,
+                    timeout=f"{int(timeout)}s",
+                )
+                text = _parse_inference_text(resp)
+                if text:
+                    return text
+            except Exception as e:
+                logger.warning("ES Inference for spec failed, using Kibana fallback: %s", e)
+
+        if self.kibana_enabled and self._http is not None:
+            try:
+                url, headers, payload = _kibana_converse_request(full_prompt)
+                resp = await self._http.post(url, json=payload, headers=headers, timeout=timeout)
+                resp.raise_for_status()
+                text = _parse_converse_text(resp.json())
+                if text:
+                    return text
+            except Exception as e:
+                logger.error("Kibana converse for spec failed: %s", e)
+                raise ValueError("Spec generation temporarily unavailable. Please try again.")
+
+        raise ValueError(
+            "Spec generation requires SPEC_INFERENCE_ID or KIBANA_URL + KIBANA_API_KEY."
+        )
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        timeout: float = 300.0,
+    ) -> AsyncIterator[str]:
+        """
+        Yield completion text as it is produced.
+
+        A cached completion is yielded in one piece. Otherwise uses the inference
+        _stream API when available; if streaming is off or fails before the
+        first token, yields the full completion once instead.
+        """
+        key = self.cache_key(prompt, system_prompt)
+        cached = await self._cached(key)
+        if cached:
+            yield cached
+            return
+
+        parts: list[str] = []
+        if self._stream_target is not None:
+            try:
+                async for delta in self._stream_inference(_join_prompt(prompt, system_prompt), timeout):
+                    parts.append(delta)
+                    yield delta
+            except Exception as e:
+                if parts:
+                    raise
+                logger.warning("Inference streaming for spec failed, using full completion: %s", e)
+        if not parts:
+            text = await self._complete_uncached(prompt, system_prompt, timeout)
+            parts.append(text)
+            yield text
+        await asyncio.to_thread(store_completion, key, "".join(parts).strip(), self.namespace)
+
+    async def _stream_inference(self, full_prompt: str, timeout: float) -> AsyncIterator[str]:
+        """POST _inference/completion/{id}/_stream and yield text deltas."""
+        base_url, headers = self._stream_target
+        url = f"{base_url}/_inference/completion/{self.inference_id}/_stream"
+        async with self._http.stream(
+            "POST",
+            url,
+            json={"input": full_prompt},
+            headers={**headers, "Accept": "text/event-stream"},
+            timeout=httpx.Timeout(timeout, connect=10.0),
+        ) as resp:
+            resp.raise_for_status()
+            async for event, data in iter_sse(resp.aiter_lines()):
+                if data == "[DONE]":
+                    return
+                payload = json.loads(data)
+                if event == "error" or "error" in payload:
+                    error = payload.get("error") or payload
+                    raise ValueError(str(error.get("reason") if isinstance(error, dict) else error))
+                delta = _parse_stream_delta(payload)
+                if delta:
+                    yield delta
+
+
+# Candidate quotes fetched per spec, quotes kept in the data_brief, and customer
+# IDs per terms bucket page, composite page and ARR mget
+_SPEC_FEEDBACK_HITS = 100
+_MAX_BRIEF_QUOTES = 40
+_MAX_SPEC_CUSTOMERS = 1000
+# Quote packing before diversity-aware selection, kept to report savings
+_BASELINE_QUOTES = 15
+
+
+def _quote_line(q: dict[str, Any]) -> str:
+    """One feedback quote as a prompt line with the IDs used for links."""
+    line = (
+        f"- feedback_id={q.get('id', '')} customer_id={q.get('customer_id', '') or ''} "
+        f"[{q.get('customer_name', 'Unknown')}] {q.get('text', '')[:200]}... "
+        f"(sentiment: {q.get('sentiment', 'neutral')})"
+    )
+    if q.get("similar_count"):
+        line += f" (+{q['similar_count']} similar)"
+    return line
+
+
+def _quotes_block(data_brief: dict[str, Any], section: str) -> str:
+    """Feedback quotes for one document, in selection order, within its token budget."""
+    budget = int(get_settings().spec_quote_token_budgets.get(section, 0))
+    if budget <= 0:
+        return ""
+    lines, _ = fit_to_budget(data_brief.get("feedback_quotes", []), budget, _quote_line)
+    return "\n".join(lines)
+
+
+def _quote_from_hit(h: dict[str, Any]) -> dict[str, Any] | None:
+    """Quote candidate from a feedback _source. None if it has no text."""
+    text = (h.get("text") or "").strip()
+    if not text:
+        return None
+    return {
+        "id": h.get("id"),
+        "customer_id": h.get("customer_id"),
+        "text": text[:500] + ("..." if len(text) > 500 else ""),
+        "customer_name": h.get("customer_name") or "Unknown",
+        "sentiment": h.get("sentiment") or "neutral",
+        "product_area": h.get("product_area"),
+    }
+
+
+def select_quotes(
+    feedback_hits: list[dict],
+    existing_quotes: list[dict[str, Any]] | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Dedupe near-identical feedback and order the rest for coverage across
+    customers, product areas and sentiment. existing_quotes (from a stored
+    brief) are ranked after the hits. Returns (quotes, selection report).
+    """
+    settings = get_settings()
+    candidates = [q for q in (_quote_from_hit(h) for h in feedback_hits) if q]
+    candidates.extend(existing_quotes or [])
+
+    kept, signatures = dedupe_quotes(candidates, threshold=settings.spec_quote_dedupe_threshold)
+    quotes = diverse_order(kept, signatures)[:_MAX_BRIEF_QUOTES]
+
+    budgets = {k: int(v) for k, v in settings.spec_quote_token_budgets.items()}
+    tokens = {
+        section: fit_to_budget(quotes, budget, _quote_line)[1]
+        for section, budget in budgets.items()
+        if budget > 0
+    }
+    baseline = sum(estimate_tokens(_quote_line(q)) + 1 for q in candidates[:_BASELINE_QUOTES])
+    report = {
+        "candidates": len(candidates),
+        "near_duplicates": len(candidates) - len(kept),
+        "kept": len(quotes),
+        "budgets": budgets,
+        "tokens": tokens,
+        "baseline_prd_tokens": baseline,
+        "prd_tokens_saved": baseline - tokens.get("prd", 0),
+    }
+    return quotes, report
+
+
+def quote_feedback_ids(quotes: list[dict[str, Any]]) -> list[str]:
+    """Feedback IDs behind the selected quotes, including folded near-duplicates."""
+    ids: list[str] = []
+    for q in quotes:
+        if q.get("id"):
+            ids.append(q["id"])
+        ids.extend(q.get("similar_ids", []))
+    return ids
+
+
 def _build_data_brief(
-    org_id: str,
     topic: str,
     product_area: str | None,
     feedback_hits: list[dict],
+    feedback_count: int,
     customer_ids: list[str],
+    customer_count: int,
     total_arr: float,
     data_freshness_date: str | None,
+    sections: dict[str, dict[str, Any]],
+    ingested_through: str | None = None,
 ) -> dict[str, Any]:
-    """Build data_brief for LLM prompts and regeneration."""
-    feedback_quotes = []
-    feedback_ids = []
-    for h in feedback_hits[:20]:
-        fid = h.get("id")
-        if fid:
-            feedback_ids.append(fid)
-        text = (h.get("text") or "").strip()
-        if not text:
-            continue
-        cust = h.get("customer_name") or "Unknown"
-        sentiment = h.get("sentiment") or "neutral"
-        feedback_quotes.append({
-            "id": fid,
-            "customer_id": h.get("customer_id"),
-            "text": text[:500] + ("..." if len(text) > 500 else ""),
-            "customer_name": cust,
-            "sentiment": sentiment,
-        })
-
-    product_context = get_all_wizard_sections(org_id)
-    goals = (product_context.get("goals", {}).get("data", {}).get("goals", [])) or []
-    roadmap = product_context.get("roadmap", {}).get("data", {}) or {}
-    teams = (product_context.get("teams", {}).get("data", {}).get("teams", [])) or []
-    tech = product_context.get("tech_stack", {}).get("data", {}).get("technologies", []) or []
+    """
+    Build data_brief for LLM prompts and regeneration. ingested_through (latest
+    ingested_at) is the watermark incremental refresh continues from.
+    """
+    feedback_quotes, quote_selection = select_quotes(feedback_hits)
+    feedback_ids = quote_feedback_ids(feedback_quotes)
+    logger.info(
+        "Quote selection for '%s': %d candidates, %d near-duplicates, PRD quotes %d tokens (saved %d)",
+        topic[:40],
+        quote_selection["candidates"],
+        quote_selection["near_duplicates"],
+        quote_selection["tokens"].get("prd", 0),
+        quote_selection["prd_tokens_saved"],
+    )
+
+    goals = (sections.get("goals", {}).get("data", {}).get("goals", [])) or []
+    roadmap = sections.get("roadmap", {}).get("data", {}) or {}
+    teams = (sections.get("teams", {}).get("data", {}).get("teams", [])) or []
+    tech = sections.get("tech_stack", {}).get("data", {}).get("technologies", []) or []
 
     return {
         "topic": topic,
         "product_area": product_area,
-        "feedback_count": len(feedback_hits),
-        "customer_count": len(customer_ids),
+        "feedback_count": feedback_count,
+        "customer_count": customer_count,
         "total_arr": total_arr,
         "data_freshness_date": data_freshness_date,
+        "ingested_through": ingested_through,
         "feedback_quotes": feedback_quotes,
         "feedback_ids": feedback_ids,
+        "quote_selection": quote_selection,
         "customer_ids": list(customer_ids),
         "goals": goals,
         "roadmap": roadmap,
@@ -168,60 +484,166 @@ def _build_data_brief(
     }
 
 
-def gather_spec_data(
+def customer_arr(org_id: str, customer_ids: list[str]) -> dict[str, float]:
+    """
+    ARR per customer for the given IDs (customers without ARR omitted), via
+    one mget per _MAX_SPEC_CUSTOMERS IDs.
+    """
+    if not customer_ids:
+        return {}
+    es = get_es_client()
+    arr: dict[str, float] = {}
+    for i in range(0, len(customer_ids), _MAX_SPEC_CUSTOMERS):
+        try:
+            resp = es.mget(
+                index=customers_index(org_id),
+                ids=customer_ids[i : i + _MAX_SPEC_CUSTOMERS],
+                _source=["org_id", "arr"],
+            )
+        except Exception as e:
+            logger.warning("ARR lookup failed for org %s: %s", org_id[:8], str(e))
+            return {}
+        for d in resp.get("docs", []):
+            src = d.get("_source") if d.get("found") else None
+            if src and src.get("org_id") == org_id and src.get("arr") is not None:
+                arr[d["_id"]] = float(src["arr"])
+    return arr
+
+
+def sum_customer_arr(org_id: str, customer_ids: list[str]) -> float:
+    """Sum ARR of the given customers (one mget per _MAX_SPEC_CUSTOMERS IDs)."""
+    return float(sum(customer_arr(org_id, customer_ids).values()))
+
+
+def spec_feedback_search(
     org_id: str,
     topic: str,
     product_area: str | None = None,
+    since: str | None = None,
 ) -> dict[str, Any]:
     """
-    Gather feedback, customers, ARR, product context for spec generation.
-    Returns data_brief dict. Raises ValueError if feedback_count == 0.
+    Search body for a spec's feedback: newest hits for quotes plus aggregations
+    over the full match set. since limits it to feedback ingested after a time
+    (imports keep their original created_at, so created_at can be older).
     """
-    idx = feedback_index(org_id)
-    ensure_index_exists(idx, FEEDBACK_MAPPING)
-    es = get_es_client()
-
-    must = [{"term": {"org_id": org_id}}, {"match": {"text": topic}}]
+    must: list[dict[str, Any]] = [{"term": {"org_id": org_id}}, {"match": {"text": topic}}]
     if product_area:
         must.append({"term": {"product_area": product_area}})
+    if since:
+        must.append({"range": {"ingested_at": {"gt": since}}})
+    return {
+        "query": {"bool": {"must": must}},
+        "size": _SPEC_FEEDBACK_HITS,
+        "sort": [{"created_at": {"order": "desc"}}],
+        "_source": ["id", "text", "customer_id", "customer_name", "sentiment", "product_area", "created_at"],
+        "track_total_hits": True,
+        "aggs": {
+            "customer_count": {"cardinality": {"field": "customer_id"}},
+            "customers": {"terms": {"field": "customer_id", "size": _MAX_SPEC_CUSTOMERS}},
+            "latest": {"max": {"field": "created_at"}},
+            "latest_ingested": {"max": {"field": "ingested_at"}},
+        },
+    }
 
-    resp = es.search(
-        index=idx,
-        query={"bool": {"must": must}},
-        size=100,
-        sort=[{"created_at": {"order": "desc"}}],
-        _source=["id", "text", "customer_id", "customer_name", "sentiment", "product_area", "created_at"],
-    )
-    hits = resp.get("hits", {}).get("hits", [])
-    feedback_hits = [h["_source"] for h in hits]
 
+def _all_spec_customer_ids(es: Any, org_id: str, query: dict[str, Any]) -> list[str]:
+    """Every customer_id of a spec's feedback, paged with a composite aggregation."""
+    ids: list[str] = []
+    after: dict[str, Any] | None = None
+    while True:
+        composite: dict[str, Any] = {
+            "size": _MAX_SPEC_CUSTOMERS,
+            "sources": [{"customer_id": {"terms": {"field": "customer_id"}}}],
+        }
+        if after:
+            composite["after"] = after
+        resp = es.search(
+            index=feedback_index(org_id),
+            query=query,
+            size=0,
+            aggs={"customers": {"composite": composite}},
+            ignore_unavailable=True,
+        )
+        agg = resp.get("aggregations", {}).get("customers", {})
+        ids.extend(b["key"]["customer_id"] for b in agg.get("buckets", []))
+        after = agg.get("after_key")
+        if not after or not agg.get("buckets"):
+            return ids
+
+
+def gather_spec_inputs(
+    org_id: str,
+    topic: str,
+    product_area: str | None = None,
+) -> tuple[dict[str, Any], ProductContextResponse]:
+    """
+    Gather the data_brief and product context for spec generation.
+
+    One _msearch returns the most recent matching feedback, aggregations over
+    the full match set (count, unique customers, latest date) and the wizard
+    sections; one mget sums customer ARR. Topics with more than
+    _MAX_SPEC_CUSTOMERS customers page the rest with a composite aggregation,
+    so total_arr covers every customer. Raises ValueError if nothing matches.
+    """
+    es = get_es_client()
+    search = spec_feedback_search(org_id, topic, product_area)
+    resp = es.msearch(searches=[
+        {"index": feedback_index(org_id), "ignore_unavailable": True},
+        search,
+        {"index": product_context_index(org_id), "ignore_unavailable": True},
+        {"query": {"term": {"org_id": org_id}}, "size": 100},
+    ])
+    fb_resp, pc_resp = resp["responses"]
+    if "error" in fb_resp:
+        raise RuntimeError(f"Feedback search failed: {fb_resp['error']}")
+
+    hits = fb_resp.get("hits", {})
+    feedback_hits = [h["_source"] for h in hits.get("hits", [])]
     if not feedback_hits:
         raise ValueError("Not enough feedback to generate specs for this topic.")
 
-    customer_ids = list({h.get("customer_id") for h in feedback_hits if h.get("customer_id")})
-    total_arr = 0.0
-    cust_idx = customers_index(org_id)
-    ensure_index_exists(cust_idx, CUSTOMERS_MAPPING)
-    for cid in customer_ids:
-        cust = get_customer(org_id, cid) if cid else None
-        if cust and cust.get("arr") is not None:
-            total_arr += float(cust["arr"])
-
-    max_created = max(
-        (h.get("created_at") for h in feedback_hits if h.get("created_at")),
-        default=None,
-    )
-    data_freshness_date = max_created
-
-    return _build_data_brief(
-        org_id,
+    aggs = fb_resp.get("aggregations", {})
+    feedback_count = hits.get("total", {}).get("value", len(feedback_hits))
+    customers = aggs.get("customers", {})
+    customer_ids = [b["key"] for b in customers.get("buckets", [])]
+    if customers.get("sum_other_doc_count"):
+        customer_ids = _all_spec_customer_ids(es, org_id, search["query"])
+    customer_count = max(aggs.get("customer_count", {}).get("value") or 0, len(customer_ids))
+    data_freshness_date = aggs.get("latest", {}).get("value_as_string") or feedback_hits[0].get("created_at")
+
+    sections: dict[str, dict[str, Any]] = {}
+    if "error" in pc_resp:
+        logger.warning("Product context lookup failed for org %s: %s", org_id[:8], pc_resp["error"])
+    for h in pc_resp.get("hits", {}).get("hits", []):
+        sec = h["_source"].get("section")
+        if sec:
+            sections[sec] = h["_source"]
+
+    data_brief = _build_data_brief(
         topic,
         product_area,
         feedback_hits,
+        feedback_count,
         customer_ids,
-        total_arr,
+        customer_count,
+        sum_customer_arr(org_id, customer_ids),
         data_freshness_date,
+        sections,
+        ingested_through=aggs.get("latest_ingested", {}).get("value_as_string"),
     )
+    return data_brief, build_product_context(sections)
+
+
+def gather_spec_data(
+    org_id: str,
+    topic: str,
+    product_area: str | None = None,
+) -> dict[str, Any]:
+    """
+    Gather feedback, customers, ARR, product context for spec generation.
+    Returns data_brief dict. Raises ValueError if feedback_count == 0.
+    """
+    return gather_spec_inputs(org_id, topic, product_area)[0]
 
 
 def _format_product_context(pc: Any) -> str:
@@ -274,12 +696,15 @@ def _format_product_context(pc: Any) -> str:
     return "\n".join(parts) if parts else "No product context available."
 
 
-def generate_prd(data_brief: dict[str, Any], product_context: Any) -> str:
-    """Generate PRD markdown via LLM."""
-    quotes_text = "\n".join(
-        f"- feedback_id={q.get('id', '')} customer_id={q.get('customer_id', '') or ''} [{q.get('customer_name', 'Unknown')}] {q.get('text', '')[:200]}... (sentiment: {q.get('sentiment', 'neutral')})"
-        for q in data_brief.get("feedback_quotes", [])[:15]
-    )
+def _feedback_section(data_brief: dict[str, Any], section: str) -> str:
+    """Optional '## Customer Feedback' block for documents with a quote budget."""
+    quotes_text = _quotes_block(data_brief, section)
+    return f"\n## Customer Feedback\n{quotes_text}\n" if quotes_text else ""
+
+
+def _prd_prompt(data_brief: dict[str, Any], product_context: Any) -> tuple[str, str]:
+    """Return (prompt, system_prompt) for the PRD."""
+    quotes_text = _quotes_block(data_brief, "prd")
     pc_text = _format_product_context(product_context)
     arr = data_brief.get("total_arr") or 0
     prompt = f"""Generate a PRD for: {data_brief.get('topic', 'unknown topic')}
@@ -310,14 +735,11 @@ Based on {data_brief.get('feedback_count', 0)} customer feedback items affecting
 - For feedback quotes use markdown links: [quote text](/feedback?id=FEEDBACK_ID)
 - Use the feedback_id and customer_id from the Data Available section when creating links
 """
-    return _llm_completion(
-        prompt,
-        system_prompt="You are a senior product/engineering writer. Output only valid markdown. No preamble.",
-    )
+    return prompt, "You are a senior product/engineering writer. Output only valid markdown. No preamble."
 
 
-def generate_architecture(data_brief: dict[str, Any], product_context: Any) -> str:
-    """Generate Architecture markdown via LLM."""
+def _architecture_prompt(data_brief: dict[str, Any], product_context: Any) -> tuple[str, str]:
+    """Return (prompt, system_prompt) for the Architecture doc."""
     pc_text = _format_product_context(product_context)
     prompt = f"""Generate an Architecture doc for: {data_brief.get('topic', 'unknown topic')}
 
@@ -333,15 +755,12 @@ def generate_architecture(data_brief: dict[str, Any], product_context: Any) -> s
 
 ## Context
 Current tech stack and architecture: {pc_text}
-"""
-    return _llm_completion(
-        prompt,
-        system_prompt="You are a senior engineer. Output only valid markdown. No preamble.",
-    )
+{_feedback_section(data_brief, "architecture")}"""
+    return prompt, "You are a senior engineer. Output only valid markdown. No preamble."
 
 
-def generate_rules(data_brief: dict[str, Any], product_context: Any) -> str:
-    """Generate Engineering Rules markdown via LLM."""
+def _rules_prompt(data_brief: dict[str, Any], product_context: Any) -> tuple[str, str]:
+    """Return (prompt, system_prompt) for the Engineering Rules."""
     prompt = f"""Generate Engineering Rules for: {data_brief.get('topic', 'unknown topic')}
 
 ## Structure
@@ -353,15 +772,12 @@ def generate_rules(data_brief: dict[str, Any], product_context: Any) -> str:
 6. Edge Cases — From real feedback
 7. Accessibility Requirements
 8. Documentation Requirements
-"""
-    return _llm_completion(
-        prompt,
-        system_prompt="You are a senior engineer. Output only valid markdown. No preamble.",
-    )
+{_feedback_section(data_brief, "rules")}"""
+    return prompt, "You are a senior engineer. Output only valid markdown. No preamble."
 
 
-def generate_plan(data_brief: dict[str, Any], product_context: Any) -> str:
-    """Generate Implementation Plan markdown via LLM."""
+def _plan_prompt(data_brief: dict[str, Any], product_context: Any) -> tuple[str, str]:
+    """Return (prompt, system_prompt) for the Implementation Plan."""
     pc_text = _format_product_context(product_context)
     prompt = f"""Generate an Implementation Plan for: {data_brief.get('topic', 'unknown topic')}
 
@@ -377,49 +793,194 @@ def generate_plan(data_brief: dict[str, Any], product_context: Any) -> str:
 
 ## Product Context
 {pc_text}
-"""
-    return _llm_completion(
-        prompt,
-        system_prompt="You are a senior engineering lead. Output only valid markdown. No preamble.",
+{_feedback_section(data_brief, "plan")}"""
+    return prompt, "You are a senior engineering lead. Output only valid markdown. No preamble."
+
+
+_PROMPT_BUILDERS = {
+    "prd": _prd_prompt,
+    "architecture": _architecture_prompt,
+    "rules": _rules_prompt,
+    "plan": _plan_prompt,
+}
+
+
+def generate_prd(data_brief: dict[str, Any], product_context: Any) -> str:
+    """Generate PRD markdown via LLM."""
+    prompt, system_prompt = _prd_prompt(data_brief, product_context)
+    return _llm_completion(prompt, system_prompt=system_prompt)
+
+
+def generate_architecture(data_brief: dict[str, Any], product_context: Any) -> str:
+    """Generate Architecture markdown via LLM."""
+    prompt, system_prompt = _architecture_prompt(data_brief, product_context)
+    return _llm_completion(prompt, system_prompt=system_prompt)
+
+
+def generate_rules(data_brief: dict[str, Any], product_context: Any) -> str:
+    """Generate Engineering Rules markdown via LLM."""
+    prompt, system_prompt = _rules_prompt(data_brief, product_context)
+    return _llm_completion(prompt, system_prompt=system_prompt)
+
+
+def generate_plan(data_brief: dict[str, Any], product_context: Any) -> str:
+    """Generate Implementation Plan markdown via LLM."""
+    prompt, system_prompt = _plan_prompt(data_brief, product_context)
+    return _llm_completion(prompt, system_prompt=system_prompt)
+
+
+def _error_message(exc: BaseException) -> str:
+    """Short, user-facing reason for a failed section."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "Timed out"
+    return str(exc) or type(exc).__name__
+
+
+def section_input_hashes(
+    data_brief: dict[str, Any],
+    product_context: Any,
+    sections: tuple[str, ...] = SPEC_DOCUMENTS,
+) -> dict[str, str]:
+    """
+    Fingerprint of each section's inputs: the cache key of its prompt, system
+    prompt and model. A section is stale when its stored hash differs.
+    """
+    namespace = _cache_namespace()
+    hashes = {}
+    for section in sections:
+        prompt, system_prompt = _PROMPT_BUILDERS[section](data_brief, product_context)
+        hashes[section] = completion_cache_key(prompt, system_prompt, namespace)
+    return hashes
+
+
+def stale_sections(doc: dict[str, Any], hashes: dict[str, str]) -> tuple[str, ...]:
+    """Sections whose inputs changed since they were generated, that are empty, or that failed."""
+    stored = doc.get("section_input_hashes") or {}
+    failed = doc.get("generation_errors") or {}
+    return tuple(
+        s for s in SPEC_DOCUMENTS
+        if stored.get(s) != hashes.get(s) or not doc.get(s) or s in failed
     )
 
 
-def generate_specs(
+async def generate_documents(
+    data_brief: dict[str, Any],
+    product_context: Any,
+    sections: tuple[str, ...] = SPEC_DOCUMENTS,
+    on_section: Callable[[str, str | None, str | None], Awaitable[None] | None] | None = None,
+    on_token: Callable[[str, str], None] | None = None,
+    use_cache: bool = True,
+) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    Generate spec documents concurrently, each under its own timeout.
+
+    Returns (documents, errors) keyed by section. A failed or timed-out section
+    only appears in errors. on_section(section, text, error) is called (and
+    awaited, if it is a coroutine function) as each section finishes. With on_token(section, delta), sections are streamed and
+    each text delta is reported as it arrives. use_cache=False bypasses the
+    completion cache. Raises ValueError if every section failed.
+    """
+    timeouts = get_settings().spec_document_timeouts
+
+    async def _report_section(section: str, text: str | None, error: str | None) -> None:
+        if on_section:
+            result = on_section(section, text, error)
+            if inspect.isawaitable(result):
+                await result
+
+    async with AsyncLLMClient(use_cache=use_cache) as llm:
+
+        async def _stream(section: str, prompt: str, system_prompt: str, timeout: float) -> str:
+            parts: list[str] = []
+            async for delta in llm.stream(prompt, system_prompt=system_prompt, timeout=timeout):
+                parts.append(delta)
+                on_token(section, delta)
+            text = "".join(parts).strip()
+            if not text:
+                raise ValueError("Empty completion")
+            return text
+
+        async def _generate(section: str) -> str:
+            prompt, system_prompt = _PROMPT_BUILDERS[section](data_brief, product_context)
+            timeout = float(timeouts.get(section, 300.0))
+            if on_token:
+                call = _stream(section, prompt, system_prompt, timeout)
+            else:
+                call = llm.complete(prompt, system_prompt=system_prompt, timeout=timeout)
+            try:
+                text = await asyncio.wait_for(call, timeout=timeout)
+            except Exception as e:
+                await _report_section(section, None, _error_message(e))
+                raise
+            await _report_section(section, text, None)
+            return text
+
+        results = await asyncio.gather(
+            *(_generate(section) for section in sections),
+            return_exceptions=True,
+        )
+
+    documents: dict[str, str] = {}
+    errors: dict[str, str] = {}
+    for section, result in zip(sections, results):
+        if isinstance(result, BaseException):
+            errors[section] = _error_message(result)
+            logger.warning("Spec %s generation failed: %s", section, errors[section])
+        else:
+            documents[section] = result
+    if sections and not documents:
+        raise ValueError(next(iter(errors.values()), "Spec generation failed."))
+    return documents, errors
+
+
+def failed_document(section: str, error: str) -> str:
+    """Placeholder markdown for a section that could not be generated."""
+    return f"_This document could not be generated ({error}). Regenerate the spec to retry._"
+
+
+def build_spec_doc(
     org_id: str,
     user_id: str,
     topic: str,
-    product_area: str | None = None,
+    product_area: str | None,
+    data_brief: dict[str, Any],
+    documents: dict[str, str] | None = None,
+    errors: dict[str, str] | None = None,
+    status: str = "draft",
+    input_hashes: dict[str, str] | None = None,
 ) -> dict[str, Any]:
     """
-    Full pipeline: gather data → 4 LLM calls → save.
-    Returns saved spec document.
+    Build a new spec document from data_brief and generated sections.
+    Failed sections get a placeholder; with status="generating" they start empty.
+    input_hashes are recorded for the sections in documents.
     """
-    data_brief = gather_spec_data(org_id, topic, product_area)
-    product_context = get_product_context(org_id)
-
-    prd = generate_prd(data_brief, product_context)
-    architecture = generate_architecture(data_brief, product_context)
-    rules = generate_rules(data_brief, product_context)
-    plan = generate_plan(data_brief, product_context)
-
+    documents = documents or {}
+    errors = errors or {}
+    input_hashes = input_hashes or {}
     user = get_user_by_id(user_id)
     generated_by_name = (user.get("full_name") or user.get("email") or "Unknown") if user else "Unknown"
 
     title = (topic[:80] + "..." if len(topic) > 80 else topic).title()
-    spec_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat() + "Z"
+    sections = {}
+    for section in SPEC_DOCUMENTS:
+        if section in documents:
+            sections[section] = documents[section]
+        elif status == "generating":
+            sections[section] = ""
+        else:
+            sections[section] = failed_document(section, errors.get(section, "unknown error"))
 
-    doc = {
-        "id": spec_id,
+    return {
+        "id": str(uuid.uuid4()),
         "org_id": org_id,
         "title": title,
         "topic": topic,
         "product_area": product_area,
-        "status": "draft",
-        "prd": prd,
-        "architecture": architecture,
-        "rules": rules,
-        "plan": plan,
+        "status": status,
+        **sections,
+        "generation_errors": errors,
+        "section_input_hashes": {k: v for k, v in input_hashes.items() if k in documents},
         "feedback_count": data_brief.get("feedback_count", 0),
         "customer_count": data_brief.get("customer_count", 0),
         "total_arr": data_brief.get("total_arr", 0),
@@ -433,9 +994,33 @@ def generate_specs(
         "created_at": now,
         "updated_at": now,
     }
+
+
+def generate_specs(
+    org_id: str,
+    user_id: str,
+    topic: str,
+    product_area: str | None = None,
+) -> dict[str, Any]:
+    """
+    Full pipeline: gather data → 4 concurrent LLM calls → save.
+    Returns saved spec document. Sections that fail are saved as placeholders
+    and listed in generation_errors.
+
+    Blocks until all sections finish; the API uses spec_job_service instead.
+    Must be called from a thread without a running event loop.
+    """
+    data_brief, product_context = gather_spec_inputs(org_id, topic, product_area)
+    hashes = section_input_hashes(data_brief, product_context)
+
+    documents, errors = asyncio.run(generate_documents(data_brief, product_context))
+
+    doc = build_spec_doc(
+        org_id, user_id, topic, product_area, data_brief, documents, errors, input_hashes=hashes
+    )
     idx = ensure_specs_index_exists(org_id)
-    index_document(idx, spec_id, doc)
-    logger.info("Generated spec %s for org %s", spec_id[:8], org_id[:8])
+    index_document(idx, doc["id"], doc)
+    logger.info("Generated spec %s for org %s", doc["id"][:8], org_id[:8])
     return doc
 
 
@@ -447,6 +1032,25 @@ def save_spec(org_id: str, spec_data: dict[str, Any]) -> dict[str, Any]:
     return spec_data
 
 
+def generation_timeout_seconds() -> float:
+    """Longest a generation job can run: the slowest section's timeout plus slack for ES writes."""
+    return max(get_settings().spec_document_timeouts.values(), default=300.0) + 120.0
+
+
+def generation_interrupted(doc: dict[str, Any]) -> bool:
+    """
+    True for a spec still 'generating' whose updated_at is older than any job
+    can run: its worker crashed or was restarted, so it will never finish.
+    """
+    if doc.get("status") != "generating":
+        return False
+    try:
+        updated = datetime.fromisoformat(str(doc.get("updated_at") or "").rstrip("Z"))
+    except ValueError:
+        return False
+    return (datetime.utcnow() - updated).total_seconds() > generation_timeout_seconds()
+
+
 def get_spec(org_id: str, spec_id: str) -> dict[str, Any] | None:
     """Get single spec. Returns None if not found or wrong org."""
     idx = specs_index(org_id)
@@ -521,8 +1125,20 @@ def delete_spec(org_id: str, spec_id: str) -> bool:
     return delete_document(idx, spec_id)
 
 
-def regenerate_spec(org_id: str, spec_id: str, user_id: str) -> dict[str, Any] | None:
-    """Regenerate 4 docs from saved data_brief. Sets status=draft. Returns updated spec."""
+def regenerate_spec(
+    org_id: str,
+    spec_id: str,
+    user_id: str,
+    force: bool = False,
+) -> dict[str, Any] | None:
+    """
+    Regenerate docs concurrently from saved data_brief. Sets status=draft.
+
+    Only sections whose inputs changed (see stale_sections) are regenerated;
+    force=True regenerates all four and bypasses the completion cache.
+    Sections that fail keep their previous content and are listed in
+    generation_errors. Returns updated spec with sections_regenerated.
+    """
     doc = get_spec(org_id, spec_id)
     if not doc:
         return None
@@ -531,20 +1147,33 @@ def regenerate_spec(org_id: str, spec_id: str, user_id: str) -> dict[str, Any] |
         raise ValueError("Spec has no data_brief; cannot regenerate.")
 
     product_context = get_product_context(org_id)
-    prd = generate_prd(data_brief, product_context)
-    architecture = generate_architecture(data_brief, product_context)
-    rules = generate_rules(data_brief, product_context)
-    plan = generate_plan(data_brief, product_context)
+    hashes = section_input_hashes(data_brief, product_context)
+    sections = SPEC_DOCUMENTS if force else stale_sections(doc, hashes)
+    if not sections:
+        doc["sections_regenerated"] = []
+        return doc
+
+    documents, errors = asyncio.run(
+        generate_documents(data_brief, product_context, sections=sections, use_cache=not force)
+    )
 
     now = datetime.utcnow().isoformat() + "Z"
-    doc["prd"] = prd
-    doc["architecture"] = architecture
-    doc["rules"] = rules
-    doc["plan"] = plan
+    stored_hashes = dict(doc.get("section_input_hashes") or {})
+    for section in sections:
+        if section in documents:
+            doc[section] = documents[section]
+            stored_hashes[section] = hashes[section]
+        elif not doc.get(section):
+            doc[section] = failed_document(section, errors.get(section, "unknown error"))
+    doc["section_input_hashes"] = stored_hashes
+    doc["generation_errors"] = errors
     doc["status"] = "draft"
     doc["updated_at"] = now
 
     idx = specs_index(org_id)
     index_document(idx, spec_id, doc)
-    logger.info("Regenerated spec %s for org %s", spec_id[:8], org_id[:8])
+    logger.info(
+        "Regenerated spec %s for org %s (sections: %s)", spec_id[:8], org_id[:8], ", ".join(sections)
+    )
+    doc["sections_regenerated"] = list(sections)
     return doc
@@ -0,0 +1,101 @@
+"""Move per-org indices into shared multi-tenant indices behind filtered aliases."""
+
+from typing import Any
+
+from app.es_client import get_es_client
+from app.models.user import ORGANIZATIONS_INDEX
+from app.services.es_service import (
+    TENANT_INDEX_TYPES,
+    ensure_shared_index,
+    resolve_index,
+    search_document_ids,
+    shared_index,
+    tenant_alias_body,
+)
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Wizard sections use the section name as id; shared indices need org-unique ids
+# (see es_service.tenant_doc_id)
+_PREFIX_ID_TYPES = {"product-context"}
+
+
+def _reindex_script(data_type: str) -> str:
+    script = "ctx._source.org_id = params.org_id;"
+    if data_type in _PREFIX_ID_TYPES:
+        script += " ctx._id = params.org_id + ':' + ctx._id;"
+    return script
+
+
+def migrate_org_index(org_id: str, data_type: str, dry_run: bool = False) -> dict[str, Any]:
+    """
+    Copy {org_id}-{data_type} into the shared index and replace it with a
+    filtered, routed alias of the same name.
+
+    The copy is verified by count before the index is swapped for the alias in
+    one atomic update_aliases call. Writes to the org during the copy are not
+    carried over, so run it while the org is idle. Returns
+    {"index", "status", "docs"} where status is missing, already_shared,
+    unsupported (an alias over several indices, e.g. feedback partitions),
+    would_migrate, migrated or count_mismatch.
+    """
+    es = get_es_client()
+    alias = f"{org_id}-{data_type}"
+    result: dict[str, Any] = {"index": alias, "docs": 0}
+    resolved = resolve_index(alias)
+    if not resolved:
+        return {**result, "status": "missing"}
+    if resolved["filtered"] or resolved["indices"] == [shared_index(data_type)]:
+        return {**result, "status": "already_shared"}
+    if len(resolved["indices"]) != 1:
+        return {**result, "status": "unsupported"}
+    # The alias itself, or the versioned index a mapping migration put behind it
+    src = resolved["indices"][0]
+
+    docs = es.count(index=src)["count"]
+    result["docs"] = docs
+    if dry_run:
+        return {**result, "status": "would_migrate"}
+
+    mapping = es.indices.get_mapping(index=src)[src]["mappings"]
+    dest = ensure_shared_index(data_type, {"mappings": mapping})
+    if mapping.get("properties"):
+        es.indices.put_mapping(index=dest, properties=mapping["properties"])
+
+    if docs:
+        es.reindex(
+            source={"index": src},
+            dest={"index": dest, "routing": f"={org_id}"},
+            script={"source": _reindex_script(data_type), "params": {"org_id": org_id}},
+            refresh=True,
+            wait_for_completion=True,
+        )
+    copied = es.count(index=dest, query={"term": {"org_id": org_id}}, routing=org_id)["count"]
+    if copied < docs:
+        logger.warning("Migration of %s copied %d of %d docs; index left in place", src, copied, docs)
+        return {**result, "status": "count_mismatch", "copied": copied}
+
+    es.indices.update_aliases(actions=[
+        {"add": {"index": dest, "alias": alias, **tenant_alias_body(org_id)}},
+        {"remove_index": {"index": src}},
+    ])
+    logger.info("Migrated %s (%d docs) to %s", src, docs, dest)
+    return {**result, "status": "migrated"}
+
+
+def migrate_org(org_id: str, dry_run: bool = False) -> list[dict[str, Any]]:
+    """Migrate every per-org index of an org. Returns one result per data type."""
+    return [migrate_org_index(org_id, t, dry_run=dry_run) for t in TENANT_INDEX_TYPES]
+
+
+def migrate_all_orgs(dry_run: bool = False) -> dict[str, list[dict[str, Any]]]:
+    """Migrate every org in the organizations index. Returns org_id -> results."""
+    results: dict[str, list[dict[str, Any]]] = {}
+    for org_id in search_document_ids(ORGANIZATIONS_INDEX, {"match_all": {}}):
+        try:
+            results[org_id] = migrate_org(org_id, dry_run=dry_run)
+        except Exception as e:
+            logger.warning("Migration failed for org %s: %s", org_id[:8], str(e))
+            results[org_id] = [{"index": f"{org_id}-*", "status": "error", "error": str(e)}]
+    return results
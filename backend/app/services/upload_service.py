@@ -5,10 +5,12 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+from app.es_client import get_es_client
 from app.models.upload import (
     UPLOAD_HISTORY_INDEX,
     UPLOAD_HISTORY_MAPPING,
 )
+from app.services.analytics_snapshot_service import refresh_feedback_snapshot
 from app.services.es_service import (
     delete_document,
     ensure_index_exists,
@@ -194,11 +196,18 @@ def delete_upload(org_id: str, upload_id: str) -> bool:
         if upload_type == "feedback":
             from app.models.feedback import feedback_index
             idx = feedback_index(org_id)
-            for doc_id in imported_ids:
+            # By ids query: with monthly partitions the feedback alias spans several indices
+            es = get_es_client()
+            for i in range(0, len(imported_ids), 1000):
                 try:
-                    delete_document(idx, doc_id)
+                    es.delete_by_query(
+                        index=idx,
+                        query={"ids": {"values": imported_ids[i : i + 1000]}},
+                        conflicts="proceed",
+                    )
                 except Exception:
                     pass
+            refresh_feedback_snapshot(org_id, deleted_ids=imported_ids)
         elif upload_type == "customers":
             from app.models.customer import customers_index
             idx = customers_index(org_id)
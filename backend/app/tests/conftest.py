@@ -35,3 +35,39 @@ def client(mock_es_client):
         with patch("app.services.es_service.get_es_client", return_value=mock_es_client):
             from app.main import app
             yield TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_known_indices():
+    """ensure_index_exists remembers indices per process; start each test clean."""
+    from app.services import es_service
+
+    es_service._known_indices.clear()
+    yield
+    es_service._known_indices.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_org_sizes():
+    """Analytics sampling caches org sizes per process; start each test clean."""
+    from app.services import analytics_sampling_service
+
+    analytics_sampling_service._org_sizes.clear()
+    yield
+    analytics_sampling_service._org_sizes.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_analytics_snapshots():
+    """Analytics snapshots live per process; start each test without any."""
+    from app.services import analytics_snapshot_service
+
+    analytics_snapshot_service.invalidate_feedback_snapshot()
+    analytics_snapshot_service._building.clear()
+    analytics_snapshot_service._held.clear()
+    analytics_snapshot_service._rejected.clear()
+    yield
+    analytics_snapshot_service.invalidate_feedback_snapshot()
+    analytics_snapshot_service._building.clear()
+    analytics_snapshot_service._held.clear()
+    analytics_snapshot_service._rejected.clear()
@@ -127,3 +127,49 @@ def test_post_chat_without_auth_returns_401():
                 client = TestClient(app)
                 resp = client.post("/api/v1/agent/chat", json={"message": "hi"})
     assert resp.status_code == 401
+
+
+def test_post_chat_stream_returns_event_stream():
+    """POST /agent/chat/stream proxies the service's SSE events."""
+
+    async def _events(**kwargs):
+        yield 'event: delta\ndata: {"text": "Hi"}\n\n'
+        yield 'event: done\ndata: {"conversation_id": "conv-1"}\n\n'
+
+    with patch("app.routers.agent.get_agent_service") as mock_get_svc:
+        mock_get_svc.return_value.chat_stream = MagicMock(side_effect=lambda **kw: _events(**kw))
+        from app.main import app
+
+        app.dependency_overrides[get_current_user] = _mock_current_user
+        try:
+            resp = TestClient(app).post("/api/v1/agent/chat/stream", json={"message": " hi "})
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert "event: delta" in resp.text and "event: done" in resp.text
+    assert mock_get_svc.return_value.chat_stream.call_args.kwargs["message"] == "hi"
+
+
+def test_get_conversation_messages_pages(client: TestClient):
+    """GET /agent/conversations/{id}/messages passes the cursor and 404s when missing."""
+    page = {"messages": [{"seq": 0, "role": "user", "content": "hi"}], "has_more": False, "next_before": None}
+    with patch("app.routers.agent.get_agent_service") as mock_get:
+        mock_get.return_value.get_conversation_messages.return_value = page
+        resp = client.get("/api/v1/agent/conversations/c1/messages?before=10&limit=20")
+        assert resp.status_code == 200
+        assert resp.json()["data"]["messages"][0]["content"] == "hi"
+        assert mock_get.return_value.get_conversation_messages.call_args.kwargs == {
+            "org_id": "o1", "conversation_id": "c1", "before": 10, "limit": 20,
+        }
+        mock_get.return_value.get_conversation_messages.return_value = None
+        assert client.get("/api/v1/agent/conversations/c1/messages").status_code == 404
+
+
+def test_get_fast_path_metrics(client: TestClient):
+    """GET /agent/fast-path/metrics returns the router's counters."""
+    metrics = {"requests": 4, "fast_path_hits": 3, "hit_rate": 0.75}
+    with patch("app.routers.agent.get_fast_path_metrics", return_value=metrics):
+        resp = client.get("/api/v1/agent/fast-path/metrics")
+    assert resp.status_code == 200
+    assert resp.json()["data"] == metrics
@@ -43,7 +43,7 @@ def test_agent_id_per_org(agent_service):
 async def test_chat_proxies_to_kibana(agent_service):
     with patch("app.services.agent_service.get_document", return_value=None):
         with patch("app.services.agent_service.ensure_index_exists"):
-            with patch("app.services.agent_service.index_document"):
+            with patch("app.services.agent_service.AgentService._save_turn", return_value="conv-1"):
                 with patch("app.services.agent_service.get_product_context") as mock_ctx:
                     mock_ctx.return_value = MagicMock(
                         product_name="Test",
@@ -53,7 +53,7 @@ async def test_chat_proxies_to_kibana(agent_service):
                         competitors=[],
                         teams=[],
                     )
-                    with patch("app.services.agent_service.httpx.AsyncClient") as mock_client:
+                    with patch("app.services.agent_service.get_async_http_client") as mock_client:
                         mock_resp = MagicMock()
                         mock_resp.status_code = 200
                         mock_resp.json.return_value = {
@@ -61,20 +61,17 @@ async def test_chat_proxies_to_kibana(agent_service):
                             "message": {"content": "Here is the response"},
                         }
                         mock_resp.raise_for_status = MagicMock()
-                        mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+                        mock_client.return_value.post = AsyncMock(
                             return_value=mock_resp
                         )
                         with patch.object(
-                            agent_service, "register_tools", new_callable=AsyncMock
+                            agent_service, "ensure_registered", new_callable=AsyncMock
                         ):
-                            with patch.object(
-                                agent_service, "register_agent", new_callable=AsyncMock
-                            ):
-                                result = await agent_service.chat(
-                                    org_id="o1",
-                                    user_id="u1",
-                                    message="What are top issues?",
-                                )
+                            result = await agent_service.chat(
+                                org_id="o1",
+                                user_id="u1",
+                                message="What are top issues?",
+                            )
     assert result["conversation_id"]
     assert result["response"] == "Here is the response"
     assert "tools_used" in result
@@ -94,7 +91,8 @@ async def test_chat_raises_when_kibana_not_configured():
 
 def test_get_conversations_returns_list(agent_service):
     with patch("app.services.agent_service.ensure_index_exists"):
-        with patch("app.services.agent_service.search_documents", return_value=[]):
+        with patch("app.services.agent_service.get_es_client") as mock_es:
+            mock_es.return_value.search.return_value = {"hits": {"hits": []}}
             items = agent_service.get_conversations(org_id="o1", user_id="u1")
     assert items == []
 
@@ -109,3 +107,133 @@ def test_get_conversation_returns_none_when_org_mismatch(agent_service):
     with patch("app.services.agent_service.get_document", return_value={"org_id": "o2"}):
         result = agent_service.get_conversation(org_id="o1", conversation_id="c1")
     assert result is None
+
+
+class _FakeStream:
+    """Async context manager standing in for httpx's streamed response."""
+
+    def __init__(self, lines, status_code=200):
+        self.lines = lines
+        self.status_code = status_code
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_proxies_events_and_persists_final_message(agent_service):
+    """Kibana events map to reasoning/tool_call/delta SSE; the final message is saved."""
+    lines = [
+        "event: conversation_id_set", 'data: {"data": {"conversation_id": "kc-1"}}', "",
+        "event: reasoning", 'data: {"data": {"reasoning": "Looking up checkout"}}', "",
+        "event: tool_call", 'data: {"data": {"tool_id": "ce_o1_top_issues", "params": {"period": "7 days"}}}', "",
+        "event: message_chunk", 'data: {"data": {"text_chunk": "Checkout "}}', "",
+        "event: message_chunk", 'data: {"data": {"text_chunk": "is slow"}}', "",
+        "event: message_complete", 'data: {"data": {"message_content": "Checkout is slow"}}', "",
+    ]
+    client = MagicMock()
+    client.stream.return_value = _FakeStream(lines)
+    with patch("app.services.agent_service.get_async_http_client", return_value=client), \
+         patch("app.services.agent_service.get_document", return_value=None), \
+         patch("app.services.agent_service.answer_locally", return_value=None), \
+         patch.object(agent_service, "ensure_registered", new_callable=AsyncMock), \
+         patch.object(agent_service, "_save_turn", return_value="conv-1") as mock_save:
+        events = [e async for e in agent_service.chat_stream("o1", "u1", "How is checkout?")]
+
+    names = [e.split("\n", 1)[0] for e in events]
+    assert names == ["event: reasoning", "event: tool_call", "event: delta", "event: delta", "event: done"]
+    assert '"conversation_id": "conv-1"' in events[-1]
+    mock_save.assert_called_once_with("o1", "u1", None, "kc-1", "How is checkout?", "Checkout is slow")
+    assert client.stream.call_args.args[1].endswith("/api/agent_builder/converse/async")
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_emits_error_without_saving(agent_service):
+    """A failed upstream stream yields one error event and stores nothing."""
+    client = MagicMock()
+    client.stream.side_effect = RuntimeError("connection reset")
+    with patch("app.services.agent_service.get_async_http_client", return_value=client), \
+         patch("app.services.agent_service.get_document", return_value=None), \
+         patch.object(agent_service, "ensure_registered", new_callable=AsyncMock), \
+         patch.object(agent_service, "_save_turn") as mock_save:
+        events = [e async for e in agent_service.chat_stream("o1", "u1", "hi")]
+    assert len(events) == 1 and events[0].startswith("event: error")
+    mock_save.assert_not_called()
+
+
+def test_save_turn_bumps_header_count_and_appends_message_docs(agent_service):
+    """One scripted header upsert numbers the turn; the two messages are appended as docs."""
+    mock_es = MagicMock()
+    mock_es.update.return_value = {"get": {"_source": {"message_count": 6}}}
+    with patch("app.services.agent_service.get_es_client", return_value=mock_es), \
+         patch("app.services.agent_service.ensure_index_exists"), \
+         patch("app.services.agent_service.bulk_index_documents") as mock_bulk:
+        conv_id = agent_service._save_turn("o1", "u1", "c1", "kc-1", "Why churn?", "Because checkout")
+
+    assert conv_id == "c1"
+    update = mock_es.update.call_args.kwargs
+    assert update["index"] == "o1-conversations" and update["id"] == "c1"
+    assert update["script"]["params"]["n"] == 2
+    assert update["upsert"]["title"] == "Why churn?" and update["upsert"]["message_count"] == 2
+    index, docs = mock_bulk.call_args.args
+    assert index == "o1-conversation-messages"
+    assert [(d["id"], d["seq"], d["role"]) for d in docs] == [
+        ("c1-000004", 4, "user"), ("c1-000005", 5, "assistant"),
+    ]
+
+
+def test_get_conversation_messages_pages_backwards_over_legacy_and_docs(agent_service):
+    """Pages are seq-ordered; legacy embedded messages fill the oldest positions."""
+    header = {
+        "id": "c1", "org_id": "o1", "message_count": 5,
+        "messages": [{"role": "user", "content": "old q"}, {"role": "assistant", "content": "old a"}],
+    }
+    mock_es = MagicMock()
+    mock_es.search.side_effect = [
+        {"hits": {"hits": [
+            {"_source": {"seq": 3, "role": "assistant", "content": "a2"}},
+            {"_source": {"seq": 4, "role": "user", "content": "q3"}},
+        ]}},
+        {"hits": {"hits": [{"_source": {"seq": 2, "role": "user", "content": "q2"}}]}},
+    ]
+    with patch("app.services.agent_service.get_document", return_value=header), \
+         patch("app.services.agent_service.get_es_client", return_value=mock_es):
+        latest = agent_service.get_conversation_messages("o1", "c1", limit=2)
+        older = agent_service.get_conversation_messages("o1", "c1", before=3, limit=2)
+
+    assert [m["seq"] for m in latest["messages"]] == [3, 4]
+    assert latest["has_more"] is True and latest["next_before"] == 3
+    seq_range = mock_es.search.call_args_list[0].kwargs["query"]["bool"]["filter"][1]["range"]["seq"]
+    assert seq_range == {"gte": 3, "lt": 5}
+    # seq 1-2: one legacy message and one message doc
+    assert [m["seq"] for m in older["messages"]] == [1, 2]
+    assert older["messages"][0] == {"seq": 1, "role": "assistant", "content": "old a"}
+    assert older["next_before"] == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_answers_templated_question_locally(agent_service):
+    """A fast-path hit is stored and returned without calling Agent Builder."""
+    local = {"intent": "top_issues", "response": "**Top issues in the last 7 days**"}
+    with patch("app.services.agent_service.answer_locally", return_value=local), \
+         patch("app.services.agent_service.get_async_http_client") as mock_client, \
+         patch("app.services.agent_service.record_fast_path") as mock_record, \
+         patch.object(agent_service, "ensure_registered", new_callable=AsyncMock) as mock_register, \
+         patch.object(agent_service, "_save_turn", return_value="conv-1") as mock_save:
+        result = await agent_service.chat("o1", "u1", "Top issues this week")
+        events = [e async for e in agent_service.chat_stream("o1", "u1", "Top issues this week")]
+
+    assert result["response"] == local["response"]
+    assert result["tools_used"] == [{"tool_id": "local:top_issues", "local": True}]
+    mock_save.assert_called_with("o1", "u1", None, None, "Top issues this week", local["response"])
+    assert [e.split("\n", 1)[0] for e in events] == ["event: delta", "event: done"]
+    assert mock_record.call_count == 2
+    mock_client.assert_not_called()
+    mock_register.assert_not_called()
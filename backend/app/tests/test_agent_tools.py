@@ -76,7 +76,7 @@ def test_chat_includes_tools_used_in_response(mock_settings):
     svc = AgentService()
     with patch("app.services.agent_service.get_document", return_value=None):
         with patch("app.services.agent_service.ensure_index_exists"):
-            with patch("app.services.agent_service.index_document"):
+            with patch("app.services.agent_service.AgentService._save_turn", return_value="conv-1"):
                 with patch("app.services.agent_service.get_product_context") as mock_ctx:
                     mock_ctx.return_value = MagicMock(
                         product_name="Test",
@@ -86,7 +86,7 @@ def test_chat_includes_tools_used_in_response(mock_settings):
                         competitors=[],
                         teams=[],
                     )
-                    with patch("app.services.agent_service.httpx.AsyncClient") as mock_client:
+                    with patch("app.services.agent_service.get_async_http_client") as mock_client:
                         mock_resp = MagicMock()
                         mock_resp.status_code = 200
                         mock_resp.json.return_value = {
@@ -96,15 +96,65 @@ def test_chat_includes_tools_used_in_response(mock_settings):
                             "citations": [{"id": "fb1", "text": "checkout is broken"}],
                         }
                         mock_resp.raise_for_status = MagicMock()
-                        mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+                        mock_client.return_value.post = AsyncMock(
                             return_value=mock_resp
                         )
-                        with patch.object(svc, "register_tools", new_callable=AsyncMock):
-                            with patch.object(svc, "register_agent", new_callable=AsyncMock):
-                                import asyncio
-                                result = asyncio.get_event_loop().run_until_complete(
-                                    svc.chat(org_id="org1", user_id="u1", message="Show checkout feedback")
-                                )
+                        with patch.object(svc, "ensure_registered", new_callable=AsyncMock):
+                            import asyncio
+                            result = asyncio.get_event_loop().run_until_complete(
+                                svc.chat(org_id="org1", user_id="u1", message="Show checkout feedback")
+                            )
     assert result["response"] == "Found 5 feedback items"
     assert result["tools_used"] == [{"tool_id": "ce_org1_search_feedback"}]
     assert result["citations"] == [{"id": "fb1", "text": "checkout is broken"}]
+
+
+def _product_context():
+    return MagicMock(
+        product_name="Test", description=None, industry=None, stage=None,
+        areas=[], goals=[], segments=[], competitors=[], teams=[],
+    )
+
+
+def test_ensure_registered_skips_when_fingerprint_unchanged(mock_settings):
+    """A matching persisted fingerprint means no Kibana calls; the result is cached in memory."""
+    from app.services import agent_service as module
+
+    mock_settings.agent_registration_recheck_seconds = 300
+    module._registrations.clear()
+    svc = AgentService()
+    fingerprint = svc._registration_fingerprint("org1", module._build_instructions(_product_context()))
+    with patch("app.services.agent_service.get_product_context", return_value=_product_context()) as mock_ctx, \
+         patch("app.services.agent_service.get_document", return_value={"agent_fingerprint": fingerprint}), \
+         patch.object(svc, "register_tools", new_callable=AsyncMock) as mock_tools:
+        import asyncio
+        assert asyncio.run(svc.ensure_registered("org1")) is False
+        assert asyncio.run(svc.ensure_registered("org1")) is False
+    mock_tools.assert_not_called()
+    mock_ctx.assert_called_once()
+    module._registrations.clear()
+
+
+def test_ensure_registered_registers_and_persists_on_change(mock_settings):
+    """A changed fingerprint registers tools concurrently, then the agent, then persists it."""
+    from app.services import agent_service as module
+
+    mock_settings.agent_registration_recheck_seconds = 300
+    module._registrations.clear()
+    svc = AgentService()
+    ok = MagicMock(status_code=200)
+    client = MagicMock(post=AsyncMock(return_value=ok))
+    with patch("app.services.agent_service.get_product_context", return_value=_product_context()), \
+         patch("app.services.agent_service.get_document", return_value={"agent_fingerprint": "old"}), \
+         patch("app.services.agent_service.get_async_http_client", return_value=client), \
+         patch("app.services.agent_service.update_document") as mock_update:
+        import asyncio
+        assert asyncio.run(svc.ensure_registered("org1")) is True
+    urls = [c.args[0] for c in client.post.call_args_list]
+    assert urls.count("https://kibana.example.com/api/agent_builder/tools") == len(TOOL_IDS)
+    assert urls[-1] == "https://kibana.example.com/api/agent_builder/agents"
+    persisted = mock_update.call_args[0][2]["agent_fingerprint"]
+    assert module._registrations["org1"][0] == persisted != "old"
+
+    module.invalidate_agent_registration("org1")
+    assert "org1" not in module._registrations
@@ -0,0 +1,133 @@
+"""ES|QL analytics engine tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from elasticsearch import BadRequestError
+
+from app.services.analytics_esql_service import esql_columns, esql_rows
+from app.services.analytics_service import (
+    get_segment_breakdown,
+    get_source_distribution,
+    get_summary,
+    get_top_issues,
+    get_volume,
+)
+
+
+def _columnar(**columns):
+    return {
+        "columns": [{"name": name, "type": "keyword"} for name in columns],
+        "values": list(columns.values()),
+    }
+
+
+@pytest.fixture
+def esql():
+    settings = MagicMock()
+    settings.analytics_engine = "esql"
+    with patch("app.services.analytics_esql_service.get_settings", return_value=settings):
+        with patch("app.services.analytics_service.ensure_index_exists"):
+            yield
+
+
+def _run(fn, es, *args, **kwargs):
+    with patch("app.services.analytics_service.get_es_client", return_value=es):
+        return fn(*args, **kwargs)
+
+
+def test_esql_columns_passes_dsl_filter_and_maps_columns():
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(source=["email", "nps"], count=[3, 1])
+    query = {"term": {"org_id": "o1"}}
+    columns = esql_columns(es, "o1-feedback", "STATS count = COUNT(*) BY source", query, ["x"])
+    assert columns == {"source": ["email", "nps"], "count": [3, 1]}
+    assert esql_rows(columns, "source", "count") == [("email", 3), ("nps", 1)]
+    kwargs = es.esql.query.call_args.kwargs
+    assert kwargs["query"] == "FROM o1-feedback | STATS count = COUNT(*) BY source"
+    assert kwargs["filter"] == query
+    assert kwargs["params"] == ["x"]
+    assert kwargs["columnar"] is True
+
+
+def test_esql_columns_unknown_index_is_empty():
+    es = MagicMock()
+    es.esql.query.side_effect = BadRequestError("Unknown index [o1-feedback-2026.01*]", MagicMock(), {})
+    assert esql_columns(es, "o1-feedback-2026.01*", "STATS count = COUNT(*)", {"match_all": {}}) == {}
+
+
+def test_summary_uses_esql_and_skips_search(esql):
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(total=[100], avg_sentiment=[-0.2], active_issues=[4])
+    es.count.return_value = {"count": 3}
+    result = _run(get_summary, es, "o1", "30d")
+    assert result["total_feedback"] == 100
+    assert result["active_issues"] == 4
+    assert result["sampling"] == {"sampled": False}
+    es.search.assert_not_called()
+    assert es.esql.query.call_args.kwargs["filter"]["bool"]["filter"][0] == {"term": {"org_id": "o1"}}
+
+
+def test_volume_fills_empty_buckets(esql):
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(
+        date=["2026-01-01T00:00:00.000Z", "2026-01-03T00:00:00.000Z"], count=[10, 5],
+    )
+    result = _run(get_volume, es, "o1", "custom", from_date="2026-01-01", to_date="2026-01-04")
+    assert result["interval"] == "day"
+    assert [(p["date"], p["count"]) for p in result["periods"]] == [
+        ("2026-01-01", 10), ("2026-01-02", 0), ("2026-01-03", 5), ("2026-01-04", 0),
+    ]
+    assert "DATE_TRUNC(1 day, created_at)" in es.esql.query.call_args.kwargs["query"]
+
+
+def test_volume_by_area_passes_areas_as_params(esql):
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(
+        date=["2026-01-01T00:00:00.000Z", "2026-01-01T00:00:00.000Z"], product_area=["billing", "search"], count=[2, 3],
+    )
+    result = _run(get_volume, es, "o1", "custom", from_date="2026-01-01", to_date="2026-01-02", areas=["billing", "search"])
+    assert result["periods"][0] == {"date": "2026-01-01", "end": "2026-01-01", "count": 5, "by_area": {"billing": 2, "search": 3}}
+    assert result["periods"][1]["count"] == 0
+    kwargs = es.esql.query.call_args.kwargs
+    assert "product_area IN (?, ?)" in kwargs["query"]
+    assert kwargs["params"] == ["billing", "search"]
+
+
+def test_source_distribution_labels_missing_source(esql):
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(source=["email", ""], count=[3, 1])
+    result = _run(get_source_distribution, es, "o1", "30d")
+    assert result["total"] == 4
+    assert result["breakdown"][1] == {"source": "unknown", "count": 1, "percentage": 25.0}
+
+
+def test_top_issues_compares_with_previous_period(esql):
+    es = MagicMock()
+    es.esql.query.side_effect = [
+        _columnar(product_area=["billing", "search"], feedback_count=[20, 4],
+                  unique_customers=[7, 2], avg_sentiment=[-0.8, -0.3]),
+        _columnar(product_area=["billing", "search"], count=[10, 8]),
+    ]
+    issues = _run(get_top_issues, es, "o1", "30d", limit=5)["issues"]
+    assert issues[0]["product_area"] == "billing"
+    assert issues[0]["severity"] == "Critical"
+    assert issues[0]["affected_customers"] == 7
+    assert issues[1]["growth_rate"] == -50.0
+    assert issues[1]["severity"] == "Improving"
+
+
+def test_segments_group_rows_like_nested_terms(esql):
+    es = MagicMock()
+    es.esql.query.return_value = _columnar(
+        customer_segment=["smb", "smb", "enterprise", "smb"],
+        product_area=["billing", "search", "billing", None],
+        count=[3, 5, 4, 2],
+    )
+    segments = _run(get_segment_breakdown, es, "o1", "30d")["segments"]
+    assert segments == [
+        {"segment": "smb", "count": 10, "by_area": [
+            {"product_area": "search", "count": 5}, {"product_area": "billing", "count": 3},
+        ]},
+        {"segment": "enterprise", "count": 4, "by_area": [{"product_area": "billing", "count": 4}]},
+    ]
@@ -101,3 +101,11 @@ def test_put_user_preferences_saved(client: TestClient):
         )
     assert resp.status_code == 200
     assert resp.json()["dashboard_preferences"]["default_period"] == "7d"
+
+
+def test_analytics_invalid_sampling_is_rejected(client: TestClient):
+    """An unknown sampling mode never reaches the widget, whichever engine is configured."""
+    with patch("app.routers.analytics.get_sentiment_breakdown") as mock_widget:
+        resp = client.get("/api/v1/analytics/sentiment?sampling=always")
+    assert resp.status_code == 422
+    mock_widget.assert_not_called()
@@ -0,0 +1,93 @@
+"""Analytics sampling tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.analytics_sampling_service import sampling_probability, search_aggs
+from app.services.analytics_service import get_sentiment_breakdown
+
+_AGGS = {"by_area": {"terms": {"field": "product_area"}}}
+
+
+def _settings(mode: str = "auto"):
+    s = MagicMock()
+    s.analytics_sampling = mode
+    s.analytics_sampling_min_org_docs = 5_000_000
+    s.analytics_sampling_target_docs = 200_000
+    return s
+
+
+def _es(org_docs: int, matching: int):
+    es = MagicMock()
+    es.count.side_effect = lambda index, query, **kw: {"count": org_docs if query == {"term": {"org_id": "o1"}} else matching}
+    es.search.return_value = {"aggregations": {"sample": {"by_area": {"buckets": []}}}}
+    return es
+
+
+def test_off_does_not_sample():
+    es = _es(50_000_000, 10_000_000)
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings("off")):
+        assert sampling_probability(es, "o1", "o1-feedback", {"match_all": {}}) is None
+    es.count.assert_not_called()
+
+
+def test_auto_skips_small_orgs():
+    es = _es(1_000_000, 1_000_000)
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+        assert sampling_probability(es, "o1", "o1-feedback", {"match_all": {}}) is None
+    assert es.count.call_count == 1
+
+
+def test_auto_samples_large_orgs_to_target():
+    es = _es(50_000_000, 10_000_000)
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+        assert sampling_probability(es, "o1", "o1-feedback", {"match_all": {}}) == (0.02, 10_000_000)
+
+
+def test_small_result_sets_are_not_sampled():
+    es = _es(50_000_000, 300_000)
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings("on")):
+        assert sampling_probability(es, "o1", "o1-feedback", {"match_all": {}}) is None
+
+
+def test_invalid_mode_raises():
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+        with pytest.raises(ValueError):
+            sampling_probability(MagicMock(), "o1", "o1-feedback", {"match_all": {}}, mode="always")
+
+
+def test_search_aggs_wraps_in_random_sampler_and_unwraps():
+    es = _es(50_000_000, 10_000_000)
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+        aggs, info = search_aggs(es, "o1", "o1-feedback", {"match_all": {}}, _AGGS)
+    sent = es.search.call_args[1]["aggs"]["sample"]
+    assert sent["random_sampler"]["probability"] == 0.02
+    assert sent["aggs"] == _AGGS
+    assert aggs == {"by_area": {"buckets": []}}
+    assert info["sampled"] is True
+    assert info["sampled_docs"] == 200_000
+    assert 0 < info["relative_error"] < 0.01
+
+
+def test_search_aggs_exact_when_not_sampled():
+    es = _es(10, 10)
+    es.search.return_value = {"aggregations": {"by_area": {"buckets": []}}}
+    with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+        aggs, info = search_aggs(es, "o1", "o1-feedback", {"match_all": {}}, _AGGS)
+    assert es.search.call_args[1]["aggs"] == _AGGS
+    assert aggs == {"by_area": {"buckets": []}}
+    assert info == {"sampled": False}
+
+
+def test_widget_reports_sampling():
+    es = _es(50_000_000, 10_000_000)
+    es.search.return_value = {
+        "aggregations": {"sample": {"sentiment": {"buckets": [{"key": "negative", "doc_count": 10_000_000}]}}}
+    }
+    with patch("app.services.analytics_service.get_es_client", return_value=es):
+        with patch("app.services.analytics_service.ensure_index_exists"):
+            with patch("app.services.analytics_sampling_service.get_settings", return_value=_settings()):
+                result = get_sentiment_breakdown("o1", "30d")
+    assert result["total"] == 10_000_000
+    assert result["sampling"]["probability"] == 0.02
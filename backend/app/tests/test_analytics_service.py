@@ -14,6 +14,7 @@ from app.services.analytics_service import (
     get_summary,
     get_top_issues,
     get_volume,
+    volume_interval,
 )
 
 
@@ -65,6 +66,37 @@ def test_get_volume_returns_periods():
             result = get_volume("o1", "30d")
     assert "periods" in result
     assert len(result["periods"]) == 2
+    assert result["interval"] == "day"
+    assert result["periods"][0]["end"] == "2026-01-01"
+
+
+def test_volume_interval_bounds_bucket_count():
+    assert volume_interval("2026-01-01", "2026-03-31", max_buckets=120) == "day"
+    assert volume_interval("2025-01-01", "2026-01-01", max_buckets=120) == "week"
+    assert volume_interval("2020-01-01", "2026-01-01", max_buckets=120) == "month"
+    assert volume_interval("2000-01-01", "2026-01-01", max_buckets=120) == "quarter"
+    assert volume_interval("1900-01-01", "2026-01-01", max_buckets=120) == "year"
+
+
+def test_get_volume_custom_range_uses_coarser_interval():
+    mock_es = MagicMock()
+    mock_es.search.return_value = {
+        "aggregations": {
+            "volume": {
+                "buckets": [
+                    {"key_as_string": "2024-01-01T00:00:00.000Z", "count": {"value": 10}},
+                    {"key_as_string": "2024-02-01T00:00:00.000Z", "count": {"value": 15}},
+                ]
+            }
+        }
+    }
+    with patch("app.services.analytics_service.get_es_client", return_value=mock_es):
+        with patch("app.services.analytics_service.ensure_index_exists"):
+            result = get_volume("o1", "custom", "2020-01-01", "2026-06-30")
+    histogram = mock_es.search.call_args[1]["aggs"]["volume"]["date_histogram"]
+    assert histogram["calendar_interval"] == "month"
+    assert result["interval"] == "month"
+    assert result["periods"][1] == {"date": "2024-02-01", "end": "2024-02-29", "count": 15}
 
 
 def test_get_sentiment_breakdown_sums_to_100():
@@ -0,0 +1,229 @@
+"""Analytics snapshot tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import analytics_snapshot_service as snap
+from app.services.analytics_service import _feedback_base_query, get_sentiment_breakdown
+from app.services.analytics_snapshot_service import FeedbackSnapshot, build_feedback_snapshot, snapshot_aggs
+
+DOCS = [
+    {"id": "f1", "created_at": "2026-01-05T10:00:00Z", "sentiment_score": -0.8, "sentiment": "negative",
+     "product_area": "checkout", "source": "support_ticket", "customer_id": "c1", "customer_segment": "enterprise"},
+    {"id": "f2", "created_at": "2026-01-06T09:00:00Z", "sentiment_score": -0.5, "sentiment": "negative",
+     "product_area": "checkout", "source": "app_store_review", "customer_id": "c2", "customer_segment": "smb"},
+    {"id": "f3", "created_at": "2026-02-01T00:00:00Z", "sentiment_score": 0.6, "sentiment": "positive",
+     "product_area": "search", "source": "support_ticket", "customer_id": "c1", "customer_segment": "enterprise"},
+    {"id": "f4", "created_at": "2026-03-15T12:00:00Z", "sentiment_score": 0.1, "sentiment": "neutral",
+     "product_area": "billing", "source": "nps_csat"},
+]
+
+
+def _settings(**overrides):
+    s = MagicMock()
+    s.analytics_snapshot_enabled = True
+    s.analytics_snapshot_max_bytes = 10**9
+    s.analytics_snapshot_max_org_docs = 1000
+    s.analytics_snapshot_build_after_requests = 2
+    for k, v in overrides.items():
+        setattr(s, k, v)
+    return s
+
+
+def _snapshot() -> FeedbackSnapshot:
+    s = FeedbackSnapshot(capacity=2)
+    s.upsert(DOCS)
+    return s
+
+
+def test_terms_avg_cardinality_and_filter_match_es_shape():
+    result = _snapshot().aggregate({
+        "by_area": {
+            "terms": {"field": "product_area", "size": 2},
+            "aggs": {
+                "unique_customers": {"cardinality": {"field": "customer_id"}},
+                "avg_sentiment": {"avg": {"field": "sentiment_score"}},
+            },
+        },
+        "active_issues": {
+            "filter": {"range": {"sentiment_score": {"lt": -0.3}}},
+            "aggs": {"areas": {"cardinality": {"field": "product_area"}}},
+        },
+        "total": {"value_count": {"field": "id"}},
+    })
+    buckets = result["by_area"]["buckets"]
+    assert [(b["key"], b["doc_count"], b["unique_customers"]["value"]) for b in buckets] == [
+        ("checkout", 2, 2),
+        ("billing", 1, 0),
+    ]
+    assert buckets[0]["avg_sentiment"]["value"] == pytest.approx(-0.65)
+    assert result["active_issues"] == {"doc_count": 2, "areas": {"value": 1}}
+    assert result["total"] == {"value": 4}
+
+
+def test_date_range_and_histogram_fill_empty_buckets():
+    result = _snapshot().aggregate(
+        {"volume": {
+            "date_histogram": {
+                "field": "created_at",
+                "calendar_interval": "month",
+                "min_doc_count": 0,
+                "extended_bounds": {"min": "2025-12-01", "max": "2026-02-28"},
+            },
+            "aggs": {"count": {"value_count": {"field": "id"}}},
+        }},
+        "2025-12-01",
+        "2026-02-28T23:59:59.999Z",
+    )
+    buckets = result["volume"]["buckets"]
+    assert [b["key_as_string"][:10] for b in buckets] == ["2025-12-01", "2026-01-01", "2026-02-01"]
+    assert [b["doc_count"] for b in buckets] == [0, 2, 1]
+    assert buckets[1]["count"] == {"value": 2}
+
+
+def test_upsert_overwrites_and_remove_hides_rows():
+    s = _snapshot()
+    s.upsert([{**DOCS[0], "product_area": "search"}])
+    s.remove(["f2"])
+    buckets = s.aggregate({"a": {"terms": {"field": "product_area"}}})["a"]["buckets"]
+    assert len(s) == 3
+    assert {b["key"]: b["doc_count"] for b in buckets} == {"search": 2, "billing": 1}
+
+
+def test_snapshot_aggs_builds_after_threshold_and_answers_base_queries():
+    query = _feedback_base_query("o1", "2026-01-01", "2026-01-31")
+    aggs = {"sentiment": {"terms": {"field": "sentiment"}}}
+    with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()):
+        with patch("app.services.analytics_snapshot_service.build_feedback_snapshot", return_value=_snapshot()):
+            with patch("app.services.analytics_snapshot_service.threading.Thread") as thread:
+                thread.side_effect = lambda target, args, daemon: MagicMock(start=lambda: target(*args))
+                assert snapshot_aggs("o1", query, aggs) is None
+                assert snapshot_aggs("o1", query, aggs) is None  # second request builds
+                result = snapshot_aggs("o1", query, aggs)
+                assert snapshot_aggs("o1", {"match_all": {}}, aggs) is None
+                assert snapshot_aggs("o1", query, {"x": {"percentiles": {"field": "sentiment_score"}}}) is None
+    assert result == {"sentiment": {"buckets": [{"key": "negative", "doc_count": 2}]}}
+
+
+def test_org_too_big_to_snapshot_backs_off_before_rebuilding():
+    """A build that returns nothing is not retried on every request; requests count again after the backoff."""
+    query = _feedback_base_query("o1", "2026-01-01", "2026-01-31")
+    aggs = {"sentiment": {"terms": {"field": "sentiment"}}}
+    with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()), \
+         patch("app.services.analytics_snapshot_service.build_feedback_snapshot", return_value=None) as build, \
+         patch("app.services.analytics_snapshot_service.threading.Thread") as thread, \
+         patch("app.services.analytics_snapshot_service.time.monotonic", return_value=1000.0) as clock:
+        thread.side_effect = lambda target, args, daemon: MagicMock(start=lambda: target(*args))
+        for _ in range(10):
+            assert snapshot_aggs("o1", query, aggs) is None
+        assert build.call_count == 1
+        clock.return_value = 1000.0 + snap._REJECTED_BACKOFF_SECONDS
+        for _ in range(2):
+            snapshot_aggs("o1", query, aggs)
+        assert build.call_count == 2
+
+
+def test_writes_during_build_are_replayed():
+    def build(org_id):
+        snap.refresh_feedback_snapshot(org_id, [{**DOCS[0], "id": "f9"}], deleted_ids=["f1"])
+        return _snapshot()
+
+    with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()):
+        with patch("app.services.analytics_snapshot_service.build_feedback_snapshot", side_effect=build):
+            snap._building["o1"] = []
+            snap._build("o1")
+    ids = snap._snapshots["o1"]._rows
+    assert "f9" in ids and len(snap._snapshots["o1"]) == 4
+
+
+def test_lru_eviction_keeps_total_under_budget():
+    one = _snapshot().nbytes
+    with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings(analytics_snapshot_max_bytes=2 * one)):
+        for org in ("o1", "o2", "o3"):
+            with patch("app.services.analytics_snapshot_service.build_feedback_snapshot", return_value=_snapshot()):
+                snap._building[org] = []
+                snap._build(org)
+        stats = snap.snapshot_stats()
+    assert [o["org_id"] for o in stats["orgs"]] == ["o2", "o3"]
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_build_pages_with_pit_and_skips_large_orgs():
+    es = MagicMock()
+    es.open_point_in_time.return_value = {"id": "pit1"}
+    es.search.return_value = {
+        "pit_id": "pit2",
+        "hits": {"total": {"value": 4}, "hits": [{"_source": d, "sort": [i]} for i, d in enumerate(DOCS)]},
+    }
+    with patch("app.services.analytics_snapshot_service.get_es_client", return_value=es):
+        with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()):
+            built = build_feedback_snapshot("o1")
+        with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings(analytics_snapshot_max_org_docs=3)):
+            skipped = build_feedback_snapshot("o1")
+    assert len(built) == 4
+    assert skipped is None
+    assert es.search.call_args[1]["sort"] == [{"_shard_doc": "asc"}]
+    es.close_point_in_time.assert_called_with(id="pit2")
+
+
+def test_verify_drops_drifted_snapshot():
+    snap._snapshots["o1"] = _snapshot()
+    es = MagicMock()
+    es.search.return_value = {"hits": {"total": {"value": 5}}, "aggregations": {"by_area": {"buckets": []}}}
+    with patch("app.services.analytics_snapshot_service.get_es_client", return_value=es):
+        assert snap.verify_feedback_snapshot("o1") is False
+    assert "o1" not in snap._snapshots
+
+
+def _es_counts(segments):
+    return {
+        "hits": {"total": {"value": 4}},
+        "aggregations": {
+            "by_area": {"buckets": [{"key": "checkout", "doc_count": 2}, {"key": "billing", "doc_count": 1},
+                                    {"key": "search", "doc_count": 1}]},
+            "by_segment": {"buckets": [{"key": k, "doc_count": v} for k, v in segments.items()]},
+            "customers": {"value": 2},
+        },
+    }
+
+
+def test_verify_compares_segments():
+    """Equal doc and area counts still drop a snapshot whose segments moved (e.g. a missed sync)."""
+    es = MagicMock()
+    with patch("app.services.analytics_snapshot_service.get_es_client", return_value=es):
+        snap._snapshots["o1"] = _snapshot()
+        es.search.return_value = _es_counts({"enterprise": 2, "smb": 1})
+        assert snap.verify_feedback_snapshot("o1") is True
+        es.search.return_value = _es_counts({"enterprise": 3})
+        assert snap.verify_feedback_snapshot("o1") is False
+    assert "o1" not in snap._snapshots
+
+
+def test_held_org_is_not_snapshotted_until_released():
+    query = _feedback_base_query("o1", "2026-01-01", "2026-01-31")
+    aggs = {"sentiment": {"terms": {"field": "sentiment"}}}
+    snap._snapshots["o1"] = _snapshot()
+    snap.hold_feedback_snapshot("o1", "node:1")
+    with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()):
+        with patch("app.services.analytics_snapshot_service.threading.Thread") as thread:
+            for _ in range(3):
+                assert snapshot_aggs("o1", query, aggs) is None
+            thread.assert_not_called()
+            snap.release_feedback_snapshot("o1", "node:1")
+            snapshot_aggs("o1", query, aggs)
+            snapshot_aggs("o1", query, aggs)
+            thread.assert_called_once()
+    assert "o1" not in snap._snapshots
+
+
+def test_widget_served_from_snapshot_without_es_search():
+    snap._snapshots["o1"] = _snapshot()
+    es = MagicMock()
+    with patch("app.services.analytics_service.get_es_client", return_value=es):
+        with patch("app.services.analytics_service.ensure_index_exists"):
+            with patch("app.services.analytics_snapshot_service.get_settings", return_value=_settings()):
+                result = get_sentiment_breakdown("o1", "custom", "2026-01-01", "2026-03-31")
+    es.search.assert_not_called()
+    assert result["total"] == 4
+    assert result["sampling"] == {"sampled": False}
@@ -0,0 +1,61 @@
+"""Customer matcher tests."""
+
+from unittest.mock import patch
+
+from app.services.customer_matching_service import (
+    CustomerMatcher,
+    get_customer_matcher,
+    invalidate_customer_matcher,
+    normalize_company_name,
+    refresh_customer_matcher,
+)
+
+CUSTOMERS = [
+    {"id": "c1", "company_name": "Acme Inc", "segment": "Enterprise"},
+    {"id": "c2", "company_name": "Globex Corporation", "segment": "SMB"},
+    {"id": "c3", "company_name": "Initech", "segment": "Mid-Market"},
+]
+
+
+def test_normalize_company_name_strips_case_punctuation_suffixes():
+    assert normalize_company_name("ACME, Inc.") == "acme"
+    assert normalize_company_name("Acme Inc") == "acme"
+    assert normalize_company_name("The Globex Corp") == "globex"
+    assert normalize_company_name("Société Générale S.A.") == "societe generale"
+    assert normalize_company_name("Inc") == "inc"
+    assert normalize_company_name("") == ""
+
+
+def test_match_exact_after_normalization():
+    m = CustomerMatcher(CUSTOMERS)
+    assert m.match("ACME, Inc.")["id"] == "c1"
+    assert m.match("acme")["id"] == "c1"
+    assert m.match("globex")["id"] == "c2"
+
+
+def test_match_fuzzy_typo_and_rejects_unrelated():
+    m = CustomerMatcher(CUSTOMERS)
+    assert m.match("Initec")["id"] == "c3"
+    assert m.match("Globexx Corp")["id"] == "c2"
+    assert m.match("Umbrella") is None
+    assert m.match("") is None
+
+
+def test_add_rename_replaces_old_name():
+    m = CustomerMatcher(CUSTOMERS)
+    m.add({"id": "c1", "company_name": "Acme Widgets", "segment": "SMB"})
+    assert m.match("Acme Widgets")["segment"] == "SMB"
+    assert m.match("Acme Inc") is None
+    assert m.get_by_id("c1")["company_name"] == "Acme Widgets"
+
+
+def test_get_customer_matcher_caches_and_refreshes():
+    invalidate_customer_matcher()
+    with patch("app.services.customer_matching_service._load_customers", return_value=CUSTOMERS) as mock_load:
+        m1 = get_customer_matcher("o1")
+        m2 = get_customer_matcher("o1")
+    assert m1 is m2
+    mock_load.assert_called_once()
+    refresh_customer_matcher("o1", [{"id": "c9", "company_name": "Hooli LLC"}])
+    assert m1.match("hooli")["id"] == "c9"
+    invalidate_customer_matcher()
@@ -16,9 +16,11 @@ def test_get_customer_feedback_returns_only_that_customer():
         mock_search.return_value = (
             [{"id": "f1", "customer_id": "c1", "text": "Great"}],
             1,
+            False,
         )
-        items, total = get_customer_feedback("o1", "c1", page=1, page_size=20)
+        items, total, lower_bound = get_customer_feedback("o1", "c1", page=1, page_size=20)
         assert len(items) == 1
+        assert total == 1 and lower_bound is False
         assert items[0]["customer_id"] == "c1"
         mock_search.assert_called_once()
         call_filters = mock_search.call_args[1]["filters"]
@@ -98,7 +100,7 @@ def test_get_customer_sentiment_trend_includes_product_average():
 def test_get_customer_feedback_isolates_by_org():
     """get_customer_feedback passes org_id to search."""
     with patch("app.services.search_service.search_feedback") as mock_search:
-        mock_search.return_value = ([], 0)
+        mock_search.return_value = ([], 0, False)
         get_customer_feedback("o1", "c1")
         mock_search.assert_called_once()
         assert mock_search.call_args.kwargs["org_id"] == "o1"
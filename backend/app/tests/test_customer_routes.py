@@ -49,7 +49,7 @@ def test_post_customer_manual_valid(client: TestClient):
 def test_get_customers_list(client: TestClient):
     """GET /customers returns paginated list."""
     with patch("app.routers.customers.get_customers") as mock_get:
-        mock_get.return_value = ([], 0)
+        mock_get.return_value = ([], 0, False)
         resp = client.get("/api/v1/customers")
     assert resp.status_code == 200
     data = resp.json()
@@ -111,3 +111,20 @@ def test_customer_endpoints_reject_without_jwt():
             fn = getattr(tc, method)
             resp = fn(path, **kwargs)
             assert resp.status_code == 401, f"{method} {path} should reject without token"
+
+
+def test_put_customer_segment_triggers_feedback_sync(client: TestClient):
+    """PUT /customers/{id} with a segment change starts a feedback sync."""
+    with patch("app.routers.customers.update_customer") as mock_update:
+        mock_update.return_value = {"id": "c1", "company_name": "Acme", "segment": "Enterprise"}
+        with patch("app.routers.customers.trigger_customer_sync") as mock_sync:
+            resp = client.put("/api/v1/customers/c1", json={"segment": "Enterprise"})
+    assert resp.status_code == 200
+    mock_sync.assert_called_once_with("o1", ["c1"], reason="customer_updated")
+
+
+def test_get_sync_job_not_found(client: TestClient):
+    """GET /customers/sync-jobs/{id} returns 404 for unknown job."""
+    with patch("app.routers.customers.get_sync_job", return_value=None):
+        resp = client.get("/api/v1/customers/sync-jobs/missing")
+    assert resp.status_code == 404
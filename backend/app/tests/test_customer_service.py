@@ -9,6 +9,7 @@ from app.services.customer_service import (
     create_customers_bulk,
     get_customer,
     get_customer_count,
+    update_customer,
 )
 
 
@@ -72,3 +73,14 @@ def test_get_customer_count():
         mock_es.return_value.count.return_value = {"count": 10}
         count = get_customer_count("o1")
         assert count == 10
+
+
+def test_update_customer():
+    """update_customer applies allowed fields and reindexes."""
+    with patch("app.services.customer_service.get_document") as mock_get:
+        mock_get.return_value = {"id": "c1", "org_id": "o1", "company_name": "Acme", "segment": "SMB"}
+        with patch("app.services.customer_service.index_document") as mock_idx:
+            doc = update_customer("o1", "c1", {"segment": "Enterprise", "org_id": "o2"})
+    assert doc["segment"] == "Enterprise"
+    assert doc["org_id"] == "o1"
+    mock_idx.assert_called_once()
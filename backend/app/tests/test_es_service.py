@@ -5,13 +5,26 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from app.services.es_service import (
+    bulk_index_documents,
     ensure_index_exists,
     get_document,
     index_document,
     search_documents,
+    split_tenant_index,
+    tenant_doc_id,
 )
 
 
+@pytest.fixture
+def shared_settings():
+    mock = MagicMock()
+    mock.index_tenancy = "shared"
+    mock.shared_index_prefix = "shared"
+    mock.shared_index_shards = 3
+    with patch("app.services.es_service.get_settings", return_value=mock):
+        yield mock
+
+
 def test_ensure_index_exists_creates_when_missing():
     """ensure_index_exists creates index when it does not exist."""
     mock_es = MagicMock()
@@ -67,3 +80,60 @@ def test_search_documents_returns_results():
     assert len(result) == 2
     assert result[0]["name"] == "a"
     assert result[1]["name"] == "b"
+
+
+def test_bulk_index_documents_reports_failed_ids():
+    errors = [{"index": {"_id": "d2", "status": 400, "error": {"type": "mapper_parsing_exception"}}}]
+    with patch("app.services.es_service.get_es_client"), \
+         patch("elasticsearch.helpers.bulk", return_value=(1, errors)) as mock_bulk:
+        failed_ids: list[str] = []
+        result = bulk_index_documents("idx", [{"id": "d1"}, {"id": "d2"}], failed_ids=failed_ids)
+    assert result == (1, 1)
+    assert failed_ids == ["d2"]
+    assert mock_bulk.call_args.kwargs["stats_only"] is False
+
+
+def test_split_tenant_index():
+    """Per-org index names split into org id and data type; others do not."""
+    assert split_tenant_index("0b9e-44aa-conversation-messages") == ("0b9e-44aa", "conversation-messages")
+    assert split_tenant_index("0b9e-44aa-conversations") == ("0b9e-44aa", "conversations")
+    assert split_tenant_index("0b9e-product-context") == ("0b9e", "product-context")
+    assert split_tenant_index("users") is None
+    assert split_tenant_index("-feedback") is None
+
+
+def test_ensure_index_exists_shared_creates_routed_alias(shared_settings):
+    """In shared tenancy a per-org name becomes a filtered alias over the shared index."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+
+    with patch("app.services.es_service.get_es_client", return_value=mock_es):
+        ensure_index_exists("o1-feedback", {"mappings": {"properties": {"org_id": {"type": "keyword"}}}})
+
+    body = mock_es.indices.create.call_args.kwargs["body"]
+    assert mock_es.indices.create.call_args.kwargs["index"] == "shared-feedback"
+    assert body["mappings"]["_routing"] == {"required": True}
+    assert body["settings"]["number_of_shards"] == 3
+    mock_es.indices.put_alias.assert_called_once_with(
+        index="shared-feedback", name="o1-feedback",
+        filter={"term": {"org_id": "o1"}}, routing="o1",
+    )
+
+
+def test_ensure_index_exists_shared_keeps_global_indices(shared_settings):
+    """Non-tenant indices are created as plain indices in shared tenancy."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+
+    with patch("app.services.es_service.get_es_client", return_value=mock_es):
+        ensure_index_exists("users", {"mappings": {}})
+
+    assert mock_es.indices.create.call_args.kwargs["index"] == "users"
+    mock_es.indices.put_alias.assert_not_called()
+
+
+def test_tenant_doc_id_prefixed_only_when_shared(shared_settings):
+    """Org-scoped ids get an org prefix in shared indices."""
+    assert tenant_doc_id("o1", "basics") == "o1:basics"
+    shared_settings.index_tenancy = "per_org"
+    assert tenant_doc_id("o1", "basics") == "basics"
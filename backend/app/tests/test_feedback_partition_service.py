@@ -0,0 +1,171 @@
+"""Monthly feedback partition tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import feedback_partition_service
+from app.services.es_service import ensure_index_exists
+from app.services.feedback_partition_service import (
+    ensure_partition,
+    feedback_ilm_policy,
+    feedback_search_index,
+    group_by_partition,
+    partition_existing_feedback,
+    partition_month,
+)
+
+
+@pytest.fixture
+def settings():
+    mock = MagicMock()
+    mock.feedback_partitioning = "monthly"
+    mock.feedback_partition_warm_after_days = 30
+    mock.index_tenancy = "per_org"
+    _clear_caches()
+    with patch("app.services.feedback_partition_service.get_settings", return_value=mock), \
+         patch("app.services.es_service.get_settings", return_value=mock):
+        yield mock
+    _clear_caches()
+
+
+def _clear_caches():
+    feedback_partition_service._known_partitions.clear()
+    feedback_partition_service._split_orgs.clear()
+    feedback_partition_service._unsplit_orgs.clear()
+
+
+def test_partition_month_from_created_at():
+    """Docs partition by created_at month; bad dates fall back to the current month."""
+    assert partition_month("2025-12-31T23:59:59Z") == "2025.12"
+    assert partition_month("2026-02-03") == "2026.02"
+    assert partition_month("not a date") == partition_month(None)
+
+
+def test_search_index_targets_overlapping_months(settings):
+    """Date-bounded searches hit only the months they overlap."""
+    feedback_partition_service._split_orgs.add("o1")
+    assert feedback_search_index("o1", "2025-11-20", "2026-01-05") == (
+        "o1-feedback-2025.11*,o1-feedback-2025.12*,o1-feedback-2026.01*"
+    )
+    assert feedback_search_index("o1") == "o1-feedback"
+    settings.feedback_partitioning = "none"
+    assert feedback_search_index("o1", "2025-11-20", "2026-01-05") == "o1-feedback"
+    settings.feedback_partitioning = "monthly"
+    settings.index_tenancy = "shared"
+    assert feedback_search_index("o1", "2025-11-20") == "o1-feedback"
+
+
+def test_ensure_partition_creates_once_with_alias_and_ilm(settings):
+    """A partition joins the read alias and ages from the end of its month."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+    with patch("app.services.feedback_partition_service.get_es_client", return_value=mock_es):
+        assert ensure_partition("o1", "2025.12", {"mappings": {"properties": {}}}) == "o1-feedback-2025.12"
+        ensure_partition("o1", "2025.12", {"mappings": {"properties": {}}})
+
+    mock_es.indices.create.assert_called_once()
+    body = mock_es.indices.create.call_args.kwargs["body"]
+    assert body["aliases"] == {"o1-feedback": {}}
+    assert body["settings"]["index.lifecycle.name"] == "feedback-partitions"
+    assert body["settings"]["index.lifecycle.origination_date"] == 1767225600000  # 2026-01-01
+
+
+def test_ilm_policy_keeps_old_partitions_writable(settings):
+    """Sync and historical imports still write to warm partitions, so nothing blocks writes."""
+    warm = feedback_ilm_policy()["phases"]["warm"]
+    assert warm["min_age"] == "30d"
+    assert "readonly" not in warm["actions"]
+    assert warm["actions"]["shrink"]["allow_write_after_shrink"] is True
+
+
+def test_ensure_index_exists_creates_current_partition_for_feedback_alias(settings):
+    """The feedback read alias is created with the current month's partition."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+    with patch("app.services.es_service.get_es_client", return_value=mock_es), \
+         patch("app.services.feedback_partition_service.get_es_client", return_value=mock_es):
+        ensure_index_exists("o1-feedback", {"mappings": {}})
+    assert mock_es.indices.create.call_args.kwargs["index"] == f"o1-feedback-{partition_month(None)}"
+
+
+def test_bulk_feedback_is_split_by_month(settings):
+    """Bulk ingest writes each month's docs to its own partition."""
+    from app.services.feedback_service import create_feedback_items_bulk
+
+    items = [
+        {"text": "A", "created_at": "2025-12-02"},
+        {"text": "B", "created_at": "2026-01-10"},
+        {"text": "C", "created_at": "2025-12-20"},
+    ]
+    feedback_partition_service._split_orgs.add("o1")
+    with patch("app.services.feedback_service._ensure_feedback_index"), \
+         patch("app.services.feedback_service.get_customer_matcher"), \
+         patch("app.services.feedback_service.is_elser_available", return_value=False), \
+         patch("app.services.feedback_service.analyze_sentiment", return_value=("neutral", 0)), \
+         patch("app.services.feedback_service.ensure_partition", side_effect=lambda o, m, _: f"{o}-feedback-{m}"), \
+         patch("app.services.feedback_service.bulk_index_documents", side_effect=lambda idx, docs, **kwargs: (len(docs), 0)) as mock_bulk:
+        imported, failed, _ = create_feedback_items_bulk("o1", items)
+
+    assert (imported, failed) == (3, 0)
+    calls = {c.args[0]: [d["text"] for d in c.args[1]] for c in mock_bulk.call_args_list}
+    assert calls == {"o1-feedback-2025.12": ["A", "C"], "o1-feedback-2026.01": ["B"]}
+    assert list(group_by_partition([{"created_at": "2026-03-01"}])) == ["2026.03"]
+
+
+def test_unsplit_org_keeps_its_single_index_until_partitioned(settings):
+    """An org with a concrete {org}-feedback index is not written to partitions; new orgs are."""
+    from app.services.feedback_service import _index_feedback_docs
+
+    mock_es = MagicMock()
+    mock_es.indices.exists.side_effect = lambda index: index == "o1-feedback"
+    mock_es.indices.exists_alias.return_value = False
+    with patch("app.services.es_service.get_es_client", return_value=mock_es), \
+         patch("app.services.feedback_service.ensure_partition") as mock_partition, \
+         patch("app.services.feedback_service.bulk_index_documents", return_value=(1, 0)) as mock_bulk:
+        _index_feedback_docs("o1", [{"text": "A", "created_at": "2025-12-02"}])
+        assert feedback_search_index("o1", "2025-11-20", "2026-01-05") == "o1-feedback"
+        _index_feedback_docs("o2", [{"text": "B", "created_at": "2025-12-02"}])
+
+    assert mock_bulk.call_args_list[0].args[0] == "o1-feedback"
+    mock_partition.assert_called_once()
+    assert mock_partition.call_args.args[:2] == ("o2", "2025.12")
+
+
+def test_partition_existing_feedback_reindexes_and_swaps_alias(settings):
+    """A single feedback index is split by month and replaced by the read alias."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.side_effect = lambda index: index == "o1-feedback"
+    mock_es.indices.exists_alias.return_value = False
+    mock_es.search.return_value = {"aggregations": {"months": {"buckets": [
+        {"key_as_string": "2025-12-01T00:00:00.000Z"}, {"key_as_string": "2026-01-01T00:00:00.000Z"},
+    ]}}}
+    mock_es.count.side_effect = [{"count": 10}, {"count": 10}]
+    mock_es.indices.get_mapping.return_value = {"o1-feedback": {"mappings": {"properties": {}}}}
+    with patch("app.services.feedback_partition_service.get_es_client", return_value=mock_es), \
+         patch("app.services.es_service.get_es_client", return_value=mock_es):
+        result = partition_existing_feedback("o1")
+
+    assert result["status"] == "partitioned" and result["docs"] == 10
+    assert {"o1-feedback-2025.12", "o1-feedback-2026.01"} <= set(result["partitions"])
+    assert mock_es.reindex.call_args.kwargs["script"]["params"]["prefix"] == "o1-feedback-"
+    mock_es.indices.update_aliases.assert_called_once_with(actions=[
+        {"add": {"indices": result["partitions"], "alias": "o1-feedback"}},
+        {"remove_index": {"index": "o1-feedback"}},
+    ])
+
+
+def test_partition_existing_feedback_skips_partitioned_alias(settings):
+    """An alias over monthly partitions is left alone; one over a versioned index is split."""
+    mock_es = MagicMock()
+    mock_es.indices.exists_alias.return_value = True
+    mock_es.indices.get_alias.return_value = {"o1-feedback-2026.01": {"aliases": {"o1-feedback": {}}}}
+    with patch("app.services.feedback_partition_service.get_es_client", return_value=mock_es), \
+         patch("app.services.es_service.get_es_client", return_value=mock_es):
+        assert partition_existing_feedback("o1")["status"] == "already_partitioned"
+
+        mock_es.indices.get_alias.return_value = {"o1-feedback-v2": {"aliases": {"o1-feedback": {}}}}
+        mock_es.search.return_value = {"aggregations": {"months": {"buckets": []}}}
+        mock_es.count.return_value = {"count": 0}
+        result = partition_existing_feedback("o1", dry_run=True)
+    assert result["status"] == "would_partition"
@@ -59,7 +59,7 @@ def test_post_feedback_manual_empty_text_returns_422(client: TestClient):
 def test_get_feedback_list(client: TestClient):
     """GET /feedback returns paginated list."""
     with patch("app.routers.feedback.get_feedback_items") as mock_get:
-        mock_get.return_value = ([], 0)
+        mock_get.return_value = ([], 0, False)
         resp = client.get("/api/v1/feedback")
     assert resp.status_code == 200
     data = resp.json()
@@ -67,6 +67,16 @@ def test_get_feedback_list(client: TestClient):
     assert "pagination" in data
 
 
+def test_get_feedback_list_reports_lower_bound_total(client: TestClient):
+    """A capped total is flagged; exact_total is passed through."""
+    with patch("app.routers.feedback.get_feedback_items") as mock_get:
+        mock_get.return_value = ([], 10000, True)
+        resp = client.get("/api/v1/feedback?exact_total=false")
+        assert resp.json()["pagination"]["total_is_lower_bound"] is True
+        client.get("/api/v1/feedback?exact_total=true")
+    assert mock_get.call_args.kwargs["exact_total"] is True
+
+
 def test_get_feedback_count(client: TestClient):
     """GET /feedback/count returns count."""
     with patch("app.routers.feedback.get_feedback_count", return_value=42):
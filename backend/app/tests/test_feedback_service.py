@@ -1,6 +1,6 @@
 """Feedback service tests."""
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -38,7 +38,8 @@ def test_create_feedback_item_requires_text():
 
 def test_create_feedback_items_bulk():
     """create_feedback_items_bulk returns (imported, failed)."""
-    with patch("app.services.feedback_service._ensure_feedback_index", return_value="o1-feedback"):
+    with patch("app.services.feedback_service._ensure_feedback_index", return_value="o1-feedback"), \
+            patch("app.services.feedback_service.get_customer_matcher"):
         with patch("app.services.feedback_service.analyze_sentiment", return_value=("neutral", 0)):
             with patch("app.services.feedback_service._resolve_customer", return_value={
                 "customer_id": None, "customer_name": None, "customer_segment": None,
@@ -57,6 +58,25 @@ def test_create_feedback_items_bulk():
                     assert len(created_ids) == 3
 
 
+def test_create_feedback_items_bulk_snapshots_only_indexed_docs():
+    """Docs rejected by the bulk request are not applied to the analytics snapshot."""
+    def bulk(index, docs, failed_ids=None):
+        failed_ids.append(docs[1]["id"])
+        return (2, 1)
+
+    with patch("app.services.feedback_service._ensure_feedback_index", return_value="o1-feedback"), \
+            patch("app.services.feedback_service.get_customer_matcher"), \
+            patch("app.services.feedback_service.analyze_sentiment", return_value=("neutral", 0)), \
+            patch("app.services.feedback_service._resolve_customer", return_value={
+                "customer_id": None, "customer_name": None, "customer_segment": None,
+            }), \
+            patch("app.services.feedback_service.bulk_index_documents", side_effect=bulk), \
+            patch("app.services.feedback_service.refresh_feedback_snapshot") as mock_refresh:
+        imported, failed, _ = create_feedback_items_bulk("o1", [{"text": "A"}, {"text": "B"}, {"text": "C"}])
+    assert (imported, failed) == (2, 1)
+    assert [d["text"] for d in mock_refresh.call_args.args[1]] == ["A", "C"]
+
+
 def test_get_feedback_item():
     """get_feedback_item returns doc when found and org matches."""
     with patch("app.services.feedback_service.get_document") as mock_get:
@@ -74,9 +94,47 @@ def test_get_feedback_item_returns_none_wrong_org():
         assert doc is None
 
 
+def test_get_feedback_items_bounds_total_hits():
+    """Newest-first listing counts at most list_track_total_hits matches unless exact_total."""
+    with patch("app.services.feedback_service.ensure_index_exists"), \
+         patch("app.services.feedback_service.get_es_client") as mock_es:
+        mock_es.return_value.search.return_value = {"hits": {"total": {"value": 10000, "relation": "gte"}, "hits": []}}
+        result = get_feedback_items("o1", page=2, page_size=20)
+        kwargs = mock_es.return_value.search.call_args.kwargs
+        assert kwargs["sort"] == [{"created_at": {"order": "desc"}}] and kwargs["from_"] == 20
+        assert kwargs["track_total_hits"] == 10000
+        assert result == ([], 10000, True)
+
+        mock_es.return_value.search.return_value = {"hits": {"total": {"value": 12345, "relation": "eq"}, "hits": []}}
+        assert get_feedback_items("o1", exact_total=True) == ([], 12345, False)
+        assert mock_es.return_value.search.call_args.kwargs["track_total_hits"] is True
+
+
 def test_get_feedback_count():
     """get_feedback_count returns count from ES."""
     with patch("app.services.feedback_service.get_es_client") as mock_es:
         mock_es.return_value.count.return_value = {"count": 42}
         count = get_feedback_count("o1")
         assert count == 42
+
+
+def test_resolve_customer_uses_matcher_for_names():
+    """_resolve_customer links by normalized name without an ES round trip."""
+    from app.services.customer_matching_service import CustomerMatcher
+    from app.services.feedback_service import _resolve_customer
+
+    matcher = CustomerMatcher([{"id": "c1", "company_name": "Acme Inc", "segment": "Enterprise"}])
+    result = _resolve_customer("o1", None, "ACME, Inc.", matcher)
+    assert result == {"customer_id": "c1", "customer_name": "Acme Inc", "customer_segment": "Enterprise"}
+
+
+def test_resolve_customer_unknown_id_falls_back_to_lookup():
+    """IDs missing from the matcher fall back to get_customer."""
+    from app.services.feedback_service import _resolve_customer
+
+    matcher = MagicMock()
+    matcher.get_by_id.return_value = None
+    with patch("app.services.feedback_service.get_customer", return_value={"id": "c2", "company_name": "Beta"}):
+        result = _resolve_customer("o1", "c2", None, matcher)
+    assert result["customer_id"] == "c2"
+    assert result["customer_name"] == "Beta"
@@ -0,0 +1,160 @@
+"""Feedback re-denormalization (sync job) tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import analytics_snapshot_service as snap
+from app.services.customer_matching_service import CustomerMatcher
+from app.services.feedback_sync_service import (
+    _await_sync_task,
+    _build_sync_request,
+    get_sync_job,
+    get_sync_jobs,
+    rethrottle_sync_job,
+    start_customer_sync,
+)
+
+
+@pytest.fixture
+def mock_es():
+    mock = MagicMock()
+    mock.mget.return_value = {
+        "docs": [
+            {"found": True, "_source": {"id": "c1", "org_id": "o1", "company_name": "Acme", "segment": "Enterprise"}},
+            {"found": True, "_source": {"id": "c2", "org_id": "o2", "company_name": "Other", "segment": "SMB"}},
+            {"found": False},
+        ]
+    }
+    mock.update_by_query.return_value = {"task": "node:42"}
+    mock.search.return_value = {"aggregations": {"names": {"buckets": []}}}
+    return mock
+
+
+def test_build_sync_request_matches_by_id_and_unlinked_name():
+    """Query covers linked feedback by id and unlinked feedback by normalized name."""
+    with patch("app.services.feedback_sync_service.get_customer_matcher", return_value=CustomerMatcher()):
+        req = _build_sync_request(
+            "o1", [{"id": "c1", "company_name": "Acme", "segment": "SMB"}], ["ACME, Inc.", "acme", "Globex"],
+        )
+    should = req["query"]["bool"]["should"]
+    assert should[0] == {"terms": {"customer_id": ["c1"]}}
+    assert should[1]["bool"]["filter"] == [{"terms": {"customer_name": ["ACME, Inc.", "acme"]}}]
+    assert req["script"]["params"]["by_id"]["c1"] == {"id": "c1", "name": "Acme", "segment": "SMB"}
+    assert req["script"]["params"]["by_name"]["ACME, Inc."]["id"] == "c1"
+
+
+def test_build_sync_request_without_unlinked_names_matches_by_id_only():
+    req = _build_sync_request("o1", [{"id": "c1", "company_name": "Acme", "segment": "SMB"}])
+    assert req["query"]["bool"]["should"] == [{"terms": {"customer_id": ["c1"]}}]
+
+
+def test_start_customer_sync_starts_throttled_task(mock_es):
+    """start_customer_sync runs sliced, throttled update_by_query without waiting."""
+    with patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es):
+        with patch("app.services.feedback_sync_service.ensure_index_exists"):
+            with patch("app.services.feedback_sync_service.index_document") as mock_idx, \
+                 patch("app.services.feedback_sync_service._watch_sync_task") as mock_watch:
+                jobs = start_customer_sync("o1", ["c1", "c2", "c3"], requests_per_second=100, slices="4")
+    assert len(jobs) == 1
+    mock_watch.assert_called_once_with(jobs[0])
+    assert snap._held == {"o1": {"node:42"}}
+    assert jobs[0]["task_id"] == "node:42"
+    assert jobs[0]["customer_ids"] == ["c1"]
+    kwargs = mock_es.update_by_query.call_args.kwargs
+    assert kwargs["index"] == "o1-feedback"
+    assert kwargs["wait_for_completion"] is False
+    assert kwargs["requests_per_second"] == 100
+    assert kwargs["slices"] == 4
+    assert kwargs["conflicts"] == "proceed"
+    mock_idx.assert_called_once()
+
+
+def test_start_customer_sync_empty_ids_noop(mock_es):
+    """No customer IDs means no ES work."""
+    with patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es):
+        assert start_customer_sync("o1", []) == []
+    mock_es.update_by_query.assert_not_called()
+
+
+def test_get_sync_job_updates_progress(mock_es):
+    """get_sync_job reads task status and marks completed jobs."""
+    job = {"id": "j1", "org_id": "o1", "task_id": "node:42", "status": "running"}
+    mock_es.tasks.get.return_value = {
+        "completed": True,
+        "response": {"total": 10, "updated": 7, "noops": 3, "failures": []},
+    }
+    with patch("app.services.feedback_sync_service.get_document", return_value=job):
+        with patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es):
+            with patch("app.services.feedback_sync_service.index_document"):
+                result = get_sync_job("o1", "j1")
+    assert result["status"] == "completed"
+    assert result["updated"] == 7
+    assert result["noops"] == 3
+
+
+def test_finished_sync_task_releases_snapshot_without_polling(mock_es):
+    """The watcher records completion and lets the org be snapshotted again."""
+    job = {"id": "j1", "org_id": "o1", "task_id": "node:42", "status": "running"}
+    snap.hold_feedback_snapshot("o1", "node:42")
+    mock_es.tasks.get.side_effect = [
+        {"completed": False, "task": {"status": {"total": 10, "updated": 2}}},
+        {"completed": True, "response": {"total": 10, "updated": 7, "noops": 3, "failures": []}},
+    ]
+    with patch("app.services.feedback_sync_service.time.sleep"), \
+         patch("app.services.feedback_sync_service.get_document", return_value=job), \
+         patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es), \
+         patch("app.services.feedback_sync_service.index_document") as mock_idx:
+        _await_sync_task(job)
+    assert mock_idx.call_args.args[2]["status"] == "completed"
+    assert snap._held == {}
+
+
+def test_lost_sync_task_fails_job_and_releases_snapshot(mock_es):
+    """A task that cannot be found is not watched forever."""
+    job = {"id": "j1", "org_id": "o1", "task_id": "node:42", "status": "running"}
+    snap.hold_feedback_snapshot("o1", "node:42")
+    mock_es.tasks.get.side_effect = Exception("resource_not_found_exception")
+    with patch("app.services.feedback_sync_service.time.sleep"), \
+         patch("app.services.feedback_sync_service.get_document", return_value=dict(job)), \
+         patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es), \
+         patch("app.services.feedback_sync_service.index_document") as mock_idx:
+        _await_sync_task(job)
+    assert mock_es.tasks.get.call_count == 12
+    saved = mock_idx.call_args.args[2]
+    assert saved["status"] == "failed" and "resource_not_found_exception" in saved["error_message"]
+    assert snap._held == {}
+
+
+def test_get_sync_jobs_sorts_newest_first_in_es():
+    """Sorting happens in the search, so the newest jobs are returned however many an org has."""
+    with patch("app.services.feedback_sync_service.ensure_index_exists"), \
+         patch("app.services.feedback_sync_service.search_documents", return_value=[]) as mock_search:
+        get_sync_jobs("o1", size=50)
+    assert mock_search.call_args.kwargs["sort"] == [{"created_at": {"order": "desc"}}]
+    assert mock_search.call_args.kwargs["size"] == 50
+
+
+def test_get_sync_job_wrong_org_returns_none():
+    """get_sync_job enforces org ownership."""
+    with patch("app.services.feedback_sync_service.get_document", return_value={"id": "j1", "org_id": "o2"}):
+        assert get_sync_job("o1", "j1") is None
+
+
+def test_rethrottle_sync_job(mock_es):
+    """rethrottle_sync_job forwards requests_per_second to ES."""
+    job = {"id": "j1", "org_id": "o1", "task_id": "node:42", "status": "running"}
+    with patch("app.services.feedback_sync_service.get_document", return_value=job):
+        with patch("app.services.feedback_sync_service.get_es_client", return_value=mock_es):
+            with patch("app.services.feedback_sync_service.index_document"):
+                result = rethrottle_sync_job("o1", "j1", -1)
+    mock_es.update_by_query_rethrottle.assert_called_once_with(task_id="node:42", requests_per_second=-1)
+    assert result["requests_per_second"] == -1
+
+
+def test_rethrottle_finished_job_raises():
+    """Only running jobs can be rethrottled."""
+    job = {"id": "j1", "org_id": "o1", "task_id": "node:42", "status": "completed"}
+    with patch("app.services.feedback_sync_service.get_document", return_value=job):
+        with pytest.raises(ValueError, match="not running"):
+            rethrottle_sync_job("o1", "j1", 10)
@@ -0,0 +1,35 @@
+"""Shared HTTP client tests."""
+
+import asyncio
+
+from app import http_client
+from app.http_client import close_http_clients, get_async_http_client, get_http_client
+from app.services.agent_service import get_agent_service
+
+
+def test_sync_client_is_shared_until_closed():
+    """get_http_client returns one pooled client; close_http_clients releases it."""
+    client = get_http_client()
+    assert get_http_client() is client
+    asyncio.run(close_http_clients())
+    assert client.is_closed
+    assert http_client._client is None
+
+
+def test_async_client_is_shared_per_event_loop():
+    """The async client is reused within a loop and closed on shutdown."""
+
+    async def _use():
+        first = get_async_http_client()
+        assert get_async_http_client() is first
+        await close_http_clients()
+        return first
+
+    client = asyncio.run(_use())
+    assert client.is_closed
+    assert http_client._async_client is None
+
+
+def test_get_agent_service_is_singleton():
+    """get_agent_service returns the same instance on every call."""
+    assert get_agent_service() is get_agent_service()
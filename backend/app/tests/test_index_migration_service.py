@@ -0,0 +1,198 @@
+"""Zero-downtime mapping migration tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.index_migration_service import (
+    advance_migration,
+    list_migrations,
+    split_migratable_index,
+    start_migration,
+)
+
+
+@pytest.fixture
+def settings():
+    mock = MagicMock()
+    mock.index_migration_requests_per_second = 500.0
+    mock.index_migration_slices = "auto"
+    mock.index_refresh_interval = "1s"
+    mock.index_number_of_replicas = 1
+    with patch("app.services.index_migration_service.get_settings", return_value=mock):
+        yield mock
+
+
+@pytest.fixture
+def store():
+    """Migration records kept in memory instead of the index-migrations index."""
+    saved = {}
+    with patch("app.services.index_migration_service.index_document",
+               side_effect=lambda index, doc_id, doc: saved.__setitem__(doc_id, dict(doc))), \
+         patch("app.services.index_migration_service.get_document", side_effect=lambda index, doc_id: saved.get(doc_id)), \
+         patch("app.services.index_migration_service.ensure_index_exists"):
+        yield saved
+
+
+def _resolved(*indices, filtered=False):
+    return {"indices": list(indices), "alias": indices != ("o1-feedback",), "filtered": filtered}
+
+
+def test_split_migratable_index_handles_versioned_names():
+    assert split_migratable_index("o1-feedback") == ("o1", "feedback")
+    assert split_migratable_index("o1-conversation-messages-v3") == ("o1", "conversation-messages")
+    assert split_migratable_index("users") is None
+
+
+def test_list_migrations_sorts_most_recent_first_in_es(store):
+    with patch("app.services.index_migration_service.search_documents", return_value=[]) as mock_search:
+        list_migrations("failed", size=10)
+    args, kwargs = mock_search.call_args
+    assert args[1] == {"term": {"status": "failed"}}
+    assert kwargs == {"size": 10, "sort": [{"updated_at": {"order": "desc"}}]}
+
+
+def test_start_migration_validates_source(settings, store):
+    """Missing names, filtered or partitioned aliases and current indices are refused."""
+    with patch("app.services.index_migration_service.resolve_index", return_value=None):
+        with pytest.raises(ValueError, match="does not exist"):
+            start_migration("o1", "feedback")
+    with patch("app.services.index_migration_service.resolve_index",
+               return_value=_resolved("shared-feedback", filtered=True)):
+        with pytest.raises(ValueError, match="filtered or multi-index"):
+            start_migration("o1", "feedback")
+    with patch("app.services.index_migration_service.resolve_index",
+               return_value=_resolved("o1-feedback-2026.01", "o1-feedback-2026.02")):
+        with pytest.raises(ValueError, match="filtered or multi-index"):
+            start_migration("o1", "feedback")
+    with patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback-v1")), \
+         patch.dict("app.services.index_migration_service.MAPPING_VERSIONS", {"feedback": 1}):
+        with pytest.raises(ValueError, match="already on mapping v1"):
+            start_migration("o1", "feedback")
+    assert store == {}
+
+
+def test_start_migration_records_pending_job(settings, store):
+    """A legacy concrete index gets a pending job to {org}-{type}-vN with the configured throttle."""
+    with patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback")), \
+         patch.dict("app.services.index_migration_service.MAPPING_VERSIONS", {"feedback": 2}):
+        job = start_migration("o1", "feedback", slices=4)
+        again = start_migration("o1", "feedback")
+
+    assert job["source_index"] == "o1-feedback" and job["dest_index"] == "o1-feedback-v2"
+    assert job["status"] == "pending" and job["requests_per_second"] == 500.0 and job["slices"] == "4"
+    assert again["id"] == job["id"] == "o1:feedback"
+    assert store["o1:feedback"]["status"] == "pending"
+
+
+def _job(status="pending", **extra):
+    return {
+        "id": "o1:feedback", "org_id": "o1", "data_type": "feedback", "alias": "o1-feedback",
+        "source_index": "o1-feedback", "dest_index": "o1-feedback-v2", "target_version": 2,
+        "status": status, "requests_per_second": 500.0, "slices": "auto", **extra,
+    }
+
+
+def test_advance_migration_walks_states_and_swaps(settings, store):
+    """Copy, catch-up, then write block, final pass and one atomic alias swap."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+    mock_es.reindex.side_effect = [{"task": "t1"}, {"task": "t2"}, {"total": 0}]
+    mock_es.tasks.get.side_effect = [
+        {"completed": False},
+        {"completed": True, "response": {"failures": []}},
+        {"completed": True, "response": {}},
+    ]
+    mock_es.count.return_value = {"count": 5}
+    mock_es.indices.stats.return_value = {"indices": {"o1-feedback": {"primaries": {"indexing": {"delete_total": 3}}}}}
+    with patch("app.services.index_migration_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback")), \
+         patch("app.services.index_migration_service._delete_strays") as mock_strays:
+        job = advance_migration(_job())
+        assert job["status"] == "copying" and job["task_id"] == "t1"
+        job = advance_migration(job)
+
+    assert job["status"] == "completed" and job["dest_count"] == 5
+    assert store["o1:feedback"]["status"] == "completed"
+    create = mock_es.indices.create.call_args.kwargs
+    assert create["index"] == "o1-feedback-v2" and create["settings"]["index.number_of_replicas"] == 0
+    first, _, final = [c.kwargs for c in mock_es.reindex.call_args_list]
+    assert first["dest"] == {"index": "o1-feedback-v2", "version_type": "external"}
+    assert first["requests_per_second"] == 500.0 and first["wait_for_completion"] is False
+    assert "ingested_at" in final["source"]["query"]["range"] and final["wait_for_completion"] is True
+    assert final["requests_per_second"] == -1
+    assert job["source_deletes"] == 3
+    mock_strays.assert_not_called()
+    mock_es.indices.add_block.assert_called_once_with(index="o1-feedback", block="write")
+    mock_es.indices.update_aliases.assert_called_once_with(actions=[
+        {"add": {"index": "o1-feedback-v2", "alias": "o1-feedback"}},
+        {"remove_index": {"index": "o1-feedback"}},
+    ])
+
+
+def test_finish_removes_docs_deleted_during_copy_even_when_counts_match(settings, store):
+    """Deletes offset by new docs leave counts equal; a moved delete counter still triggers the ID check."""
+    mock_es = MagicMock()
+    mock_es.count.return_value = {"count": 5}
+    mock_es.indices.stats.return_value = {"indices": {"o1-feedback": {"primaries": {"indexing": {"delete_total": 4}}}}}
+    job = _job("swapping", catchup_started_at="2026-01-01T00:00:00Z", source_deletes=3)
+    with patch("app.services.index_migration_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback")), \
+         patch("app.services.index_migration_service._delete_strays", return_value=2) as mock_strays:
+        job = advance_migration(job)
+
+    assert job["status"] == "completed" and job["strays_deleted"] == 2
+    mock_strays.assert_called_once()
+
+
+def test_final_pass_recopies_feedback_of_customers_synced_after_catch_up(settings, store):
+    """A sync rewrites customer fields without bumping ingested_at; its customers' feedback is copied again."""
+    mock_es = MagicMock()
+    mock_es.count.return_value = {"count": 5}
+    mock_es.indices.stats.return_value = {"indices": {"o1-feedback": {"primaries": {"indexing": {"delete_total": 3}}}}}
+    mock_es.search.return_value = {"hits": {"hits": [
+        {"_source": {"customer_ids": ["c1", "c2"]}}, {"_source": {"customer_ids": ["c2", "c3"]}},
+    ]}}
+    job = _job("swapping", catchup_started_at="2026-01-01T00:00:00Z", source_deletes=3)
+    with patch("app.services.index_migration_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback")):
+        job = advance_migration(job)
+
+    assert job["status"] == "completed"
+    jobs_query = mock_es.search.call_args.kwargs
+    assert jobs_query["index"] == "feedback-sync-jobs"
+    assert {"range": {"completed_at": {"gte": "2025-12-31T23:59:00Z"}}} in jobs_query["query"]["bool"]["should"]
+    should = mock_es.reindex.call_args.kwargs["source"]["query"]["bool"]["should"]
+    assert should == [
+        {"range": {"ingested_at": {"gte": "2025-12-31T23:59:00Z"}}},
+        {"terms": {"customer_id": ["c1", "c2", "c3"]}},
+    ]
+
+
+def test_finish_fails_and_unblocks_on_count_mismatch(settings, store):
+    """A short copy leaves the alias on source and lifts the write block."""
+    mock_es = MagicMock()
+    mock_es.count.side_effect = [{"count": 5}, {"count": 4}]
+    mock_es.indices.stats.return_value = {"indices": {"o1-feedback-v1": {"primaries": {"indexing": {"delete_total": 0}}}}}
+    job = _job(
+        "swapping", source_index="o1-feedback-v1", catchup_started_at="2026-01-01T00:00:00Z", source_deletes=0,
+    )
+    with patch("app.services.index_migration_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback-v1")):
+        job = advance_migration(job)
+
+    assert job["status"] == "failed" and "count mismatch" in job["error_message"]
+    mock_es.indices.update_aliases.assert_not_called()
+    mock_es.indices.put_settings.assert_called_once_with(index="o1-feedback-v1", settings={"index.blocks.write": False})
+
+
+def test_resume_after_swap_only_completes_record(settings, store):
+    """If the alias already points at dest, the interrupted job is just marked completed."""
+    mock_es = MagicMock()
+    with patch("app.services.index_migration_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_migration_service.resolve_index", return_value=_resolved("o1-feedback-v2")):
+        job = advance_migration(_job("swapping", catchup_started_at="2026-01-01T00:00:00Z"))
+
+    assert job["status"] == "completed"
+    mock_es.indices.add_block.assert_not_called()
+    mock_es.reindex.assert_not_called()
@@ -0,0 +1,91 @@
+"""Index template and mapping version tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import index_template_service
+from app.services.es_service import ensure_index_exists
+from app.services.index_template_service import (
+    MAPPING_VERSIONS,
+    build_template,
+    check_mapping_versions,
+    install_index_templates,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_installed():
+    index_template_service._installed = False
+    yield
+    index_template_service._installed = False
+
+
+def test_feedback_template_follows_elser_and_settings():
+    """Feedback template picks the mapping at install time and carries its version."""
+    with patch("app.services.index_template_service.is_elser_available", return_value=True):
+        body = build_template("feedback")
+    assert body["index_patterns"] == ["*-feedback", "*-feedback-*"]
+    assert body["template"]["settings"] == {
+        "number_of_shards": 1, "number_of_replicas": 1, "refresh_interval": "1s",
+        "index.sort.field": "created_at", "index.sort.order": "desc",
+    }
+    mappings = body["template"]["mappings"]
+    assert "text_semantic" in mappings["properties"]
+    assert mappings["_meta"] == {"mapping_version": MAPPING_VERSIONS["feedback"], "template": "context-engine-feedback", "semantic": True, "profile": "lean"}
+
+    with patch("app.services.index_template_service.is_elser_available", return_value=False):
+        assert "text_semantic" not in build_template("feedback")["template"]["mappings"]["properties"]
+
+
+def test_template_priorities_are_distinct_and_clear_of_fleet():
+    """Overlapping patterns need distinct priorities; Fleet integration templates use 200."""
+    with patch("app.services.index_template_service.is_elser_available", return_value=False):
+        priorities = [build_template(t)["priority"] for t in MAPPING_VERSIONS]
+    assert len(set(priorities)) == len(priorities)
+    assert min(priorities) > 200
+
+
+def test_install_templates_then_org_indices_created_without_body():
+    """After install, new per-org indices come from the template; repeats skip ES."""
+    mock_es = MagicMock()
+    mock_es.indices.exists.return_value = False
+    with patch("app.services.index_template_service.get_es_client", return_value=mock_es), \
+         patch("app.services.es_service.get_es_client", return_value=mock_es):
+        names = install_index_templates()
+        ensure_index_exists("o1-customers", {"mappings": {}})
+        ensure_index_exists("o1-customers", {"mappings": {}})
+        ensure_index_exists("users", {"mappings": {"properties": {}}})
+
+    assert len(names) == len(MAPPING_VERSIONS) == mock_es.indices.put_index_template.call_count
+    create_calls = [c.kwargs for c in mock_es.indices.create.call_args_list]
+    assert create_calls == [{"index": "o1-customers"}, {"index": "users", "body": {"mappings": {"properties": {}}}}]
+    assert mock_es.indices.exists.call_count == 2
+
+
+def test_check_mapping_versions_reports_outdated():
+    """Indices without the current version, or missing text_semantic, are reported."""
+    def get_mapping(index, **_):
+        if index.startswith("*-feedback"):
+            return {
+                "o1-feedback": {"mappings": {"properties": {"text": {}}}},
+                "o2-feedback": {"mappings": {
+                    "_meta": {"mapping_version": MAPPING_VERSIONS["feedback"]},
+                    "properties": {"text_semantic": {}},
+                }},
+            }
+        if index.startswith("*-customers"):
+            return {"o1-customers": {"mappings": {"_meta": {"mapping_version": MAPPING_VERSIONS["customers"]}}}}
+        return {}
+
+    mock_es = MagicMock()
+    mock_es.indices.get_mapping.side_effect = get_mapping
+    with patch("app.services.index_template_service.get_es_client", return_value=mock_es), \
+         patch("app.services.index_template_service.is_elser_available", return_value=True):
+        report = check_mapping_versions()
+
+    assert report["checked"] == 3
+    assert report["outdated"] == [{
+        "index": "o1-feedback", "data_type": "feedback", "mapping_version": 0,
+        "expected": MAPPING_VERSIONS["feedback"], "reason": "mapping_version",
+    }]
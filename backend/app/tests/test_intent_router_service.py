@@ -0,0 +1,131 @@
+"""Local fast-path intent routing tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import intent_router_service
+from app.services.intent_router_service import (
+    answer_locally,
+    classify_intent,
+    get_fast_path_metrics,
+    record_escalation,
+    record_fast_path,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    intent_router_service._cache.clear()
+    with patch.dict(intent_router_service._metrics, {
+        "requests": 0, "fast_path_hits": 0, "fast_path_ms": 0.0,
+        "escalations": 0, "escalated_ms": 0.0, "by_intent": {},
+    }):
+        yield
+    intent_router_service._cache.clear()
+
+
+@pytest.fixture
+def settings():
+    mock = MagicMock()
+    mock.agent_fast_path_enabled = True
+    mock.agent_fast_path_cache_seconds = 60
+    with patch("app.services.intent_router_service.get_settings", return_value=mock):
+        yield mock
+
+
+@pytest.mark.parametrize("message,intent,period", [
+    ("What are the top issues this week?", "top_issues", "7d"),
+    ("Which customers are at risk?", "at_risk", "30d"),
+    ("Feedback by segment last quarter", "compare_segments", "90d"),
+    ("Show sentiment by product area", "area_breakdown", "30d"),
+    ("Give me a summary", "summary", "30d"),
+])
+def test_classify_templated_questions(message, intent, period):
+    """Templated analytics questions map to an intent and period."""
+    assert classify_intent("o1", message) == {"intent": intent, "period": period}
+
+
+@pytest.mark.parametrize("message", [
+    "Why are enterprise customers unhappy with checkout?",
+    "What should we prioritize this quarter?",
+    "Generate a spec for the top issues",
+    "What's happening with checkout this week?",
+    "Can you look at the top issues and tell me which ones overlap with the roadmap items we discussed?",
+])
+def test_open_ended_questions_escalate(message):
+    """Reasoning, writing, long or unrecognized questions go to the agent."""
+    with patch("app.services.intent_router_service.get_customer_matcher") as mock_matcher:
+        mock_matcher.return_value.match.return_value = None
+        assert classify_intent("o1", message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "what are the top issues for Acme?",
+    "top issues in billing this month",
+    "is Acme at risk?",
+    "how does the enterprise segment feel about onboarding",
+    "summary of mobile area",
+])
+def test_scoped_questions_escalate(message):
+    """Analytics answers are org-wide, so questions about one customer, area or segment go to the agent."""
+    with patch("app.services.intent_router_service.get_customer_matcher") as mock_matcher:
+        mock_matcher.return_value.match.return_value = None
+        assert classify_intent("o1", message) is None
+
+
+def test_customer_lookup_requires_known_customer():
+    """Customer lookups resolve through the org's customer matcher."""
+    with patch("app.services.intent_router_service.get_customer_matcher") as mock_matcher:
+        mock_matcher.return_value.match.side_effect = lambda name: {"id": "c1"} if name == "Acme" else None
+        assert classify_intent("o1", "How is Acme doing?") == {
+            "intent": "customer_lookup", "period": "30d", "customer_id": "c1",
+        }
+        assert classify_intent("o1", "Tell me about onboarding") is None
+
+
+def test_answer_locally_renders_and_caches(settings):
+    """Answers come from analytics_service and are reused within the cache window."""
+    issues = {"issues": [{
+        "product_area": "checkout", "feedback_count": 12, "affected_customers": 4,
+        "avg_sentiment": -0.6, "growth_rate": 50.0, "severity": "high",
+    }]}
+    with patch("app.services.intent_router_service.get_top_issues", return_value=issues) as mock_top:
+        first = answer_locally("o1", "Top issues this week")
+        second = answer_locally("o1", "What are the biggest problems last week?")
+
+    assert first["intent"] == "top_issues"
+    assert "| checkout | 12 | 4 | -0.6 | +50.0% | high |" in first["response"]
+    assert second == first
+    mock_top.assert_called_once_with("o1", "7d")
+
+
+def test_answer_cache_prunes_expired_and_caps_entries(settings):
+    """Expired answers are dropped on write, and the least recently used go beyond the cap."""
+    with patch("app.services.intent_router_service.time.monotonic", return_value=0.0):
+        intent_router_service._cache_put(("o1", "summary", "30d", ""), "old", 60)
+    with patch("app.services.intent_router_service.time.monotonic", return_value=100.0), \
+         patch("app.services.intent_router_service._CACHE_MAX_ENTRIES", 2):
+        for org in ("o2", "o3", "o4"):
+            intent_router_service._cache_put((org, "summary", "30d", ""), org, 60)
+    assert [k[0] for k in intent_router_service._cache] == ["o3", "o4"]
+
+
+def test_answer_locally_escalates_on_failure_or_when_disabled(settings):
+    """Analytics errors and a disabled fast path fall back to the agent."""
+    with patch("app.services.intent_router_service.get_summary", side_effect=RuntimeError("es down")):
+        assert answer_locally("o1", "Give me a summary") is None
+    settings.agent_fast_path_enabled = False
+    assert answer_locally("o1", "Give me a summary") is None
+
+
+def test_fast_path_metrics():
+    """Hit rate and estimated savings come from recorded latencies."""
+    record_fast_path("summary", 40.0)
+    record_fast_path("top_issues", 60.0)
+    record_escalation(3050.0)
+    metrics = get_fast_path_metrics()
+    assert metrics["requests"] == 3 and metrics["hit_rate"] == 0.667
+    assert metrics["avg_fast_path_ms"] == 50.0 and metrics["avg_escalated_ms"] == 3050.0
+    assert metrics["estimated_ms_saved"] == 6000.0
+    assert metrics["by_intent"] == {"summary": 1, "top_issues": 1}
@@ -0,0 +1,82 @@
+"""LLM completion cache tests."""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from app.services import llm_cache_service
+from app.services.llm_cache_service import (
+    completion_cache_key,
+    get_cached_completion,
+    prune_llm_cache,
+    store_completion,
+)
+
+
+def _settings(**overrides):
+    mock = MagicMock()
+    mock.llm_cache_enabled = True
+    mock.llm_cache_ttl_seconds = 3600
+    mock.llm_cache_max_entries = 2
+    mock.llm_cache_max_entry_bytes = 100
+    for k, v in overrides.items():
+        setattr(mock, k, v)
+    return mock
+
+
+def test_completion_cache_key_covers_prompt_system_and_model():
+    """Key is stable and changes with any of its inputs."""
+    key = completion_cache_key("p", "s", "model-a")
+    assert key == completion_cache_key("p", "s", "model-a")
+    assert key != completion_cache_key("p", "s", "model-b")
+    assert key != completion_cache_key("p", None, "model-a")
+    assert key != completion_cache_key("p2", "s", "model-a")
+
+
+def test_get_cached_completion_respects_ttl():
+    """Fresh entries are returned; expired ones are ignored."""
+    fresh = {"text": "# PRD", "created_at": datetime.utcnow().isoformat() + "Z"}
+    stale = {"text": "# PRD", "created_at": (datetime.utcnow() - timedelta(hours=2)).isoformat() + "Z"}
+    with patch("app.services.llm_cache_service.get_settings", return_value=_settings()):
+        with patch("app.services.llm_cache_service.get_document", return_value=fresh):
+            assert get_cached_completion("k") == "# PRD"
+        with patch("app.services.llm_cache_service.get_document", return_value=stale):
+            assert get_cached_completion("k") is None
+    with patch("app.services.llm_cache_service.get_settings", return_value=_settings(llm_cache_enabled=False)):
+        with patch("app.services.llm_cache_service.get_document", return_value=fresh) as mock_get:
+            assert get_cached_completion("k") is None
+    mock_get.assert_not_called()
+
+
+def test_store_completion_skips_oversize_entries():
+    """Entries above llm_cache_max_entry_bytes are not stored."""
+    with patch("app.services.llm_cache_service.get_settings", return_value=_settings()), \
+         patch("app.services.llm_cache_service.index_document") as mock_index:
+        store_completion("k1", "short", "m")
+        store_completion("k2", "x" * 500, "m")
+    assert mock_index.call_count == 1
+    assert mock_index.call_args[0][1] == "k1"
+
+
+def test_store_completion_prunes_periodically():
+    """Every _PRUNE_EVERY stores trigger one prune."""
+    llm_cache_service._stores_since_prune = llm_cache_service._PRUNE_EVERY - 1
+    with patch("app.services.llm_cache_service.get_settings", return_value=_settings()), \
+         patch("app.services.llm_cache_service.index_document"), \
+         patch("app.services.llm_cache_service.prune_llm_cache") as mock_prune:
+        store_completion("k", "text", "m")
+    mock_prune.assert_called_once()
+    assert llm_cache_service._stores_since_prune == 0
+
+
+def test_prune_llm_cache_drops_expired_then_oldest_excess():
+    """Expired entries go first, then the oldest beyond the max entry count."""
+    mock_es = MagicMock()
+    mock_es.delete_by_query.side_effect = [{"deleted": 3}, {"deleted": 1}]
+    mock_es.count.return_value = {"count": 3}
+    mock_es.search.return_value = {"hits": {"hits": [{"_id": "oldest"}]}}
+    with patch("app.services.llm_cache_service.get_settings", return_value=_settings()), \
+         patch("app.services.llm_cache_service.get_es_client", return_value=mock_es):
+        deleted = prune_llm_cache()
+    assert deleted == 4
+    assert mock_es.search.call_args.kwargs["size"] == 1
+    assert mock_es.delete_by_query.call_args.kwargs["query"] == {"ids": {"values": ["oldest"]}}
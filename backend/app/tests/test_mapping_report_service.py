@@ -0,0 +1,49 @@
+"""Lean feedback mapping and profile comparison tests."""
+
+from unittest.mock import MagicMock, patch
+
+from app.models.feedback import FEEDBACK_MAPPING_WITH_ELSER, feedback_mapping
+from app.services.mapping_report_service import compare_feedback_profiles
+
+
+def test_lean_profile_trims_unqueried_indexing():
+    """No text.keyword or positions, author fields and metadata unindexed, hot keys eager."""
+    props = feedback_mapping(True, "lean")["mappings"]["properties"]
+    assert props["text"] == {"type": "text", "index_options": "freqs"}
+    assert props["author_email"] == {"type": "keyword", "index": False, "doc_values": False}
+    assert props["metadata"] == {"type": "object", "enabled": False}
+    assert props["product_area"]["eager_global_ordinals"] is True
+    assert "eager_global_ordinals" not in props["customer_id"]
+    assert props["customer_name"]["ignore_above"] == 256
+    assert props["text_semantic"] == FEEDBACK_MAPPING_WITH_ELSER["mappings"]["properties"]["text_semantic"]
+    assert feedback_mapping(True, "standard") is FEEDBACK_MAPPING_WITH_ELSER
+    assert "text_semantic" not in feedback_mapping(False, "lean")["mappings"]["properties"]
+
+
+def _stats(index, store):
+    return {"indices": {index: {"primaries": {
+        "docs": {"count": 100}, "store": {"size_in_bytes": store},
+        "segments": {"count": 1}, "fielddata": {"memory_size_in_bytes": 2048},
+    }}}}
+
+
+def test_compare_feedback_profiles_reports_savings_and_cleans_up():
+    """Each profile gets a scratch copy; sizes are compared and scratch indices dropped."""
+    mock_es = MagicMock()
+    mock_es.indices.stats.side_effect = [_stats("mapping-report-standard", 1000), _stats("mapping-report-lean", 600)]
+    mock_es.indices.disk_usage.side_effect = [
+        {"mapping-report-standard": {"fields": {"text.keyword": {"total_in_bytes": 300}}}},
+        {"mapping-report-lean": {"fields": {"text": {"total_in_bytes": 200}}}},
+    ]
+    with patch("app.services.mapping_report_service.get_es_client", return_value=mock_es):
+        report = compare_feedback_profiles("o1", max_docs=100)
+
+    assert report["docs"] == 100
+    assert report["savings"] == {"store_bytes": 400, "store_pct": 40.0}
+    assert report["profiles"]["standard"]["fields"] == {"text.keyword": 300}
+    lean_create = mock_es.indices.create.call_args_list[1].kwargs
+    assert lean_create["index"] == "mapping-report-lean"
+    assert lean_create["mappings"]["properties"]["metadata"] == {"type": "object", "enabled": False}
+    assert mock_es.reindex.call_args.kwargs["source"]["index"] == "o1-feedback"
+    deleted = [c.kwargs["index"] for c in mock_es.indices.delete.call_args_list]
+    assert deleted[-2:] == ["mapping-report-standard", "mapping-report-lean"]
@@ -0,0 +1,60 @@
+"""Quote selection (dedupe, diverse ordering, token budget) tests."""
+
+from app.services.quote_selection_service import (
+    dedupe_quotes,
+    diverse_order,
+    estimate_tokens,
+    fit_to_budget,
+    minhash,
+    shingles,
+    similarity,
+)
+
+
+def _q(i, text, customer="c1", area="checkout", sentiment="negative"):
+    return {"id": f"fb{i}", "text": text, "customer_id": customer, "product_area": area, "sentiment": sentiment}
+
+
+def test_minhash_similarity_separates_near_duplicates_from_distinct_text():
+    """Near-identical texts score high; unrelated texts score low."""
+    a = minhash(shingles("The checkout form loses all my data when I press the back button"))
+    b = minhash(shingles("The checkout form loses all my data when I press the back button!!"))
+    c = minhash(shingles("Exporting reports to CSV takes forever on large workspaces"))
+    assert similarity(a, b) > 0.9
+    assert similarity(a, c) < 0.2
+
+
+def test_dedupe_quotes_collapses_near_duplicates():
+    """Near-duplicates fold into the first quote, which records them."""
+    quotes = [
+        _q(1, "Checkout form loses state when navigating back to the cart page"),
+        _q(2, "checkout form loses state when navigating back to the cart page.", customer="c2"),
+        _q(3, "Search results are slow and irrelevant for product names"),
+    ]
+    kept, sigs = dedupe_quotes(quotes)
+    assert [q["id"] for q in kept] == ["fb1", "fb3"]
+    assert kept[0]["similar_count"] == 1
+    assert kept[0]["similar_ids"] == ["fb2"]
+    assert len(sigs) == 2
+
+
+def test_diverse_order_prefers_uncovered_customers_and_areas():
+    """After the top quote, a quote from a new customer/area beats another from the same one."""
+    quotes = [
+        _q(1, "Checkout button does nothing on mobile safari"),
+        _q(2, "Coupon field rejects valid codes at checkout"),
+        _q(3, "Invoices page times out for large accounts", customer="c9", area="billing", sentiment="neutral"),
+    ]
+    kept, sigs = dedupe_quotes(quotes)
+    ordered = diverse_order(kept, sigs)
+    assert ordered[0]["id"] == "fb1"
+    assert ordered[1]["id"] == "fb3"
+
+
+def test_fit_to_budget_skips_quotes_that_do_not_fit():
+    """Lines are taken in order until the budget is reached; oversize lines are skipped."""
+    quotes = [_q(1, "short"), _q(2, "x" * 400), _q(3, "also short")]
+    lines, used = fit_to_budget(quotes, 20, lambda q: q["text"])
+    assert lines == ["short", "also short"]
+    assert used <= 20
+    assert estimate_tokens("abcd" * 10) == 10
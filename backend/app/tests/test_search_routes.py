@@ -56,7 +56,7 @@ def test_post_search_feedback_with_query_returns_200(client: TestClient):
 def test_post_search_feedback_with_filters_returns_filtered(client: TestClient):
     """POST /search/feedback with filters returns filtered results."""
     with patch("app.routers.search.search_feedback") as mock_search:
-        mock_search.return_value = ([], 0)
+        mock_search.return_value = ([], 0, False)
         resp = client.post(
             "/api/v1/search/feedback",
             json={
@@ -110,7 +110,7 @@ def test_get_customers_id_feedback_returns_customer_feedback(client: TestClient)
     with patch("app.routers.customers.get_customer") as mock_get_cust:
         mock_get_cust.return_value = {"id": "c1", "company_name": "Acme"}
         with patch("app.routers.customers.get_customer_feedback") as mock_fb:
-            mock_fb.return_value = ([{"id": "f1", "text": "Great"}], 1)
+            mock_fb.return_value = ([{"id": "f1", "text": "Great"}], 1, False)
             resp = client.get("/api/v1/customers/c1/feedback")
     assert resp.status_code == 200
     data = resp.json()
@@ -61,11 +61,13 @@ def test_search_feedback_empty_query_returns_match_all():
             mock_es.search.return_value = {"hits": {"total": {"value": 10}, "hits": []}}
             mock_es_cls.return_value = mock_es
 
-            items, total = search_feedback("o1", "", None, "relevance", 1, 20)
+            items, total, _ = search_feedback("o1", "", None, "relevance", 1, 20)
             assert items == []
             assert total == 10
             call_query = mock_es.search.call_args[1]["query"]
             assert "match_all" in str(call_query)
+            assert mock_es.search.call_args[1]["sort"] == [{"created_at": {"order": "desc"}}]
+            assert mock_es.search.call_args[1]["track_total_hits"] == 10000
 
 
 def test_search_feedback_with_query_calls_es():
@@ -85,7 +87,7 @@ def test_search_feedback_with_query_calls_es():
                 }
                 mock_es_cls.return_value = mock_es
 
-                items, total = search_feedback("o1", "payment", None, "relevance", 1, 20)
+                items, total, _ = search_feedback("o1", "payment", None, "relevance", 1, 20)
                 assert len(items) == 2
                 assert total == 2
                 assert items[0]["text"] == "checkout broken"
@@ -0,0 +1,277 @@
+"""Background spec generation job tests."""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import spec_job_service
+from app.services.spec_job_service import (
+    SpecJobLimitError,
+    _run_spec_job,
+    get_spec_status,
+    spec_progress_events,
+    start_spec_generation,
+    start_spec_regeneration,
+)
+
+DATA_BRIEF = {"topic": "checkout", "feedback_count": 3, "customer_count": 2, "total_arr": 1000}
+CONTEXT = MagicMock()
+HASHES = {"prd": "h-prd", "architecture": "h-arch", "rules": "h-rules", "plan": "h-plan"}
+
+
+@pytest.fixture(autouse=True)
+def reset_inflight():
+    spec_job_service._inflight.clear()
+    spec_job_service._queued.clear()
+    yield
+    spec_job_service._inflight.clear()
+    spec_job_service._queued.clear()
+
+
+def test_start_spec_generation_saves_generating_doc_and_queues_job():
+    """The spec is indexed in 'generating' status before the job is queued."""
+    with patch("app.services.spec_job_service.gather_spec_inputs", return_value=(DATA_BRIEF, CONTEXT)), \
+         patch("app.services.spec_service.get_user_by_id", return_value={"full_name": "PM"}), \
+         patch("app.services.spec_job_service.ensure_specs_index_exists", return_value="specs-o1"), \
+         patch("app.services.spec_job_service.index_document") as mock_index, \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        doc = start_spec_generation("o1", "u1", "checkout")
+
+    assert doc["status"] == "generating"
+    assert doc["prd"] == "" and doc["sections_completed"] == []
+    mock_index.assert_called_once_with("specs-o1", doc["id"], doc)
+    mock_submit.assert_called_once_with("o1", doc["id"], DATA_BRIEF, keep_previous=False, product_context=CONTEXT)
+
+
+def test_start_spec_generation_enforces_per_org_limit():
+    """A third concurrent job for the same org is rejected; other orgs are unaffected."""
+    with patch("app.services.spec_job_service.get_settings") as mock_settings, \
+         patch("app.services.spec_job_service.gather_spec_inputs", return_value=(DATA_BRIEF, CONTEXT)), \
+         patch("app.services.spec_service.get_user_by_id", return_value=None), \
+         patch("app.services.spec_job_service.ensure_specs_index_exists", return_value="specs-o1"), \
+         patch("app.services.spec_job_service.index_document"), \
+         patch("app.services.spec_job_service._get_executor"):
+        mock_settings.return_value.spec_job_max_per_org = 2
+        start_spec_generation("o1", "u1", "a")
+        start_spec_generation("o1", "u1", "b")
+        with pytest.raises(SpecJobLimitError):
+            start_spec_generation("o1", "u1", "c")
+        start_spec_generation("o2", "u1", "a")
+    assert spec_job_service._inflight == {"o1": 2, "o2": 1}
+
+
+def test_start_spec_generation_releases_slot_on_no_feedback():
+    """ValueError from data gathering propagates and frees the slot."""
+    with patch("app.services.spec_job_service.gather_spec_inputs", side_effect=ValueError("No feedback")):
+        with pytest.raises(ValueError, match="No feedback"):
+            start_spec_generation("o1", "u1", "checkout")
+    assert "o1" not in spec_job_service._inflight
+
+
+def test_start_spec_regeneration_rejects_spec_already_generating():
+    """Regenerating a spec that is still generating raises ValueError."""
+    with patch("app.services.spec_job_service.get_spec", return_value={"id": "s1", "status": "generating", "data_brief": DATA_BRIEF}):
+        with pytest.raises(ValueError, match="already"):
+            start_spec_regeneration("o1", "s1")
+
+
+def test_start_spec_regeneration_restarts_interrupted_job():
+    """A spec left 'generating' longer than any job can run is regenerated, and reported failed meanwhile."""
+    stuck = {"id": "s1", "status": "generating", "data_brief": DATA_BRIEF, "updated_at": "2020-01-01T00:00:00Z"}
+    with patch("app.services.spec_job_service.get_spec", return_value=dict(stuck)):
+        status = get_spec_status("o1", "s1")
+    assert status["status"] == "failed"
+    assert "interrupted" in status["error_message"]
+
+    with patch("app.services.spec_job_service.get_spec", return_value=dict(stuck)), \
+         patch("app.services.spec_job_service.get_product_context", return_value=CONTEXT), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.update_document"), \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        doc = start_spec_regeneration("o1", "s1")
+    assert doc["status"] == "generating"
+    mock_submit.assert_called_once()
+
+
+def test_spec_waiting_for_a_worker_is_not_interrupted():
+    """Time queued behind other jobs does not count; the timeout starts when a worker picks the job up."""
+    queued = {"id": "s1", "status": "generating", "data_brief": DATA_BRIEF, "updated_at": "2020-01-01T00:00:00Z"}
+    with patch("app.services.spec_job_service._get_executor") as mock_executor:
+        spec_job_service._submit("o1", "s1", DATA_BRIEF, keep_previous=False)
+    assert spec_job_service.job_interrupted(queued) is False
+    with patch("app.services.spec_job_service.get_spec", return_value=dict(queued)):
+        assert get_spec_status("o1", "s1")["status"] == "generating"
+        with pytest.raises(ValueError, match="already"):
+            start_spec_regeneration("o1", "s1")
+
+    job = mock_executor.return_value.submit.call_args.args
+    with patch("app.services.spec_job_service.update_document"), \
+         patch("app.services.spec_job_service.get_product_context", side_effect=RuntimeError("stop")):
+        job[0](*job[1:], **mock_executor.return_value.submit.call_args.kwargs)
+    assert "s1" not in spec_job_service._queued
+
+
+def test_start_spec_regeneration_marks_generating():
+    """Regeneration flips status to 'generating' and queues with keep_previous."""
+    existing = {"id": "s1", "status": "draft", "prd": "# Old", "data_brief": DATA_BRIEF}
+    with patch("app.services.spec_job_service.get_spec", return_value=existing), \
+         patch("app.services.spec_job_service.get_product_context", return_value=CONTEXT), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.update_document") as mock_update, \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        doc = start_spec_regeneration("o1", "s1")
+
+    assert doc["status"] == "generating"
+    assert doc["prd"] == "# Old"
+    assert doc["sections_regenerated"] == ["prd", "architecture", "rules", "plan"]
+    assert mock_update.call_args[0][2]["status"] == "generating"
+    mock_submit.assert_called_once_with(
+        "o1", "s1", DATA_BRIEF,
+        keep_previous=True, product_context=CONTEXT,
+        sections=("prd", "architecture", "rules", "plan"), use_cache=True,
+    )
+
+
+def test_start_spec_regeneration_only_queues_changed_sections():
+    """Sections whose input hash is unchanged are kept; unchanged specs are not queued."""
+    existing = {
+        "id": "s1", "status": "draft", "data_brief": DATA_BRIEF,
+        "prd": "# PRD", "architecture": "# Arch", "rules": "# Rules", "plan": "# Plan",
+        "section_input_hashes": {**HASHES, "rules": "old"},
+    }
+    with patch("app.services.spec_job_service.get_spec", return_value=dict(existing)), \
+         patch("app.services.spec_job_service.get_product_context", return_value=CONTEXT), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.update_document") as mock_update, \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        doc = start_spec_regeneration("o1", "s1")
+
+    assert doc["sections_regenerated"] == ["rules"]
+    assert mock_update.call_args[0][2]["sections_completed"] == ["prd", "architecture", "plan"]
+    assert mock_submit.call_args.kwargs["sections"] == ("rules",)
+
+    unchanged = {**existing, "section_input_hashes": HASHES}
+    with patch("app.services.spec_job_service.get_spec", return_value=unchanged), \
+         patch("app.services.spec_job_service.get_product_context", return_value=CONTEXT), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        doc = start_spec_regeneration("o1", "s1")
+    assert doc["sections_regenerated"] == []
+    assert doc["status"] == "draft"
+    mock_submit.assert_not_called()
+
+    with patch("app.services.spec_job_service.get_spec", return_value=dict(unchanged)), \
+         patch("app.services.spec_job_service.get_product_context", return_value=CONTEXT), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.update_document"), \
+         patch("app.services.spec_job_service._submit") as mock_submit:
+        start_spec_regeneration("o1", "s1", force=True)
+    assert mock_submit.call_args.kwargs["use_cache"] is False
+    assert len(mock_submit.call_args.kwargs["sections"]) == 4
+
+
+def test_run_spec_job_writes_each_section_then_finalizes():
+    """Each finished section is written as it completes; final write sets draft and errors."""
+    spec_job_service._inflight["o1"] = 1
+
+    async def _fake_generate(data_brief, product_context, sections=None, on_section=None, on_token=None, use_cache=True):
+        on_token("rules", "# Ru")
+        await on_section("rules", "# Rules", None)
+        await on_section("prd", "# PRD", None)
+        await on_section("plan", None, "timed out after 1s")
+        return {"rules": "# Rules", "prd": "# PRD"}, {"plan": "timed out after 1s"}
+
+    with patch("app.services.spec_job_service.get_product_context", return_value=None), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.generate_documents", side_effect=_fake_generate), \
+         patch("app.services.spec_job_service.update_document") as mock_update:
+        _run_spec_job("o1", "s1", DATA_BRIEF, keep_previous=False)
+
+    writes = [c[0][2] for c in mock_update.call_args_list]
+    assert list(writes.pop(0)) == ["updated_at"]
+    assert writes[0]["rules"] == "# Rules" and writes[0]["sections_completed"] == ["rules"]
+    assert writes[0]["section_input_hashes"] == {"rules": "h-rules"}
+    assert writes[1]["prd"] == "# PRD" and writes[1]["sections_completed"] == ["rules", "prd"]
+    final = writes[-1]
+    assert final["status"] == "draft"
+    assert final["generation_errors"] == {"plan": "timed out after 1s"}
+    assert "could not be generated" in final["plan"]
+    assert "o1" not in spec_job_service._inflight
+
+
+def test_run_spec_job_marks_failed_when_all_sections_fail():
+    """An exception from generation marks the spec failed with an error message."""
+    spec_job_service._inflight["o1"] = 1
+
+    async def _fail(*args, **kwargs):
+        raise ValueError("LLM unavailable")
+
+    with patch("app.services.spec_job_service.get_product_context", return_value=None), \
+         patch("app.services.spec_job_service.section_input_hashes", return_value=HASHES), \
+         patch("app.services.spec_job_service.generate_documents", side_effect=_fail), \
+         patch("app.services.spec_job_service.update_document") as mock_update:
+        _run_spec_job("o1", "s1", DATA_BRIEF, keep_previous=True)
+
+    final = mock_update.call_args[0][2]
+    assert final["status"] == "failed"
+    assert final["error_message"] == "LLM unavailable"
+    assert "o1" not in spec_job_service._inflight
+
+
+def test_get_spec_status():
+    """get_spec_status returns lightweight progress, None when missing."""
+    doc = {"id": "s1", "status": "generating", "sections_completed": ["prd"], "updated_at": datetime.utcnow().isoformat() + "Z"}
+    with patch("app.services.spec_job_service.get_spec", return_value=doc):
+        result = get_spec_status("o1", "s1")
+    assert result["status"] == "generating"
+    assert result["sections_completed"] == ["prd"]
+    with patch("app.services.spec_job_service.get_spec", return_value=None):
+        assert get_spec_status("o1", "missing") is None
+
+
+def test_spec_progress_events_emits_sections_then_done():
+    """Events stream status, each new section once, then done."""
+    snapshots = [
+        {"id": "s1", "status": "generating", "sections_completed": []},
+        {"id": "s1", "status": "generating", "sections_completed": ["rules"], "rules": "# Rules"},
+        {"id": "s1", "status": "draft", "sections_completed": ["rules", "prd"], "rules": "# Rules", "prd": "# PRD"},
+    ]
+    mock_get = MagicMock(side_effect=snapshots)
+
+    async def _collect():
+        return [e async for e in spec_progress_events("o1", "s1", poll_seconds=0, max_seconds=10)]
+
+    with patch("app.services.spec_job_service.get_spec", mock_get):
+        events = asyncio.run(_collect())
+
+    named = [e.split("\n", 1)[0] for e in events if e.startswith("event:")]
+    assert named == ["event: status", "event: section", "event: section", "event: done"]
+    sections = [e for e in events if e.startswith("event: section")]
+    assert '"section": "rules"' in sections[0]
+    assert '"section": "prd"' in sections[1]
+
+
+def test_spec_progress_events_forwards_tokens():
+    """Token deltas published by the worker are streamed before the section lands."""
+    snapshots = [
+        {"id": "s1", "status": "generating", "sections_completed": []},
+        {"id": "s1", "status": "draft", "sections_completed": ["prd"], "prd": "# PRD"},
+    ]
+
+    async def _collect():
+        events = []
+        async for e in spec_progress_events("o1", "s1", poll_seconds=0.2, max_seconds=10):
+            events.append(e)
+            if e.startswith("event: status"):
+                spec_job_service._publish_token("s1", "prd", "# P")
+        return events
+
+    with patch("app.services.spec_job_service.get_spec", MagicMock(side_effect=snapshots)):
+        events = asyncio.run(_collect())
+
+    named = [e.split("\n", 1)[0] for e in events if e.startswith("event:")]
+    assert named == ["event: status", "event: token", "event: section", "event: done"]
+    assert '"delta": "# P"' in events[1]
+    assert spec_job_service._token_subscribers == {}
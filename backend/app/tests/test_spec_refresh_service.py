@@ -0,0 +1,175 @@
+"""Incremental spec refresh tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.spec_job_service import SpecJobLimitError
+from app.services.spec_refresh_service import (
+    _threshold_crossed,
+    refresh_all_orgs,
+    refresh_spec,
+    refresh_stale_specs,
+)
+
+QUOTE = {
+    "id": "fb1", "customer_id": "c1", "text": "Checkout form loses state on back navigation",
+    "customer_name": "Acme", "sentiment": "negative", "product_area": "checkout",
+    "similar_count": 0, "similar_ids": [],
+}
+
+
+def _spec(spec_id="s1", pending=0):
+    brief = {
+        "topic": "checkout", "product_area": None,
+        "feedback_count": 100, "customer_count": 1, "customer_ids": ["c1"], "total_arr": 1000.0,
+        "feedback_quotes": [QUOTE], "feedback_ids": ["fb1"],
+        "data_freshness_date": "2026-01-01T00:00:00.000Z",
+    }
+    return {
+        "id": spec_id, "status": "draft", "topic": "checkout", "data_brief": brief,
+        "data_freshness_date": brief["data_freshness_date"], "feedback_since_generation": pending,
+    }
+
+
+def _delta(total, customers=(), hits=(), latest=None, ingested=None):
+    return {
+        "hits": {"total": {"value": total}, "hits": [{"_source": h} for h in hits]},
+        "aggregations": {
+            "customers": {"buckets": [{"key": c, "doc_count": 1} for c in customers]},
+            "latest": {"value_as_string": latest},
+            "latest_ingested": {"value_as_string": ingested},
+        },
+    }
+
+
+def _settings():
+    mock = MagicMock()
+    mock.spec_refresh_min_new_feedback = 10
+    mock.spec_refresh_min_growth_ratio = 0.1
+    mock.spec_refresh_batch_size = 50
+    mock.spec_quote_dedupe_threshold = 0.6
+    mock.spec_quote_token_budgets = {"prd": 1500}
+    return mock
+
+
+@pytest.fixture
+def settings():
+    mock = _settings()
+    with patch("app.services.spec_refresh_service.get_settings", return_value=mock), \
+         patch("app.services.spec_service.get_settings", return_value=mock):
+        yield mock
+
+
+def test_threshold_needs_min_count_and_growth(settings):
+    """Small deltas never trigger; large specs need proportional growth."""
+    assert not _threshold_crossed(105, 5)
+    assert _threshold_crossed(110, 10)
+    assert not _threshold_crossed(1015, 15)
+    assert _threshold_crossed(1100, 100)
+
+
+def test_refresh_spec_merges_delta_without_regenerating(settings):
+    """Legacy briefs continue from data_freshness_date; new feedback is folded into the stored brief."""
+    mock_es = MagicMock()
+    mock_es.msearch.return_value = {"responses": [_delta(
+        3, customers=["c1", "c2"], latest="2026-02-01T00:00:00.000Z",
+        hits=[{"id": "fb9", "customer_id": "c2", "text": "Coupon codes rejected at checkout", "created_at": "2026-02-01"}],
+    )]}
+    mock_es.mget.return_value = {"docs": [{"_id": "c2", "found": True, "_source": {"org_id": "o1", "arr": 500}}]}
+    mock_es.bulk.return_value = {"errors": False}
+    with patch("app.services.spec_refresh_service.get_spec", return_value=_spec()), \
+         patch("app.services.spec_refresh_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_refresh_service.start_spec_regeneration") as mock_regen:
+        result = refresh_spec("o1", "s1")
+
+    search = mock_es.msearch.call_args.kwargs["searches"][1]
+    assert {"range": {"ingested_at": {"gt": "2026-01-01T00:00:00.000Z"}}} in search["query"]["bool"]["must"]
+    assert mock_es.mget.call_args.kwargs["ids"] == ["c2"]
+    update = mock_es.bulk.call_args.kwargs["operations"][1]["doc"]
+    brief = update["data_brief"]
+    assert brief["feedback_count"] == 103
+    assert brief["customer_ids"] == ["c1", "c2"] and brief["customer_count"] == 2
+    assert brief["total_arr"] == 1500.0
+    assert {q["id"] for q in brief["feedback_quotes"]} == {"fb1", "fb9"}
+    assert update["data_freshness_date"] == "2026-02-01T00:00:00.000Z"
+    assert update["feedback_since_generation"] == 3
+    assert result == {
+        "spec_id": "s1", "new_feedback": 3, "new_customers": 1,
+        "feedback_since_generation": 3, "regenerating": False,
+    }
+    mock_regen.assert_not_called()
+
+
+def test_refresh_spec_folds_in_imported_feedback_with_old_created_at(settings):
+    """The watermark is ingested_at, so a historical import is still picked up and dates never move back."""
+    spec = _spec()
+    spec["data_brief"]["ingested_through"] = "2026-03-01T00:00:00.000Z"
+    mock_es = MagicMock()
+    mock_es.msearch.return_value = {"responses": [_delta(
+        1, latest="2025-06-01T00:00:00.000Z", ingested="2026-03-02T00:00:00.000Z",
+        hits=[{"id": "fb7", "customer_id": "c1", "text": "Old ticket about refunds", "created_at": "2025-06-01"}],
+    )]}
+    mock_es.bulk.return_value = {"errors": False}
+    with patch("app.services.spec_refresh_service.get_spec", return_value=spec), \
+         patch("app.services.spec_refresh_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_refresh_service.start_spec_regeneration"):
+        refresh_spec("o1", "s1")
+
+    header, search = mock_es.msearch.call_args.kwargs["searches"]
+    assert header["index"] == "o1-feedback"
+    assert {"range": {"ingested_at": {"gt": "2026-03-01T00:00:00.000Z"}}} in search["query"]["bool"]["must"]
+    update = mock_es.bulk.call_args.kwargs["operations"][1]["doc"]
+    assert update["data_brief"]["ingested_through"] == "2026-03-02T00:00:00.000Z"
+    assert update["data_freshness_date"] == "2026-01-01T00:00:00.000Z"
+    assert update["feedback_count"] == 101
+
+
+def test_refresh_all_orgs_pages_past_10k_orgs(settings):
+    """Org IDs are paged with a PIT, so orgs past the first 10k are refreshed too."""
+    mock_es = MagicMock()
+    mock_es.open_point_in_time.return_value = {"id": "pit"}
+    mock_es.search.side_effect = [
+        {"hits": {"hits": [{"_id": f"o{i}", "sort": [i]} for i in range(10000)]}},
+        {"hits": {"hits": [{"_id": "o10000", "sort": [10000]}]}},
+    ]
+    with patch("app.services.es_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_refresh_service.refresh_stale_specs", return_value={"updated": 1}) as mock_refresh:
+        assert refresh_all_orgs() == 10001
+    assert mock_refresh.call_args.args == ("o10000",)
+    assert mock_es.search.call_args.kwargs["search_after"] == [9999]
+    mock_es.close_point_in_time.assert_called_once_with(id="pit")
+
+
+def test_refresh_stale_specs_batches_and_regenerates_past_threshold(settings):
+    """One msearch and one bulk for the batch; only specs over the threshold regenerate."""
+    mock_es = MagicMock()
+    mock_es.search.return_value = {"hits": {"hits": [
+        {"_source": _spec("s1", pending=8)}, {"_source": _spec("s2")}, {"_source": _spec("s3")},
+    ]}}
+    mock_es.msearch.return_value = {"responses": [_delta(4), _delta(0), _delta(12)]}
+    mock_es.bulk.return_value = {"errors": False}
+    with patch("app.services.spec_refresh_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_service.get_es_client", return_value=mock_es), \
+         patch("app.services.spec_refresh_service.start_spec_regeneration",
+               side_effect=[{"sections_regenerated": ["prd"]}, SpecJobLimitError("full")]) as mock_regen:
+        summary = refresh_stale_specs("o1")
+
+    assert mock_es.msearch.call_count == 1 and len(mock_es.msearch.call_args.kwargs["searches"]) == 6
+    assert mock_es.bulk.call_count == 1
+    ops = mock_es.bulk.call_args.kwargs["operations"]
+    assert ops[3]["doc"].keys() == {"refreshed_at"}
+    assert [c.args for c in mock_regen.call_args_list] == [("o1", "s1"), ("o1", "s3")]
+    assert summary["checked"] == 3 and summary["updated"] == 2 and summary["regenerating"] == 1
+    assert summary["results"][2]["feedback_since_generation"] == 12
+
+
+def test_refresh_spec_rejects_generating_spec():
+    """A spec that is generating cannot be refreshed."""
+    with patch("app.services.spec_refresh_service.get_spec", return_value={**_spec(), "status": "generating"}):
+        with pytest.raises(ValueError, match="already"):
+            refresh_spec("o1", "s1")
+    with patch("app.services.spec_refresh_service.get_spec", return_value=None):
+        assert refresh_spec("o1", "missing") is None
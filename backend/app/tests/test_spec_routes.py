@@ -35,11 +35,11 @@ def client():
 
 def test_post_specs_generate_returns_200(client: TestClient):
     """POST /specs/generate returns 200 and spec summary."""
-    with patch("app.routers.specs.generate_specs") as mock_gen:
+    with patch("app.routers.specs.start_spec_generation") as mock_gen:
         mock_gen.return_value = {
             "id": "spec-1",
             "title": "Checkout Issues",
-            "status": "draft",
+            "status": "generating",
             "feedback_count": 10,
             "customer_count": 5,
             "total_arr": 100000,
@@ -54,6 +54,7 @@ def test_post_specs_generate_returns_200(client: TestClient):
     assert data["id"] == "spec-1"
     assert data["title"] == "Checkout Issues"
     assert data["feedback_count"] == 10
+    assert data["status"] == "generating"
 
 
 def test_post_specs_generate_empty_topic_returns_422(client: TestClient):
@@ -64,7 +65,7 @@ def test_post_specs_generate_empty_topic_returns_422(client: TestClient):
 
 def test_post_specs_generate_value_error_returns_400(client: TestClient):
     """POST /specs/generate with ValueError (e.g. no feedback) returns 400."""
-    with patch("app.routers.specs.generate_specs") as mock_gen:
+    with patch("app.routers.specs.start_spec_generation") as mock_gen:
         mock_gen.side_effect = ValueError("Not enough feedback")
         resp = client.post(
             "/api/v1/specs/generate",
@@ -74,6 +75,16 @@ def test_post_specs_generate_value_error_returns_400(client: TestClient):
     assert "Not enough feedback" in resp.json()["detail"]
 
 
+def test_post_specs_generate_limit_returns_429(client: TestClient):
+    """POST /specs/generate returns 429 when the org is at its job limit."""
+    from app.services.spec_job_service import SpecJobLimitError
+
+    with patch("app.routers.specs.start_spec_generation") as mock_gen:
+        mock_gen.side_effect = SpecJobLimitError("Already generating 2 specs.")
+        resp = client.post("/api/v1/specs/generate", json={"topic": "checkout"})
+    assert resp.status_code == 429
+
+
 def test_get_specs_list(client: TestClient):
     """GET /specs returns paginated list."""
     with patch("app.routers.specs.get_specs") as mock_get:
@@ -156,20 +167,49 @@ def test_delete_spec_not_found_returns_404(client: TestClient):
 
 def test_post_specs_regenerate(client: TestClient):
     """POST /specs/{id}/regenerate returns updated spec."""
-    updated = {"id": "s1", "prd": "# New PRD", "status": "draft"}
-    with patch("app.routers.specs.regenerate_spec", return_value=updated):
+    updated = {"id": "s1", "prd": "# Old PRD", "status": "generating"}
+    with patch("app.routers.specs.start_spec_regeneration", return_value=updated):
         resp = client.post("/api/v1/specs/s1/regenerate")
     assert resp.status_code == 200
-    assert resp.json()["data"]["prd"] == "# New PRD"
+    assert resp.json()["data"]["status"] == "generating"
 
 
 def test_post_specs_regenerate_not_found_returns_404(client: TestClient):
     """POST /specs/{id}/regenerate returns 404 when not found."""
-    with patch("app.routers.specs.regenerate_spec", return_value=None):
+    with patch("app.routers.specs.start_spec_regeneration", return_value=None):
         resp = client.post("/api/v1/specs/unknown/regenerate")
     assert resp.status_code == 404
 
 
+def test_get_spec_status(client: TestClient):
+    """GET /specs/{id}/status returns generation progress."""
+    progress = {"id": "s1", "status": "generating", "sections_completed": ["rules"]}
+    with patch("app.routers.specs.get_spec_status", return_value=progress):
+        resp = client.get("/api/v1/specs/s1/status")
+    assert resp.status_code == 200
+    assert resp.json()["data"]["sections_completed"] == ["rules"]
+
+
+def test_get_spec_status_not_found_returns_404(client: TestClient):
+    """GET /specs/{id}/status returns 404 when not found."""
+    with patch("app.routers.specs.get_spec_status", return_value=None):
+        resp = client.get("/api/v1/specs/unknown/status")
+    assert resp.status_code == 404
+
+
+def test_get_spec_events_streams_sse(client: TestClient):
+    """GET /specs/{id}/events streams server-sent events."""
+    async def _events(org_id, spec_id):
+        yield 'event: done\ndata: {"status": "draft"}\n\n'
+
+    with patch("app.routers.specs.get_spec", return_value={"id": "s1"}):
+        with patch("app.routers.specs.spec_progress_events", side_effect=_events):
+            resp = client.get("/api/v1/specs/s1/events")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert "event: done" in resp.text
+
+
 def test_specs_endpoints_reject_without_auth():
     """Spec endpoints reject requests without JWT."""
     mock_es = MagicMock()
@@ -183,3 +223,23 @@ def test_specs_endpoints_reject_without_auth():
             c = TestClient(app)
             resp = c.get("/api/v1/specs")
     assert resp.status_code == 401
+
+
+def test_post_specs_refresh(client: TestClient):
+    """POST /specs/refresh sweeps the caller's org; POST /specs/{id}/refresh refreshes one spec."""
+    summary = {"checked": 2, "updated": 1, "regenerating": 0, "results": []}
+    with patch("app.routers.specs.refresh_stale_specs", return_value=summary) as mock_sweep:
+        resp = client.post("/api/v1/specs/refresh?limit=10")
+    assert resp.status_code == 200
+    assert resp.json()["data"]["updated"] == 1
+    mock_sweep.assert_called_once_with("o1", 10)
+
+    with patch("app.routers.specs.refresh_spec", return_value={"spec_id": "s1", "new_feedback": 4}):
+        resp = client.post("/api/v1/specs/s1/refresh")
+    assert resp.status_code == 200
+    assert resp.json()["data"]["new_feedback"] == 4
+
+    with patch("app.routers.specs.refresh_spec", side_effect=ValueError("Spec is already being generated.")):
+        assert client.post("/api/v1/specs/s1/refresh").status_code == 400
+    with patch("app.routers.specs.refresh_spec", return_value=None):
+        assert client.post("/api/v1/specs/s1/refresh").status_code == 404
@@ -1,18 +1,30 @@
 """Spec service unit tests."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
 from app.services.spec_service import (
+    AsyncLLMClient,
+    _quotes_block,
+    _parse_stream_delta,
     delete_spec,
     gather_spec_data,
+    gather_spec_inputs,
+    generate_documents,
     get_spec,
     get_specs,
     regenerate_spec,
     save_spec,
+    section_input_hashes,
+    stale_sections,
     update_spec,
 )
+from app.utils.sse import iter_sse
 
 
 @pytest.fixture
@@ -43,25 +55,37 @@ def mock_feedback_hits():
     ]
 
 
+def _msearch_response(feedback_hits, total=None, customers=(), latest=None, sections=()):
+    return {
+        "responses": [
+            {
+                "hits": {"hits": feedback_hits, "total": {"value": len(feedback_hits) if total is None else total}},
+                "aggregations": {
+                    "customer_count": {"value": len(customers)},
+                    "customers": {"buckets": [{"key": c, "doc_count": 1} for c in customers]},
+                    "latest": {"value": None, "value_as_string": latest} if latest else {"value": None},
+                },
+            },
+            {"hits": {"hits": [{"_source": s} for s in sections]}},
+        ]
+    }
+
+
 def test_gather_spec_data_empty_feedback_raises(mock_es):
     """gather_spec_data raises when no feedback matches topic."""
+    mock_es.msearch.return_value = _msearch_response([], total=0)
     with patch("app.services.spec_service.get_es_client", return_value=mock_es):
-        with patch("app.services.spec_service.ensure_index_exists"):
-            with patch("app.services.spec_service.get_customer", return_value={"arr": 1000}):
-                mock_es.search.return_value = {"hits": {"hits": [], "total": {"value": 0}}}
-                with pytest.raises(ValueError, match="Not enough feedback"):
-                    gather_spec_data("org1", "checkout issues", None)
+        with pytest.raises(ValueError, match="Not enough feedback"):
+            gather_spec_data("org1", "checkout issues", None)
+    mock_es.mget.assert_not_called()
 
 
 def test_gather_spec_data_returns_data_brief(mock_es, mock_feedback_hits):
     """gather_spec_data returns data_brief with feedback, customers, ARR."""
-    mock_es.search.side_effect = [
-        {"hits": {"hits": mock_feedback_hits, "total": {"value": 1}}},
-    ]
+    mock_es.msearch.return_value = _msearch_response(mock_feedback_hits, customers=["c1"])
+    mock_es.mget.return_value = {"docs": [{"_id": "c1", "found": True, "_source": {"org_id": "org1", "arr": 5000}}]}
     with patch("app.services.spec_service.get_es_client", return_value=mock_es):
-        with patch("app.services.spec_service.ensure_index_exists"):
-            with patch("app.services.spec_service.get_customer", return_value={"arr": 5000}):
-                result = gather_spec_data("org1", "checkout", "checkout")
+        result = gather_spec_data("org1", "checkout", "checkout")
     assert result["topic"] == "checkout"
     assert result["product_area"] == "checkout"
     assert result["feedback_count"] >= 1
@@ -71,6 +95,121 @@ def test_gather_spec_data_returns_data_brief(mock_es, mock_feedback_hits):
     assert "data_freshness_date" in result
 
 
+def test_gather_spec_inputs_uses_full_match_set_and_one_mget(mock_es, mock_feedback_hits):
+    """Counts come from aggregations, not the quote page; ARR is one mget; context loaded once."""
+    mock_es.msearch.return_value = _msearch_response(
+        mock_feedback_hits,
+        total=2400,
+        customers=["c1", "c2", "c3"],
+        latest="2026-02-01T00:00:00.000Z",
+        sections=[
+            {"section": "basics", "data": {"product_name": "Shop"}},
+            {"section": "goals", "data": {"goals": [{"title": "Reduce churn"}]}},
+        ],
+    )
+    mock_es.mget.return_value = {"docs": [
+        {"_id": "c1", "found": True, "_source": {"org_id": "org1", "arr": 1000}},
+        {"_id": "c2", "found": True, "_source": {"org_id": "org1", "arr": 2500.5}},
+        {"_id": "c3", "found": True, "_source": {"org_id": "other", "arr": 99999}},
+    ]}
+    with patch("app.services.spec_service.get_es_client", return_value=mock_es):
+        brief, product_context = gather_spec_inputs("org1", "checkout")
+
+    assert brief["feedback_count"] == 2400
+    assert brief["customer_count"] == 3
+    assert brief["customer_ids"] == ["c1", "c2", "c3"]
+    assert brief["total_arr"] == 3500.5
+    assert brief["data_freshness_date"] == "2026-02-01T00:00:00.000Z"
+    assert brief["goals"] == [{"title": "Reduce churn"}]
+    assert product_context.product_name == "Shop"
+    mock_es.msearch.assert_called_once()
+    mock_es.mget.assert_called_once()
+    assert mock_es.mget.call_args.kwargs["ids"] == ["c1", "c2", "c3"]
+    mock_es.search.assert_not_called()
+
+
+def test_gather_spec_inputs_pages_customers_past_terms_size(mock_es, mock_feedback_hits):
+    """ARR covers every customer, not just the first terms page."""
+    response = _msearch_response(mock_feedback_hits, customers=["c1"])
+    response["responses"][0]["aggregations"]["customers"]["sum_other_doc_count"] = 2
+    mock_es.msearch.return_value = response
+    mock_es.search.side_effect = [
+        {"aggregations": {"customers": {
+            "buckets": [{"key": {"customer_id": "c1"}}, {"key": {"customer_id": "c2"}}],
+            "after_key": {"customer_id": "c2"},
+        }}},
+        {"aggregations": {"customers": {"buckets": [{"key": {"customer_id": "c3"}}], "after_key": {"customer_id": "c3"}}}},
+        {"aggregations": {"customers": {"buckets": []}}},
+    ]
+    mock_es.mget.return_value = {"docs": [
+        {"_id": c, "found": True, "_source": {"org_id": "org1", "arr": 100}} for c in ("c1", "c2", "c3")
+    ]}
+    with patch("app.services.spec_service.get_es_client", return_value=mock_es):
+        brief, _ = gather_spec_inputs("org1", "checkout")
+
+    assert brief["customer_ids"] == ["c1", "c2", "c3"]
+    assert brief["customer_count"] == 3
+    assert brief["total_arr"] == 300
+    assert mock_es.search.call_args_list[1].kwargs["aggs"]["customers"]["composite"]["after"] == {"customer_id": "c2"}
+
+
+def test_data_brief_dedupes_quotes_and_reports_savings(mock_es):
+    """Near-duplicate feedback is folded; PRD quotes fit the budget and savings are reported."""
+    dup = "The checkout page forgets my shipping address every time I go back to edit the cart"
+    hits = [
+        {"_source": {"id": f"fb{i}", "text": dup + ("." * (i % 3)), "customer_id": f"c{i}",
+                     "customer_name": f"Cust {i}", "sentiment": "negative", "created_at": "2026-01-01T00:00:00Z"}}
+        for i in range(30)
+    ]
+    hits.append({"_source": {"id": "fb-other", "text": "Apple Pay option missing at checkout", "customer_id": "c99",
+                             "customer_name": "Other", "sentiment": "neutral", "created_at": "2026-01-01T00:00:00Z"}})
+    mock_es.msearch.return_value = _msearch_response(hits, customers=["c1"])
+    mock_es.mget.return_value = {"docs": []}
+    with patch("app.services.spec_service.get_es_client", return_value=mock_es):
+        brief = gather_spec_data("org1", "checkout")
+
+    report = brief["quote_selection"]
+    assert report["candidates"] == 31
+    assert report["near_duplicates"] == 29
+    assert [q["id"] for q in brief["feedback_quotes"]] == ["fb0", "fb-other"]
+    assert brief["feedback_quotes"][0]["similar_count"] == 29
+    assert report["prd_tokens_saved"] > 0
+    assert "+29 similar" in _quotes_block(brief, "prd")
+    assert len(brief["feedback_ids"]) == 31
+
+
+def test_default_quote_budgets_save_tokens_on_distinct_feedback(mock_es):
+    """With 100 distinct hits, default budgets put fewer quote tokens in prompts than the old 15-quote packing."""
+    import random
+    import uuid
+
+    rng = random.Random(7)
+    vocabulary = [f"{stem}{suffix}" for stem in ("cart", "page", "load", "sync", "team", "save", "plan", "bill",
+                                                 "list", "slow", "edit", "sort", "link", "form", "user")
+                  for suffix in ("", "s", "ed", "ing", "er")]
+    areas = ["checkout", "search", "billing", "onboarding", "reports"]
+    hits = [
+        {"_source": {
+            "id": str(uuid.UUID(int=i)), "customer_id": str(uuid.UUID(int=1000 + i % 40)),
+            "customer_name": f"Customer {i % 40}", "sentiment": ["negative", "neutral", "positive"][i % 3],
+            "product_area": areas[i % 5], "created_at": "2026-01-01T00:00:00Z",
+            "text": " ".join(rng.choice(vocabulary) for _ in range(40)),
+        }}
+        for i in range(100)
+    ]
+    mock_es.msearch.return_value = _msearch_response(hits, customers=["c1"])
+    mock_es.mget.return_value = {"docs": []}
+    with patch("app.services.spec_service.get_es_client", return_value=mock_es):
+        brief = gather_spec_data("org1", "checkout")
+
+    report = brief["quote_selection"]
+    assert report["near_duplicates"] == 0
+    assert 0 < report["tokens"]["prd"] < report["baseline_prd_tokens"]
+    assert report["prd_tokens_saved"] > 0
+    assert set(report["tokens"]) == {"prd"}
+    assert _quotes_block(brief, "rules") == ""
+
+
 def test_save_spec_and_get_spec(mock_es):
     """save_spec stores doc; get_spec retrieves it."""
     doc = {
@@ -160,26 +299,205 @@ def test_delete_spec_not_found_returns_false():
 
 
 def test_regenerate_spec(mock_es):
-    """regenerate_spec calls LLM 4x and updates doc."""
+    """regenerate_spec generates 4 docs and updates doc."""
     existing = {
         "id": "s1",
         "org_id": "org1",
         "data_brief": {"topic": "x", "feedback_quotes": []},
         "prd": "old",
     }
+    documents = {
+        "prd": "# New PRD",
+        "architecture": "# New Arch",
+        "rules": "# New Rules",
+        "plan": "# New Plan",
+    }
     with patch("app.services.spec_service.get_spec", return_value=existing):
         with patch("app.services.spec_service.get_product_context", return_value=MagicMock(product_name="P")):
-            with patch("app.services.spec_service.generate_prd", return_value="# New PRD"):
-                with patch("app.services.spec_service.generate_architecture", return_value="# New Arch"):
-                    with patch("app.services.spec_service.generate_rules", return_value="# New Rules"):
-                        with patch("app.services.spec_service.generate_plan", return_value="# New Plan"):
-                            with patch("app.services.spec_service.index_document"):
-                                result = regenerate_spec("org1", "s1", "user1")
+            with patch(
+                "app.services.spec_service.generate_documents",
+                new_callable=AsyncMock,
+                return_value=(documents, {}),
+            ):
+                with patch("app.services.spec_service.index_document"):
+                    result = regenerate_spec("org1", "s1", "user1")
     assert result is not None
     assert result["prd"] == "# New PRD"
+    assert result["plan"] == "# New Plan"
     assert result["status"] == "draft"
 
 
+def test_regenerate_spec_partial_failure_keeps_previous_content():
+    """Sections that fail keep their old content and are reported."""
+    existing = {
+        "id": "s1",
+        "org_id": "org1",
+        "data_brief": {"topic": "x", "feedback_quotes": []},
+        "prd": "old prd",
+        "rules": "old rules",
+    }
+    documents = {"prd": "# New PRD", "architecture": "# Arch", "plan": "# Plan"}
+    with patch("app.services.spec_service.get_spec", return_value=existing):
+        with patch("app.services.spec_service.get_product_context", return_value=MagicMock()):
+            with patch(
+                "app.services.spec_service.generate_documents",
+                new_callable=AsyncMock,
+                return_value=(documents, {"rules": "Timed out"}),
+            ):
+                with patch("app.services.spec_service.index_document"):
+                    result = regenerate_spec("org1", "s1", "user1")
+    assert result["prd"] == "# New PRD"
+    assert result["rules"] == "old rules"
+    assert result["generation_errors"] == {"rules": "Timed out"}
+
+
+class _FakeLLM:
+    """Async LLM stand-in: sleeps, then echoes, or fails for some prompts."""
+
+    def __init__(self, delay: float = 0.05, fail_on: str | None = None, hang_on: str | None = None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.hang_on = hang_on
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def complete(self, prompt, system_prompt=None, timeout=300.0):
+        if self.hang_on and self.hang_on in prompt:
+            await asyncio.sleep(10)
+        await asyncio.sleep(self.delay)
+        if self.fail_on and self.fail_on in prompt:
+            raise ValueError("LLM error")
+        return prompt.splitlines()[0]
+
+    async def stream(self, prompt, system_prompt=None, timeout=300.0):
+        text = await self.complete(prompt, system_prompt, timeout)
+        for word in text.split(" "):
+            yield word + " "
+
+
+def test_generate_documents_runs_concurrently():
+    """Four documents take about one LLM latency, not four."""
+    brief = {"topic": "checkout", "feedback_quotes": []}
+    with patch("app.services.spec_service.AsyncLLMClient", return_value=_FakeLLM(delay=0.2)):
+        start = time.monotonic()
+        documents, errors = asyncio.run(generate_documents(brief, MagicMock()))
+        elapsed = time.monotonic() - start
+    assert set(documents) == {"prd", "architecture", "rules", "plan"}
+    assert errors == {}
+    assert elapsed < 0.6
+
+
+def test_generate_documents_partial_failure_and_timeout():
+    """Failed and timed-out sections are reported; others still return."""
+    brief = {"topic": "checkout", "feedback_quotes": []}
+    llm = _FakeLLM(fail_on="Engineering Rules", hang_on="Implementation Plan")
+    with patch("app.services.spec_service.AsyncLLMClient", return_value=llm):
+        with patch("app.services.spec_service.get_settings") as mock_settings:
+            mock_settings.return_value.spec_document_timeouts = {"plan": 0.1}
+            documents, errors = asyncio.run(generate_documents(brief, MagicMock()))
+    assert set(documents) == {"prd", "architecture"}
+    assert errors["rules"] == "LLM error"
+    assert errors["plan"] == "Timed out"
+
+
+def test_generate_documents_all_failed_raises():
+    """ValueError when no section could be generated."""
+    with patch("app.services.spec_service.AsyncLLMClient", return_value=_FakeLLM(fail_on="Generate")):
+        with pytest.raises(ValueError, match="LLM error"):
+            asyncio.run(generate_documents({"topic": "x"}, MagicMock()))
+
+
+def test_generate_documents_streams_tokens():
+    """With on_token, each section is streamed and its deltas reported."""
+    tokens: list[tuple[str, str]] = []
+    brief = {"topic": "checkout", "feedback_quotes": []}
+    with patch("app.services.spec_service.AsyncLLMClient", return_value=_FakeLLM(delay=0)):
+        documents, errors = asyncio.run(
+            generate_documents(brief, MagicMock(), on_token=lambda s, d: tokens.append((s, d)))
+        )
+    assert errors == {}
+    prd_tokens = [d for s, d in tokens if s == "prd"]
+    assert len(prd_tokens) > 1
+    assert documents["prd"] == "".join(prd_tokens).strip()
+
+
+def testiter_sse_groups_events():
+    """iter_sse yields (event, data) per blank-line-terminated block."""
+    async def _lines():
+        for line in [
+            "event: message",
+            'data: {"completion":[{"delta":"Hel"}]}',
+            "",
+            'data: {"completion":[{"delta":"lo"}]}',
+            "",
+            "data: [DONE]",
+        ]:
+            yield line
+
+    async def _collect():
+        return [e async for e in iter_sse(_lines())]
+
+    events = asyncio.run(_collect())
+    assert events[0] == ("message", '{"completion":[{"delta":"Hel"}]}')
+    assert _parse_stream_delta(json.loads(events[1][1])) == "lo"
+    assert events[2] == ("message", "[DONE]")
+
+
+def test_llm_stream_falls_back_to_complete_when_streaming_fails():
+    """A stream error before the first token falls back to a full completion."""
+    llm = AsyncLLMClient()
+    llm._stream_target = ("http://es", {})
+
+    async def _broken(*args, **kwargs):
+        raise httpx.ConnectError("refused")
+        yield  # pragma: no cover
+
+    async def _run():
+        with patch.object(llm, "_stream_inference", _broken), \
+             patch.object(llm, "_complete_uncached", AsyncMock(return_value="# Full PRD")), \
+             patch("app.services.spec_service.get_cached_completion", return_value=None), \
+             patch("app.services.spec_service.store_completion") as mock_store:
+            result = [d async for d in llm.stream("prompt")]
+        mock_store.assert_called_once()
+        return result
+
+    assert asyncio.run(_run()) == ["# Full PRD"]
+
+
+def test_llm_complete_uses_cache_unless_bypassed():
+    """A cached completion skips the LLM; use_cache=False always calls it and refreshes the cache."""
+    async def _run(use_cache):
+        llm = AsyncLLMClient(use_cache=use_cache)
+        with patch.object(llm, "_complete_uncached", AsyncMock(return_value="# Fresh")) as mock_llm, \
+             patch("app.services.spec_service.get_cached_completion", return_value="# Cached"), \
+             patch("app.services.spec_service.store_completion") as mock_store:
+            text = await llm.complete("prompt", system_prompt="sys")
+        return text, mock_llm.await_count, mock_store.call_count
+
+    assert asyncio.run(_run(True)) == ("# Cached", 0, 0)
+    assert asyncio.run(_run(False)) == ("# Fresh", 1, 1)
+
+
+def test_section_input_hashes_change_only_for_affected_sections():
+    """With the default budgets, changing quotes alters only the PRD hash."""
+    brief = {"topic": "checkout", "feedback_quotes": [{"id": "fb1", "text": "Cart resets"}]}
+    context = MagicMock()
+    context.configure_mock(**{k: None for k in ("product_name", "description", "areas", "goals", "segments",
+                                                "competitors", "teams", "technologies")})
+    before = section_input_hashes(brief, context)
+    after = section_input_hashes({**brief, "feedback_quotes": [{"id": "fb2", "text": "Coupon fails"}]}, context)
+    assert before["prd"] != after["prd"]
+    assert before["rules"] == after["rules"]
+    assert before["architecture"] == after["architecture"]
+    assert before["plan"] == after["plan"]
+    assert stale_sections({"section_input_hashes": before, "prd": "x", "architecture": "x",
+                           "rules": "x", "plan": "x"}, after) == ("prd",)
+
+
 def test_regenerate_spec_no_data_brief_raises():
     """regenerate_spec raises when data_brief missing."""
     with patch("app.services.spec_service.get_spec", return_value={"id": "s1", "org_id": "org1"}):
@@ -0,0 +1,83 @@
+"""Per-org to shared index migration tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.tenant_migration_service import migrate_org_index
+
+
+@pytest.fixture
+def settings():
+    mock = MagicMock()
+    mock.index_tenancy = "shared"
+    mock.shared_index_prefix = "shared"
+    mock.shared_index_shards = 3
+    with patch("app.services.es_service.get_settings", return_value=mock):
+        yield mock
+
+
+def _es(docs=5, copied=5, is_alias=None, shared_exists=True):
+    es = MagicMock()
+    es.indices.exists.side_effect = lambda index: True if index != "shared-product-context" else shared_exists
+    es.indices.exists_alias.return_value = bool(is_alias)
+    if is_alias:
+        es.indices.get_alias.return_value = is_alias
+    es.indices.get_mapping.return_value = {"o1-product-context": {"mappings": {"properties": {"section": {"type": "keyword"}}}}}
+    es.count.side_effect = [{"count": docs}, {"count": copied}]
+    return es
+
+
+def _run(es, **kwargs):
+    with patch("app.services.tenant_migration_service.get_es_client", return_value=es), \
+         patch("app.services.es_service.get_es_client", return_value=es):
+        return migrate_org_index("o1", "product-context", **kwargs)
+
+
+def test_migrate_reindexes_with_routing_and_swaps_alias(settings):
+    """Docs are copied routed by org, ids prefixed, then the index is swapped for an alias."""
+    es = _es()
+    result = _run(es)
+
+    assert result == {"index": "o1-product-context", "docs": 5, "status": "migrated"}
+    reindex = es.reindex.call_args.kwargs
+    assert reindex["dest"] == {"index": "shared-product-context", "routing": "=o1"}
+    assert "ctx._id = params.org_id + ':' + ctx._id" in reindex["script"]["source"]
+    es.indices.update_aliases.assert_called_once_with(actions=[
+        {"add": {
+            "index": "shared-product-context", "alias": "o1-product-context",
+            "filter": {"term": {"org_id": "o1"}}, "routing": "o1",
+        }},
+        {"remove_index": {"index": "o1-product-context"}},
+    ])
+
+
+def test_migrate_keeps_index_on_count_mismatch(settings):
+    """A short copy leaves the per-org index in place."""
+    es = _es(docs=5, copied=3)
+    result = _run(es)
+    assert result["status"] == "count_mismatch" and result["copied"] == 3
+    es.indices.update_aliases.assert_not_called()
+
+
+def test_migrate_skips_aliases_and_dry_run(settings):
+    """Already migrated orgs are skipped; dry runs change nothing."""
+    shared = {"shared-product-context": {"aliases": {"o1-product-context": {"filter": {"term": {"org_id": "o1"}}}}}}
+    assert _run(_es(is_alias=shared))["status"] == "already_shared"
+    es = _es()
+    assert _run(es, dry_run=True) == {"index": "o1-product-context", "docs": 5, "status": "would_migrate"}
+    es.reindex.assert_not_called()
+    es.indices.update_aliases.assert_not_called()
+
+
+def test_migrate_copies_from_versioned_index_behind_alias(settings):
+    """After a mapping migration the alias points at {org}-{type}-vN, which is copied and dropped."""
+    es = _es(is_alias={"o1-product-context-v2": {"aliases": {"o1-product-context": {}}}})
+    es.indices.get_mapping.return_value = {"o1-product-context-v2": {"mappings": {}}}
+    result = _run(es)
+
+    assert result["status"] == "migrated"
+    assert es.reindex.call_args.kwargs["source"] == {"index": "o1-product-context-v2"}
+    actions = es.indices.update_aliases.call_args.kwargs["actions"]
+    assert actions[0]["add"]["alias"] == "o1-product-context"
+    assert actions[1] == {"remove_index": {"index": "o1-product-context-v2"}}
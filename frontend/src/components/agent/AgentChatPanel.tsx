@@ -4,9 +4,12 @@ import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import { useAgentChat } from "../../hooks/useAgentChat";
 import {
+  ChatStreamUnavailableError,
   sendChatMessage,
+  streamChatMessage,
   getConversations,
   getConversation,
+  getConversationMessages,
   type Conversation,
 } from "../../services/agentApi";
 
@@ -28,6 +31,8 @@ export default function AgentChatPanel() {
   const [conversations, setConversations] = useState<Conversation[]>([]);
   const [showHistory, setShowHistory] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [activity, setActivity] = useState<string | null>(null);
+  const [olderBefore, setOlderBefore] = useState<number | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLTextAreaElement>(null);
 
@@ -41,23 +46,7 @@ export default function AgentChatPanel() {
       if (pending) {
         setInput("");
         inputRef.current?.focus();
-        setMessages((m) => [...m, { role: "user", content: pending }]);
-        setLoading(true);
-        setError(null);
-        sendChatMessage(pending, conversationId || undefined)
-          .then((res) => {
-            setConversationId(res.conversation_id);
-            setMessages((m) => [...m, { role: "assistant", content: res.response }]);
-          })
-          .catch((e: unknown) => {
-            const msg = e && typeof e === "object" && "response" in e
-              ? (e as { response?: { data?: { detail?: string } } }).response?.data?.detail
-              : "Agent temporarily unavailable";
-            setError(String(msg));
-            setMessages((m) => [...m, { role: "assistant", content: `Error: ${msg}` }]);
-          })
-          .finally(() => setLoading(false));
-        setInput("");
+        sendMessage(pending);
       } else {
         inputRef.current?.focus();
       }
@@ -71,31 +60,59 @@ export default function AgentChatPanel() {
     scrollToBottom();
   }, [messages, scrollToBottom]);
 
-  const handleSend = async () => {
-    const text = input.trim();
-    if (!text || loading) return;
-    setInput("");
+  /**
+   * Stream the agent's reply into the last message as it arrives. Only when
+   * the stream request itself fails fall back to the non-streaming endpoint;
+   * an error during the turn is shown, since retrying would run the agent twice.
+   */
+  const sendMessage = async (text: string) => {
     setMessages((m) => [...m, { role: "user", content: text }]);
     setLoading(true);
     setError(null);
+    setActivity(null);
+    let streamed = "";
+    const showAssistant = (content: string, replace: boolean) =>
+      setMessages((m) => [...(replace ? m.slice(0, -1) : m), { role: "assistant", content }]);
     try {
-      const res = await sendChatMessage(text, conversationId || undefined);
+      let res: { conversation_id: string; response: string };
+      try {
+        res = await streamChatMessage(text, conversationId || undefined, {
+          onDelta: (delta) => {
+            const first = !streamed;
+            streamed += delta;
+            showAssistant(streamed, !first);
+          },
+          onReasoning: (t) => setActivity(t),
+          onToolCall: (toolId) => setActivity(`Running ${toolId}…`),
+        });
+      } catch (e) {
+        if (!(e instanceof ChatStreamUnavailableError)) throw e;
+        res = await sendChatMessage(text, conversationId || undefined);
+      }
       setConversationId(res.conversation_id);
-      setMessages((m) => [...m, { role: "assistant", content: res.response }]);
+      showAssistant(res.response, Boolean(streamed));
       getConversations()
         .then((r) => setConversations(r.data || []))
         .catch(() => {});
     } catch (e: unknown) {
       const msg = e && typeof e === "object" && "response" in e
         ? (e as { response?: { data?: { detail?: string } } }).response?.data?.detail
-        : "Agent temporarily unavailable";
+        : e instanceof Error ? e.message : "Agent temporarily unavailable";
       setError(String(msg));
       setMessages((m) => [...m, { role: "assistant", content: `Error: ${msg}` }]);
     } finally {
       setLoading(false);
+      setActivity(null);
     }
   };
 
+  const handleSend = async () => {
+    const text = input.trim();
+    if (!text || loading) return;
+    setInput("");
+    await sendMessage(text);
+  };
+
   const handleKeyDown = (e: React.KeyboardEvent<HTMLTextAreaElement>) => {
     if (e.key === "Enter" && !e.shiftKey) {
       e.preventDefault();
@@ -106,6 +123,7 @@ export default function AgentChatPanel() {
   const handleNewConversation = () => {
     setConversationId(null);
     setMessages([]);
+    setOlderBefore(null);
     setError(null);
     setShowHistory(false);
   };
@@ -117,11 +135,24 @@ export default function AgentChatPanel() {
       setConversationId(conv.id);
       const msgs = (conv.messages || []).map((m) => ({ role: m.role, content: m.content }));
       setMessages(msgs);
+      setOlderBefore(conv.has_more ? conv.next_before ?? null : null);
     } catch {
       setError("Could not load conversation");
     }
   };
 
+  const handleLoadEarlier = async () => {
+    if (!conversationId || olderBefore == null) return;
+    try {
+      const page = await getConversationMessages(conversationId, olderBefore);
+      const older = page.messages.map((m) => ({ role: m.role, content: m.content }));
+      setMessages((m) => [...older, ...m]);
+      setOlderBefore(page.has_more ? page.next_before : null);
+    } catch {
+      setError("Could not load earlier messages");
+    }
+  };
+
   useEffect(() => {
     const h = (e: KeyboardEvent) => e.key === "Escape" && setIsOpen(false);
     window.addEventListener("keydown", h);
@@ -204,6 +235,15 @@ export default function AgentChatPanel() {
         </div>
 
         <div className="flex-1 overflow-y-auto p-4 space-y-4 min-h-0">
+          {olderBefore != null && (
+            <button
+              type="button"
+              onClick={handleLoadEarlier}
+              className="w-full text-center text-xs text-gray-400 hover:text-gray-200"
+            >
+              Load earlier messages
+            </button>
+          )}
           {messages.length === 0 && (
             <div className="space-y-3">
               <p className="text-gray-400 text-sm">Ask me anything about your feedback.</p>
@@ -213,24 +253,8 @@ export default function AgentChatPanel() {
                     key={p}
                     type="button"
                     onClick={() => {
-                      setMessages((m) => [...m, { role: "user", content: p }]);
                       setInput("");
-                      setLoading(true);
-                      setError(null);
-                      sendChatMessage(p, conversationId || undefined)
-                        .then((res) => {
-                          setConversationId(res.conversation_id);
-                          setMessages((m) => [...m, { role: "assistant", content: res.response }]);
-                          getConversations().then((r) => setConversations(r.data || [])).catch(() => {});
-                        })
-                        .catch((e: unknown) => {
-                          const msg = e && typeof e === "object" && "response" in e
-                            ? (e as { response?: { data?: { detail?: string } } }).response?.data?.detail
-                            : "Agent temporarily unavailable";
-                          setError(String(msg));
-                          setMessages((m) => [...m, { role: "assistant", content: `Error: ${msg}` }]);
-                        })
-                        .finally(() => setLoading(false));
+                      sendMessage(p);
                     }}
                     className="px-3 py-1.5 text-sm rounded-full bg-gray-700 hover:bg-gray-600 text-gray-200"
                   >
@@ -262,10 +286,10 @@ export default function AgentChatPanel() {
               </div>
             </div>
           ))}
-          {loading && (
+          {loading && messages[messages.length - 1]?.role !== "assistant" && (
             <div className="flex justify-start">
               <div className="rounded-lg px-3 py-2 bg-gray-800 text-gray-400 text-sm">
-                Thinking…
+                {activity || "Thinking…"}
               </div>
             </div>
           )}
@@ -28,7 +28,15 @@ export function SummaryCards({ data, loading }: SummaryCardsProps) {
 
   return (
     <div>
-      <p className="text-xs text-gray-400 mb-3">Key metrics for the selected period. Click a card to drill down.</p>
+      <p className="text-xs text-gray-400 mb-3">
+        Key metrics for the selected period. Click a card to drill down.
+        {data.sampling?.sampled && (
+          <span title="Estimated from a random sample of this period's feedback">
+            {" "}Estimated from a {((data.sampling.probability ?? 0) * 100).toFixed(1)}% sample (±
+            {((data.sampling.relative_error ?? 0) * 100).toFixed(1)}%).
+          </span>
+        )}
+      </p>
       <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
       <Link
         to="/feedback"
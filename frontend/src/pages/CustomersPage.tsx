@@ -36,6 +36,7 @@ export default function CustomersPage() {
   const [searchParams, setSearchParams] = useSearchParams();
   const [items, setItems] = useState<Customer[]>([]);
   const [total, setTotal] = useState(0);
+  const [totalIsLowerBound, setTotalIsLowerBound] = useState(false);
   const [page, setPage] = useState(1);
   const pageSize = 20;
   const [loading, setLoading] = useState(true);
@@ -71,6 +72,7 @@ export default function CustomersPage() {
       .then((res) => {
         setItems(res.data);
         setTotal(res.pagination.total);
+        setTotalIsLowerBound(!!res.pagination.total_is_lower_bound);
       })
       .finally(() => setLoading(false));
   }, [page, pageSize, search, segment, healthMin, healthMax, renewalWithin, hasNegative, arrMin, arrMax, sortBy]);
@@ -274,7 +276,7 @@ export default function CustomersPage() {
       {totalPages > 1 && (
         <div className="flex justify-between items-center mt-4">
           <p className="text-gray-400 text-sm">
-            Page {page} of {totalPages} ({total} total)
+            Page {page} of {totalPages} ({total.toLocaleString()}{totalIsLowerBound ? "+" : ""} total)
           </p>
           <div className="flex gap-2">
             <button
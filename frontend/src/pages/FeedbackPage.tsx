@@ -51,6 +51,7 @@ export default function FeedbackPage() {
   const { pathname } = useLocation();
   const [items, setItems] = useState<Feedback[]>([]);
   const [total, setTotal] = useState(0);
+  const [totalIsLowerBound, setTotalIsLowerBound] = useState(false);
   const [page, setPage] = useState(1);
   const pageSize = 20;
   const [loading, setLoading] = useState(true);
@@ -101,6 +102,7 @@ export default function FeedbackPage() {
       .then((res) => {
         setItems(res.data);
         setTotal(res.pagination.total);
+        setTotalIsLowerBound(!!res.pagination.total_is_lower_bound);
       })
       .finally(() => setLoading(false));
   }, [q, filters, sortBy, page, pageSize]);
@@ -264,7 +266,7 @@ export default function FeedbackPage() {
           <FilterBar filters={filters} onChange={handleFiltersChange} />
         </div>
         <div className="flex items-center justify-between mb-3">
-          <p className="text-gray-400 text-sm">Showing {total} results</p>
+          <p className="text-gray-400 text-sm">Showing {total.toLocaleString()}{totalIsLowerBound ? "+" : ""} results</p>
           <select
             value={sortBy}
             onChange={(e) => {
@@ -4,11 +4,12 @@ import { ArrowLeft, Download, Copy, Share2, RefreshCw, Edit3, Trash2 } from "luc
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import JSZip from "jszip";
-import { getSpec, updateSpec, deleteSpec, regenerateSpec } from "../services/specApi";
+import { getSpec, updateSpec, deleteSpec, regenerateSpec, streamSpecEvents } from "../services/specApi";
 import type { Spec } from "../services/specApi";
 import LoadingSpinner from "../components/common/LoadingSpinner";
 
 const TABS = ["prd", "architecture", "rules", "plan"] as const;
+const POLL_INTERVAL_MS = 2000;
 
 export default function SpecDetailPage() {
   const { id } = useParams<{ id: string }>();
@@ -42,6 +43,59 @@ export default function SpecDetailPage() {
     fetchSpec();
   }, [fetchSpec]);
 
+  const isGenerating = spec?.status === "generating";
+
+  // While generating: stream tokens into the sections; fall back to polling if the stream drops.
+  useEffect(() => {
+    if (!id || !isGenerating) return;
+    const controller = new AbortController();
+    let timer: ReturnType<typeof setInterval> | undefined;
+    const streaming = new Set<string>();
+    const setSection = (section: string, update: (prev: string) => string) =>
+      setSpec((prev) =>
+        prev
+          ? { ...prev, [section]: update((prev as unknown as Record<string, string>)[section] ?? "") }
+          : prev
+      );
+
+    streamSpecEvents(
+      id,
+      {
+        onToken: (section, delta) => {
+          const fresh = !streaming.has(section);
+          streaming.add(section);
+          setSection(section, (prev) => (fresh ? delta : prev + delta));
+        },
+        onSection: (section, content) =>
+          setSpec((prev) =>
+            prev
+              ? {
+                  ...prev,
+                  [section]: content,
+                  sections_completed: Array.from(new Set([...(prev.sections_completed ?? []), section])),
+                }
+              : prev
+          ),
+        onDone: () => {
+          getSpec(id).then(setSpec).catch(() => {});
+        },
+      },
+      controller.signal
+    ).catch(() => {
+      if (controller.signal.aborted) return;
+      timer = setInterval(() => {
+        getSpec(id)
+          .then(setSpec)
+          .catch(() => {});
+      }, POLL_INTERVAL_MS);
+    });
+
+    return () => {
+      controller.abort();
+      if (timer) clearInterval(timer);
+    };
+  }, [id, isGenerating]);
+
   useEffect(() => {
     if (spec) {
       const key = activeTab === "prd" ? "prd" : activeTab;
@@ -134,13 +188,18 @@ export default function SpecDetailPage() {
     }
   };
 
-  const handleRegenerate = async () => {
+  const handleRegenerate = async (e: React.MouseEvent) => {
     setRegenerating(true);
     try {
-      const updated = await regenerateSpec(id);
+      // Shift-click forces a full regeneration, skipping the completion cache.
+      const updated = await regenerateSpec(id, e.shiftKey);
       setSpec(updated);
-      setEditContent((updated as unknown as Record<string, string>)[activeTab] ?? "");
-      showToast("Regenerated");
+      setEditMode(false);
+      showToast(
+        updated.sections_regenerated?.length === 0
+          ? "Already up to date"
+          : "Regenerating…"
+      );
     } catch (e: unknown) {
       const msg =
         e && typeof e === "object" && "response" in e
@@ -227,10 +286,11 @@ export default function SpecDetailPage() {
           </button>
           <button
             onClick={handleRegenerate}
-            disabled={regenerating}
+            disabled={regenerating || isGenerating}
+            title="Regenerate documents whose inputs changed (Shift-click: regenerate all)"
             className="flex items-center gap-2 px-3 py-1.5 text-sm bg-gray-700 hover:bg-gray-600 disabled:opacity-50 rounded text-gray-200"
           >
-            <RefreshCw className={`w-4 h-4 ${regenerating ? "animate-spin" : ""}`} /> Regenerate
+            <RefreshCw className={`w-4 h-4 ${regenerating || isGenerating ? "animate-spin" : ""}`} /> Regenerate
           </button>
           {spec.status === "draft" && (
             <>
@@ -254,6 +314,7 @@ export default function SpecDetailPage() {
           )}
           <select
             value={spec.status}
+            disabled={isGenerating}
             onChange={async (e) => {
               const v = e.target.value;
               try {
@@ -276,6 +337,18 @@ export default function SpecDetailPage() {
           </button>
         </div>
 
+        {isGenerating && (
+          <div className="mb-4 rounded border border-blue-800 bg-blue-900/30 px-4 py-2 text-sm text-blue-200">
+            Generating… {spec.sections_completed?.length ?? 0} of {TABS.length} documents ready.
+            {!currentContent && " This tab will fill in when its document is done."}
+          </div>
+        )}
+        {spec.status === "failed" && (
+          <div className="mb-4 rounded border border-red-800 bg-red-900/30 px-4 py-2 text-sm text-red-200">
+            Generation failed{spec.error_message ? `: ${spec.error_message}` : "."} Try Regenerate.
+          </div>
+        )}
+
         {showDeleteConfirm && (
           <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/50">
             <div className="bg-gray-900 border border-gray-700 rounded-lg p-6 max-w-md">
@@ -1,4 +1,5 @@
 import { api } from "./api";
+import { API_BASE_URL, TOKEN_KEY } from "../utils/constants";
 
 const PREFIX = "/agent";
 
@@ -15,13 +16,31 @@ export interface ChatResponse {
   citations: Array<{ feedback_id?: string; text?: string; customer_id?: string }>;
 }
 
+export interface ConversationMessage {
+  seq?: number;
+  role: string;
+  content: string;
+  timestamp?: string;
+}
+
+export interface ConversationMessagePage {
+  messages: ConversationMessage[];
+  has_more: boolean;
+  next_before: number | null;
+}
+
 export interface Conversation {
   id: string;
   org_id: string;
   user_id: string;
   kibana_conversation_id?: string;
   title: string;
-  messages: Array<{ role: string; content: string; timestamp?: string }>;
+  last_message?: string;
+  message_count?: number;
+  /** Most recent page only; see has_more / getConversationMessages. */
+  messages?: ConversationMessage[];
+  has_more?: boolean;
+  next_before?: number | null;
   created_at: string;
   updated_at: string;
 }
@@ -40,6 +59,78 @@ export async function sendChatMessage(
   return data;
 }
 
+/**
+ * The stream request itself failed (network error or non-OK response), so
+ * the agent never ran and the non-streaming endpoint can safely be tried.
+ */
+export class ChatStreamUnavailableError extends Error {}
+
+export interface ChatStreamHandlers {
+  onDelta?: (text: string) => void;
+  onReasoning?: (text: string) => void;
+  onToolCall?: (toolId: string) => void;
+}
+
+/**
+ * Send a chat message and stream the agent's turn (SSE over fetch, since
+ * EventSource cannot POST). Resolves with the stored conversation and final
+ * text once the turn is persisted. Throws ChatStreamUnavailableError when
+ * the request fails before the turn starts; an `error` event or a broken
+ * stream after that throws a plain Error, as the agent may already have run.
+ */
+export async function streamChatMessage(
+  message: string,
+  conversationId: string | undefined,
+  handlers: ChatStreamHandlers,
+  signal?: AbortSignal
+): Promise<{ conversation_id: string; response: string }> {
+  const token = localStorage.getItem(TOKEN_KEY);
+  let resp: Response;
+  try {
+    resp = await fetch(`${API_BASE_URL}${PREFIX}/chat/stream`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ message, conversation_id: conversationId ?? null }),
+      signal,
+    });
+  } catch (e) {
+    if (signal?.aborted) throw e;
+    throw new ChatStreamUnavailableError(e instanceof Error ? e.message : "Chat stream failed");
+  }
+  if (!resp.ok || !resp.body) throw new ChatStreamUnavailableError(`Chat stream failed (${resp.status})`);
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) throw new Error("Chat stream ended unexpectedly");
+    buffer += decoder.decode(value, { stream: true });
+    let sep = buffer.indexOf("\n\n");
+    while (sep !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      sep = buffer.indexOf("\n\n");
+      let event = "message";
+      const dataLines: string[] = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+      }
+      if (!dataLines.length) continue;
+      const data = JSON.parse(dataLines.join("\n"));
+      if (event === "delta") handlers.onDelta?.(data.text);
+      else if (event === "reasoning") handlers.onReasoning?.(data.text);
+      else if (event === "tool_call") handlers.onToolCall?.(data.tool_id);
+      else if (event === "done") return { conversation_id: data.conversation_id, response: data.response };
+      else if (event === "error") throw new Error(data.detail);
+    }
+  }
+}
+
 /** List conversations for the current user. */
 export async function getConversations(): Promise<{ data: Conversation[] }> {
   const { data } = await api.get<{ data: Conversation[] }>(`${PREFIX}/conversations`);
@@ -51,3 +142,17 @@ export async function getConversation(id: string): Promise<Conversation> {
   const { data } = await api.get<Conversation>(`${PREFIX}/conversations/${id}`);
   return data;
 }
+
+/** Page backwards through a conversation's messages (pass next_before as before). */
+export async function getConversationMessages(
+  id: string,
+  before?: number | null,
+  limit = 50
+): Promise<ConversationMessagePage> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (before != null) params.set("before", String(before));
+  const { data } = await api.get<{ data: ConversationMessagePage }>(
+    `${PREFIX}/conversations/${id}/messages?${params}`
+  );
+  return data.data;
+}
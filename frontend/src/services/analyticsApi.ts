@@ -2,6 +2,13 @@ import { api } from "./api";
 
 const PREFIX = "/analytics";
 
+export interface SamplingInfo {
+  sampled: boolean;
+  probability?: number;
+  sampled_docs?: number;
+  relative_error?: number;
+}
+
 export interface SummaryResponse {
   total_feedback: number;
   total_feedback_trend: number | null;
@@ -10,15 +17,21 @@ export interface SummaryResponse {
   active_issues: number;
   active_issues_trend: number | null;
   at_risk_customers: number;
+  sampling?: SamplingInfo;
 }
 
+export type VolumeInterval = "day" | "week" | "month" | "quarter" | "year";
+
 export interface VolumeResponse {
-  periods: { date: string; count: number; by_area?: Record<string, number> }[];
+  periods: { date: string; end?: string; count: number; by_area?: Record<string, number> }[];
+  interval?: VolumeInterval;
+  sampling?: SamplingInfo;
 }
 
 export interface SentimentResponse {
   breakdown: { sentiment: string; count: number; percentage: number }[];
   total: number;
+  sampling?: SamplingInfo;
 }
 
 export interface TopIssue {
@@ -33,6 +46,7 @@ export interface TopIssue {
 
 export interface TopIssuesResponse {
   issues: TopIssue[];
+  sampling?: SamplingInfo;
 }
 
 export interface AreaBreakdownItem {
@@ -43,6 +57,7 @@ export interface AreaBreakdownItem {
 
 export interface AreaBreakdownResponse {
   areas: AreaBreakdownItem[];
+  sampling?: SamplingInfo;
 }
 
 export interface AtRiskCustomer {
@@ -67,6 +82,7 @@ export interface SourceBreakdownItem {
 export interface SourceBreakdownResponse {
   breakdown: SourceBreakdownItem[];
   total: number;
+  sampling?: SamplingInfo;
 }
 
 export interface SegmentBreakdownItem {
@@ -77,6 +93,7 @@ export interface SegmentBreakdownItem {
 
 export interface SegmentBreakdownResponse {
   segments: SegmentBreakdownItem[];
+  sampling?: SamplingInfo;
 }
 
 export interface DashboardPreferences {
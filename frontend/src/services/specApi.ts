@@ -1,5 +1,6 @@
 import { api } from "./api";
 import type { ApiResponse, PaginatedResponse } from "../types/common";
+import { API_BASE_URL, TOKEN_KEY } from "../utils/constants";
 
 const PREFIX = "/specs";
 
@@ -23,6 +24,10 @@ export interface Spec {
   generated_by?: string | null;
   generated_by_name?: string | null;
   data_freshness_date?: string | null;
+  sections_completed?: string[];
+  sections_regenerated?: string[];
+  generation_errors?: Record<string, string>;
+  error_message?: string | null;
   created_at: string;
   updated_at: string;
 }
@@ -37,7 +42,16 @@ export interface GenerateSpecResponse {
   created_at: string;
 }
 
-/** Generate specs for a topic. */
+export interface SpecStatus {
+  id: string;
+  status: string;
+  sections_completed: string[];
+  generation_errors: Record<string, string>;
+  error_message?: string | null;
+  updated_at?: string | null;
+}
+
+/** Start spec generation for a topic. Returns immediately with status "generating". */
 export async function generateSpecs(body: {
   topic: string;
   product_area?: string;
@@ -79,6 +93,62 @@ export async function getSpec(id: string): Promise<Spec> {
   return data.data;
 }
 
+/** Get generation progress (for polling while status is "generating"). */
+export async function getSpecStatus(id: string): Promise<SpecStatus> {
+  const { data } = await api.get<ApiResponse<SpecStatus>>(`${PREFIX}/${id}/status`);
+  return data.data;
+}
+
+export interface SpecEventHandlers {
+  onToken?: (section: string, delta: string) => void;
+  onSection?: (section: string, content: string) => void;
+  onDone?: (status: string) => void;
+}
+
+/**
+ * Stream generation events (tokens, finished sections, done) for a spec.
+ * Uses fetch so the auth header can be sent; resolves when the stream ends.
+ */
+export async function streamSpecEvents(
+  id: string,
+  handlers: SpecEventHandlers,
+  signal?: AbortSignal
+): Promise<void> {
+  const token = localStorage.getItem(TOKEN_KEY);
+  const resp = await fetch(`${API_BASE_URL}${PREFIX}/${id}/events`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    signal,
+  });
+  if (!resp.ok || !resp.body) throw new Error(`Event stream failed (${resp.status})`);
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let sep = buffer.indexOf("\n\n");
+    while (sep !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      sep = buffer.indexOf("\n\n");
+      let event = "message";
+      const dataLines: string[] = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+      }
+      if (!dataLines.length) continue;
+      const data = JSON.parse(dataLines.join("\n"));
+      if (event === "token") handlers.onToken?.(data.section, data.delta);
+      else if (event === "section") handlers.onSection?.(data.section, data.content);
+      else if (event === "done") handlers.onDone?.(data.status);
+      else if (event === "error") throw new Error(data.detail);
+    }
+  }
+}
+
 /** Update spec status or content. */
 export async function updateSpec(
   id: string,
@@ -100,8 +170,13 @@ export async function deleteSpec(id: string): Promise<void> {
   await api.delete(`${PREFIX}/${id}`);
 }
 
-/** Regenerate 4 docs from saved data_brief. */
-export async function regenerateSpec(id: string): Promise<Spec> {
-  const { data } = await api.post<ApiResponse<Spec>>(`${PREFIX}/${id}/regenerate`);
+/**
+ * Queue regeneration of docs whose inputs changed since they were generated.
+ * force regenerates all 4 and bypasses the completion cache.
+ */
+export async function regenerateSpec(id: string, force = false): Promise<Spec> {
+  const { data } = await api.post<ApiResponse<Spec>>(
+    `${PREFIX}/${id}/regenerate${force ? "?force=true" : ""}`
+  );
   return data.data;
 }
@@ -6,6 +6,8 @@ export interface Pagination {
   page: number;
   page_size: number;
   total: number;
+  /** True when the server stopped counting; render the total as "N+" */
+  total_is_lower_bound?: boolean;
 }
 
 export interface PaginatedResponse<T> {
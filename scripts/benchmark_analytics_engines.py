@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark dashboard widgets on the Query DSL and ES|QL analytics engines.
+
+Usage:
+  cd Hackathon && python scripts/benchmark_analytics_engines.py <org_id> [--iterations 20] [--period 90d]
+
+Runs every widget (except at-risk customers, which is DSL-only) against an
+existing org with ANALYTICS_ENGINE=dsl and =esql, sampling and snapshots
+off, and reports p50/p95 wall time per widget and whether both engines
+returned the same result. Requires Elasticsearch settings in Hackathon/.env.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+ENGINES = ("dsl", "esql")
+
+
+def _round(value):
+    """Results with floats rounded, so engines that average in a different order still compare equal."""
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _round(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_round(v) for v in value]
+    return value
+
+
+def _time(fn, iterations: int) -> tuple[list[float], dict]:
+    took = []
+    result: dict = {}
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        took.append((time.perf_counter() - start) * 1000)
+    return sorted(took), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dashboard widgets on the dsl and esql analytics engines.")
+    parser.add_argument("org_id", help="Org whose feedback is aggregated")
+    parser.add_argument("--iterations", type=int, default=20, help="Calls per widget and engine (default 20)")
+    parser.add_argument("--period", default="90d", help="Dashboard period: 7d, 30d or 90d (default 90d)")
+    args = parser.parse_args()
+
+    os.environ["ANALYTICS_SAMPLING"] = "off"
+    os.environ["ANALYTICS_SNAPSHOT_ENABLED"] = "false"
+
+    from app.services import analytics_service
+
+    widgets = {
+        "summary": analytics_service.get_summary,
+        "volume": analytics_service.get_volume,
+        "sentiment": analytics_service.get_sentiment_breakdown,
+        "top_issues": analytics_service.get_top_issues,
+        "areas": analytics_service.get_area_breakdown,
+        "sources": analytics_service.get_source_distribution,
+        "segments": analytics_service.get_segment_breakdown,
+    }
+
+    print(f"{'widget':<12} {'engine':<6} {'p50 ms':>8} {'p95 ms':>8}  match")
+    for name, widget in widgets.items():
+        results = {}
+        for engine in ENGINES:
+            # get_settings() reads the environment on every call
+            os.environ["ANALYTICS_ENGINE"] = engine
+            widget(args.org_id, args.period)  # warm up caches and global ordinals
+            took, result = _time(lambda: widget(args.org_id, args.period), args.iterations)
+            result.pop("sampling", None)
+            results[engine] = _round(result)
+            p95 = took[min(len(took) - 1, int(len(took) * 0.95))]
+            match = ("yes" if results["dsl"] == results["esql"] else "NO") if engine == "esql" else ""
+            print(f"{name:<12} {engine:<6} {statistics.median(took):>8.1f} {p95:>8.1f}  {match}")
+
+
+if __name__ == "__main__":
+    main()
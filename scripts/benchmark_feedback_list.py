@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark newest-first feedback list queries on an unsorted index versus one
+sorted by created_at desc, with exact and bounded total hit counts.
+
+Usage:
+  cd Hackathon && python scripts/benchmark_feedback_list.py [--docs 5000000] [--iterations 50] [--keep]
+
+Loads the same synthetic feedback into list-bench-unsorted and
+list-bench-sorted (one shard, no replicas), then reports p50/p95 of the ES
+"took" time per case. Needs disk for roughly two copies of --docs feedback
+docs. Requires Elasticsearch settings in Hackathon/.env.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+from datetime import datetime, timedelta
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+ORG_ID = "list-bench"
+INDICES = {"unsorted": "list-bench-unsorted", "sorted": "list-bench-sorted"}
+AREAS = ["checkout", "search", "onboarding", "billing", "reporting", "mobile", "integrations", "performance"]
+SOURCES = ["support_ticket", "app_store_review", "nps_csat", "customer_email", "bug_report"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+WORDS = "slow crash login export checkout button page report sync error love great missing confusing fast".split()
+
+
+def _docs(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    span = int(timedelta(days=730).total_seconds())
+    for i in range(count):
+        created = start + timedelta(seconds=rng.randrange(span))
+        yield {
+            "id": f"fb-{i}",
+            "org_id": ORG_ID,
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))),
+            "source": rng.choice(SOURCES),
+            "sentiment": rng.choice(SENTIMENTS),
+            "sentiment_score": round(rng.uniform(-1, 1), 3),
+            "product_area": rng.choice(AREAS),
+            "customer_id": f"c{rng.randrange(5000)}",
+            "created_at": created.isoformat() + "Z",
+            "ingested_at": created.isoformat() + "Z",
+        }
+
+
+def _load(es, index: str, count: int) -> None:
+    from elasticsearch.helpers import streaming_bulk
+
+    done = 0
+    for ok, _ in streaming_bulk(
+        es, ({"_index": index, "_id": d["id"], "_source": d} for d in _docs(count)),
+        chunk_size=5000, raise_on_error=False,
+    ):
+        done += ok
+        if done % 500000 == 0:
+            print(f"  {index}: {done} docs")
+    es.indices.put_settings(index=index, settings={"index.refresh_interval": "1s"})
+    es.indices.refresh(index=index)
+
+
+def _run(es, index: str, page: int, track_total_hits, iterations: int) -> list[int]:
+    took = []
+    for _ in range(iterations):
+        resp = es.search(
+            index=index,
+            query={"bool": {"must": [{"term": {"org_id": ORG_ID}}]}},
+            sort=[{"created_at": {"order": "desc"}}],
+            from_=(page - 1) * 20,
+            size=20,
+            track_total_hits=track_total_hits,
+            request_cache=False,
+        )
+        took.append(resp["took"])
+    return took
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark feedback list queries with and without index sorting.")
+    parser.add_argument("--docs", type=int, default=5_000_000, help="Synthetic docs per index (default 5M)")
+    parser.add_argument("--iterations", type=int, default=50, help="Queries per case (default 50)")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark indices (skip reload next run)")
+    args = parser.parse_args()
+
+    from app.config import get_settings
+    from app.es_client import get_es_client
+    from app.models.feedback import FEEDBACK_INDEX_SORT, feedback_mapping
+
+    es = get_es_client()
+    mappings = feedback_mapping(False, "lean")["mappings"]
+    for kind, index in INDICES.items():
+        if es.indices.exists(index=index):
+            print(f"Reusing {index} ({es.count(index=index)['count']} docs)")
+            continue
+        settings = {"number_of_shards": 1, "number_of_replicas": 0, "refresh_interval": "-1"}
+        if kind == "sorted":
+            settings.update(FEEDBACK_INDEX_SORT)
+        es.indices.create(index=index, mappings=mappings, settings=settings)
+        print(f"Loading {args.docs} docs into {index}...")
+        _load(es, index, args.docs)
+
+    bound = get_settings().list_track_total_hits
+    print(f"\n{'index':<10} {'page':>4} {'totals':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for kind, index in INDICES.items():
+            for page in (1, 10):
+                for label, tth in (("exact", True), (f"<= {bound}", bound)):
+                    took = sorted(_run(es, index, page, tth, args.iterations))
+                    p95 = took[min(len(took) - 1, int(len(took) * 0.95))]
+                    print(f"{kind:<10} {page:>4} {label:>12} {statistics.median(took):>8.1f} {p95:>8}")
+    finally:
+        if not args.keep:
+            for index in INDICES.values():
+                es.indices.delete(index=index, ignore_unavailable=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Report per-org indices whose mapping is older than the current index template.
+
+Usage:
+  cd Hackathon && python scripts/check_index_mappings.py
+
+Exits 1 when any index is outdated. Requires Elasticsearch settings in Hackathon/.env.
+"""
+
+import os
+import sys
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+
+def main() -> None:
+    from app.es_client import get_es_client
+    from app.services.elser_service import ensure_elser_deployed
+    from app.services.index_template_service import check_mapping_versions
+
+    ensure_elser_deployed(get_es_client())
+    report = check_mapping_versions()
+    for entry in report["outdated"]:
+        print(
+            f"{entry['index']}: {entry['data_type']} mapping v{entry['mapping_version']}, "
+            f"expected v{entry['expected']} ({entry['reason']})"
+        )
+    print(f"Checked {report['checked']} indices, {len(report['outdated'])} outdated.")
+    sys.exit(1 if report["outdated"] else 0)
+
+
+if __name__ == "__main__":
+    main()
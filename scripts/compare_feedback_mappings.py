@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare disk and heap use of the standard and lean feedback mappings on a
+sample of an org's feedback.
+
+Usage:
+  cd Hackathon && python scripts/compare_feedback_mappings.py <org_id> [--max-docs N]
+
+Creates and deletes mapping-report-* scratch indices. Requires Elasticsearch
+settings in Hackathon/.env.
+"""
+
+import argparse
+import os
+import sys
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:.2f} MB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare feedback mapping profiles.")
+    parser.add_argument("org_id", help="Org whose feedback is sampled")
+    parser.add_argument("--max-docs", type=int, default=50000, help="Docs copied per profile (default 50000)")
+    args = parser.parse_args()
+
+    from app.services.mapping_report_service import compare_feedback_profiles
+
+    report = compare_feedback_profiles(args.org_id, max_docs=args.max_docs)
+    print(f"Org {report['org_id']}, {report['docs']} docs")
+    for profile, stats in report["profiles"].items():
+        print(
+            f"  {profile}: store {_mb(stats['store_bytes'])}, {stats['segments']} segments, "
+            f"fielddata/global ordinals {_mb(stats['fielddata_bytes'])}"
+        )
+    fields = sorted(
+        set(report["profiles"]["standard"]["fields"]) | set(report["profiles"]["lean"]["fields"]),
+        key=lambda f: -report["profiles"]["standard"]["fields"].get(f, 0),
+    )
+    print("  Per-field disk (standard -> lean):")
+    for field in fields[:15]:
+        before = report["profiles"]["standard"]["fields"].get(field, 0)
+        after = report["profiles"]["lean"]["fields"].get(field, 0)
+        print(f"    {field}: {_mb(before)} -> {_mb(after)}")
+    savings = report["savings"]
+    print(f"Lean saves {_mb(savings['store_bytes'])} ({savings['store_pct']}%).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Move per-org indices with an outdated mapping onto the current index template
+without downtime: copy into {org}-{type}-vN, catch up, swap the alias.
+
+Usage:
+  cd Hackathon && python scripts/migrate_index_mappings.py plan
+  cd Hackathon && python scripts/migrate_index_mappings.py run [--org ORG] [--type TYPE]
+      [--rps N] [--slices auto|N] [--parallel N]
+  cd Hackathon && python scripts/migrate_index_mappings.py status
+
+run without --org/--type migrates everything plan reports, and resumes jobs
+left unfinished by an earlier run. Requires Elasticsearch settings in
+Hackathon/.env.
+"""
+
+import argparse
+import os
+import sys
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+
+def _print_job(job: dict) -> None:
+    counts = ""
+    if job.get("dest_count") is not None:
+        counts = f" ({job.get('dest_count')}/{job.get('source_count')} docs)"
+    error = f": {job['error_message']}" if job.get("error_message") else ""
+    print(f"  {job['id']}: {job['status']}{counts}{error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate per-org indices to the current mapping version.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("plan", help="List outdated indices")
+    run = sub.add_parser("run", help="Migrate outdated indices")
+    run.add_argument("--org", help="Only this org")
+    run.add_argument("--type", help="Only this data type (e.g. feedback)")
+    run.add_argument("--rps", type=float, help="Reindex requests_per_second throttle (-1 for none)")
+    run.add_argument("--slices", help="Reindex slices: auto or a number")
+    run.add_argument("--parallel", type=int, default=4, help="Indices copied at once (default 4)")
+    sub.add_parser("status", help="Show migration records")
+    args = parser.parse_args()
+
+    from app.es_client import get_es_client
+    from app.services.elser_service import ensure_elser_deployed
+    from app.services.index_migration_service import list_migrations, plan_migrations, run_migrations
+    from app.services.index_template_service import install_index_templates
+
+    if args.command == "status":
+        jobs = list_migrations()
+        print(f"{len(jobs)} migrations:")
+        for job in jobs:
+            _print_job(job)
+        return
+
+    ensure_elser_deployed(get_es_client())
+    install_index_templates()
+    planned = plan_migrations()
+    if args.command == "plan":
+        for p in planned:
+            print(f"  {p['index']}: v{p['mapping_version']} -> v{p['expected']}")
+        print(f"{len(planned)} indices to migrate.")
+        return
+
+    targets = [(p["org_id"], p["data_type"]) for p in planned]
+    unfinished = list_migrations()
+    targets += [
+        (j["org_id"], j["data_type"]) for j in unfinished
+        if j["status"] in ("pending", "copying", "catching_up", "swapping")
+    ]
+    targets = [
+        t for t in dict.fromkeys(targets)
+        if (not args.org or t[0] == args.org) and (not args.type or t[1] == args.type)
+    ]
+    if args.org and args.type and not targets:
+        targets = [(args.org, args.type)]
+    print(f"Migrating {len(targets)} indices...")
+    jobs = run_migrations(targets, parallel=args.parallel, requests_per_second=args.rps, slices=args.slices)
+    for job in jobs:
+        _print_job(job)
+    failed = any(job["status"] == "failed" for job in jobs)
+    print("Done." if not failed else "Done with errors.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
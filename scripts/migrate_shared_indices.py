@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Move per-org indices ({org}-feedback, {org}-customers, ...) into shared
+indices routed by org_id, leaving filtered aliases under the old names.
+
+Usage:
+  cd Hackathon && python scripts/migrate_shared_indices.py [--dry-run] [org_id ...]
+
+Without org ids every org in the organizations index is migrated. Requires
+INDEX_TENANCY=shared and Elasticsearch settings in Hackathon/.env. Run while
+the orgs are idle: writes during the copy are not carried over.
+"""
+
+import argparse
+import os
+import sys
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate per-org indices to shared indices.")
+    parser.add_argument("org_ids", nargs="*", help="Orgs to migrate (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without changing anything")
+    args = parser.parse_args()
+
+    from app.services.es_service import shared_tenancy
+    from app.services.tenant_migration_service import migrate_all_orgs, migrate_org
+
+    if not shared_tenancy():
+        print("Error: set INDEX_TENANCY=shared before migrating", file=sys.stderr)
+        sys.exit(1)
+
+    if args.org_ids:
+        results = {org_id: migrate_org(org_id, dry_run=args.dry_run) for org_id in args.org_ids}
+    else:
+        results = migrate_all_orgs(dry_run=args.dry_run)
+
+    failed = False
+    for org_id, org_results in results.items():
+        print(f"Org {org_id}:")
+        for r in org_results:
+            print(f"  {r['index']}: {r['status']} ({r.get('docs', 0)} docs)")
+            failed = failed or r["status"] in ("count_mismatch", "error")
+    print("Done." if not failed else "Done with errors.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Split existing {org}-feedback indices into monthly partitions
+({org}-feedback-YYYY.MM) behind the {org}-feedback alias.
+
+Usage:
+  cd Hackathon && python scripts/partition_feedback.py [--dry-run] [org_id ...]
+
+Without org ids every org in the organizations index is partitioned. Requires
+FEEDBACK_PARTITIONING=monthly and Elasticsearch settings in Hackathon/.env.
+Run while the orgs are idle: writes during the copy are not carried over.
+"""
+
+import argparse
+import os
+import sys
+
+# Allow importing app from backend
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_hackathon_dir = os.path.dirname(_script_dir)
+_backend_dir = os.path.join(_hackathon_dir, "backend")
+sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(_hackathon_dir, ".env"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Partition feedback indices by month.")
+    parser.add_argument("org_ids", nargs="*", help="Orgs to partition (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Report partitions without changing anything")
+    args = parser.parse_args()
+
+    from app.models.user import ORGANIZATIONS_INDEX
+    from app.services.es_service import search_document_ids
+    from app.services.feedback_partition_service import (
+        ensure_feedback_ilm_policy,
+        partition_existing_feedback,
+        partitioning_enabled,
+    )
+
+    if not partitioning_enabled():
+        print("Error: set FEEDBACK_PARTITIONING=monthly (with INDEX_TENANCY=per_org) first", file=sys.stderr)
+        sys.exit(1)
+    if not args.dry_run:
+        ensure_feedback_ilm_policy()
+
+    org_ids = args.org_ids or search_document_ids(ORGANIZATIONS_INDEX, {"match_all": {}})
+    failed = False
+    for org_id in org_ids:
+        try:
+            r = partition_existing_feedback(org_id, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"{org_id}-feedback: error ({e})", file=sys.stderr)
+            failed = True
+            continue
+        print(f"{r['index']}: {r['status']} ({r['docs']} docs, {len(r['partitions'])} partitions)")
+        failed = failed or r["status"] == "count_mismatch"
+    print("Done." if not failed else "Done with errors.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()